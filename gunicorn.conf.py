@@ -14,7 +14,16 @@ backlog = 2048
 # Worker processes - Memory optimized for Render.com
 workers = 1  # Single worker for free tier (512MB limit)
 worker_class = "gthread"
-threads = 2  # Reduced from 4 to save memory
+# SSE (/api/company/<id>/events) her bağlantı için bir thread'i bağlantı süresince tutar.
+# Bu yüzden thread bütçesi ikiye ayrılır:
+#   GUNICORN_THREADS (2)               -> normal istekler (SSE bunlara dokunamaz)
+#   SMARTSAFE_SSE_MAX_SUBSCRIBERS (16) -> canlı SSE akışları (event broker aynı sayıyla sınırlar)
+# Gerçek kapasite: workers x SMARTSAFE_SSE_MAX_SUBSCRIBERS eşzamanlı dashboard (varsayılan 16).
+# SSE thread'i zamanının neredeyse tamamını Condition.wait'te geçirir; maliyeti CPU değil
+# thread stack'idir (birkaç yüz KB RSS). Limit doluysa 429 alan istemci polling'e düşer;
+# akışlar SMARTSAFE_SSE_STREAM_LIFETIME_S sonunda kapanır ve EventSource yeniden bağlanır.
+_sse_threads = int(os.getenv('SMARTSAFE_SSE_MAX_SUBSCRIBERS', '16'))
+threads = int(os.getenv('GUNICORN_THREADS', '2')) + _sse_threads
 worker_connections = 50  # Reduced for memory optimization
 timeout = 300  # Timeout for requests (5 minutes - allows cold start + initialization)
 worker_int = 30  # Worker interrupt timeout
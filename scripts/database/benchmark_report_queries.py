@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Report Query Benchmark - Index migration öncesi / sonrası
+Geçici bir SQLite veritabanına milyonlarca detection satırı yükler ve rapor,
+istatistik ve oturum sorgularını migration'lar uygulanmadan ve uygulandıktan
+sonra ölçer.
+
+Kullanım:
+    python scripts/database/benchmark_report_queries.py --rows 2000000
+    python scripts/database/benchmark_report_queries.py --rows 200000 --repeat 5 --db /tmp/bench.db
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from src.smartsafe.database.migrations import apply_migrations, rollback_to  # noqa: E402
+
+SCHEMA = (
+    '''CREATE TABLE IF NOT EXISTS detections (
+        detection_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        company_id TEXT NOT NULL, camera_id TEXT NOT NULL, detection_type TEXT NOT NULL,
+        confidence REAL DEFAULT 0, people_detected INTEGER DEFAULT 0, ppe_compliant INTEGER DEFAULT 0,
+        violations_count INTEGER DEFAULT 0, timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+        total_people INTEGER DEFAULT 0)''',
+    '''CREATE TABLE IF NOT EXISTS violations (
+        violation_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        company_id TEXT NOT NULL, camera_id TEXT NOT NULL, worker_id TEXT, missing_ppe TEXT NOT NULL,
+        violation_type TEXT NOT NULL, confidence REAL DEFAULT 0, timestamp DATETIME DEFAULT CURRENT_TIMESTAMP)''',
+    '''CREATE TABLE IF NOT EXISTS violation_events (
+        event_id TEXT PRIMARY KEY, company_id TEXT NOT NULL, camera_id TEXT NOT NULL, person_id TEXT NOT NULL,
+        violation_type TEXT NOT NULL, start_time REAL NOT NULL, end_time REAL, duration_seconds INTEGER,
+        snapshot_path TEXT, resolution_snapshot_path TEXT, severity TEXT DEFAULT 'warning',
+        status TEXT DEFAULT 'active', created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)''',
+    '''CREATE TABLE IF NOT EXISTS companies (company_id TEXT PRIMARY KEY, status TEXT DEFAULT 'active')''',
+    '''CREATE TABLE IF NOT EXISTS users (
+        user_id TEXT PRIMARY KEY, company_id TEXT NOT NULL, username TEXT, email TEXT, role TEXT,
+        status TEXT DEFAULT 'active')''',
+    '''CREATE TABLE IF NOT EXISTS sessions (
+        session_id TEXT PRIMARY KEY, user_id TEXT NOT NULL, company_id TEXT NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, expires_at TIMESTAMP NOT NULL,
+        ip_address TEXT, user_agent TEXT, status TEXT DEFAULT 'active')''',
+)
+
+PPE_TYPES = ('helmet', 'vest', 'gloves', 'glasses', 'mask')
+
+
+def seed(conn, rows: int, companies: int, cameras_per_company: int, days: int, batch: int = 50000):
+    """Detection satırlarının %10'u kadar violation ve violation_event üretir"""
+    rng = random.Random(42)
+    now = datetime.now()
+    cursor = conn.cursor()
+    for statement in SCHEMA:
+        cursor.execute(statement)
+
+    company_ids = [f"COMP_{i:04d}" for i in range(companies)]
+    cursor.executemany('INSERT INTO companies (company_id) VALUES (?)', [(c,) for c in company_ids])
+    cursor.executemany('INSERT INTO users (user_id, company_id, username, email, role) VALUES (?, ?, ?, ?, ?)',
+                       [(f"USR_{c}", c, c.lower(), f"{c.lower()}@example.com", 'admin') for c in company_ids])
+
+    def random_row():
+        company_id = rng.choice(company_ids)
+        camera_id = f"{company_id}_CAM_{rng.randrange(cameras_per_company):02d}"
+        ts = now - timedelta(seconds=rng.randrange(days * 86400))
+        return company_id, camera_id, ts
+
+    inserted = 0
+    while inserted < rows:
+        size = min(batch, rows - inserted)
+        detections, violations, events = [], [], []
+        for i in range(size):
+            company_id, camera_id, ts = random_row()
+            people = rng.randrange(0, 6)
+            compliant = rng.randrange(0, people + 1)
+            detections.append((company_id, camera_id, 'construction', round(rng.uniform(0.4, 0.99), 2),
+                               people, compliant, people - compliant, ts.strftime('%Y-%m-%d %H:%M:%S'), people))
+            if (inserted + i) % 10 == 0:
+                ppe = rng.choice(PPE_TYPES)
+                violations.append((company_id, camera_id, f"W{rng.randrange(500)}", ppe, f"missing_{ppe}",
+                                   0.8, ts.strftime('%Y-%m-%d %H:%M:%S')))
+                start = ts.timestamp()
+                resolved = rng.random() < 0.9
+                events.append((f"EVT_{inserted + i}", company_id, camera_id, f"P{rng.randrange(500)}",
+                               f"missing_{ppe}", start, start + 30 if resolved else None,
+                               30 if resolved else None, 'resolved' if resolved else 'active'))
+        cursor.executemany('''INSERT INTO detections (company_id, camera_id, detection_type, confidence,
+                              people_detected, ppe_compliant, violations_count, timestamp, total_people)
+                              VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)''', detections)
+        cursor.executemany('''INSERT INTO violations (company_id, camera_id, worker_id, missing_ppe,
+                              violation_type, confidence, timestamp) VALUES (?, ?, ?, ?, ?, ?, ?)''', violations)
+        cursor.executemany('''INSERT INTO violation_events (event_id, company_id, camera_id, person_id,
+                              violation_type, start_time, end_time, duration_seconds, status)
+                              VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)''', events)
+        conn.commit()
+        inserted += size
+        print(f"   📥 {inserted:,}/{rows:,} detection rows", end='\r', flush=True)
+    print()
+
+    sessions = []
+    for i in range(max(1000, companies * 200)):
+        company_id = company_ids[i % companies]
+        expires = now + timedelta(hours=rng.randrange(-48, 48))
+        sessions.append((f"SES_{i:08d}", f"USR_{company_id}", company_id, expires.strftime('%Y-%m-%d %H:%M:%S')))
+    cursor.executemany('INSERT INTO sessions (session_id, user_id, company_id, expires_at) VALUES (?, ?, ?, ?)',
+                       sessions)
+    conn.commit()
+    return company_ids, len(sessions)
+
+
+def build_queries(company_id: str, session_count: int):
+    """Endpoint'lerin çalıştırdığı SQL (SQLite sürümleri) - (isim, sql, parametreler)"""
+    camera_id = f"{company_id}_CAM_03"
+    start_date = (datetime.now() - timedelta(days=30)).isoformat()
+    return [
+        ('company stats (24h)', '''
+            SELECT COUNT(*), SUM(people_detected), SUM(ppe_compliant), SUM(violations_count), AVG(confidence)
+            FROM detections WHERE company_id = ? AND timestamp >= datetime('now', '-' || ? || ' hours')
+        ''', (company_id, 24)),
+        ('camera detections (latest 100)', '''
+            SELECT * FROM detections WHERE camera_id = ? ORDER BY timestamp DESC LIMIT 100
+        ''', (camera_id,)),
+        ('violations report: daily', '''
+            SELECT DATE(timestamp), COUNT(*), GROUP_CONCAT(DISTINCT missing_ppe) FROM violations
+            WHERE company_id = ? AND timestamp >= ? GROUP BY DATE(timestamp) ORDER BY DATE(timestamp) DESC LIMIT 30
+        ''', (company_id, start_date)),
+        ('violations report: per camera', '''
+            SELECT camera_id, COUNT(*) AS count, MAX(timestamp) FROM violations
+            WHERE company_id = ? AND timestamp >= ? GROUP BY camera_id ORDER BY count DESC
+        ''', (company_id, start_date)),
+        ('violation history (24h)', '''
+            SELECT * FROM violation_events WHERE camera_id = ? AND start_time >= ? ORDER BY start_time DESC LIMIT 100
+        ''', (camera_id, time.time() - 86400)),
+        ('active violations', '''
+            SELECT * FROM violation_events WHERE company_id = ? AND status = 'active'
+        ''', (company_id,)),
+        ('validate_session', '''
+            SELECT s.user_id, s.company_id, u.username, u.email, u.role
+            FROM sessions s JOIN users u ON s.user_id = u.user_id JOIN companies c ON s.company_id = c.company_id
+            WHERE s.session_id = ? AND s.expires_at > datetime('now')
+                  AND s.status = 'active' AND u.status = 'active' AND c.status = 'active'
+        ''', (f"SES_{session_count // 2:08d}",)),
+    ]
+
+
+def time_queries(conn, queries, repeat: int):
+    """Sorgu başına medyan süre (ms)"""
+    results = {}
+    cursor = conn.cursor()
+    for name, sql, params in queries:
+        samples = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            cursor.execute(sql, params).fetchall()
+            samples.append((time.perf_counter() - started) * 1000)
+        results[name] = statistics.median(samples)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Report query benchmark before/after index migrations')
+    parser.add_argument('--rows', type=int, default=2_000_000, help='Detection rows to seed')
+    parser.add_argument('--companies', type=int, default=50)
+    parser.add_argument('--cameras', type=int, default=20, help='Cameras per company')
+    parser.add_argument('--days', type=int, default=90, help='Time span of seeded data')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per query (median is reported)')
+    parser.add_argument('--db', help='SQLite file (default: temporary file, removed afterwards)')
+    args = parser.parse_args()
+
+    db_path = args.db or os.path.join(tempfile.mkdtemp(prefix='smartsafe_bench_'), 'bench.db')
+    print("=" * 70)
+    print("📊 REPORT QUERY BENCHMARK - index migrations")
+    print("=" * 70)
+    print(f"📁 Database: {db_path}")
+
+    conn = sqlite3.connect(db_path)
+    try:
+        started = time.perf_counter()
+        company_ids, session_count = seed(conn, args.rows, args.companies, args.cameras, args.days)
+        print(f"✅ Seeded in {time.perf_counter() - started:.1f}s")
+
+        rollback_to(conn, 'sqlite', 0)
+        queries = build_queries(company_ids[len(company_ids) // 2], session_count)
+        before = time_queries(conn, queries, args.repeat)
+
+        started = time.perf_counter()
+        applied = apply_migrations(conn, 'sqlite')
+        print(f"🔧 Migrations {applied} applied in {time.perf_counter() - started:.1f}s")
+        after = time_queries(conn, queries, args.repeat)
+
+        print()
+        print(f"{'query':<34}{'before ms':>12}{'after ms':>12}{'speedup':>10}")
+        print("-" * 68)
+        for name, _, _ in queries:
+            speedup = before[name] / after[name] if after[name] > 0 else float('inf')
+            print(f"{name:<34}{before[name]:>12.2f}{after[name]:>12.2f}{speedup:>9.1f}x")
+    finally:
+        conn.close()
+        if not args.db:
+            os.remove(db_path)
+            os.rmdir(os.path.dirname(db_path))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+SQLite Connection Benchmark - sorgu başına bağlantı vs kalıcı WAL bağlantıları
+Aynı karışık okuma / yazma yükünü (N okuyucu thread + M detection yazıcı thread)
+iki modda çalıştırır ve saniyedeki işlem sayısını, "database is locked"
+hatalarını ve gecikme yüzdeliklerini raporlar.
+
+- per-query: eski DatabaseAdapter davranışı (her sorguda sqlite3.connect,
+  rollback journal, kilitlenmede üstel geri çekilme)
+- persistent: SQLiteConnectionManager (thread başına bağlantı, WAL, tek yazıcı)
+
+Kullanım:
+    python scripts/database/benchmark_sqlite_connections.py
+    python scripts/database/benchmark_sqlite_connections.py --readers 8 --writers 4 --seconds 10
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from src.smartsafe.database.sqlite_connections import SQLiteConnectionManager  # noqa: E402
+from src.smartsafe.services.latency_tracer import percentile  # noqa: E402
+
+SCHEMA = '''CREATE TABLE IF NOT EXISTS detections (
+    detection_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    company_id TEXT NOT NULL, camera_id TEXT NOT NULL, detection_type TEXT NOT NULL,
+    confidence REAL DEFAULT 0, people_detected INTEGER DEFAULT 0, ppe_compliant INTEGER DEFAULT 0,
+    violations_count INTEGER DEFAULT 0, timestamp DATETIME DEFAULT CURRENT_TIMESTAMP)'''
+INDEX = 'CREATE INDEX IF NOT EXISTS idx_detections_company_ts ON detections (company_id, timestamp)'
+INSERT = '''INSERT INTO detections (company_id, camera_id, detection_type, confidence, people_detected,
+            ppe_compliant, violations_count) VALUES (?, ?, ?, ?, ?, ?, ?)'''
+READ = '''SELECT COUNT(*), SUM(people_detected), SUM(violations_count) FROM detections
+          WHERE company_id = ? AND timestamp >= datetime('now', '-1 hours')'''
+COMPANIES = [f"COMP_{i:03d}" for i in range(20)]
+
+
+def prepare(db_path: str, seed_rows: int):
+    conn = sqlite3.connect(db_path)
+    conn.execute('PRAGMA journal_mode=DELETE')
+    conn.execute(SCHEMA)
+    conn.execute(INDEX)
+    rng = random.Random(7)
+    conn.executemany(INSERT, [(rng.choice(COMPANIES), 'CAM_01', 'construction', 0.9, 3, 2, 1)
+                              for _ in range(seed_rows)])
+    conn.commit()
+    conn.close()
+
+
+class PerQueryConnections:
+    """Eski davranış: her sorguda yeni bağlantı, kilitte 3 deneme ve üstel bekleme"""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+
+    def run(self, sql: str, params: tuple, write: bool) -> bool:
+        delay = 0.1
+        for attempt in range(3):
+            conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+            try:
+                cursor = conn.execute(sql, params)
+                if write:
+                    conn.commit()
+                else:
+                    cursor.fetchall()
+                return True
+            except sqlite3.OperationalError as e:
+                if 'database is locked' in str(e) and attempt < 2:
+                    time.sleep(delay)
+                    delay *= 2
+                    continue
+                return False
+            finally:
+                conn.close()
+        return False
+
+
+class PersistentConnections:
+    def __init__(self, db_path: str):
+        self.manager = SQLiteConnectionManager(db_path)
+
+    def run(self, sql: str, params: tuple, write: bool) -> bool:
+        try:
+            if write:
+                with self.manager.writer() as conn:
+                    conn.execute(sql, params)
+            else:
+                conn = self.manager.connection()
+                try:
+                    conn.execute(sql, params).fetchall()
+                finally:
+                    conn.close()
+            return True
+        except sqlite3.OperationalError:
+            return False
+
+
+def run_load(backend, readers: int, writers: int, seconds: float):
+    stop = threading.Event()
+    results = {'read': [], 'write': [], 'errors': 0}
+    lock = threading.Lock()
+
+    def worker(write: bool, seed: int):
+        rng = random.Random(seed)
+        latencies, errors = [], 0
+        while not stop.is_set():
+            company = rng.choice(COMPANIES)
+            if write:
+                sql, params = INSERT, (company, 'CAM_01', 'construction', 0.9, 3, 2, 1)
+            else:
+                sql, params = READ, (company,)
+            started = time.perf_counter()
+            ok = backend.run(sql, params, write)
+            latencies.append((time.perf_counter() - started) * 1000)
+            if not ok:
+                errors += 1
+        with lock:
+            results['write' if write else 'read'].extend(latencies)
+            results['errors'] += errors
+
+    threads = [threading.Thread(target=worker, args=(False, i)) for i in range(readers)]
+    threads += [threading.Thread(target=worker, args=(True, 1000 + i)) for i in range(writers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def report(name: str, results, seconds: float):
+    reads, writes = sorted(results['read']), sorted(results['write'])
+    total = len(reads) + len(writes)
+    print(f"{name:<12}{total / seconds:>10.0f}{len(reads) / seconds:>10.0f}{len(writes) / seconds:>10.0f}"
+          f"{percentile(reads, 99):>12.2f}{percentile(writes, 99):>12.2f}{results['errors']:>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Mixed read/write throughput: per-query vs persistent WAL connections')
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=5.0)
+    parser.add_argument('--seed-rows', type=int, default=100_000)
+    args = parser.parse_args()
+
+    print("=" * 72)
+    print(f"📊 SQLITE CONNECTION BENCHMARK - {args.readers} readers / {args.writers} writers, {args.seconds}s")
+    print("=" * 72)
+    print(f"{'mode':<12}{'ops/s':>10}{'reads/s':>10}{'writes/s':>10}{'read p99':>12}{'write p99':>12}{'errors':>9}")
+    print("-" * 72)
+
+    for name, factory in (('per-query', PerQueryConnections), ('persistent', PersistentConnections)):
+        workdir = tempfile.mkdtemp(prefix='smartsafe_conn_bench_')
+        db_path = os.path.join(workdir, 'bench.db')
+        try:
+            prepare(db_path, args.seed_rows)
+            backend = factory(db_path)
+            report(name, run_load(backend, args.readers, args.writers, args.seconds), args.seconds)
+            if isinstance(backend, PersistentConnections):
+                backend.manager.close_all()
+        finally:
+            for suffix in ('', '-wal', '-shm', '-journal'):
+                if os.path.exists(db_path + suffix):
+                    os.remove(db_path + suffix)
+            os.rmdir(workdir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Detection Log Replay - ikili detection günlüğünden zaman aralığı okuma
+Denetim için ham frame'leri NDJSON olarak döker ya da kayıtlı box'lar üzerinde
+uyum kuralını çevrimdışı yeniden çalıştırır (model tekrar çalışmaz):
+
+- Her 'person' box'ı için gerekli PPE sınıflarının her biri, merkezi kişinin
+  box'ı içinde kalan bir box ile karşılanıyorsa kişi uyumlu sayılır
+- Sonuç, canlı döngünün o anda kaydettiği uyumlu kişi sayısıyla karşılaştırılır
+
+Kullanım:
+    python scripts/monitoring/replay_detection_log.py COMP_1 CAM_1 --start 2024-03-05T08:00 --end 2024-03-05T09:00
+    python scripts/monitoring/replay_detection_log.py COMP_1 CAM_1 --start ... --end ... \\
+        --required helmet,safety_vest
+"""
+
+import argparse
+import json
+import os
+import sys
+from datetime import datetime
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from src.smartsafe.services.detection_log import DetectionLog  # noqa: E402
+
+
+def parse_time(value: str) -> float:
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+
+def _center_inside(box, person) -> bool:
+    cx, cy = (box[0] + box[2]) / 2, (box[1] + box[3]) / 2
+    return person[0] <= cx <= person[2] and person[1] <= cy <= person[3]
+
+
+def compliant_people(frame, required) -> int:
+    people = [box.bbox for box in frame.boxes if box.class_name == 'person']
+    ppe = [box for box in frame.boxes if box.class_name in required]
+    return sum(1 for person in people
+               if all(any(item.class_name == name and _center_inside(item.bbox, person) for item in ppe)
+                      for name in required))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Dump or re-check detections from the binary detection log')
+    parser.add_argument('company_id')
+    parser.add_argument('camera_id')
+    parser.add_argument('--start', required=True, help='epoch seconds or ISO time')
+    parser.add_argument('--end', required=True, help='epoch seconds or ISO time')
+    parser.add_argument('--root', default=os.getenv('SMARTSAFE_DETECTION_LOG_DIR', 'detection_logs'))
+    parser.add_argument('--required', default='', help='comma-separated PPE class names to re-check')
+    args = parser.parse_args()
+
+    log = DetectionLog(root=args.root, retention_days=0)
+    frames = log.read_range(args.company_id, args.camera_id, parse_time(args.start), parse_time(args.end))
+    required = [name.strip() for name in args.required.split(',') if name.strip()]
+    if not required:
+        for frame in frames:
+            print(json.dumps(frame.to_dict()))
+        return
+
+    total = people = logged = recomputed = mismatched = 0
+    for frame in frames:
+        compliant = compliant_people(frame, required)
+        total += 1
+        people += sum(1 for box in frame.boxes if box.class_name == 'person')
+        logged += frame.compliant
+        recomputed += compliant
+        if compliant != frame.compliant:
+            mismatched += 1
+    print(json.dumps({
+        'frames': total,
+        'people': people,
+        'required_ppe': required,
+        'logged_compliant': logged,
+        'recomputed_compliant': recomputed,
+        'recomputed_compliance_rate': round(recomputed / people * 100, 1) if people else None,
+        'frames_with_different_result': mismatched,
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
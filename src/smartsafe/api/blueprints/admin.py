@@ -7,6 +7,9 @@ import os
 from datetime import datetime, timedelta
 import re
 
+from src.smartsafe.database.query_profiler import get_query_profiler
+from src.smartsafe.services.ttl_cache import invalidate_company
+
 logger = logging.getLogger(__name__)
 
 
@@ -129,10 +132,50 @@ def create_blueprint(api):
             
             conn.commit()
             conn.close()
+            invalidate_company(company_id)
             
             return jsonify({'success': True, 'message': f'Şirket {company_name} silindi'})
             
         except Exception as e:
             return jsonify({'success': False, 'error': str(e)}), 500
 
+    # === QUERY PROFILER ===
+    @bp.route('/api/admin/db/queries', methods=['GET'])
+    def admin_query_profile():
+        """Admin - Parmak izi başına sorgu istatistikleri, yavaş sorgu ve N+1 günlüğü"""
+        if not session.get('admin_authenticated'):
+            return jsonify({'error': 'Yetkisiz erişim'}), 401
+        
+        sort = request.args.get('sort', 'total_ms')
+        limit = min(max(request.args.get('limit', 50, type=int), 1), 500)
+        return jsonify({'success': True, **get_query_profiler().stats(sort, limit)})
+    
+    @bp.route('/api/admin/db/queries/reset', methods=['POST'])
+    def admin_query_profile_reset():
+        """Admin - Profil istatistiklerini sıfırla"""
+        if not session.get('admin_authenticated'):
+            return jsonify({'error': 'Yetkisiz erişim'}), 401
+        
+        get_query_profiler().reset()
+        return jsonify({'success': True})
+    
+    @bp.route('/api/admin/db/queries/<fingerprint>/explain', methods=['GET'])
+    def admin_query_explain(fingerprint):
+        """Admin - Yavaş sorgunun EXPLAIN planı (son yavaş örnekle)"""
+        if not session.get('admin_authenticated'):
+            return jsonify({'error': 'Yetkisiz erişim'}), 401
+        
+        conn = None
+        try:
+            conn = api.db.db_adapter.get_connection()
+            return jsonify({'success': True, **get_query_profiler().explain(fingerprint, conn)})
+        except KeyError:
+            return jsonify({'success': False, 'error': 'Bu parmak izi için yavaş sorgu örneği yok'}), 404
+        except Exception as e:
+            logger.error(f"❌ Query explain failed: {e}")
+            return jsonify({'success': False, 'error': str(e)}), 500
+        finally:
+            if conn is not None:
+                api.db.db_adapter.close_connection(conn)
+
     return bp
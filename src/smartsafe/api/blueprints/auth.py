@@ -7,6 +7,8 @@ import os
 from datetime import datetime, timedelta
 import re
 
+from src.smartsafe.services.session_cache import get_session_cache
+
 logger = logging.getLogger(__name__)
 
 
@@ -1240,6 +1242,9 @@ def create_blueprint(api):
     @bp.route('/logout', methods=['POST'])
     def logout():
         """Çıkış işlemi"""
+        session_id = session.get('session_id')
+        if session_id:
+            get_session_cache().invalidate_session(session_id)
         session.clear()
         return jsonify({'success': True, 'message': 'Çıkış yapıldı'})
 
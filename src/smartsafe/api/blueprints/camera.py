@@ -16,6 +16,11 @@ from requests.auth import HTTPBasicAuth
 from datetime import datetime
 from typing import Dict, Any
 
+from src.smartsafe.services.frame_ring import get_frame_ring_registry
+from src.smartsafe.services.snapshot_poller import get_snapshot_poller
+from src.smartsafe.services.response_cache import KEY_CHART_DATA, KEY_STATS, get_response_cache
+from src.smartsafe.services.ttl_cache import invalidate_company
+
 logger = logging.getLogger(__name__)
 
 
@@ -76,39 +81,71 @@ def create_blueprint(api):
             last_detection_time = 0
             detection_frequency = 5  # Her 5 frame'de bir detection (daha sık)
 
+            # Async snapshot poller: host başına keep-alive, paralel URL keşfi; aynı kamerayı
+            # izleyen tüm istemciler tek polling'i paylaşır
+            poller = get_snapshot_poller()
+            poll_key = f"{company_id}_{camera_id}_mjpeg"
+
+            def fetch_frame_blocking():
+                """aiohttp yoksa: her frame için sıralı requests.get (eski yol)"""
+                try:
+                    response = requests.get(stream_url, auth=auth, timeout=3)
+                    if response.status_code == 200:
+                        frame_data = np.frombuffer(response.content, np.uint8)
+                        frame = cv2.imdecode(frame_data, cv2.IMREAD_COLOR)
+                        if frame is not None:
+                            return frame
+                except Exception as e:
+                    logger.debug(f"Primary URL failed: {e}")
+                
+                for alt_url in alternative_urls:
+                    try:
+                        response = requests.get(alt_url, auth=auth, timeout=3)
+                        if response.status_code == 200:
+                            frame_data = np.frombuffer(response.content, np.uint8)
+                            frame = cv2.imdecode(frame_data, cv2.IMREAD_COLOR)
+                            if frame is not None:
+                                return frame
+                    except Exception as e:
+                        logger.debug(f"Alternative URL failed {alt_url}: {e}")
+                        continue
+                return None
+
             def generate():
+                # Abonelik generator içinde alınır: istemci body başlamadan koparsa generator
+                # hiç çalışmaz ve abonelik sızmaz; başladıysa finally bırakır
+                use_poller = poller.subscribe(
+                    poll_key, [stream_url] + alternative_urls,
+                    auth=(username, password) if (username and password) else None,
+                    interval=0.04, timeout=3.0
+                )
+                try:
+                    yield from stream_frames(use_poller)
+                finally:
+                    if use_poller:
+                        poller.unsubscribe(poll_key)
+
+            def stream_frames(use_poller):
                 nonlocal frame_count, last_detection_time
+                last_seq = 0
                 
                 while True:
                     try:
-                        # Try to get frame from primary URL
                         frame = None
-                        working_url = None
-                        
-                        # Primary URL'yi dene
-                        try:
-                            response = requests.get(stream_url, auth=auth, timeout=3)
-                            if response.status_code == 200:
-                                frame_data = np.frombuffer(response.content, np.uint8)
-                                frame = cv2.imdecode(frame_data, cv2.IMREAD_COLOR)
-                                working_url = stream_url
-                        except Exception as e:
-                            logger.debug(f"Primary URL failed: {e}")
-                        
-                        # Alternatif URL'leri dene
-                        if frame is None:
-                            for alt_url in alternative_urls:
-                                try:
-                                    response = requests.get(alt_url, auth=auth, timeout=3)
-                                    if response.status_code == 200:
-                                        frame_data = np.frombuffer(response.content, np.uint8)
-                                        frame = cv2.imdecode(frame_data, cv2.IMREAD_COLOR)
-                                        if frame is not None:
-                                            working_url = alt_url
-                                            break
-                                except Exception as e:
-                                    logger.debug(f"Alternative URL failed {alt_url}: {e}")
-                                    continue
+                        if use_poller:
+                            ring = get_frame_ring_registry().get(poll_key)
+                            view = ring.acquire_latest(min_seq=last_seq) if ring is not None else None
+                            if view is not None:
+                                with view:
+                                    last_seq = view.seq
+                                    # Detection overlay'i frame üzerine çizildiği için yazılabilir kopya
+                                    frame = view.frame.copy()
+                            elif ring is not None and ring.has_frame():
+                                # Yeni frame henüz gelmedi - son frame'i tekrar gönderme
+                                time.sleep(0.01)
+                                continue
+                        else:
+                            frame = fetch_frame_blocking()
                         
                         if frame is not None and frame.size > 0:
                             frame_count += 1
@@ -278,9 +315,13 @@ def create_blueprint(api):
         if not user_data or user_data['company_id'] != company_id:
             return jsonify({'error': 'Yetkisiz erişim'}), 401
         
-        try:
+        degraded = []  # Hata yedeğiyle üretilen sonuç döner ama cache'lenmez
+        
+        def compute_stats():
             # MultiTenant database'den base istatistikleri al
             stats = api.db.get_company_stats(company_id)
+            if stats.get('degraded'):
+                degraded.append('company_stats')
             
             # Gerçek kamera sayısını database'den al (unified approach)
             try:
@@ -297,11 +338,12 @@ def create_blueprint(api):
                     'inactive_cameras': total_cameras - active_cameras
                 })
                 
-                logger.info(f"✅ Unified stats for company {company_id}: {total_cameras} cameras ({active_cameras} active, {discovered_cameras} discovered)")
+                logger.debug(f"✅ Unified stats for company {company_id}: {total_cameras} cameras ({active_cameras} active, {discovered_cameras} discovered)")
                 
             except Exception as camera_error:
                 logger.error(f"❌ Error getting camera stats: {camera_error}")
                 # Fallback to existing stats without camera updates
+                degraded.append('cameras')
             
             # Enhanced stats with unified camera data
             enhanced_stats = {
@@ -328,7 +370,13 @@ def create_blueprint(api):
                 'last_updated': datetime.now().isoformat()
             }
             
-            return jsonify(enhanced_stats)
+            return enhanced_stats
+
+        try:
+            # Dashboard polling'i: şirket başına kısa TTL'li cache, eşzamanlı miss'lerde tek hesaplama
+            return jsonify(get_response_cache().get_or_compute(
+                company_id, KEY_STATS, compute_stats,
+                cache_if=lambda value: value is not None and not degraded))
             
         except Exception as e:
             logger.error(f"❌ Stats error for company {company_id}: {e}")
@@ -416,7 +464,7 @@ def create_blueprint(api):
             
             # Abonelik limit kontrolü
             logger.info(f"🔍 Checking subscription limits...")
-            subscription_info = api.get_subscription_info_internal(company_id)
+            subscription_info = api.get_subscription_info_internal(company_id, use_cache=False)
             logger.info(f"📊 Subscription info: {subscription_info}")
                 
             if not subscription_info['success']:
@@ -481,6 +529,8 @@ def create_blueprint(api):
             # Kamera ekle
             logger.info(f"💾 Calling database add_camera function...")
             success, result = api.db.add_camera(company_id, mapped_data)
+            # Kamera sayıları stats / abonelik yanıtlarında
+            get_response_cache().invalidate(company_id)
             logger.info(f"💾 Database result - Success: {success}, Result: {result}")
             
             if success:
@@ -506,8 +556,9 @@ def create_blueprint(api):
             return jsonify({'error': 'Yetkisiz erişim'}), 401
         
         try:
-            # Gerçek detection sonuçlarından grafik verilerini hesapla
-            chart_data = api.calculate_real_chart_data(company_id)
+            # Gerçek detection sonuçlarından grafik verilerini hesapla (şirket başına cache'li)
+            chart_data = get_response_cache().get_or_compute(
+                company_id, KEY_CHART_DATA, lambda: api.calculate_real_chart_data(company_id))
             
             return jsonify(chart_data)
             
@@ -1214,6 +1265,8 @@ def create_blueprint(api):
             
             # Kamerayı güncelle
             success = api.db.update_camera_status(camera_id, company_id, new_status)
+            # Kamera sayıları stats / abonelik yanıtlarında
+            get_response_cache().invalidate(company_id)
             
             if success:
                 logger.info(f"✅ Camera status updated successfully to: {new_status}")
@@ -1750,6 +1803,8 @@ def create_blueprint(api):
             
             # Veritabanından kamerayı sil
             success = api.db.delete_camera(camera_id, company_id)
+            # Kamera sayıları stats / abonelik yanıtlarında
+            get_response_cache().invalidate(company_id)
             
             if not success:
                 return jsonify({
@@ -1812,6 +1867,8 @@ def create_blueprint(api):
             
             # Database update
             success = api.db.update_camera(camera_id, company_id, camera_data)
+            # Kamera sayıları stats / abonelik yanıtlarında
+            get_response_cache().invalidate(company_id)
             
             if not success:
                 return jsonify({
@@ -2022,6 +2079,8 @@ def create_blueprint(api):
             
             conn.commit()
             conn.close()
+            # Detection worker'ları bir sonraki frame'de yeni snapshot'ı alır
+            invalidate_company(company_id)
             
             logger.info(f"✅ PPE config updated for company {company_id}: {len(cleaned_ppe_config['required'])} required, {len(cleaned_ppe_config['optional'])} optional")
             
@@ -11,6 +11,13 @@ import threading
 import queue
 from datetime import datetime, timedelta
 
+from src.smartsafe.database.pagination import InvalidCursor
+from src.smartsafe.services.detection_log import get_detection_log
+from src.smartsafe.services.response_cache import GLOBAL_NAMESPACE, KEY_SECTORS, get_response_cache
+from src.smartsafe.services.event_broker import (
+    EVENT_STATUS, get_event_broker, stream_events
+)
+
 logger = logging.getLogger(__name__)
 
 # Lazy import to avoid circular import: smartsafe_saas_api -> blueprints -> detection -> smartsafe_saas_api
@@ -33,6 +40,34 @@ def _get_detection_state():
     }
 
 
+def _publish_stopped(company_id, camera_id):
+    """SSE abonelerine kameranın durduğunu bildir"""
+    broker = get_event_broker()
+    broker.forget_camera(company_id, camera_id)
+    broker.publish(company_id, EVENT_STATUS, {
+        'camera_id': camera_id,
+        'is_active': False,
+        'timestamp': datetime.now().isoformat()
+    }, camera_id=camera_id)
+
+
+def _camera_rtsp_url(camera_info):
+    """Kameranın RTSP kaynağı (passthrough restream için); RTSP değilse None"""
+    import urllib.parse
+    rtsp_url = camera_info.get('rtsp_url') or ''
+    if rtsp_url.lower().startswith('rtsp://'):
+        return rtsp_url
+    if (camera_info.get('protocol') or '').lower() != 'rtsp' or not camera_info.get('ip_address'):
+        return None
+    username = camera_info.get('username') or ''
+    password = camera_info.get('password') or ''
+    auth = f"{urllib.parse.quote(username)}:{urllib.parse.quote(password)}@" if username and password else ''
+    stream_path = camera_info.get('stream_path') or '/'
+    if not stream_path.startswith('/'):
+        stream_path = '/' + stream_path
+    return f"rtsp://{auth}{camera_info['ip_address']}:{camera_info.get('port') or 554}{stream_path}"
+
+
 def create_blueprint(api):
     bp = Blueprint('detection', __name__)
 
@@ -141,18 +176,21 @@ def create_blueprint(api):
         if not user_data:
             return jsonify({'error': 'Unauthorized'}), 401
         
-        try:
+        def list_sectors():
             sectors = [
                 'construction', 'manufacturing', 'chemical', 
                 'food_beverage', 'warehouse_logistics', 'energy',
                 'petrochemical', 'marine_shipyard', 'aviation'
             ]
-            
-            return jsonify({
+            return {
                 'success': True,
                 'sectors': sectors,
                 'total_sectors': len(sectors)
-            })
+            }
+        
+        try:
+            # Sektör listesi şirketten bağımsız - tek global kayıt
+            return jsonify(get_response_cache().get_or_compute(GLOBAL_NAMESPACE, KEY_SECTORS, list_sectors))
             
         except Exception as e:
             logger.error(f"❌ Get SH17 sectors error: {e}")
@@ -339,6 +377,13 @@ def create_blueprint(api):
                 }
             }
             
+            get_event_broker().publish(company_id, EVENT_STATUS, {
+                'camera_id': camera_id,
+                'is_active': True,
+                'detection_mode': detection_mode,
+                'timestamp': datetime.now().isoformat()
+            }, camera_id=camera_id)
+            
             return jsonify({
                 'success': True,
                 'message': f'Kamera {camera_id} tespiti başlatıldı',
@@ -383,6 +428,7 @@ def create_blueprint(api):
                     if camera_key in state['frame_buffers']:
                         del state['frame_buffers'][camera_key]
                     
+                    _publish_stopped(company_id, camera_id)
                     logger.info(f"✅ Detection stopped for camera: {camera_id}")
                     return jsonify({'success': True, 'message': f'Kamera {camera_id} detection durduruldu'})
                 else:
@@ -405,6 +451,7 @@ def create_blueprint(api):
                         del state['frame_buffers'][camera_key]
                     if camera_key in state['detection_threads']:
                         del state['detection_threads'][camera_key]
+                    _publish_stopped(company_id, camera_key.split('_', 1)[1])
                 
                 return jsonify({'success': True, 'message': 'Tüm kameralar durduruldu'})
         except Exception as e:
@@ -524,6 +571,50 @@ def create_blueprint(api):
             logger.error(f"❌ Live stats error: {e}")
             return jsonify({'success': False, 'error': str(e)}), 500
 
+    @bp.route('/api/company/<company_id>/events')
+    def live_events(company_id):
+        """Canlı detection/ihlal olayları - Server-Sent Events (polling yerine push)
+        
+        ?camera_id=CAM1,CAM2 ile kamera filtresi verilebilir.
+        Olay tipleri: status, detection, violation, dropped
+        ?events=overlay,status ile tip seçilir (overlay sadece açıkça istenirse gelir)
+        """
+        user_data = api.validate_session()
+        if not user_data or user_data.get('company_id') != company_id:
+            return jsonify({'success': False, 'error': 'Yetkisiz erişim'}), 401
+        
+        camera_ids = [c.strip() for c in request.args.get('camera_id', '').split(',') if c.strip()]
+        event_types = [t.strip() for t in request.args.get('events', '').split(',') if t.strip()]
+        broker = get_event_broker()
+        subscription = broker.subscribe(company_id, camera_ids, event_types)
+        if subscription is None:
+            # EventSource 429'da yeniden denemez; istemci polling'e düşer
+            return jsonify({'success': False, 'error': 'Çok fazla canlı bağlantı'}), 429, {'Retry-After': '30'}
+        
+        # Bağlantı anındaki durum: aktif kameralar + her kameranın son detection özeti
+        state = _get_detection_state()
+        active_cameras = [key.split('_', 1)[1] for key, active in list(state['active_detectors'].items())
+                          if key.startswith(f"{company_id}_") and active]
+        if camera_ids:
+            active_cameras = [c for c in active_cameras if c in camera_ids]
+        initial_events = [{'id': 0, 'event': EVENT_STATUS, 'data': {
+            'active_camera_ids': active_cameras,
+            'timestamp': datetime.now().isoformat()
+        }}] + [event for event in broker.retained_events(company_id, camera_ids)
+               if event['event'] in subscription.event_types]
+        
+        response = Response(
+            stream_events(subscription, initial_events, max_lifetime=broker.stream_lifetime),
+            mimetype='text/event-stream',
+            headers={
+                'Cache-Control': 'no-cache',
+                'X-Accel-Buffering': 'no'
+            }
+        )
+        # Generator hiç başlamadan istemci koparsa da abonelik temizlensin
+        response.call_on_close(lambda: broker.unsubscribe(subscription))
+        return response
+
     @bp.route('/api/company/<company_id>/detection-results/<camera_id>')
     def get_detection_results(company_id, camera_id):
         """Detection sonuçlarını al - Production uyumlu"""
@@ -601,7 +692,7 @@ def create_blueprint(api):
             ad_ref = state['active_detectors']
             
             return Response(
-                api.generate_saas_frames(camera_key, company_id, camera_id, active_detectors_ref=ad_ref),
+                api.generate_saas_frames(camera_key, company_id, camera_id, active_detectors_ref=ad_ref, tier=request.args.get('tier')),
                 mimetype='multipart/x-mixed-replace; boundary=frame'
             )
                 
@@ -622,22 +713,70 @@ def create_blueprint(api):
                 return jsonify({'success': False, 'error': 'Unauthorized'}), 401
             
             limit = request.args.get('limit', 100, type=int)
+            # Sonraki sayfa: önceki yanıtın next_cursor'ı (keyset - derin sayfalar da ilk sayfa kadar ucuz)
+            cursor = request.args.get('cursor') or None
             
             from src.smartsafe.database.database_adapter import get_db_adapter
             db = get_db_adapter()
-            results = db.get_camera_detection_results(camera_id, company_id, limit)
+            page = db.get_camera_detection_page(camera_id, company_id, limit, cursor)
             
             return jsonify({
                 'success': True,
                 'camera_id': camera_id,
-                'results': results,
-                'total_count': len(results)
+                'results': page.items,
+                'total_count': len(page.items),
+                'next_cursor': page.next_cursor,
+                'has_more': page.has_more
             })
             
+        except InvalidCursor as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
         except Exception as e:
             logger.error(f"❌ Get detection history error: {e}")
             return jsonify({'success': False, 'error': str(e)}), 500
 
+    @bp.route('/api/company/<company_id>/cameras/<camera_id>/detection/log', methods=['GET'])
+    def get_camera_detection_log(company_id, camera_id):
+        """Ham inference sonuçları (ikili detection günlüğünden), NDJSON - satır başına bir frame
+        
+        ?start= / ?end= epoch saniye veya ISO zaman (varsayılan: son 1 saat, en fazla 24 saat)
+        """
+        user_data = api.validate_session()
+        if not user_data or user_data.get('company_id') != company_id:
+            return jsonify({'success': False, 'error': 'Unauthorized'}), 401
+        
+        def parse_time(value, default):
+            if not value:
+                return default
+            try:
+                return float(value)
+            except ValueError:
+                return datetime.fromisoformat(value).timestamp()
+        
+        try:
+            end = parse_time(request.args.get('end'), datetime.now().timestamp())
+            start = parse_time(request.args.get('start'), end - 3600)
+        except ValueError:
+            return jsonify({'success': False, 'error': 'Invalid start/end'}), 400
+        if end <= start or end - start > 86400:
+            return jsonify({'success': False, 'error': 'Time range must be between 0 and 24 hours'}), 400
+        
+        try:
+            frames = get_detection_log().read_range(company_id, camera_id, start, end)
+            first = next(frames, None)
+        except Exception as e:
+            logger.error(f"❌ Detection log read error: {e}")
+            return jsonify({'success': False, 'error': str(e)}), 500
+        
+        def generate():
+            if first is None:
+                return
+            yield json.dumps(first.to_dict()) + '\n'
+            for frame in frames:
+                yield json.dumps(frame.to_dict()) + '\n'
+        
+        return Response(generate(), mimetype='application/x-ndjson')
+
     @bp.route('/api/company/<company_id>/cameras/<camera_id>/detection/latest', methods=['GET'])
     def get_camera_latest_detection(company_id, camera_id):
         """Get latest detection result for a camera - Optimized with error handling"""
@@ -772,7 +911,7 @@ def create_blueprint(api):
             state = _get_detection_state()
             if state['active_detectors'].get(camera_key):
                 return Response(
-                    api.generate_saas_frames(camera_key, company_id, camera_id, active_detectors_ref=state['active_detectors']),
+                    api.generate_saas_frames(camera_key, company_id, camera_id, active_detectors_ref=state['active_detectors'], tier=request.args.get('tier')),
                     mimetype='multipart/x-mixed-replace; boundary=frame'
                 )
             
@@ -786,4 +925,36 @@ def create_blueprint(api):
             logger.error(f"❌ Detection stream endpoint error: {e}")
             return jsonify({'success': False, 'error': str(e)}), 500
 
+    @bp.route('/api/company/<company_id>/cameras/<camera_id>/restream/<filename>')
+    def get_camera_restream(company_id, camera_id, filename):
+        """H.264 passthrough HLS (fMP4) - transcode yok; overlay'ler /overlays veya SSE ile ayrı gelir"""
+        user_data = api.validate_session()
+        if not user_data or user_data.get('company_id') != company_id:
+            return jsonify({'success': False, 'error': 'Unauthorized'}), 401
+        
+        def resolve_sources():
+            camera_info = api.db.get_camera_by_id(camera_id, company_id)
+            source_url = _camera_rtsp_url(camera_info) if camera_info else None
+            return [source_url] if source_url else []
+        
+        try:
+            return api.serve_restream_file(f"{company_id}_{camera_id}", filename, resolve_sources)
+        except Exception as e:
+            logger.error(f"❌ Camera restream error: {e}")
+            return jsonify({'success': False, 'error': str(e)}), 500
+
+    @bp.route('/api/company/<company_id>/cameras/<camera_id>/overlays')
+    def get_camera_overlays(company_id, camera_id):
+        """Son detection bbox'ları (JSON) - restream videosu üzerine istemci tarafında çizilir"""
+        user_data = api.validate_session()
+        if not user_data or user_data.get('company_id') != company_id:
+            return jsonify({'success': False, 'error': 'Unauthorized'}), 401
+        
+        try:
+            latest = api.get_detection_overlay(f"{company_id}_{camera_id}")
+            return jsonify({'success': True, 'overlay': latest.get('overlay') if latest else None})
+        except Exception as e:
+            logger.error(f"❌ Camera overlays error: {e}")
+            return jsonify({'success': False, 'error': str(e)}), 500
+
     return bp
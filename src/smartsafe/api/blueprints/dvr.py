@@ -14,8 +14,14 @@ import cv2
 import numpy as np
 
 from src.smartsafe.database.database_adapter import get_db_adapter
+from src.smartsafe.database.pagination import InvalidCursor
 from src.smartsafe.integrations.dvr.dvr_ppe_integration import get_dvr_ppe_manager
+from src.smartsafe.database.stream_policies import STREAM_POLICIES
+from src.smartsafe.integrations.dvr.dvr_preview_service import get_preview_service
+from src.smartsafe.integrations.dvr.dvr_stream_handler import frame_ring_key, get_stream_handler
 from src.smartsafe.integrations.cameras.camera_integration_manager import DVRConfig
+from src.smartsafe.services.adaptive_mjpeg import adaptive_mjpeg_stream
+from src.smartsafe.services.frame_ring import get_frame_ring_registry
 
 logger = logging.getLogger(__name__)
 
@@ -235,6 +241,9 @@ def create_blueprint(api):
             # Generate stream ID
             stream_id = f"{dvr_id}_ch{channel_number:02d}"
             
+            # Önceden öğrenilmiş RTSP kalıbı varsa ilk denenen URL o olur
+            stream_handler.load_learned_pattern(company_id, {'dvr_id': dvr_id, **dvr_system})
+            
             # Ensure stream is running and wait until active
             success = stream_handler.start_stream(
                 stream_id=stream_id,
@@ -243,7 +252,9 @@ def create_blueprint(api):
                 username=dvr_system['username'],
                 password=dvr_system['password'],
                 rtsp_port=dvr_system['rtsp_port'],
-                channel_number=channel_number
+                channel_number=channel_number,
+                company_id=company_id,
+                dvr_id=dvr_id
             )
             if not success:
                 return jsonify({'success': False, 'error': 'Failed to start stream'}), 404
@@ -433,6 +444,7 @@ def create_blueprint(api):
 
             status = stream_handler.get_stream_status(stream_id)
             if not status or status.get('status') != 'active':
+                stream_handler.load_learned_pattern(company_id, {'dvr_id': dvr_id, **dvr_system})
                 seed_rtsp = (
                     f"rtsp://{dvr_system['ip_address']}:{dvr_system['rtsp_port']}"
                     f"/user={dvr_system['username']}&password={dvr_system['password']}"
@@ -445,64 +457,47 @@ def create_blueprint(api):
                     username=dvr_system['username'],
                     password=dvr_system['password'],
                     rtsp_port=dvr_system['rtsp_port'],
-                    channel_number=channel_number
+                    channel_number=channel_number,
+                    company_id=company_id,
+                    dvr_id=dvr_id
                 )
 
             boundary = 'frame'
+            ring_key = frame_ring_key(stream_id)
+            ring_registry = get_frame_ring_registry()
+
+            def next_frame(min_seq):
+                # Worker'ın yazdığı ham frame - base64 decode/re-encode yok
+                ring = ring_registry.get(ring_key)
+                view = ring.acquire_latest(min_seq) if ring is not None else None
+                if view is None:
+                    return None
+
+                def render():
+                    # 🎯 DETECTION OVERLAY EKLE
+                    detection_result = stream_handler.get_latest_detection_result(stream_id)
+                    if detection_result and detection_result.get('detections'):
+                        return api.draw_saas_overlay(view.frame.copy(), detection_result)
+                    return view.frame
+
+                return view.seq, render, view.release, view.captured_at
+
+            def idle_part():
+                # Ring henüz dolmadıysa stream açılırken alınan ilk frame gönderilir
+                ring = ring_registry.get(ring_key)
+                if ring is not None and ring.has_frame():
+                    return None
+                frame_b64 = stream_handler.get_latest_frame(stream_id)
+                return base64.b64decode(frame_b64) if frame_b64 else None
 
             def generate():
-                # Higher frame rate for smooth video (25 FPS)
-                frame_interval = 0.04  # 40ms between frames
-                last_frame_time = 0
-                
-                while True:
-                    try:
-                        current_time = time.time()
-                        
-                        # Only send frame if enough time has passed
-                        if current_time - last_frame_time >= frame_interval:
-                            frame_b64 = stream_handler.get_latest_frame(stream_id)
-                            if frame_b64:
-                                # 🎯 DETECTION OVERLAY EKLE
-                                try:
-                                    # Base64'ten frame'e çevir
-                                    jpg_bytes = base64.b64decode(frame_b64)
-                                    nparr = np.frombuffer(jpg_bytes, np.uint8)
-                                    frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-                                    
-                                    if frame is not None:
-                                        # Son detection sonuçlarını al
-                                        detection_result = stream_handler.get_latest_detection_result(stream_id)
-                                        if detection_result and 'detections' in detection_result:
-                                            # Bounding box'ları çiz
-                                            frame = api.draw_saas_overlay(frame, detection_result)
-                                        
-                                        # Frame'i tekrar encode et
-                                        ret, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 85])
-                                        if ret:
-                                            jpg_bytes = buffer.tobytes()
-                                except Exception as e:
-                                    logger.debug(f"⚠️ Detection overlay hatası (devam ediliyor): {e}")
-                                    # Hata durumunda orijinal frame'i kullan
-                                    jpg_bytes = base64.b64decode(frame_b64)
-                                
-                                yield (b"--" + boundary.encode() + b"\r\n"
-                                       b"Content-Type: image/jpeg\r\n"
-                                       b"Content-Length: " + str(len(jpg_bytes)).encode() + b"\r\n\r\n"
-                                       + jpg_bytes + b"\r\n")
-                                last_frame_time = current_time
-                            else:
-                                # If no frame, send a small delay
-                                time.sleep(0.01)
-                        else:
-                            # Wait until next frame time
-                            time.sleep(0.01)
-                            
-                    except GeneratorExit:
-                        break
-                    except Exception as e:
-                        logger.warning(f"⚠️ MJPEG frame error: {e}")
-                        time.sleep(0.1)
+                try:
+                    yield from adaptive_mjpeg_stream(
+                        ring_key, next_frame, tier=request.args.get('tier'), boundary=boundary,
+                        idle_part=idle_part
+                    )
+                except Exception as e:
+                    logger.warning(f"⚠️ MJPEG frame error: {e}")
 
             return Response(generate(), mimetype=f'multipart/x-mixed-replace; boundary={boundary}')
 
@@ -547,6 +542,40 @@ def create_blueprint(api):
             logger.error(f"❌ Get DVR channels error: {e}")
             return jsonify({'error': str(e)}), 500
 
+    @bp.route('/api/company/<company_id>/dvr/<dvr_id>/channels/<int:channel_number>/stream-policy', methods=['GET', 'PUT'])
+    def dvr_channel_stream_policy(company_id, dvr_id, channel_number):
+        """Get/update dual-stream policy of a DVR channel (dual/main/sub)"""
+        user_data = api.validate_session()
+        if not user_data:
+            return jsonify({'error': 'Unauthorized'}), 401
+        
+        try:
+            db_adapter = get_db_adapter()
+            if request.method == 'GET':
+                return jsonify({
+                    'success': True,
+                    'channel_number': channel_number,
+                    'stream_policy': db_adapter.get_dvr_channel_stream_policy(company_id, dvr_id, channel_number)
+                })
+            
+            data = request.get_json() or {}
+            policy = data.get('stream_policy')
+            if policy not in STREAM_POLICIES:
+                return jsonify({'error': f"Geçersiz stream_policy. Geçerli değerler: {', '.join(STREAM_POLICIES)}"}), 400
+            
+            if not db_adapter.update_dvr_channel_stream_policy(company_id, dvr_id, channel_number, policy):
+                return jsonify({'error': 'Stream politikası kaydedilemedi'}), 500
+            
+            return jsonify({
+                'success': True,
+                'channel_number': channel_number,
+                'stream_policy': policy,
+                'message': 'Yeni politika bir sonraki detection başlangıcında uygulanır'
+            })
+        except Exception as e:
+            logger.error(f"❌ DVR channel stream policy error: {e}")
+            return jsonify({'error': str(e)}), 500
+
     @bp.route('/api/company/<company_id>/dvr/<dvr_id>/gateway/config', methods=['GET'])
     def get_gateway_config(company_id, dvr_id):
         user_data = api.validate_session()
@@ -601,9 +630,6 @@ def create_blueprint(api):
             if not dvr_system:
                 return jsonify({'success': False, 'error': 'DVR system not found'}), 404
 
-            from src.smartsafe.integrations.dvr.dvr_stream_handler import get_stream_handler
-            stream_handler = get_stream_handler()
-
             # For previews, try first N channels quickly for responsiveness
             # Allow client override (?limit=9) but cap to 12
             try:
@@ -614,19 +640,10 @@ def create_blueprint(api):
 
             detected = list(range(1, limit + 1))
 
-            previews = []
-            for ch in detected:
-                frame_b64 = stream_handler.capture_single_frame(
-                    ip_address=dvr_system['ip_address'],
-                    username=dvr_system['username'],
-                    password=dvr_system['password'],
-                    rtsp_port=dvr_system['rtsp_port'],
-                    channel_number=ch
-                )
-                previews.append({
-                    'channel_number': ch,
-                    'frame': frame_b64
-                })
+            get_stream_handler().load_learned_pattern(company_id, {'dvr_id': dvr_id, **dvr_system})
+
+            # Paralel yakalama + aktif stream frame'i + kısa TTL'li thumbnail cache
+            previews = get_preview_service().get_previews(company_id, dvr_id, dvr_system, detected)
 
             return jsonify({'success': True, 'previews': previews})
         except Exception as e:
@@ -655,19 +672,48 @@ def create_blueprint(api):
                 f"&channel={channel_number}&stream=0.sdp"
             )
             
-            # For now, return a simple response with stream info
-            # In production, you would implement actual RTSP to HLS conversion
+            # Tarayıcı oynatımı: H.264 passthrough HLS (transcode yok), overlay'ler SSE ile ayrı
+            stream_id = f"dvr_{dvr_id}_ch{channel_number:02d}"
             return jsonify({
                 'success': True,
                 'message': 'Stream proxy endpoint',
                 'rtsp_url': rtsp_url,
-                'note': 'RTSP to HLS conversion would be implemented here'
+                'hls_url': f"/api/company/{company_id}/dvr/{dvr_id}/restream/{channel_number}/index.m3u8",
+                'overlay_events_url': f"/api/company/{company_id}/events?camera_id={stream_id}&events=overlay",
+                'mjpeg_url': f"/api/company/{company_id}/dvr/{dvr_id}/mjpeg/{channel_number}"
             })
             
         except Exception as e:
             logger.error(f"❌ Proxy DVR stream error: {e}")
             return jsonify({'error': str(e)}), 500
 
+    @bp.route('/api/company/<company_id>/dvr/<dvr_id>/restream/<int:channel_number>/<filename>')
+    def restream_dvr_channel(company_id, dvr_id, channel_number, filename):
+        """DVR kanalı için H.264 passthrough HLS (fMP4) - MJPEG yolunun aksine decode/encode yok"""
+        user_data = api.validate_session()
+        if not user_data or user_data.get('company_id') != company_id:
+            return jsonify({'error': 'Unauthorized'}), 401
+        
+        def resolve_sources():
+            dvr_system = api.get_camera_manager().dvr_manager.get_dvr_system(company_id, dvr_id)
+            if not dvr_system:
+                return []
+            stream_handler = get_stream_handler()
+            stream_handler.load_learned_pattern(company_id, {'dvr_id': dvr_id, **dvr_system})
+            args = (dvr_system['ip_address'], dvr_system['username'], dvr_system['password'],
+                    dvr_system['rtsp_port'], channel_number)
+            learned_url = stream_handler.get_learned_url(*args, company_id=company_id, dvr_id=dvr_id)
+            if learned_url:
+                return [learned_url]
+            brand = dvr_system.get('rtsp_brand') or dvr_system.get('dvr_type')
+            return stream_handler.generate_rtsp_urls(*args, brand=brand, company_id=company_id, dvr_id=dvr_id)[:6]
+        
+        try:
+            return api.serve_restream_file(f"{company_id}_dvr_{dvr_id}_ch{channel_number:02d}", filename, resolve_sources)
+        except Exception as e:
+            logger.error(f"❌ DVR restream error: {e}")
+            return jsonify({'error': str(e)}), 500
+
     @bp.route('/api/company/<company_id>/dvr/<dvr_id>/delete', methods=['DELETE'])
     def delete_dvr_system(company_id, dvr_id):
         user_data = api.validate_session()
@@ -676,6 +722,7 @@ def create_blueprint(api):
         try:
             manager = api.get_camera_manager().dvr_manager
             success, msg = manager.remove_dvr_system(dvr_id, company_id)
+            get_preview_service().invalidate(company_id, dvr_id)
             return jsonify({'success': success, 'message': msg})
             
         except Exception as e:
@@ -694,10 +741,11 @@ def create_blueprint(api):
             data = request.get_json()
             channels = data.get('channels', [1])  # Default: channel 1
             detection_mode = data.get('detection_mode', 'construction')
+            stream_policy = data.get('stream_policy')  # None = kanal ayarı
             
             dvr_ppe_manager = get_dvr_ppe_manager()
             result = dvr_ppe_manager.start_dvr_ppe_detection(
-                dvr_id, channels, company_id, detection_mode
+                dvr_id, channels, company_id, detection_mode, stream_policy
             )
             
             logger.info(f"🎥 DVR detection started: {result}")
@@ -756,25 +804,27 @@ def create_blueprint(api):
         
         try:
             limit = request.args.get('limit', 50, type=int)
+            cursor = request.args.get('cursor') or None
             
             # Get detection sessions
             db_adapter = get_db_adapter()
             sessions = db_adapter.get_dvr_detection_sessions(company_id, dvr_id)
             
-            # Get recent results for each session
-            all_results = []
-            for sess in sessions:
-                if sess.get('session_id'):
-                    results = db_adapter.get_dvr_detection_results(sess['session_id'], limit)
-                    all_results.extend(results)
+            # Tüm oturumların sonuçları tek keyset sayfasında (created_at, id) birleşir
+            session_ids = [sess['session_id'] for sess in sessions if sess.get('session_id')]
+            page = db_adapter.get_dvr_detection_page(session_ids, limit, cursor)
             
             return jsonify({
                 'sessions': sessions,
-                'results': all_results,
+                'results': page.items,
                 'total_sessions': len(sessions),
-                'total_results': len(all_results)
+                'total_results': len(page.items),
+                'next_cursor': page.next_cursor,
+                'has_more': page.has_more
             })
             
+        except InvalidCursor as e:
+            return jsonify({'error': str(e)}), 400
         except Exception as e:
             logger.error(f"❌ Get DVR detection results error: {e}")
             return jsonify({'error': str(e)}), 500
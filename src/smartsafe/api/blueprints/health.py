@@ -3,7 +3,7 @@ SmartSafe AI - Health Blueprint
 Health check, API docs & Prometheus metrics endpoints
 """
 
-from flask import Blueprint, jsonify
+from flask import Blueprint, jsonify, request
 import logging
 import os
 from datetime import datetime
@@ -11,6 +11,527 @@ from datetime import datetime
 logger = logging.getLogger(__name__)
 
 
+def _frame_ring_metrics() -> str:
+    """Kamera frame ring bellek metrikleri (Prometheus text format)"""
+    try:
+        from src.smartsafe.services.frame_ring import get_frame_ring_registry
+        ring_stats = get_frame_ring_registry().stats()
+    except Exception as e:
+        logger.debug(f"Frame ring metrics unavailable: {e}")
+        return ""
+    
+    lines = [
+        "",
+        "# HELP smartsafe_process_peak_rss_megabytes Process peak resident set size",
+        "# TYPE smartsafe_process_peak_rss_megabytes gauge",
+        f"smartsafe_process_peak_rss_megabytes {ring_stats['process_peak_rss_mb']}",
+        "# HELP smartsafe_frame_ring_allocated_megabytes Frame ring buffer memory per camera",
+        "# TYPE smartsafe_frame_ring_allocated_megabytes gauge",
+    ]
+    for camera_key, cam in ring_stats['cameras'].items():
+        lines.append(f'smartsafe_frame_ring_allocated_megabytes{{camera="{camera_key}"}} {cam["allocated_mb"]}')
+    lines += [
+        "# HELP smartsafe_frame_ring_peak_megabytes Peak frame ring buffer memory per camera",
+        "# TYPE smartsafe_frame_ring_peak_megabytes gauge",
+    ]
+    for camera_key, cam in ring_stats['cameras'].items():
+        lines.append(f'smartsafe_frame_ring_peak_megabytes{{camera="{camera_key}"}} {cam["peak_mb"]}')
+    lines += [
+        "# HELP smartsafe_frame_ring_dropped_total Frames dropped because all ring slots were pinned",
+        "# TYPE smartsafe_frame_ring_dropped_total counter",
+    ]
+    for camera_key, cam in ring_stats['cameras'].items():
+        lines.append(f'smartsafe_frame_ring_dropped_total{{camera="{camera_key}"}} {cam["frames_dropped"]}')
+    return "\n".join(lines) + "\n"
+
+
+def _restream_metrics() -> str:
+    """H.264 passthrough restream oturum metrikleri (Prometheus text format)"""
+    try:
+        from src.smartsafe.services.hls_restreamer import get_hls_restreamer
+        restream_stats = get_hls_restreamer().stats()
+    except Exception as e:
+        logger.debug(f"Restream metrics unavailable: {e}")
+        return ""
+    
+    lines = [
+        "",
+        "# HELP smartsafe_restream_sessions Active H.264 passthrough (HLS) restream sessions",
+        "# TYPE smartsafe_restream_sessions gauge",
+        f"smartsafe_restream_sessions {restream_stats['active_sessions']}",
+        "# HELP smartsafe_restream_sessions_failed_total Restream sessions whose remux process exited or failed to start",
+        "# TYPE smartsafe_restream_sessions_failed_total counter",
+        f"smartsafe_restream_sessions_failed_total {restream_stats['sessions_failed']}",
+    ]
+    return "\n".join(lines) + "\n"
+
+
+def _event_broker_metrics() -> str:
+    """Canlı olay (SSE) yayın metrikleri (Prometheus text format)"""
+    try:
+        from src.smartsafe.services.event_broker import get_event_broker
+        broker_stats = get_event_broker().stats()
+    except Exception as e:
+        logger.debug(f"Event broker metrics unavailable: {e}")
+        return ""
+    
+    lines = [
+        "",
+        "# HELP smartsafe_sse_subscribers Connected live event (SSE) clients",
+        "# TYPE smartsafe_sse_subscribers gauge",
+        f"smartsafe_sse_subscribers {broker_stats['subscribers']}",
+        "# HELP smartsafe_sse_events_published_total Live events published to at least one subscriber",
+        "# TYPE smartsafe_sse_events_published_total counter",
+        f"smartsafe_sse_events_published_total {broker_stats['events_published']}",
+        "# HELP smartsafe_sse_events_delivered_total Live events written to clients",
+        "# TYPE smartsafe_sse_events_delivered_total counter",
+        f"smartsafe_sse_events_delivered_total {broker_stats['events_delivered']}",
+        "# HELP smartsafe_sse_clients_dropped_total Slow SSE clients dropped because their buffer filled up",
+        "# TYPE smartsafe_sse_clients_dropped_total counter",
+        f"smartsafe_sse_clients_dropped_total {broker_stats['clients_dropped']}",
+        "# HELP smartsafe_sse_clients_rejected_total SSE connections refused because the subscriber limit was reached",
+        "# TYPE smartsafe_sse_clients_rejected_total counter",
+        f"smartsafe_sse_clients_rejected_total {broker_stats['clients_rejected']}",
+    ]
+    return "\n".join(lines) + "\n"
+
+
+def _frame_latency_metrics() -> str:
+    """Yakalamadan gönderime aşama bazlı frame gecikmesi (Prometheus summary)"""
+    try:
+        from src.smartsafe.services.latency_tracer import get_latency_tracer
+        latency_stats = get_latency_tracer().stats()
+    except Exception as e:
+        logger.debug(f"Frame latency metrics unavailable: {e}")
+        return ""
+    
+    lines = [
+        "",
+        "# HELP smartsafe_frame_latency_milliseconds Time from frame capture to each pipeline stage (rolling window)",
+        "# TYPE smartsafe_frame_latency_milliseconds summary",
+    ]
+    for camera_key, cam in latency_stats['cameras'].items():
+        for stage, entry in cam['stages_ms'].items():
+            labels = f'camera="{camera_key}",stage="{stage}"'
+            for quantile, key in (('0.5', 'p50'), ('0.95', 'p95'), ('0.99', 'p99')):
+                lines.append(f'smartsafe_frame_latency_milliseconds{{{labels},quantile="{quantile}"}} {entry[key]}')
+            lines.append(f'smartsafe_frame_latency_milliseconds_count{{{labels}}} {entry["count"]}')
+    return "\n".join(lines) + "\n"
+
+
+def _mjpeg_tier_metrics() -> str:
+    """Adaptif MJPEG istemci tier ve encode paylaşım metrikleri (Prometheus text format)"""
+    try:
+        from src.smartsafe.services.adaptive_mjpeg import get_tiered_encode_cache
+        tier_stats = get_tiered_encode_cache().stats()
+    except Exception as e:
+        logger.debug(f"MJPEG tier metrics unavailable: {e}")
+        return ""
+    
+    lines = [
+        "",
+        "# HELP smartsafe_mjpeg_clients Connected MJPEG clients per quality tier",
+        "# TYPE smartsafe_mjpeg_clients gauge",
+    ]
+    for tier_name, count in tier_stats['clients_by_tier'].items():
+        lines.append(f'smartsafe_mjpeg_clients{{tier="{tier_name}"}} {count}')
+    lines += [
+        "# HELP smartsafe_mjpeg_encodes_total JPEG encodes performed for MJPEG clients",
+        "# TYPE smartsafe_mjpeg_encodes_total counter",
+        f"smartsafe_mjpeg_encodes_total {tier_stats['encodes']}",
+        "# HELP smartsafe_mjpeg_shared_frames_total MJPEG frames served from another client's encode on the same tier",
+        "# TYPE smartsafe_mjpeg_shared_frames_total counter",
+        f"smartsafe_mjpeg_shared_frames_total {tier_stats['shared_hits']}",
+    ]
+    return "\n".join(lines) + "\n"
+
+
+def _write_behind_metrics() -> str:
+    """Write-behind INSERT kuyruğu metrikleri (Prometheus text format)"""
+    try:
+        from src.smartsafe.services.write_behind import get_write_behind_queue
+        queue_stats = get_write_behind_queue().stats()
+    except Exception as e:
+        logger.debug(f"Write-behind metrics unavailable: {e}")
+        return ""
+    
+    lines = [
+        "",
+        "# HELP smartsafe_write_behind_pending_rows Rows waiting in the write-behind queue",
+        "# TYPE smartsafe_write_behind_pending_rows gauge",
+        f"smartsafe_write_behind_pending_rows {queue_stats['pending']}",
+        "# HELP smartsafe_write_behind_rows_written_total Rows flushed to the database in batches",
+        "# TYPE smartsafe_write_behind_rows_written_total counter",
+        f"smartsafe_write_behind_rows_written_total {queue_stats['rows_written']}",
+        "# HELP smartsafe_write_behind_rows_dropped_total Rows dropped because the queue was full or shutting down",
+        "# TYPE smartsafe_write_behind_rows_dropped_total counter",
+        f"smartsafe_write_behind_rows_dropped_total {queue_stats['rows_dropped']}",
+        "# HELP smartsafe_write_behind_rows_dead_lettered_total Rows rejected by the database even when written alone",
+        "# TYPE smartsafe_write_behind_rows_dead_lettered_total counter",
+        f"smartsafe_write_behind_rows_dead_lettered_total {queue_stats['rows_dead_lettered']}",
+        "# HELP smartsafe_write_behind_flush_errors_total Interrupted batch flushes (uncommitted rows are re-queued)",
+        "# TYPE smartsafe_write_behind_flush_errors_total counter",
+        f"smartsafe_write_behind_flush_errors_total {queue_stats['flush_errors']}",
+        "# HELP smartsafe_write_behind_last_flush_milliseconds Duration of the last batch flush",
+        "# TYPE smartsafe_write_behind_last_flush_milliseconds gauge",
+        f"smartsafe_write_behind_last_flush_milliseconds {queue_stats['last_flush_ms']}",
+    ]
+    return "\n".join(lines) + "\n"
+
+
+def _sqlite_connection_metrics() -> str:
+    """Kalıcı SQLite bağlantı metrikleri (Prometheus text format)"""
+    try:
+        from src.smartsafe.database.sqlite_connections import sqlite_connection_stats
+        all_stats = sqlite_connection_stats()
+    except Exception as e:
+        logger.debug(f"SQLite connection metrics unavailable: {e}")
+        return ""
+    if not all_stats:
+        return ""
+    
+    lines = [
+        "",
+        "# HELP smartsafe_sqlite_open_connections Persistent SQLite connections (per-thread readers + writer)",
+        "# TYPE smartsafe_sqlite_open_connections gauge",
+    ]
+    for path, stats in all_stats.items():
+        lines.append(f'smartsafe_sqlite_open_connections{{db="{path}"}} {stats["open_connections"]}')
+    lines += [
+        "# HELP smartsafe_sqlite_reconnects_total Connections reopened after a failed health check",
+        "# TYPE smartsafe_sqlite_reconnects_total counter",
+    ]
+    for path, stats in all_stats.items():
+        lines.append(f'smartsafe_sqlite_reconnects_total{{db="{path}"}} {stats["reconnects"]}')
+    lines += [
+        "# HELP smartsafe_sqlite_writer_wait_milliseconds Average wait for the shared writer connection",
+        "# TYPE smartsafe_sqlite_writer_wait_milliseconds gauge",
+    ]
+    for path, stats in all_stats.items():
+        lines.append(f'smartsafe_sqlite_writer_wait_milliseconds{{db="{path}"}} {stats["avg_write_wait_ms"]}')
+    return "\n".join(lines) + "\n"
+
+
+def _pg_pool_metrics() -> str:
+    """PostgreSQL bağlantı havuzu metrikleri (Prometheus text format)"""
+    try:
+        from src.smartsafe.database.pg_pool import pg_pool_stats
+        all_stats = pg_pool_stats()
+    except Exception as e:
+        logger.debug(f"PostgreSQL pool metrics unavailable: {e}")
+        return ""
+    if not all_stats:
+        return ""
+    
+    lines = [""]
+    gauges = (
+        ('in_use', 'smartsafe_pg_pool_in_use', 'gauge', 'Pooled PostgreSQL connections checked out'),
+        ('idle', 'smartsafe_pg_pool_idle', 'gauge', 'Idle pooled PostgreSQL connections'),
+        ('waiters', 'smartsafe_pg_pool_waiters', 'gauge', 'Threads waiting for a pooled connection'),
+        ('timeouts', 'smartsafe_pg_pool_timeouts_total', 'counter', 'Acquires that timed out on an exhausted pool'),
+        ('connections_discarded', 'smartsafe_pg_pool_discarded_total', 'counter',
+         'Connections closed after a failed health check or max lifetime'),
+    )
+    for key, metric, kind, help_text in gauges:
+        lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} {kind}"]
+        for name, stats in all_stats.items():
+            lines.append(f'{metric}{{pool="{name}"}} {stats[key]}')
+    lines += [
+        "# HELP smartsafe_pg_pool_wait_seconds Time spent waiting to acquire a pooled connection",
+        "# TYPE smartsafe_pg_pool_wait_seconds histogram",
+    ]
+    for name, stats in all_stats.items():
+        cumulative = 0
+        for bound, count in stats['wait_buckets']:
+            cumulative += count
+            le = '+Inf' if bound == float('inf') else bound
+            lines.append(f'smartsafe_pg_pool_wait_seconds_bucket{{pool="{name}",le="{le}"}} {cumulative}')
+        lines.append(f'smartsafe_pg_pool_wait_seconds_sum{{pool="{name}"}} {stats["wait_sum_seconds"]}')
+        lines.append(f'smartsafe_pg_pool_wait_seconds_count{{pool="{name}"}} {stats["acquires"]}')
+    return "\n".join(lines) + "\n"
+
+
+def _read_replica_metrics() -> str:
+    """Read-replica yönlendirme metrikleri (Prometheus text format)"""
+    try:
+        from src.smartsafe.database.read_routing import get_read_router
+        router = get_read_router()
+        stats = router.stats() if router is not None else None
+    except Exception as e:
+        logger.debug(f"Read replica metrics unavailable: {e}")
+        return ""
+    if not stats:
+        return ""
+    
+    lines = [
+        "",
+        "# HELP smartsafe_read_replica_lag_seconds Last measured replication lag (-1 when unreachable)",
+        "# TYPE smartsafe_read_replica_lag_seconds gauge",
+    ]
+    for name, replica in stats['replicas'].items():
+        lag = -1 if replica['lag_seconds'] is None else replica['lag_seconds']
+        lines.append(f'smartsafe_read_replica_lag_seconds{{replica="{name}"}} {lag}')
+    lines += [
+        "# HELP smartsafe_read_replica_healthy Replica reachable and within the staleness bound",
+        "# TYPE smartsafe_read_replica_healthy gauge",
+    ]
+    for name, replica in stats['replicas'].items():
+        eligible = replica['healthy'] and replica['lag_seconds'] is not None \
+            and replica['lag_seconds'] <= stats['max_lag_seconds']
+        lines.append(f'smartsafe_read_replica_healthy{{replica="{name}"}} {1 if eligible else 0}')
+    lines += [
+        "# HELP smartsafe_read_replica_reads_total Reads served by each replica",
+        "# TYPE smartsafe_read_replica_reads_total counter",
+    ]
+    for name, replica in stats['replicas'].items():
+        lines.append(f'smartsafe_read_replica_reads_total{{replica="{name}"}} {replica["reads"]}')
+    counters = (
+        ('primary_reads', 'smartsafe_read_primary_total', 'Routed reads served by the primary'),
+        ('sticky_reads', 'smartsafe_read_sticky_total', 'Reads pinned to the primary after a write (read-your-writes)'),
+        ('fallbacks', 'smartsafe_read_replica_fallbacks_total', 'Reads that fell back to the primary (lag or failure)'),
+    )
+    for key, metric, help_text in counters:
+        lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} counter", f"{metric} {stats[key]}"]
+    return "\n".join(lines) + "\n"
+
+
+def _query_profiler_metrics(limit: int = 50) -> str:
+    """Sorgu profili metrikleri - toplam süreye göre ilk `limit` parmak izi (Prometheus text format)"""
+    try:
+        from src.smartsafe.database.query_profiler import get_query_profiler
+        profile = get_query_profiler().stats(limit=limit)
+    except Exception as e:
+        logger.debug(f"Query profiler metrics unavailable: {e}")
+        return ""
+    if not profile['enabled'] or not profile['queries']:
+        return ""
+    
+    series = (
+        ('calls', 'smartsafe_db_query_calls_total', 'counter', 'Statements executed per query fingerprint'),
+        ('errors', 'smartsafe_db_query_errors_total', 'counter', 'Failed statements per query fingerprint'),
+        ('rows', 'smartsafe_db_query_rows_total', 'counter', 'Rows returned or affected per query fingerprint'),
+        ('total_ms', 'smartsafe_db_query_duration_milliseconds_sum', 'counter',
+         'Total execution time per query fingerprint'),
+        ('avg_ms', 'smartsafe_db_query_avg_milliseconds', 'gauge', 'Average execution time per query fingerprint'),
+        ('p95_ms', 'smartsafe_db_query_p95_milliseconds', 'gauge',
+         'p95 execution time per query fingerprint (rolling window)'),
+        ('slow', 'smartsafe_db_query_slow_total', 'counter', 'Executions over the slow-query threshold'),
+        ('n_plus_one', 'smartsafe_db_query_n_plus_one_total', 'counter',
+         'Requests that repeated the fingerprint past the N+1 threshold'),
+    )
+    lines = [""]
+    for key, metric, kind, help_text in series:
+        lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} {kind}"]
+        for query in profile['queries']:
+            lines.append(f'{metric}{{fingerprint="{query["fingerprint"]}"}} {query[key]}')
+    lines += [
+        "# HELP smartsafe_db_queries_total Statements seen by the query profiler",
+        "# TYPE smartsafe_db_queries_total counter",
+        f"smartsafe_db_queries_total {profile['total_queries']}",
+    ]
+    return "\n".join(lines) + "\n"
+
+
+def _detection_log_metrics() -> str:
+    """İkili detection günlüğü metrikleri (Prometheus text format)"""
+    try:
+        from src.smartsafe.services.detection_log import get_detection_log
+        stats = get_detection_log().stats()
+    except Exception as e:
+        logger.debug(f"Detection log metrics unavailable: {e}")
+        return ""
+    if not stats['enabled']:
+        return ""
+    
+    series = (
+        ('frames_written', 'smartsafe_detection_log_frames_total', 'counter', 'Inference results appended'),
+        ('boxes_written', 'smartsafe_detection_log_boxes_total', 'counter', 'Bounding boxes appended'),
+        ('bytes_written', 'smartsafe_detection_log_bytes_total', 'counter', 'Bytes appended to frame and box files'),
+        ('write_errors', 'smartsafe_detection_log_write_errors_total', 'counter', 'Failed appends'),
+        ('files_purged', 'smartsafe_detection_log_files_purged_total', 'counter',
+         'Day files removed by retention'),
+        ('open_writers', 'smartsafe_detection_log_open_writers', 'gauge', 'Cameras with an open day file'),
+    )
+    lines = [""]
+    for key, metric, kind, help_text in series:
+        lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} {kind}", f"{metric} {stats[key]}"]
+    return "\n".join(lines) + "\n"
+
+
+def _session_cache_metrics() -> str:
+    """Session doğrulama cache metrikleri (Prometheus text format)"""
+    try:
+        from src.smartsafe.services.session_cache import get_session_cache
+        cache_stats = get_session_cache().stats()
+    except Exception as e:
+        logger.debug(f"Session cache metrics unavailable: {e}")
+        return ""
+    
+    lines = [
+        "",
+        "# HELP smartsafe_session_cache_hits_total Session validations served from the in-process cache",
+        "# TYPE smartsafe_session_cache_hits_total counter",
+        f"smartsafe_session_cache_hits_total {cache_stats['hits']}",
+        "# HELP smartsafe_session_cache_misses_total Session validations that queried the database",
+        "# TYPE smartsafe_session_cache_misses_total counter",
+        f"smartsafe_session_cache_misses_total {cache_stats['misses']}",
+        "# HELP smartsafe_session_cache_hit_ratio Session cache hit ratio since start",
+        "# TYPE smartsafe_session_cache_hit_ratio gauge",
+        f"smartsafe_session_cache_hit_ratio {cache_stats['hit_ratio']}",
+        "# HELP smartsafe_session_cache_entries Cached validated sessions",
+        "# TYPE smartsafe_session_cache_entries gauge",
+        f"smartsafe_session_cache_entries {cache_stats['size']}",
+    ]
+    return "\n".join(lines) + "\n"
+
+
+def _tenant_cache_metrics() -> str:
+    """Tenant config cache metrikleri (Prometheus text format)"""
+    try:
+        from src.smartsafe.services.tenant_cache import get_tenant_config_cache
+        cache_stats = get_tenant_config_cache().stats()
+    except Exception as e:
+        logger.debug(f"Tenant cache metrics unavailable: {e}")
+        return ""
+    
+    lines = [
+        "",
+        "# HELP smartsafe_tenant_cache_hits_total Tenant config lookups served from cache",
+        "# TYPE smartsafe_tenant_cache_hits_total counter",
+        f"smartsafe_tenant_cache_hits_total {cache_stats['hits']}",
+        "# HELP smartsafe_tenant_cache_misses_total Tenant config lookups that queried the database",
+        "# TYPE smartsafe_tenant_cache_misses_total counter",
+        f"smartsafe_tenant_cache_misses_total {cache_stats['misses']}",
+        "# HELP smartsafe_tenant_cache_invalidations_total Explicit tenant config invalidations",
+        "# TYPE smartsafe_tenant_cache_invalidations_total counter",
+        f"smartsafe_tenant_cache_invalidations_total {cache_stats['invalidations']}",
+        "# HELP smartsafe_tenant_cache_load_failures_total Tenant snapshot loads that failed (previous snapshot or defaults served)",
+        "# TYPE smartsafe_tenant_cache_load_failures_total counter",
+        f"smartsafe_tenant_cache_load_failures_total {cache_stats['load_failures']}",
+    ]
+    return "\n".join(lines) + "\n"
+
+
+def _response_cache_metrics() -> str:
+    """Response cache metrikleri (Prometheus text format)"""
+    try:
+        from src.smartsafe.services.response_cache import get_response_cache
+        stats = get_response_cache().stats()
+    except Exception as e:
+        logger.debug(f"Response cache metrics unavailable: {e}")
+        return ""
+    
+    series = (
+        ('hits', 'smartsafe_response_cache_hits_total', 'counter', 'API responses served from cache'),
+        ('misses', 'smartsafe_response_cache_misses_total', 'counter', 'Lookups that had to compute the response'),
+        ('coalesced', 'smartsafe_response_cache_coalesced_total', 'counter',
+         'Concurrent misses that waited for an in-flight computation'),
+        ('evictions', 'smartsafe_response_cache_evictions_total', 'counter', 'Entries evicted by the size bound (LRU)'),
+        ('expirations', 'smartsafe_response_cache_expirations_total', 'counter', 'Entries dropped after their TTL'),
+        ('invalidations', 'smartsafe_response_cache_invalidations_total', 'counter', 'Tenant invalidations'),
+        ('entries', 'smartsafe_response_cache_entries', 'gauge', 'Cached responses'),
+        ('bytes', 'smartsafe_response_cache_bytes', 'gauge', 'Approximate cached response size (JSON bytes)'),
+    )
+    lines = [""]
+    for key, metric, kind, help_text in series:
+        lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} {kind}", f"{metric} {stats[key]}"]
+    return "\n".join(lines) + "\n"
+
+
+def _report_rollup_metrics() -> str:
+    """Rapor rollup compaction metrikleri (Prometheus text format)"""
+    try:
+        from src.smartsafe.services.report_rollups import get_rollup_compactor
+        rollup_stats = get_rollup_compactor().stats()
+    except Exception as e:
+        logger.debug(f"Report rollup metrics unavailable: {e}")
+        return ""
+    
+    lines = [
+        "",
+        "# HELP smartsafe_rollup_hours_compacted_total Closed hours folded into the report rollup tables",
+        "# TYPE smartsafe_rollup_hours_compacted_total counter",
+        f"smartsafe_rollup_hours_compacted_total {rollup_stats['hours_compacted']}",
+        "# HELP smartsafe_rollup_hours_restated_total Hours recomputed behind the watermark to pick up late rows",
+        "# TYPE smartsafe_rollup_hours_restated_total counter",
+        f"smartsafe_rollup_hours_restated_total {rollup_stats['hours_restated']}",
+        "# HELP smartsafe_rollup_errors_total Failed rollup compaction runs",
+        "# TYPE smartsafe_rollup_errors_total counter",
+        f"smartsafe_rollup_errors_total {rollup_stats['errors']}",
+        "# HELP smartsafe_rollup_last_run_milliseconds Duration of the last rollup compaction run",
+        "# TYPE smartsafe_rollup_last_run_milliseconds gauge",
+        f"smartsafe_rollup_last_run_milliseconds {rollup_stats['last_run_ms']}",
+    ]
+    if rollup_stats['lag_seconds'] is not None:
+        lines += [
+            "# HELP smartsafe_rollup_lag_seconds Age of the rollup watermark (raw rows read after it)",
+            "# TYPE smartsafe_rollup_lag_seconds gauge",
+            f"smartsafe_rollup_lag_seconds {rollup_stats['lag_seconds']}",
+        ]
+    return "\n".join(lines) + "\n"
+
+
+def _partition_metrics() -> str:
+    """Bölüm bakımı ve saklama süresi metrikleri (Prometheus text format)"""
+    try:
+        from src.smartsafe.database.partitions import get_partition_maintainer
+        partition_stats = get_partition_maintainer().stats()
+    except Exception as e:
+        logger.debug(f"Partition metrics unavailable: {e}")
+        return ""
+    
+    lines = [
+        "",
+        "# HELP smartsafe_partitions_created_total Monthly partitions created by maintenance",
+        "# TYPE smartsafe_partitions_created_total counter",
+        f"smartsafe_partitions_created_total {partition_stats['partitions_created']}",
+        "# HELP smartsafe_partitions_dropped_total Partitions dropped by the retention policy",
+        "# TYPE smartsafe_partitions_dropped_total counter",
+        f"smartsafe_partitions_dropped_total {partition_stats['partitions_dropped']}",
+        "# HELP smartsafe_retention_rows_purged_total Rows deleted from partitions of expired companies",
+        "# TYPE smartsafe_retention_rows_purged_total counter",
+        f"smartsafe_retention_rows_purged_total {partition_stats['rows_purged']}",
+        "# HELP smartsafe_partition_maintenance_errors_total Failed partition maintenance steps",
+        "# TYPE smartsafe_partition_maintenance_errors_total counter",
+        f"smartsafe_partition_maintenance_errors_total {partition_stats['errors']}",
+        "# HELP smartsafe_partitions Current number of partitions per table",
+        "# TYPE smartsafe_partitions gauge",
+    ]
+    for table, count in partition_stats['partitions'].items():
+        lines.append(f'smartsafe_partitions{{table="{table}"}} {count}')
+    return "\n".join(lines) + "\n"
+
+
+def _report_export_metrics() -> str:
+    """Arka plan export işi metrikleri (Prometheus text format)"""
+    try:
+        from src.smartsafe.services.report_export import get_export_job_manager
+        export_stats = get_export_job_manager().stats()
+    except Exception as e:
+        logger.debug(f"Report export metrics unavailable: {e}")
+        return ""
+    
+    lines = [
+        "",
+        "# HELP smartsafe_export_jobs_running Background export jobs currently writing files",
+        "# TYPE smartsafe_export_jobs_running gauge",
+        f"smartsafe_export_jobs_running {export_stats['jobs_running']}",
+        "# HELP smartsafe_export_jobs_completed_total Background export jobs finished successfully",
+        "# TYPE smartsafe_export_jobs_completed_total counter",
+        f"smartsafe_export_jobs_completed_total {export_stats['jobs_completed']}",
+        "# HELP smartsafe_export_jobs_failed_total Background export jobs that failed",
+        "# TYPE smartsafe_export_jobs_failed_total counter",
+        f"smartsafe_export_jobs_failed_total {export_stats['jobs_failed']}",
+        "# HELP smartsafe_export_jobs_rejected_total Export jobs refused because too many were already pending",
+        "# TYPE smartsafe_export_jobs_rejected_total counter",
+        f"smartsafe_export_jobs_rejected_total {export_stats['jobs_rejected']}",
+        "# HELP smartsafe_export_rows_total Rows written by background export jobs",
+        "# TYPE smartsafe_export_rows_total counter",
+        f"smartsafe_export_rows_total {export_stats['rows_exported']}",
+    ]
+    return "\n".join(lines) + "\n"
+
+
 def create_blueprint(api):
     bp = Blueprint('health', __name__)
 
@@ -63,6 +584,27 @@ def create_blueprint(api):
                 "timestamp": datetime.now().isoformat()
             }), 503
 
+    @bp.route('/api/system/frame-buffers', methods=['GET'])
+    def frame_buffer_stats():
+        """Per-camera frame ring memory usage and process peak RSS"""
+        try:
+            from src.smartsafe.services.frame_ring import get_frame_ring_registry
+            return jsonify({'success': True, **get_frame_ring_registry().stats()})
+        except Exception as e:
+            logger.error(f"Frame buffer stats failed: {e}")
+            return jsonify({'success': False, 'error': str(e)}), 500
+
+    @bp.route('/api/system/frame-latency', methods=['GET'])
+    def frame_latency_stats():
+        """Per-camera capture-to-stage latency percentiles (p50/p95/p99, ms)"""
+        try:
+            from src.smartsafe.services.latency_tracer import get_latency_tracer
+            camera_key = request.args.get('camera') or None
+            return jsonify({'success': True, **get_latency_tracer().stats(camera_key)})
+        except Exception as e:
+            logger.error(f"Frame latency stats failed: {e}")
+            return jsonify({'success': False, 'error': str(e)}), 500
+
     @bp.route('/api/docs', methods=['GET'])
     def api_documentation():
         """API Documentation endpoint"""
@@ -132,6 +674,23 @@ smartsafe_uptime_seconds 3600
 # TYPE smartsafe_requests_total counter
 smartsafe_requests_total 100
 """
+            metrics_data += _frame_ring_metrics()
+            metrics_data += _event_broker_metrics()
+            metrics_data += _restream_metrics()
+            metrics_data += _mjpeg_tier_metrics()
+            metrics_data += _frame_latency_metrics()
+            metrics_data += _write_behind_metrics()
+            metrics_data += _sqlite_connection_metrics()
+            metrics_data += _session_cache_metrics()
+            metrics_data += _tenant_cache_metrics()
+            metrics_data += _report_rollup_metrics()
+            metrics_data += _partition_metrics()
+            metrics_data += _report_export_metrics()
+            metrics_data += _pg_pool_metrics()
+            metrics_data += _read_replica_metrics()
+            metrics_data += _query_profiler_metrics()
+            metrics_data += _detection_log_metrics()
+            metrics_data += _response_cache_metrics()
             
             return metrics_data, 200, {'Content-Type': 'text/plain; version=0.0.4'}
             
@@ -3,16 +3,39 @@ SmartSafe AI - Report Blueprint
 Settings, Users, Reports, Profile & Notification endpoints
 """
 
-from flask import Blueprint, request, jsonify, session, redirect, render_template, render_template_string
+from flask import (Blueprint, request, jsonify, session, redirect, render_template, render_template_string,
+                   Response, send_file, stream_with_context)
+import json
 import logging
 import os
 import uuid
 import bcrypt
 from datetime import datetime, timedelta
 
+from src.smartsafe.services.report_export import (
+    CONTENT_TYPES, FILE_FORMATS, JOB_COMPLETED, STREAM_FORMATS, ExportQueueFull, get_export_job_manager,
+    resolve_dataset, stream_export
+)
+from src.smartsafe.services.report_rollups import (
+    GROUP_CAMERA, GROUP_DAY, GROUP_PPE_TYPE, SOURCE_DETECTIONS, SOURCE_VIOLATIONS, summarize
+)
+from src.smartsafe.services.session_cache import get_session_cache
+from src.smartsafe.services.tenant_cache import KIND_COMPANY_INFO, get_tenant_config_cache
+from src.smartsafe.services.response_cache import get_response_cache
+from src.smartsafe.services.ttl_cache import invalidate_company
+
 logger = logging.getLogger(__name__)
 
 
+def _export_range(args):
+    """?start=YYYY-MM-DD&end=YYYY-MM-DD (end dahil) veya ?days=N -> (since, until)"""
+    since = datetime.fromisoformat(args['start']) if args.get('start') else None
+    until = datetime.fromisoformat(args['end']) + timedelta(days=1) if args.get('end') else None
+    if since is None and args.get('days'):
+        since = datetime.now() - timedelta(days=int(args['days']))
+    return since, until
+
+
 def create_blueprint(api):
     bp = Blueprint('report', __name__)
 
@@ -262,6 +285,8 @@ def create_blueprint(api):
             
             conn.commit()
             conn.close()
+            # Oturum bağlamındaki şirket adı / e-posta değişmiş olabilir
+            invalidate_company(company_id)
             
             print(f"✅ Profile updated successfully for company: {company_id}")
             return jsonify({'success': True, 'message': 'Profil başarıyla güncellendi'})
@@ -360,6 +385,8 @@ def create_blueprint(api):
                     else:
                         raise db_error
             
+            get_tenant_config_cache().invalidate(company_id, KIND_COMPANY_INFO)
+            get_response_cache().invalidate(company_id)
             return jsonify({
                 'success': True, 
                 'message': 'Logo başarıyla yüklendi',
@@ -412,6 +439,7 @@ def create_blueprint(api):
             
             conn.commit()
             conn.close()
+            get_session_cache().invalidate_company(company_id)
             
             return jsonify({'success': True, 'message': 'Şifre başarıyla değiştirildi'})
                 
@@ -449,6 +477,7 @@ def create_blueprint(api):
             
             conn.commit()
             conn.close()
+            invalidate_company(company_id)
             
             session.clear()
             
@@ -586,6 +615,7 @@ def create_blueprint(api):
             
             conn.commit()
             conn.close()
+            get_session_cache().invalidate_user(user_id)
             
             return jsonify({'success': True, 'message': 'Kullanıcı başarıyla silindi'})
             
@@ -620,59 +650,12 @@ def create_blueprint(api):
             end_date = datetime.now()
             start_date = end_date - timedelta(days=30)
             
-            conn = api.db.get_connection()
-            cursor = conn.cursor()
-            
-            placeholder = api.db.get_placeholder() if hasattr(api.db, 'get_placeholder') else '?'
-            
-            if api.db.db_adapter.db_type == 'postgresql':
-                cursor.execute(f'''
-                    SELECT DATE(timestamp) as date, COUNT(*) as count,
-                           STRING_AGG(DISTINCT missing_ppe, ', ') as ppe_types
-                    FROM violations 
-                    WHERE company_id = {placeholder} 
-                    AND timestamp >= {placeholder}
-                    GROUP BY DATE(timestamp)
-                    ORDER BY DATE(timestamp) DESC
-                    LIMIT 30
-                ''', (company_id, start_date.isoformat()))
-            else:
-                cursor.execute(f'''
-                    SELECT DATE(timestamp) as date, COUNT(*) as count,
-                           GROUP_CONCAT(DISTINCT missing_ppe) as ppe_types
-                    FROM violations 
-                    WHERE company_id = {placeholder} 
-                    AND timestamp >= {placeholder}
-                    GROUP BY DATE(timestamp)
-                    ORDER BY DATE(timestamp) DESC
-                    LIMIT 30
-                ''', (company_id, start_date.isoformat()))
-            
-            daily_violations = cursor.fetchall()
-            
-            cursor.execute(f'''
-                SELECT camera_id, COUNT(*) as count,
-                       MAX(timestamp) as last_violation
-                FROM violations 
-                WHERE company_id = {placeholder} 
-                AND timestamp >= {placeholder}
-                GROUP BY camera_id
-                ORDER BY count DESC
-            ''', (company_id, start_date.isoformat()))
-            
-            camera_violations = cursor.fetchall()
-            
-            cursor.execute(f'''
-                SELECT missing_ppe, COUNT(*) as count
-                FROM violations 
-                WHERE company_id = {placeholder} 
-                AND timestamp >= {placeholder}
-                GROUP BY missing_ppe
-                ORDER BY count DESC
-            ''', (company_id, start_date.isoformat()))
-            
-            ppe_violations = cursor.fetchall()
-            
+            conn = api.db.get_read_connection()
+            db_type = api.db.db_adapter.db_type
+            # Kapanmış saatler rollup tablolarından, açık saat ham violations tablosundan
+            by_day = summarize(conn, db_type, company_id, SOURCE_VIOLATIONS,
+                               (GROUP_DAY, GROUP_PPE_TYPE), since=start_date)
+            by_camera = summarize(conn, db_type, company_id, SOURCE_VIOLATIONS, (GROUP_CAMERA,), since=start_date)
             conn.close()
             
             violations_data = {
@@ -683,48 +666,38 @@ def create_blueprint(api):
                 'period': f"{start_date.strftime('%Y-%m-%d')} - {end_date.strftime('%Y-%m-%d')}"
             }
             
-            total_violations = 0
-            for row in daily_violations:
-                if hasattr(row, 'keys'):
-                    violations_data['daily_violations'].append({
-                        'date': row['date'],
-                        'count': row['count'],
-                        'ppe_types': row['ppe_types'] or ''
-                    })
-                    total_violations += row['count']
-                else:
-                    violations_data['daily_violations'].append({
-                        'date': row[0],
-                        'count': row[1],
-                        'ppe_types': row[2] or ''
-                    })
-                    total_violations += row[1]
+            daily_counts = {}
+            daily_types = {}
+            ppe_counts = {}
+            for (day, ppe_type), row in by_day.items():
+                if not row['violation_count']:
+                    continue
+                daily_counts[day] = daily_counts.get(day, 0) + row['violation_count']
+                daily_types.setdefault(day, set()).add(ppe_type)
+                ppe_counts[ppe_type] = ppe_counts.get(ppe_type, 0) + row['violation_count']
             
-            for row in camera_violations:
-                if hasattr(row, 'keys'):
-                    violations_data['camera_violations'].append({
-                        'camera_id': row['camera_id'],
-                        'count': row['count'],
-                        'last_violation': row['last_violation']
-                    })
-                else:
+            total_violations = 0
+            for day in sorted(daily_counts, reverse=True)[:30]:
+                violations_data['daily_violations'].append({
+                    'date': day,
+                    'count': daily_counts[day],
+                    'ppe_types': ', '.join(sorted(daily_types[day]))
+                })
+                total_violations += daily_counts[day]
+            
+            for (camera_id,), row in sorted(by_camera.items(), key=lambda item: -item[1]['violation_count']):
+                if row['violation_count']:
                     violations_data['camera_violations'].append({
-                        'camera_id': row[0],
-                        'count': row[1],
-                        'last_violation': row[2]
+                        'camera_id': camera_id,
+                        'count': row['violation_count'],
+                        'last_violation': row['last_at']
                     })
             
-            for row in ppe_violations:
-                if hasattr(row, 'keys'):
-                    violations_data['ppe_violations'].append({
-                        'ppe_type': row['missing_ppe'],
-                        'count': row['count']
-                    })
-                else:
-                    violations_data['ppe_violations'].append({
-                        'ppe_type': row[0],
-                        'count': row[1]
-                    })
+            for ppe_type, count in sorted(ppe_counts.items(), key=lambda item: -item[1]):
+                violations_data['ppe_violations'].append({
+                    'ppe_type': ppe_type,
+                    'count': count
+                })
             
             violations_data['total_violations'] = total_violations
             
@@ -749,114 +722,30 @@ def create_blueprint(api):
             if not user_data or user_data.get('company_id') != company_id:
                 return jsonify({'success': False, 'error': 'Geçersiz oturum'}), 401
             
-            conn = api.db.get_connection()
-            cursor = conn.cursor()
-            
-            placeholder = api.db.get_placeholder() if hasattr(api.db, 'get_placeholder') else '?'
-            
             from datetime import datetime, timedelta
             end_date = datetime.now()
             start_date = end_date - timedelta(days=30)
             
-            if api.db.db_adapter.db_type == 'postgresql':
-                cursor.execute(f'''
-                    SELECT DATE(d.timestamp) as date,
-                           COUNT(d.detection_id) as total_detections,
-                           COUNT(v.violation_id) as total_violations,
-                           ROUND(
-                               CASE 
-                                   WHEN COUNT(d.detection_id) > 0 
-                                   THEN (COUNT(d.detection_id) - COUNT(v.violation_id)) * 100.0 / COUNT(d.detection_id)
-                                   ELSE 0 
-                               END, 1
-                           ) as compliance_rate
-                    FROM detections d
-                    LEFT JOIN violations v ON DATE(d.timestamp) = DATE(v.timestamp) 
-                                          AND d.company_id = v.company_id
-                    WHERE d.company_id = {placeholder} 
-                    AND d.timestamp >= {placeholder}
-                    GROUP BY DATE(d.timestamp)
-                    ORDER BY DATE(d.timestamp) DESC
-                    LIMIT 30
-                ''', (company_id, start_date.isoformat()))
-            else:
-                cursor.execute(f'''
-                    SELECT DATE(d.timestamp) as date,
-                           COUNT(d.detection_id) as total_detections,
-                           COUNT(v.violation_id) as total_violations,
-                           ROUND(
-                               CASE 
-                                   WHEN COUNT(d.detection_id) > 0 
-                                   THEN (COUNT(d.detection_id) - COUNT(v.violation_id)) * 100.0 / COUNT(d.detection_id)
-                                   ELSE 0 
-                               END, 1
-                           ) as compliance_rate
-                    FROM detections d
-                    LEFT JOIN violations v ON DATE(d.timestamp) = DATE(v.timestamp) 
-                                          AND d.company_id = v.company_id
-                    WHERE d.company_id = {placeholder} 
-                    AND d.timestamp >= {placeholder}
-                    GROUP BY DATE(d.timestamp)
-                    ORDER BY DATE(d.timestamp) DESC
-                    LIMIT 30
-                ''', (company_id, start_date.isoformat()))
-            
-            daily_compliance = cursor.fetchall()
-            
-            cursor.execute(f'''
-                SELECT d.camera_id,
-                       COUNT(d.detection_id) as total_detections,
-                       COUNT(v.violation_id) as total_violations,
-                       ROUND(
-                           CASE 
-                               WHEN COUNT(d.detection_id) > 0 
-                               THEN (COUNT(d.detection_id) - COUNT(v.violation_id)) * 100.0 / COUNT(d.detection_id)
-                               ELSE 0 
-                           END, 1
-                       ) as compliance_rate
-                FROM detections d
-                LEFT JOIN violations v ON d.camera_id = v.camera_id 
-                                      AND d.company_id = v.company_id
-                WHERE d.company_id = {placeholder} 
-                AND d.timestamp >= {placeholder}
-                GROUP BY d.camera_id
-                ORDER BY compliance_rate DESC
-            ''', (company_id, start_date.isoformat()))
-            
-            camera_compliance = cursor.fetchall()
-            
-            cursor.execute(f'''
-                SELECT missing_ppe, COUNT(*) as violation_count
-                FROM violations 
-                WHERE company_id = {placeholder} 
-                AND timestamp >= {placeholder}
-                GROUP BY missing_ppe
-                ORDER BY violation_count DESC
-            ''', (company_id, start_date.isoformat()))
-            
-            ppe_violations = cursor.fetchall()
-            
-            cursor.execute(f'''
-                SELECT COUNT(*) as total_detections
-                FROM detections 
-                WHERE company_id = {placeholder} 
-                AND timestamp >= {placeholder}
-            ''', (company_id, start_date.isoformat()))
-            
-            total_detections = cursor.fetchone()
-            total_detections = total_detections[0] if total_detections else 0
+            conn = api.db.get_read_connection()
+            db_type = api.db.db_adapter.db_type
+            # Kapanmış saatler rollup tablolarından, açık saat ham tablolardan
+            detections_by_day = summarize(conn, db_type, company_id, SOURCE_DETECTIONS, (GROUP_DAY,), since=start_date)
+            detections_by_camera = summarize(conn, db_type, company_id, SOURCE_DETECTIONS, (GROUP_CAMERA,),
+                                             since=start_date)
+            violations_by_day = summarize(conn, db_type, company_id, SOURCE_VIOLATIONS, (GROUP_DAY,), since=start_date)
+            violations_by_camera = summarize(conn, db_type, company_id, SOURCE_VIOLATIONS, (GROUP_CAMERA,),
+                                             since=start_date)
+            violations_by_ppe = summarize(conn, db_type, company_id, SOURCE_VIOLATIONS, (GROUP_PPE_TYPE,),
+                                          since=start_date)
+            conn.close()
             
-            cursor.execute(f'''
-                SELECT COUNT(*) as total_violations
-                FROM violations 
-                WHERE company_id = {placeholder} 
-                AND timestamp >= {placeholder}
-            ''', (company_id, start_date.isoformat()))
+            def _compliance_rate(detections, violations):
+                if detections > 0:
+                    return round((detections - violations) * 100.0 / detections, 1)
+                return 0
             
-            total_violations = cursor.fetchone()
-            total_violations = total_violations[0] if total_violations else 0
-            
-            conn.close()
+            total_detections = sum(row['detections'] for row in detections_by_day.values())
+            total_violations = sum(row['violation_count'] for row in violations_by_day.values())
             
             overall_compliance = 0
             if total_detections > 0:
@@ -872,13 +761,9 @@ def create_blueprint(api):
             vest_violations = 0
             shoes_violations = 0
             
-            for row in ppe_violations:
-                if hasattr(row, 'keys'):
-                    ppe_type = row['missing_ppe'].lower()
-                    count = row['violation_count']
-                else:
-                    ppe_type = row[0].lower()
-                    count = row[1]
+            for (ppe_type,), row in violations_by_ppe.items():
+                ppe_type = (ppe_type or '').lower()
+                count = row['violation_count']
                 
                 if 'helmet' in ppe_type or 'kask' in ppe_type:
                     helmet_violations += count
@@ -904,39 +789,27 @@ def create_blueprint(api):
                 'period': f"{start_date.strftime('%Y-%m-%d')} - {end_date.strftime('%Y-%m-%d')}"
             }
             
-            for row in daily_compliance:
-                if hasattr(row, 'keys'):
-                    compliance_data['daily_stats'].append({
-                        'date': str(row['date']),
-                        'compliance': float(row['compliance_rate']) if row['compliance_rate'] else 0,
-                        'detections': row['total_detections'],
-                        'violations': row['total_violations']
-                    })
-                else:
-                    compliance_data['daily_stats'].append({
-                        'date': str(row[0]),
-                        'compliance': float(row[3]) if row[3] else 0,
-                        'detections': row[1],
-                        'violations': row[2]
-                    })
-            
-            for row in camera_compliance:
-                if hasattr(row, 'keys'):
-                    compliance_data['camera_stats'].append({
-                        'camera_name': f'Kamera {row["camera_id"]}',
-                        'camera_id': row['camera_id'],
-                        'compliance': float(row['compliance_rate']) if row['compliance_rate'] else 0,
-                        'detections': row['total_detections'],
-                        'violations': row['total_violations']
-                    })
-                else:
-                    compliance_data['camera_stats'].append({
-                        'camera_name': f'Kamera {row[0]}',
-                        'camera_id': row[0],
-                        'compliance': float(row[3]) if row[3] else 0,
-                        'detections': row[1],
-                        'violations': row[2]
-                    })
+            for (day,) in sorted(detections_by_day, reverse=True)[:30]:
+                detections = detections_by_day[(day,)]['detections']
+                violations = violations_by_day.get((day,), {}).get('violation_count', 0)
+                compliance_data['daily_stats'].append({
+                    'date': str(day),
+                    'compliance': _compliance_rate(detections, violations),
+                    'detections': detections,
+                    'violations': violations
+                })
+            
+            camera_stats = []
+            for (camera_id,), row in detections_by_camera.items():
+                violations = violations_by_camera.get((camera_id,), {}).get('violation_count', 0)
+                camera_stats.append({
+                    'camera_name': f'Kamera {camera_id}',
+                    'camera_id': camera_id,
+                    'compliance': _compliance_rate(row['detections'], violations),
+                    'detections': row['detections'],
+                    'violations': violations
+                })
+            compliance_data['camera_stats'] = sorted(camera_stats, key=lambda stat: -stat['compliance'])
             
             if total_detections == 0:
                 compliance_data['message'] = 'Live detection başlatıldığında gerçek uyumluluk verileri burada görünecek'
@@ -964,10 +837,8 @@ def create_blueprint(api):
             format_type = data.get('format', 'pdf')
             send_email = data.get('send_email', False)
             
-            conn = api.db.get_connection()
-            cursor = conn.cursor()
-            
-            placeholder = api.db.get_placeholder() if hasattr(api.db, 'get_placeholder') else '?'
+            conn = api.db.get_read_connection()
+            db_type = api.db.db_adapter.db_type
             
             report_data = {
                 'company_id': company_id,
@@ -977,47 +848,31 @@ def create_blueprint(api):
                 'data': {}
             }
             
+            # Tüm geçmiş: kapanmış günler/saatler rollup tablolarından, açık saat ham tablolardan
             if report_type == 'violations':
-                cursor.execute(f'''
-                    SELECT camera_id, COUNT(*) as count, MAX(timestamp) as last_violation
-                    FROM violations 
-                    WHERE company_id = {placeholder}
-                    GROUP BY camera_id
-                    ORDER BY count DESC
-                ''', (company_id,))
-                
-                violations_data = cursor.fetchall()
-                report_data['data']['violations'] = violations_data
+                by_camera = summarize(conn, db_type, company_id, SOURCE_VIOLATIONS, (GROUP_CAMERA,))
+                report_data['data']['violations'] = [
+                    {'camera_id': camera_id, 'count': row['violation_count'], 'last_violation': row['last_at']}
+                    for (camera_id,), row in sorted(by_camera.items(), key=lambda item: -item[1]['violation_count'])
+                    if row['violation_count']
+                ]
             
             elif report_type == 'compliance':
-                cursor.execute(f'''
-                    SELECT DATE(timestamp) as date, 
-                           COUNT(*) as total_detections,
-                           SUM(CASE WHEN violations_count = 0 THEN 1 ELSE 0 END) as compliant_detections
-                    FROM detections 
-                    WHERE company_id = {placeholder}
-                    GROUP BY DATE(timestamp)
-                    ORDER BY date DESC
-                    LIMIT 30
-                ''', (company_id,))
-                
-                compliance_data = cursor.fetchall()
-                report_data['data']['compliance'] = compliance_data
+                by_day = summarize(conn, db_type, company_id, SOURCE_DETECTIONS, (GROUP_DAY,))
+                report_data['data']['compliance'] = [
+                    {'date': day, 'total_detections': by_day[(day,)]['detections'],
+                     'compliant_detections': by_day[(day,)]['compliant_detections']}
+                    for (day,) in sorted(by_day, reverse=True)[:30]
+                ]
             
             elif report_type == 'camera':
-                cursor.execute(f'''
-                    SELECT camera_id,
-                           COUNT(*) as total_detections,
-                           AVG(confidence) as avg_confidence,
-                           SUM(violations_count) as total_violations
-                    FROM detections 
-                    WHERE company_id = {placeholder}
-                    GROUP BY camera_id
-                    ORDER BY total_detections DESC
-                ''', (company_id,))
-                
-                camera_data = cursor.fetchall()
-                report_data['data']['camera_performance'] = camera_data
+                by_camera = summarize(conn, db_type, company_id, SOURCE_DETECTIONS, (GROUP_CAMERA,))
+                report_data['data']['camera_performance'] = [
+                    {'camera_id': camera_id, 'total_detections': row['detections'],
+                     'avg_confidence': row['confidence_sum'] / row['detections'] if row['detections'] else 0,
+                     'total_violations': row['violations']}
+                    for (camera_id,), row in sorted(by_camera.items(), key=lambda item: -item[1]['detections'])
+                ]
             
             conn.close()
             
@@ -1028,17 +883,22 @@ def create_blueprint(api):
                 cursor.execute('''
                     INSERT INTO reports (company_id, report_type, report_data, created_at)
                     VALUES (?, ?, ?, ?)
-                ''', (company_id, report_type, str(report_data), datetime.now()))
+                ''', (company_id, report_type, json.dumps(report_data, default=str), datetime.now()))
             else:
                 cursor.execute('''
                     INSERT INTO reports (company_id, report_type, report_data, created_at)
                     VALUES (%s, %s, %s, %s)
-                ''', (company_id, report_type, report_data, datetime.now()))
+                ''', (company_id, report_type, json.dumps(report_data, default=str), datetime.now()))
             
             conn.commit()
             conn.close()
             
-            export_url = f"/exports/{company_id}_{report_type}_{format_type}.{format_type}"
+            if format_type in STREAM_FORMATS:
+                # Ham satırlar belleğe alınmadan akış olarak indirilir
+                export_url = (f"/api/company/{company_id}/reports/export/stream"
+                              f"?dataset={report_type}&format={format_type}")
+            else:
+                export_url = f"/exports/{company_id}_{report_type}_{format_type}.{format_type}"
             
             return jsonify({
                 'success': True, 
@@ -1053,6 +913,98 @@ def create_blueprint(api):
             logger.error(f"❌ Export report error: {str(e)}")
             return jsonify({'success': False, 'error': str(e)}), 500
 
+    @bp.route('/api/company/<company_id>/reports/export/stream', methods=['GET'])
+    def stream_report_export(company_id):
+        """Ham rapor verisini CSV / NDJSON olarak chunked yanıtla akıt - O(chunk) bellek"""
+        user_data = api.validate_session()
+        if not user_data or user_data.get('company_id') != company_id:
+            return jsonify({'success': False, 'error': 'Geçersiz oturum'}), 401
+        
+        format_type = request.args.get('format', 'csv')
+        try:
+            dataset = resolve_dataset(request.args.get('dataset'))
+            since, until = _export_range(request.args)
+            if format_type not in STREAM_FORMATS:
+                raise ValueError(f"Unsupported stream format: {format_type}")
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        
+        db_adapter = api.db.db_adapter
+        
+        def generate():
+            conn = db_adapter.get_read_connection()
+            try:
+                yield from stream_export(conn, db_adapter.db_type, dataset, company_id, format_type,
+                                         since=since, until=until)
+            except Exception as e:
+                # Başlıklar gönderildi - hata sadece loglanabilir, yanıt yarıda kesilir
+                logger.error(f"❌ Export stream error for {company_id}: {e}")
+                raise
+            finally:
+                db_adapter.close_connection(conn)
+        
+        filename = f"{company_id}_{dataset.table}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{format_type}"
+        return Response(stream_with_context(generate()), mimetype=CONTENT_TYPES[format_type],
+                        headers={'Content-Disposition': f'attachment; filename="{filename}"',
+                                 'X-Accel-Buffering': 'no'})
+
+    @bp.route('/api/company/<company_id>/reports/export/jobs', methods=['POST'])
+    def create_export_job(company_id):
+        """Çok büyük aralıklar için arka planda dosyaya export (CSV / NDJSON / Parquet)"""
+        user_data = api.validate_session()
+        if not user_data or user_data.get('company_id') != company_id:
+            return jsonify({'success': False, 'error': 'Geçersiz oturum'}), 401
+        
+        data = request.get_json(silent=True) or {}
+        format_type = data.get('format', 'csv')
+        try:
+            if format_type not in FILE_FORMATS:
+                raise ValueError(f"Unsupported export format: {format_type}")
+            since, until = _export_range(data)
+            job = get_export_job_manager().submit(company_id, data.get('dataset', 'violations'), format_type,
+                                                  since=since, until=until)
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        except ExportQueueFull:
+            return jsonify({'success': False, 'error': 'Çok fazla bekleyen export işi, daha sonra tekrar deneyin'}), \
+                429, {'Retry-After': '60'}
+        
+        return jsonify({
+            'success': True,
+            'job': job.progress(),
+            'progress_url': f"/api/company/{company_id}/reports/export/jobs/{job.job_id}"
+        }), 202
+
+    @bp.route('/api/company/<company_id>/reports/export/jobs/<job_id>', methods=['GET'])
+    def export_job_progress(company_id, job_id):
+        """Arka plan export işinin ilerlemesi"""
+        user_data = api.validate_session()
+        if not user_data or user_data.get('company_id') != company_id:
+            return jsonify({'success': False, 'error': 'Geçersiz oturum'}), 401
+        
+        job = get_export_job_manager().get(company_id, job_id)
+        if job is None:
+            return jsonify({'success': False, 'error': 'Export işi bulunamadı'}), 404
+        
+        progress = job.progress()
+        if job.status == JOB_COMPLETED:
+            progress['download_url'] = f"/api/company/{company_id}/reports/export/jobs/{job_id}/download"
+        return jsonify({'success': True, 'job': progress})
+
+    @bp.route('/api/company/<company_id>/reports/export/jobs/<job_id>/download', methods=['GET'])
+    def download_export_job(company_id, job_id):
+        """Tamamlanan export dosyasını indir"""
+        user_data = api.validate_session()
+        if not user_data or user_data.get('company_id') != company_id:
+            return jsonify({'success': False, 'error': 'Geçersiz oturum'}), 401
+        
+        job = get_export_job_manager().get(company_id, job_id)
+        if job is None or job.status != JOB_COMPLETED or not job.path or not os.path.exists(job.path):
+            return jsonify({'success': False, 'error': 'Export dosyası hazır değil'}), 404
+        
+        return send_file(os.path.abspath(job.path), mimetype=CONTENT_TYPES[job.format],
+                         as_attachment=True, download_name=job.filename)
+
     # =========================================================================
     # COMPANY PROFILE PAGE
     # =========================================================================
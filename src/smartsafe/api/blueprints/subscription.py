@@ -7,6 +7,9 @@ from flask import Blueprint, request, jsonify, session, redirect, render_templat
 import logging
 from datetime import datetime
 
+from src.smartsafe.services.response_cache import KEY_SUBSCRIPTION, get_response_cache
+from src.smartsafe.services.ttl_cache import invalidate_company
+
 logger = logging.getLogger(__name__)
 
 
@@ -128,6 +131,7 @@ def create_blueprint(api):
             
             conn.commit()
             conn.close()
+            invalidate_company(company_id)
             
             return jsonify({
                 'success': True,
@@ -247,6 +251,7 @@ def create_blueprint(api):
             
             conn.commit()
             conn.close()
+            invalidate_company(company_id)
             
             return jsonify({
                 'success': True,
@@ -282,6 +287,7 @@ def create_blueprint(api):
             
             conn.commit()
             conn.close()
+            invalidate_company(company_id)
             
             return jsonify({
                 'success': True,
@@ -318,6 +324,7 @@ def create_blueprint(api):
             
             conn.commit()
             conn.close()
+            invalidate_company(company_id)
             
             return jsonify({
                 'success': True,
@@ -353,37 +360,42 @@ def create_blueprint(api):
                 
             logger.info(f"✅ Session validation successful for API")
 
-            # Test database connection first
-            try:
-                conn = api.db.get_connection()
-                cursor = conn.cursor()
-                cursor.execute("SELECT COUNT(*) FROM companies")
-                company_count = cursor.fetchone()[0]
-                
-                # Check if specific company exists
-                placeholder = api.db.get_placeholder() if hasattr(api.db, 'get_placeholder') else '?'
-                cursor.execute(f"SELECT company_name FROM companies WHERE company_id = {placeholder}", (company_id,))
-                company_result = cursor.fetchone()
-                
-                conn.close()
-                logger.info(f"🔍 Database connection test successful. Total companies: {company_count}")
-                if company_result:
-                    logger.info(f"🔍 Company found: {company_result[0]}")
-                else:
-                    logger.warning(f"⚠️ Company not found: {company_id}")
-                    return jsonify({'success': False, 'error': 'Şirket bulunamadı'}), 404
+            def load_subscription():
+                # Önce veritabanı bağlantısı ve şirket varlığı kontrolü
+                try:
+                    conn = api.db.get_connection()
+                    cursor = conn.cursor()
+                    cursor.execute("SELECT COUNT(*) FROM companies")
+                    company_count = cursor.fetchone()[0]
                     
-            except Exception as db_error:
-                logger.error(f"❌ Database connection test failed: {db_error}")
-                return jsonify({'success': False, 'error': 'Veritabanı bağlantı hatası'}), 500
-            
-            result = api.get_subscription_info_internal(company_id)
-            logger.info(f"🔍 Internal subscription result: {result}")
-            if result and result.get('success'):
-                return jsonify(result)
-            else:
+                    # Check if specific company exists
+                    placeholder = api.db.get_placeholder() if hasattr(api.db, 'get_placeholder') else '?'
+                    cursor.execute(f"SELECT company_name FROM companies WHERE company_id = {placeholder}", (company_id,))
+                    company_result = cursor.fetchone()
+                    
+                    conn.close()
+                    logger.info(f"🔍 Database connection test successful. Total companies: {company_count}")
+                    if company_result:
+                        logger.info(f"🔍 Company found: {company_result[0]}")
+                    else:
+                        logger.warning(f"⚠️ Company not found: {company_id}")
+                        return {'success': False, 'error': 'Şirket bulunamadı'}, 404
+                        
+                except Exception as db_error:
+                    logger.error(f"❌ Database connection test failed: {db_error}")
+                    return {'success': False, 'error': 'Veritabanı bağlantı hatası'}, 500
+                
+                result = api.get_subscription_info_internal(company_id)
+                logger.info(f"🔍 Internal subscription result: {result}")
+                if result and result.get('success'):
+                    return result, 200
                 error_msg = result.get('error', 'Şirket bulunamadı') if result else 'Şirket bulunamadı'
-                return jsonify({'success': False, 'error': error_msg}), 404
+                return {'success': False, 'error': error_msg}, 404
+            
+            # Şirket başına cache'li (sadece başarılı yanıt); abonelik yazmaları invalidate eder
+            body, status = get_response_cache().get_or_compute(
+                company_id, KEY_SUBSCRIPTION, load_subscription, cache_if=lambda response: response[1] == 200)
+            return jsonify(body), status
             
         except Exception as e:
             logger.error(f"❌ Abonelik bilgileri getirme hatası: {e}")
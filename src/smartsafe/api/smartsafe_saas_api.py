@@ -4,7 +4,7 @@ SmartSafe AI - SaaS Multi-Tenant API Server
 Şirket bazlı veri ayrımı ile profesyonel SaaS sistemi
 """
 
-from flask import Flask, request, jsonify, session, redirect, url_for, render_template_string, Response, render_template
+from flask import Flask, request, jsonify, session, redirect, url_for, render_template_string, Response, render_template, send_file, g
 from flask_cors import CORS
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
@@ -42,6 +42,27 @@ from src.smartsafe.database.database_adapter import get_db_adapter
 from src.smartsafe.integrations.cameras.camera_integration_manager import DVRConfig
 from src.smartsafe.detection.snapshot_manager import get_snapshot_manager
 from src.smartsafe.integrations.dvr.dvr_ppe_integration import get_dvr_ppe_manager
+from src.smartsafe.services.frame_ring import get_frame_ring_registry
+from src.smartsafe.services.report_rollups import get_rollup_compactor
+from src.smartsafe.database.partitions import get_partition_maintainer
+from src.smartsafe.database.read_routing import begin_read_scope, end_read_scope
+from src.smartsafe.database.query_profiler import get_query_profiler
+from src.smartsafe.services.snapshot_poller import get_snapshot_poller
+from src.smartsafe.services.adaptive_mjpeg import adaptive_mjpeg_stream
+from src.smartsafe.services.tenant_cache import KIND_DEMO_STATUS, KIND_SUBSCRIPTION, get_tenant_config_cache
+from src.smartsafe.services.write_behind import get_write_behind_queue
+from src.smartsafe.services.latency_tracer import (
+    STAGE_ASSOCIATION, STAGE_DB_ENQUEUE, STAGE_DEQUEUE, STAGE_INFERENCE_END, STAGE_INFERENCE_START,
+    STAGE_OVERLAY, get_latency_tracer
+)
+from src.smartsafe.services.hls_restreamer import (
+    PLAYLIST_NAME, content_type_for, get_hls_restreamer, select_passthrough_source
+)
+from src.smartsafe.services.event_broker import (
+    EVENT_DETECTION, EVENT_OVERLAY, EVENT_VIOLATION, detection_summary, get_event_broker, overlay_payload
+)
+from src.smartsafe.services.detection_log import get_detection_log
+from src.smartsafe.services.response_cache import GLOBAL_NAMESPACE, get_response_cache
 import cv2
 import numpy as np
 import base64
@@ -70,16 +91,14 @@ logger.info("✅ Enterprise modülleri lazy loading için hazır - Memory optimi
 active_detectors = {}
 detection_threads = {}
 camera_captures = {}  # Kamera yakalama nesneleri
-frame_buffers = {}    # Frame buffer'ları
+frame_buffers = {}    # Frame buffer'ları (legacy worker'lar; SaaS worker'lar frame ring kullanır)
 detection_results = {} # Tespit sonuçları
 live_violation_state = {}  # SaaS canlı tespit için ihlal durumu (start/resolution)
 # Kamera okuma hataları için sayaç (noise azaltma + gerektiğinde yeniden bağlanma)
 frame_failure_counts = {}
 
-# İYİLEŞTİRİLDİ: Response Caching
-response_cache = {}
-cache_timestamps = {}
-CACHE_DURATION = 300  # 5 dakika cache süresi
+# Response caching: sınırlı LRU/TTL cache (services/response_cache.py)
+CACHE_DURATION = 300  # 5 dakika varsayılan cache süresi
 
 
 
@@ -128,6 +147,21 @@ class SmartSafeSaaSAPI:
                 response.headers['X-UA-Compatible'] = 'IE=Edge,chrome=1'
             return response
         
+        # İstek kapsamları: read-your-writes (yazan oturumun okumaları kısa süre primary'den)
+        # ve N+1 tespiti için istek başına sorgu sayımı
+        @self.app.before_request
+        def open_request_scopes():
+            g.read_scope_token = begin_read_scope(
+                session.get('session_id') or request.remote_addr,
+                write=request.method not in ('GET', 'HEAD', 'OPTIONS'))
+            g.query_scope_token = get_query_profiler().begin_request(
+                f"{request.method} {request.endpoint or request.path}")
+        
+        @self.app.teardown_request
+        def close_request_scopes(exc=None):
+            get_query_profiler().end_request(g.pop('query_scope_token', None))
+            end_read_scope(g.pop('read_scope_token', None))
+        
         # SH17 Model Manager entegrasyonu (Production Optimized - Lazy Loading)
         self.sh17_manager = None
         try:
@@ -363,6 +397,10 @@ class SmartSafeSaaSAPI:
                 return False
             
             self._db_initialized = True
+            # Rapor rollup'ları: kapanmış saatleri periyodik olarak özet tablolara taşı
+            get_rollup_compactor().start()
+            # Aylık bölümler + saklama süresi (bölüm DROP) bakımı
+            get_partition_maintainer().start()
             logger.info("✅ Database initialized successfully")
             return True
         except Exception as e:
@@ -374,56 +412,24 @@ class SmartSafeSaaSAPI:
             return False
     
     def setup_cache_management(self):
-        """Cache yönetimi için yardımcı fonksiyonlar"""
+        """Cache yönetimi için yardımcı fonksiyonlar (sınırlı response cache üzerinde)"""
+        cache = get_response_cache()
+        
         def get_cached_response(cache_key: str) -> Optional[Dict]:
             """Cache'den response al"""
-            if cache_key in response_cache:
-                timestamp = cache_timestamps.get(cache_key, 0)
-                if time.time() - timestamp < CACHE_DURATION:
-                    logger.info(f"✅ Cache hit: {cache_key}")
-                    return response_cache[cache_key]
-                else:
-                    # Expired cache
-                    del response_cache[cache_key]
-                    del cache_timestamps[cache_key]
-            return None
+            return cache.get(GLOBAL_NAMESPACE, cache_key)
         
         def set_cached_response(cache_key: str, response_data: Dict):
             """Response'u cache'e kaydet"""
-            response_cache[cache_key] = response_data
-            cache_timestamps[cache_key] = time.time()
-            logger.info(f"💾 Cache set: {cache_key}")
+            cache.put(GLOBAL_NAMESPACE, cache_key, response_data, ttl=CACHE_DURATION)
         
         def clear_expired_cache():
-            """Expired cache'leri temizle"""
-            current_time = time.time()
-            expired_keys = [
-                key for key, timestamp in cache_timestamps.items()
-                if current_time - timestamp > CACHE_DURATION
-            ]
-            for key in expired_keys:
-                del response_cache[key]
-                del cache_timestamps[key]
-            if expired_keys:
-                logger.info(f"🧹 Cleared {len(expired_keys)} expired cache entries")
+            """Expired kayıtlar erişimde / LRU tahliyesinde düşer - ayrı temizlik gerekmez"""
         
         # Cache fonksiyonlarını instance'a ekle
         self.get_cached_response = get_cached_response
         self.set_cached_response = set_cached_response
         self.clear_expired_cache = clear_expired_cache
-        
-        # Cache cleanup thread başlat
-        def cache_cleanup_worker():
-            while True:
-                try:
-                    clear_expired_cache()
-                    time.sleep(60)  # Her dakika kontrol et
-                except Exception as e:
-                    logger.error(f"❌ Cache cleanup error: {e}")
-                    time.sleep(60)
-        
-        cache_thread = threading.Thread(target=cache_cleanup_worker, daemon=True)
-        cache_thread.start()
         logger.info("✅ Cache management initialized")
     
     def _create_error_frame(self, error_message: str):
@@ -577,8 +583,16 @@ class SmartSafeSaaSAPI:
         except Exception as e:
             logger.warning(f"⚠️ Memory cleanup failed: {e}")
     
-    def get_subscription_info_internal(self, company_id):
-        """Internal subscription info - session kontrolü olmadan"""
+    def get_subscription_info_internal(self, company_id, use_cache=True):
+        """Internal subscription info - session kontrolü olmadan (limit kontrolleri use_cache=False)"""
+        if not use_cache:
+            return self._load_subscription_info(company_id)
+        return get_tenant_config_cache().get_or_load(
+            company_id, KIND_SUBSCRIPTION, lambda: self._load_subscription_info(company_id),
+            cache_if=lambda info: bool(info and info.get('success')))
+    
+    def _load_subscription_info(self, company_id):
+        """Abonelik bilgisini ve kamera kullanımını veritabanından oku"""
         from datetime import datetime
         try:
             # Veritabanını başlat (lazy initialization)
@@ -1025,7 +1039,12 @@ class SmartSafeSaaSAPI:
             return None
     
     def check_demo_status(self, company_id: str) -> Dict[str, Any]:
-        """Demo hesabı durumunu kontrol et"""
+        """Demo hesabı durumunu kontrol et (tenant cache'lenmiş)"""
+        return get_tenant_config_cache().get_or_load(
+            company_id, KIND_DEMO_STATUS, lambda: self._load_demo_status(company_id))
+    
+    def _load_demo_status(self, company_id: str) -> Dict[str, Any]:
+        """Demo hesabı durumunu veritabanından oku"""
         try:
             # Database initialization kontrolü
             if not self.ensure_database_initialized():
@@ -1606,6 +1625,9 @@ class SmartSafeSaaSAPI:
                                     pass
                                 detection_results[camera_key].put_nowait(detection_data)
 
+                            get_event_broker().publish(company_id, EVENT_DETECTION, detection_summary(detection_data),
+                                                       camera_id=camera_id, retain=True)
+
                             # === NEW: Persist detection to DB for dynamic widgets ===
                             try:
                                 from src.smartsafe.database.database_adapter import get_db_adapter
@@ -5612,6 +5634,7 @@ class SmartSafeSaaSAPI:
                 let detectionActive = false;
                 let currentCameraId = null;
                 let detectionMonitoringInterval = null;
+                let detectionEventSource = null;
                 
                 function startDetection() {
                     const camera = document.getElementById('camera-select').value;
@@ -5692,10 +5715,7 @@ class SmartSafeSaaSAPI:
                                 stopVideoFeed();
                                 
                                 // Detection monitoring durdur
-                                if (detectionMonitoringInterval) {
-                                    clearInterval(detectionMonitoringInterval);
-                                    detectionMonitoringInterval = null;
-                                }
+                                stopDetectionMonitoring();
                                 
                                 // UI güncelle
                                 document.getElementById('start-btn').disabled = false;
@@ -5752,96 +5772,131 @@ class SmartSafeSaaSAPI:
                     placeholder.innerHTML = '<i class="fas fa-video fa-4x text-muted mb-3"></i><h5 class="text-muted">Canlı Video Feed</h5><p class="text-muted">Tespiti başlatmak için yukarıdaki butonu kullanın</p>';
                 }
                 
+                function renderDetectionResult(result) {
+                    // İYİLEŞTİRİLDİ: Tüm dinamik verileri güncelle
+                    document.getElementById('live-people-count').textContent = result.total_people || 0;
+                    document.getElementById('live-compliance-rate').textContent = `${(result.compliance_rate || 0).toFixed(1)}%`;
+                    
+                    // YENİ: FPS, işlem süresi ve tespit sayısı güncelleme
+                    const fps = Math.round(1000 / (result.processing_time_ms || 100));
+                    document.getElementById('fps-display').textContent = `FPS: ${fps}`;
+                    document.getElementById('live-fps').textContent = fps;
+                    document.getElementById('live-processing-time').textContent = `${(result.processing_time_ms || 0).toFixed(0)}ms`;
+                    document.getElementById('live-detection-count').textContent = result.detection_count || 0;
+                    
+                    // YENİ: Violation count badge güncelleme
+                    const violationCount = result.violations ? result.violations.length : 0;
+                    document.getElementById('violation-count').textContent = violationCount;
+                    
+                    // YENİ: Son güncelleme zamanı
+                    const now = new Date();
+                    document.getElementById('last-update').textContent = 
+                        now.toLocaleTimeString('tr-TR', { hour: '2-digit', minute: '2-digit', second: '2-digit' });
+                    
+                    // YENİ: Trend göstergelerini güncelle
+                    updateTrendIndicators({
+                        'people-trend': result.total_people > 0 ? 1 : 0,
+                        'compliance-trend': result.compliance_rate > 80 ? 1 : (result.compliance_rate > 60 ? 0 : -1),
+                        'fps-trend': fps > 15 ? 1 : (fps > 5 ? 0 : -1),
+                        'processing-trend': result.processing_time_ms < 100 ? 1 : (result.processing_time_ms < 200 ? 0 : -1)
+                    });
+                    
+                    // Detection status'u güncelle
+                    const statusElement = document.getElementById('detection-status');
+                    statusElement.innerHTML = `Aktif - ${result.total_people || 0} kişi`;
+                    
+                    // Compliance rate'e göre renk değiştir
+                    if (result.compliance_rate >= 80) {
+                        statusElement.className = 'badge bg-success me-2';
+                        document.getElementById('live-compliance-rate').className = 'stat-value text-success';
+                    } else if (result.compliance_rate >= 60) {
+                        statusElement.className = 'badge bg-warning me-2';
+                        document.getElementById('live-compliance-rate').className = 'stat-value text-warning';
+                    } else {
+                        statusElement.className = 'badge bg-danger me-2';
+                        document.getElementById('live-compliance-rate').className = 'stat-value text-danger';
+                    }
+                    
+                    // İhlalleri göster
+                    const violationsList = document.getElementById('live-violations-list');
+                    
+                    if (result.violations && result.violations.length > 0) {
+                        violationsList.innerHTML = result.violations.map(violation => 
+                            `<div class="alert alert-danger alert-sm py-1 px-2 mb-1">
+                                <small><strong>${violation.person_id || 'Kişi'}:</strong> ${violation.missing_ppe.join(', ')}</small>
+                            </div>`
+                        ).join('');
+                    } else {
+                        violationsList.innerHTML = '<p class="text-muted small">Henüz ihlal tespit edilmedi</p>';
+                    }
+                }
+                
+                function resetDetectionStats() {
+                    document.getElementById('fps-display').textContent = 'FPS: --';
+                    document.getElementById('live-fps').textContent = '0';
+                    document.getElementById('live-processing-time').textContent = '0ms';
+                    document.getElementById('live-detection-count').textContent = '0';
+                    document.getElementById('violation-count').textContent = '0';
+                }
+                
                 function startDetectionMonitoring() {
+                    stopDetectionMonitoring();
+                    
+                    // Push (SSE): sonuç inference biter bitmez gelir, polling isteği yok
+                    if (window.EventSource) {
+                        detectionEventSource = new EventSource(
+                            `/api/company/${companyId}/events?camera_id=${encodeURIComponent(currentCameraId)}`);
+                        detectionEventSource.addEventListener('detection', (event) => {
+                            if (detectionActive) {
+                                renderDetectionResult(JSON.parse(event.data));
+                            }
+                        });
+                        // EventSource koptuğunda tarayıcı otomatik yeniden bağlanır (retry);
+                        // sunucu canlı bağlantı limiti dolu (429) ise kapanır -> polling
+                        detectionEventSource.onerror = () => {
+                            if (detectionEventSource && detectionEventSource.readyState === EventSource.CLOSED) {
+                                detectionEventSource = null;
+                                startDetectionPolling();
+                            }
+                        };
+                        return;
+                    }
+                    
+                    startDetectionPolling();
+                }
+                
+                function startDetectionPolling() {
+                    // Fallback: EventSource desteklemeyen tarayıcılar / SSE limiti dolu iken polling
                     detectionMonitoringInterval = setInterval(() => {
                         if (detectionActive && currentCameraId) {
-                            // Detection sonuçlarını al
                             fetch(`/api/company/${companyId}/detection-results/${currentCameraId}`)
                                 .then(response => response.json())
                                 .then(data => {
                                     if (data.success && data.result) {
-                                        const result = data.result;
-                                        
-                                        // İYİLEŞTİRİLDİ: Tüm dinamik verileri güncelle
-                                        document.getElementById('live-people-count').textContent = result.total_people || 0;
-                                        document.getElementById('live-compliance-rate').textContent = `${(result.compliance_rate || 0).toFixed(1)}%`;
-                                        
-                                        // YENİ: FPS, işlem süresi ve tespit sayısı güncelleme
-                                        const fps = Math.round(1000 / (result.processing_time_ms || 100));
-                                        document.getElementById('fps-display').textContent = `FPS: ${fps}`;
-                                        document.getElementById('live-fps').textContent = fps;
-                                        document.getElementById('live-processing-time').textContent = `${(result.processing_time_ms || 0).toFixed(0)}ms`;
-                                        document.getElementById('live-detection-count').textContent = result.detection_count || 0;
-                                        
-                                        // YENİ: Violation count badge güncelleme
-                                        const violationCount = result.violations ? result.violations.length : 0;
-                                        document.getElementById('violation-count').textContent = violationCount;
-                                        
-                                        // YENİ: Son güncelleme zamanı
-                                        const now = new Date();
-                                        document.getElementById('last-update').textContent = 
-                                            now.toLocaleTimeString('tr-TR', { hour: '2-digit', minute: '2-digit', second: '2-digit' });
-                                        
-                                        // YENİ: Trend göstergelerini güncelle
-                                        updateTrendIndicators({
-                                            'people-trend': result.total_people > 0 ? 1 : 0,
-                                            'compliance-trend': result.compliance_rate > 80 ? 1 : (result.compliance_rate > 60 ? 0 : -1),
-                                            'fps-trend': fps > 15 ? 1 : (fps > 5 ? 0 : -1),
-                                            'processing-trend': result.processing_time_ms < 100 ? 1 : (result.processing_time_ms < 200 ? 0 : -1)
-                                        });
-                                        
-                                        // Detection status'u güncelle
-                                        const statusElement = document.getElementById('detection-status');
-                                        statusElement.innerHTML = `Aktif - ${result.total_people || 0} kişi`;
-                                        
-                                        // Compliance rate'e göre renk değiştir
-                                        if (result.compliance_rate >= 80) {
-                                            statusElement.className = 'badge bg-success me-2';
-                                            document.getElementById('live-compliance-rate').className = 'stat-value text-success';
-                                        } else if (result.compliance_rate >= 60) {
-                                            statusElement.className = 'badge bg-warning me-2';
-                                            document.getElementById('live-compliance-rate').className = 'stat-value text-warning';
-                                        } else {
-                                            statusElement.className = 'badge bg-danger me-2';
-                                            document.getElementById('live-compliance-rate').className = 'stat-value text-danger';
-                                        }
-                                        
-                                        // İhlalleri göster
-                                        const violationsList = document.getElementById('live-violations-list');
-                                        console.log('🔍 Detection result:', result);
-                                        console.log('🔍 Violations:', result.violations);
-                                        
-                                        if (result.violations && result.violations.length > 0) {
-                                            violationsList.innerHTML = result.violations.map(violation => 
-                                                `<div class="alert alert-danger alert-sm py-1 px-2 mb-1">
-                                                    <small><strong>${violation.person_id || 'Kişi'}:</strong> ${violation.missing_ppe.join(', ')}</small>
-                                                </div>`
-                                            ).join('');
-                                        } else {
-                                            violationsList.innerHTML = '<p class="text-muted small">Henüz ihlal tespit edilmedi</p>';
-                                        }
+                                        renderDetectionResult(data.result);
                                     } else {
-                                        document.getElementById('fps-display').textContent = 'FPS: --';
-                                        // İYİLEŞTİRİLDİ: Boş durumda da dinamik verileri sıfırla
-                                        document.getElementById('live-fps').textContent = '0';
-                                        document.getElementById('live-processing-time').textContent = '0ms';
-                                        document.getElementById('live-detection-count').textContent = '0';
-                                        document.getElementById('violation-count').textContent = '0';
+                                        resetDetectionStats();
                                     }
                                 })
                                 .catch(error => {
                                     console.error('Detection monitoring error:', error);
-                                    document.getElementById('fps-display').textContent = 'FPS: --';
-                                    // İYİLEŞTİRİLDİ: Hata durumunda da dinamik verileri sıfırla
-                                    document.getElementById('live-fps').textContent = '0';
-                                    document.getElementById('live-processing-time').textContent = '0ms';
-                                    document.getElementById('live-detection-count').textContent = '0';
-                                    document.getElementById('violation-count').textContent = '0';
+                                    resetDetectionStats();
                                 });
                         }
                     }, 2000); // Her 2 saniyede bir
                 }
                 
+                function stopDetectionMonitoring() {
+                    if (detectionEventSource) {
+                        detectionEventSource.close();
+                        detectionEventSource = null;
+                    }
+                    if (detectionMonitoringInterval) {
+                        clearInterval(detectionMonitoringInterval);
+                        detectionMonitoringInterval = null;
+                    }
+                }
+                
                 function showAlert(message, type) {
                     const alertDiv = document.createElement('div');
                     alertDiv.className = `alert alert-${type} alert-dismissible fade show position-fixed`;
@@ -13865,6 +13920,13 @@ smartsafe_requests_total 100
             
         return people_detected, ppe_compliant, ppe_violations
 
+    @staticmethod
+    def _tenant_detection_config(tenant):
+        """Tenant snapshot'tan (sektör, zorunlu PPE listesi veya None)"""
+        sector = tenant.sector or 'construction'
+        required_ppe = list(tenant.required_ppe) if tenant.required_ppe is not None else None
+        return sector, required_ppe
+
     def saas_detection_worker(self, camera_key, camera_id, company_id, detection_mode, confidence=0.5, active_detectors_ref=None):
         """SaaS Profesyonel Detection Worker - OPTİMİZE EDİLDİ. active_detectors_ref: blueprint'in yazdığı dict (reloader/çift app için zorunlu)."""
         logger.info(f"🚀 SaaS Detection başlatılıyor - Kamera: {camera_id}, Şirket: {company_id}")
@@ -13881,40 +13943,14 @@ smartsafe_requests_total 100
         # PPE Detection Model - SH17 or PoseAware fallback
         pose_detector = None
         device = 'cpu'
+        tenant_cache = get_tenant_config_cache()
         try:
             self.ensure_database_initialized()
-            if self.db is not None:
-                company_data = self.db.get_company_info(company_id)
-                sector = company_data.get('sector', 'construction') if company_data and isinstance(company_data, dict) else 'construction'
-            else:
-                sector = 'construction'
-                logger.warning(f"⚠️ Database not initialized, using default sector: {sector}")
-            
-            # Şirket bazlı zorunlu PPE konfigürasyonunu al (varsa)
-            # None  => konfig yok / bilinmiyor → eski davranış (helmet+vest zorunlu)
-            # []    => kullanıcı "hiçbir PPE zorunlu değil" seçmiş → herkes uyumlu, violation yok
-            required_ppe = None
-            if self.db is not None:
-                try:
-                    company_ppe_config = self.db.get_company_ppe_config(company_id)
-                    if isinstance(company_ppe_config, dict) and 'required' in company_ppe_config:
-                        raw_required = company_ppe_config.get('required')
-                        # Normalize isimler (lowercase, trim) - SH17 ve pose-aware tarafı için güvenli
-                        if isinstance(raw_required, list):
-                            normalized = []
-                            for item in raw_required:
-                                if item is None:
-                                    continue
-                                try:
-                                    normalized.append(str(item).strip().lower())
-                                except Exception:
-                                    continue
-                            required_ppe = normalized
-                        else:
-                            required_ppe = None
-                except Exception as cfg_err:
-                    logger.warning(f"⚠️ PPE config okunamadı, varsayılan kullanılacak: {cfg_err}")
-                    required_ppe = None
+            # Sektör + şirket bazlı zorunlu PPE (tenant snapshot; settings/ppe-config yazmaları invalidate eder)
+            # required_ppe None => konfig yok / bilinmiyor → eski davranış (helmet+vest zorunlu)
+            # required_ppe []   => kullanıcı "hiçbir PPE zorunlu değil" seçmiş → herkes uyumlu, violation yok
+            tenant = tenant_cache.snapshot(company_id)
+            sector, required_ppe = self._tenant_detection_config(tenant)
             
             if self.sh17_manager:
                 logger.info(f"🎯 SH17 PPE Detection - Sektör: {sector}")
@@ -13957,22 +13993,43 @@ smartsafe_requests_total 100
         logger.info(f"🔍 SaaS Detection worker loop başlıyor: active_detectors.get({camera_key}) = {_active}")
         
         time.sleep(0.3)  # Kamera thread'in açılması için kısa bekleme
+        ring_registry = get_frame_ring_registry()
+        tracer = get_latency_tracer()
+        detection_log = get_detection_log()
         while ad.get(camera_key, False):
+            view = None
             try:
-                # Frame al
-                if camera_key in frame_buffers and frame_buffers[camera_key] is not None:
-                    frame = frame_buffers[camera_key].copy()
+                # Frame al - ring slot'una pinlenmiş read-only görünüm (kopya yok)
+                ring = ring_registry.get(camera_key)
+                view = ring.acquire_latest() if ring is not None else None
+                if view is not None:
+                    frame = view.frame
                     frame_count += 1
                     
                     # OPTİMİZE EDİLDİ: Her 6 frame'de bir tespit yap
-                    if frame_count % frame_skip == 0:
+                    if frame_count % frame_skip != 0:
+                        view.release()
+                    else:
+                        # Konfigürasyon değiştiyse yeni snapshot (frame başına DB sorgusu yok)
+                        latest_tenant = tenant_cache.snapshot(company_id)
+                        if latest_tenant is not tenant:
+                            tenant = latest_tenant
+                            sector, required_ppe = self._tenant_detection_config(tenant)
+                        
+                        # Yakalamadan overlay'e gecikme izi (seq + monotonic yakalanma zamanı)
+                        trace = tracer.start(camera_key, view.seq, view.captured_at)
+                        trace.mark(STAGE_DEQUEUE)
                         start_time = time.time()
+                        # Restream overlay senkronu için frame'in yakalanma anı ve boyutu
+                        frame_ts = view.timestamp
+                        frame_size = (frame.shape[1], frame.shape[0])
                         
                         # PPE Detection - PoseAware preferred, SH17 or fallback
                         people_detected = 0
                         ppe_violations = []
                         ppe_compliant = 0
                         
+                        trace.mark(STAGE_INFERENCE_START)
                         try:
                             if pose_detector is not None:
                                 # PoseAwarePPEDetector: person pose + PPE region analysis
@@ -14025,8 +14082,20 @@ smartsafe_requests_total 100
                         except Exception as detection_error:
                             logger.error(f"❌ Detection hatası: {detection_error}")
                             results = []
+                        finally:
+                            # Inference bitti - slot'u producer'a geri ver
+                            view.release()
+                            trace.mark(STAGE_INFERENCE_END)
+                        
+                        # Her inference sonucu (boş frame'ler dahil) ikili detection günlüğüne
+                        detection_log.append(
+                            company_id, camera_id, frame_ts, results, people=people_detected,
+                            compliant=ppe_compliant, violations=len(ppe_violations), frame_size=frame_size,
+                            seq=view.seq, inference_ms=(time.time() - start_time) * 1000
+                        )
                         
                         if not results and people_detected == 0:
+                            tracer.finish(trace)
                             continue
 
                         # İhlal listesini normalize et (dict formatına çevir, string'leri sar)
@@ -14037,6 +14106,7 @@ smartsafe_requests_total 100
                         # PoseAware veya SH17 tarafı ppe_compliant'ı 0 bıraksa bile burada normalize ediyoruz.
                         if people_detected > 0 and len(ppe_violations) == 0 and ppe_compliant == 0:
                             ppe_compliant = people_detected
+                        trace.mark(STAGE_ASSOCIATION)
 
                         # Reports kayıt (both SH17 and YOLOv8 paths)
                         try:
@@ -14064,6 +14134,7 @@ smartsafe_requests_total 100
                                 self._save_violation_to_reports(company_id, camera_id, violation)
                         except Exception as result_error:
                             logger.error(f"❌ Result processing hatası: {result_error}")
+                        trace.mark(STAGE_DB_ENQUEUE)
                         
                         compliance_rate = 0
                         if people_detected > 0:
@@ -14098,7 +14169,14 @@ smartsafe_requests_total 100
                             'detection_mode': str(detection_mode),
                             'confidence_threshold': float(confidence),
                             'detections': results if isinstance(results, list) else [],  # bbox listesi overlay için
+                            'frame_seq': int(view.seq),
+                            'frame_captured_at': view.captured_at,  # monotonic - overlay yaşı ölçümü
+                            'latency_ms': trace.ages_ms(),
                         }
+                        # İstemci tarafı overlay (restream): bbox + frame zaman damgası
+                        detection_data['overlay'] = overlay_payload(
+                            camera_id, detection_data['detections'] + normalized_ppe_violations, frame_ts, frame_size
+                        )
                         
                         # Queue'ya ekle
                         try:
@@ -14109,11 +14187,21 @@ smartsafe_requests_total 100
                             except queue.Empty:
                                 pass
                             detection_results[camera_key].put_nowait(detection_data)
+                        tracer.finish(trace)
+                        
+                        # Canlı dashboard'lara push (SSE) - abone yoksa maliyet tek dict lookup
+                        event_broker = get_event_broker()
+                        event_broker.publish(company_id, EVENT_DETECTION, detection_summary(detection_data),
+                                             camera_id=camera_id, retain=True)
+                        event_broker.publish(company_id, EVENT_OVERLAY, detection_data['overlay'], camera_id=camera_id)
+                        if normalized_ppe_violations:
+                            event_broker.publish(company_id, EVENT_VIOLATION, {
+                                'camera_id': camera_id,
+                                'timestamp': detection_data['timestamp'],
+                                'violations': normalized_ppe_violations,
+                            }, camera_id=camera_id)
                         
-                        # Veritabanına kaydet (her 10 tespit) - SQLite'ta legacy şema kullanıldığı için
-                        # sadece production PostgreSQL için özet kayıt atılır.
-                        if detection_count % 10 == 0:
-                            self.save_detection_to_db(detection_data)
+                        # Detection satırı _save_detection_to_reports ile (her iki veritabanında) yazılır
                         
                         # İhlal varsa veritabanına kaydet (normalize edilmiş dict listesiyle)
                         if normalized_ppe_violations:
@@ -14125,40 +14213,27 @@ smartsafe_requests_total 100
                     
             except Exception as e:
                 logger.error(f"❌ SaaS Detection hatası: {e}")
+                if view is not None:
+                    view.release()
                 time.sleep(1)
         
+        tracer.forget(camera_key)
+        detection_log.close_camera(company_id, camera_id)
         logger.info(f"🛑 SaaS Detection durduruldu - Kamera: {camera_id}")
 
     def _save_detection_to_reports(self, company_id, camera_id, detection_type, 
                                   people_detected, ppe_compliant, violations_count, 
                                   processing_time, confidence):
-        """Save detection data to reports table"""
+        """Save detection data to reports table (write-behind - inference thread DB'yi beklemez)"""
         try:
-            # Database adapter kullan - SQLite ve PostgreSQL uyumlu
-            conn = self.db.get_connection()
-            cursor = conn.cursor()
-            
-            placeholder = self.db.get_placeholder() if hasattr(self.db, 'get_placeholder') else '?'
-            
-            if self.db.db_adapter.db_type == 'sqlite':
-                cursor.execute(f'''
-                    INSERT INTO detections (company_id, camera_id, detection_type, confidence,
-                                          people_detected, ppe_compliant, violations_count, timestamp)
-                    VALUES ({placeholder}, {placeholder}, {placeholder}, {placeholder}, 
-                            {placeholder}, {placeholder}, {placeholder}, {placeholder})
-                ''', (company_id, camera_id, detection_type, confidence,
-                      people_detected, ppe_compliant, violations_count, datetime.now()))
-            else:  # PostgreSQL
-                cursor.execute(f'''
-                    INSERT INTO detections (company_id, camera_id, detection_type, confidence,
-                                          people_detected, ppe_compliant, violations_count, timestamp)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-                ''', (company_id, camera_id, detection_type, confidence,
-                      people_detected, ppe_compliant, violations_count, datetime.now()))
-            
-            conn.commit()
-            conn.close()
-            logger.debug(f"✅ Detection saved to reports: {people_detected} people, {ppe_compliant} compliant")
+            get_write_behind_queue().enqueue(
+                'detections',
+                ('company_id', 'camera_id', 'detection_type', 'confidence',
+                 'people_detected', 'ppe_compliant', 'violations_count', 'timestamp'),
+                (company_id, camera_id, detection_type, confidence,
+                 people_detected, ppe_compliant, violations_count, datetime.now())
+            )
+            logger.debug(f"✅ Detection queued for reports: {people_detected} people, {ppe_compliant} compliant")
             
         except Exception as e:
             logger.error(f"❌ Failed to save detection to reports: {e}")
@@ -14211,30 +14286,16 @@ smartsafe_requests_total 100
                     'camera_id': camera_id
                 })
             
-            # Generate alerts
+            # Generate alerts (write-behind)
             for alert_data in alerts_to_generate:
                 try:
-                    # Alert'i database'e kaydet
-                    conn = self.db.get_connection()
-                    cursor = conn.cursor()
-                    
-                    placeholder = self.db.get_placeholder() if hasattr(self.db, 'get_placeholder') else '?'
-                    
-                    if self.db.db_adapter.db_type == 'sqlite':
-                        cursor.execute(f'''
-                            INSERT INTO alerts (company_id, camera_id, alert_type, severity, title, message, status, created_at)
-                            VALUES ({placeholder}, {placeholder}, {placeholder}, {placeholder}, {placeholder}, {placeholder}, 'active', datetime('now'))
-                        ''', (company_id, alert_data['camera_id'], alert_data['alert_type'], alert_data['severity'], 
-                              alert_data['title'], alert_data['message']))
-                    else:  # PostgreSQL
-                        cursor.execute(f'''
-                            INSERT INTO alerts (company_id, camera_id, alert_type, severity, title, message, status, created_at)
-                            VALUES (%s, %s, %s, %s, %s, %s, 'active', NOW())
-                        ''', (company_id, alert_data['camera_id'], alert_data['alert_type'], alert_data['severity'], 
-                              alert_data['title'], alert_data['message']))
-                    
-                    conn.commit()
-                    conn.close()
+                    # Alert'i database kuyruğuna ekle
+                    get_write_behind_queue().enqueue(
+                        'alerts',
+                        ('company_id', 'camera_id', 'alert_type', 'severity', 'title', 'message', 'status', 'created_at'),
+                        (company_id, alert_data['camera_id'], alert_data['alert_type'], alert_data['severity'],
+                         alert_data['title'], alert_data['message'], 'active', datetime.now())
+                    )
                     
                     logger.info(f"✅ Live alert generated: {alert_data['title']} - {alert_data['message']}")
                     
@@ -14245,39 +14306,21 @@ smartsafe_requests_total 100
             logger.error(f"❌ Live alert generation error: {e}")
     
     def _save_violation_to_reports(self, company_id, camera_id, violation):
-        """Save violation data to reports table"""
+        """Save violation data to reports table (write-behind)"""
         try:
-            # Database adapter kullan - SQLite ve PostgreSQL uyumlu
-            conn = self.db.get_connection()
-            cursor = conn.cursor()
-            
-            placeholder = self.db.get_placeholder() if hasattr(self.db, 'get_placeholder') else '?'
-            
             # Violation details
             missing_ppe = violation.get('missing_ppe', ['Unknown'])[0] if isinstance(violation.get('missing_ppe'), list) else violation.get('missing_ppe', 'Unknown')
             violation_type = f"{missing_ppe}_missing"
             
             confidence = violation.get('confidence', 0.8)
             
-            if self.db.db_adapter.db_type == 'sqlite':
-                cursor.execute(f'''
-                    INSERT INTO violations (company_id, camera_id, worker_id, missing_ppe,
-                                          violation_type, confidence, timestamp)
-                    VALUES ({placeholder}, {placeholder}, {placeholder}, {placeholder},
-                            {placeholder}, {placeholder}, {placeholder})
-                ''', (company_id, camera_id, violation.get('person_id', 'unknown'),
-                      missing_ppe, violation_type, confidence, datetime.now()))
-            else:  # PostgreSQL
-                cursor.execute(f'''
-                    INSERT INTO violations (company_id, camera_id, worker_id, missing_ppe,
-                                          violation_type, confidence, timestamp)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s)
-                ''', (company_id, camera_id, violation.get('person_id', 'unknown'),
-                      missing_ppe, violation_type, confidence, datetime.now()))
-            
-            conn.commit()
-            conn.close()
-            logger.debug(f"✅ Violation saved to reports: {missing_ppe}")
+            get_write_behind_queue().enqueue(
+                'violations',
+                ('company_id', 'camera_id', 'worker_id', 'missing_ppe', 'violation_type', 'confidence', 'timestamp'),
+                (company_id, camera_id, violation.get('person_id', 'unknown'),
+                 missing_ppe, violation_type, confidence, datetime.now())
+            )
+            logger.debug(f"✅ Violation queued for reports: {missing_ppe}")
             
         except Exception as e:
             logger.error(f"❌ Failed to save violation to reports: {e}")
@@ -15183,6 +15226,14 @@ smartsafe_requests_total 100
     def start_saas_camera_snapshot_polling(self, camera_key, snapshot_urls, auth=None, active_detectors_ref=None):
         """Snapshot URL'leri ile polling worker başlat - /video canlı görüntüye kalsın"""
         try:
+            # Tercih: tek event-loop thread'li async poller (keep-alive, paralel URL keşfi)
+            ad = active_detectors_ref if active_detectors_ref is not None else active_detectors
+            poller = get_snapshot_poller()
+            if poller.subscribe(camera_key, snapshot_urls, auth=auth, interval=0.25, timeout=3.0,
+                                is_active=lambda: ad.get(camera_key, False)):
+                return
+            
+            # aiohttp yoksa thread başına requests tabanlı polling
             camera_thread = threading.Thread(
                 target=self.saas_camera_worker_snapshot_polling,
                 args=(camera_key, snapshot_urls, auth, active_detectors_ref),
@@ -15195,6 +15246,7 @@ smartsafe_requests_total 100
     def saas_camera_worker_snapshot_polling(self, camera_key, snapshot_urls, auth=None, active_detectors_ref=None):
         """Snapshot URL'lerden periyodik frame al - MJPEG /video tarayıcıya ayrılır"""
         working_url = None
+        ring = None
         poll_interval = 0.25  # 4 FPS snapshot - detection için yeterli
         ad = active_detectors_ref if active_detectors_ref is not None else active_detectors
         try:
@@ -15214,6 +15266,7 @@ smartsafe_requests_total 100
             # URL'de kimlik varsa (user:pass@host) auth gönderme
             use_auth = auth if (auth and '@' not in working_url) else None
             camera_captures[camera_key] = None  # VideoCapture yok
+            ring = get_frame_ring_registry().get_or_create(camera_key)
             while ad.get(camera_key, False):
                 try:
                     r = requests.get(working_url, auth=use_auth, timeout=3)
@@ -15221,20 +15274,22 @@ smartsafe_requests_total 100
                         arr = np.frombuffer(r.content, np.uint8)
                         frame = cv2.imdecode(arr, cv2.IMREAD_COLOR)
                         if frame is not None:
-                            frame_buffers[camera_key] = frame
+                            # imdecode zaten yeni array üretir - kopyalamadan ring'e ver
+                            ring.publish(frame)
                 except Exception as e:
                     logger.debug(f"Snapshot poll hatası: {e}")
                 time.sleep(poll_interval)
         finally:
             if camera_key in camera_captures:
                 del camera_captures[camera_key]
-            if camera_key in frame_buffers:
-                del frame_buffers[camera_key]
+            if ring is not None:
+                get_frame_ring_registry().remove(camera_key, ring)
             logger.info(f"🛑 SaaS Snapshot polling durduruldu: {camera_key}")
 
     def saas_camera_worker_with_alternatives(self, camera_key, primary_url, alternative_urls, active_detectors_ref=None):
         """Alternatif URL'ler ile kamera worker"""
         cap = None
+        ring = None
         ad = active_detectors_ref if active_detectors_ref is not None else active_detectors
         try:
             import cv2
@@ -15301,14 +15356,15 @@ smartsafe_requests_total 100
             cap.set(cv2.CAP_PROP_FPS, 15)
             
             camera_captures[camera_key] = cap
+            ring = get_frame_ring_registry().get_or_create(camera_key)
             
             logger.info(f"✅ SaaS Kamera worker başladı: {camera_key}")
             frame_failure_counts[camera_key] = 0
             
             while ad.get(camera_key, False):
-                ret, frame = cap.read()
+                # Frame doğrudan ring slot'una decode edilir
+                ret = ring.read_into(cap)
                 if ret:
-                    frame_buffers[camera_key] = frame
                     frame_failure_counts[camera_key] = 0
                 else:
                     # Art arda hataları say - 30'dan sonra sadece uyarı + hafif reconnect
@@ -15341,14 +15397,15 @@ smartsafe_requests_total 100
                 cap.release()
             if camera_key in camera_captures:
                 del camera_captures[camera_key]
-            if camera_key in frame_buffers:
-                del frame_buffers[camera_key]
+            if ring is not None:
+                get_frame_ring_registry().remove(camera_key, ring)
             
             logger.info(f"🛑 SaaS Kamera worker durduruldu: {camera_key}")
 
     def saas_camera_worker(self, camera_key, camera_url, active_detectors_ref=None):
         """SaaS Kamera Worker"""
         cap = None
+        ring = None
         ad = active_detectors_ref if active_detectors_ref is not None else active_detectors
         try:
             import cv2
@@ -15375,14 +15432,15 @@ smartsafe_requests_total 100
             cap.set(cv2.CAP_PROP_FPS, 15)
             
             camera_captures[camera_key] = cap
+            ring = get_frame_ring_registry().get_or_create(camera_key)
             
             logger.info(f"✅ SaaS Kamera worker başladı: {camera_key}")
             frame_failure_counts[camera_key] = 0
             
             while ad.get(camera_key, False):
-                ret, frame = cap.read()
+                # Frame doğrudan ring slot'una decode edilir
+                ret = ring.read_into(cap)
                 if ret:
-                    frame_buffers[camera_key] = frame
                     frame_failure_counts[camera_key] = 0
                 else:
                     frame_failure_counts[camera_key] = frame_failure_counts.get(camera_key, 0) + 1
@@ -15402,57 +15460,91 @@ smartsafe_requests_total 100
                 cap.release()
             if camera_key in camera_captures:
                 del camera_captures[camera_key]
-            if camera_key in frame_buffers:
-                del frame_buffers[camera_key]
+            if ring is not None:
+                get_frame_ring_registry().remove(camera_key, ring)
             
             logger.info(f"🛑 SaaS Kamera worker durduruldu: {camera_key}")
 
-    def generate_saas_frames(self, camera_key, company_id, camera_id, active_detectors_ref=None):
-        """SaaS Frame Generator - detection state ref ile senkron"""
-        import cv2
-        
+    def generate_saas_frames(self, camera_key, company_id, camera_id, active_detectors_ref=None, tier=None):
+        """SaaS Frame Generator - detection state ref ile senkron.
+        tier: ?tier= parametresi (auto/high/medium/low/minimal) - istemci hızına göre kalite/boyut/FPS"""
         ad = active_detectors_ref if active_detectors_ref is not None else active_detectors
+        ring_registry = get_frame_ring_registry()
+        tracer = get_latency_tracer()
         
-        while ad.get(camera_key, False):
-            try:
-                # Frame al
-                if camera_key in frame_buffers and frame_buffers[camera_key] is not None:
-                    frame = frame_buffers[camera_key].copy()
-                    
-                    # Detection sonuçlarını al
-                    detection_overlay = self.get_detection_overlay(camera_key)
-                    
-                    # Overlay ekle
-                    if detection_overlay:
-                        frame = self.draw_saas_overlay(frame, detection_overlay)
-                    
-                    # Frame'i encode et
-                    ret, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 85])
-                    if ret:
-                        frame_bytes = buffer.tobytes()
-                        yield (b'--frame\r\n'
-                               b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
-                else:
-                    # Placeholder: Kamera worker henüz frame doldurmadıysa okunabilir mesaj
-                    import numpy as np
-                    placeholder = np.zeros((480, 640, 3), dtype=np.uint8)
-                    placeholder[:] = (40, 40, 40)  # Koyu gri arka plan (siyah değil)
-                    cv2.putText(placeholder, 'Kamera hazirlaniyor...', (120, 220),
-                               cv2.FONT_HERSHEY_SIMPLEX, 1.2, (255, 255, 255), 2)
-                    cv2.putText(placeholder, 'PPE Detection aktif', (180, 270),
-                               cv2.FONT_HERSHEY_SIMPLEX, 0.9, (200, 200, 200), 2)
-                    
-                    ret, buffer = cv2.imencode('.jpg', placeholder)
-                    if ret:
-                        frame_bytes = buffer.tobytes()
-                        yield (b'--frame\r\n'
-                               b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
-                
-                time.sleep(0.05)  # ~20 FPS
-                
-            except Exception as e:
-                logger.error(f"❌ Frame generation hatası: {e}")
-                time.sleep(0.1)
+        def next_frame(min_seq):
+            # Read-only ring görünümü; encode bitene kadar slot pinli kalır
+            ring = ring_registry.get(camera_key)
+            view = ring.acquire_latest(min_seq) if ring is not None else None
+            if view is None:
+                return None
+            
+            def render():
+                detection_overlay = self.get_detection_overlay(camera_key)
+                # Overlay ekle - çizim frame'i değiştirdiği için sadece bu durumda kopya al
+                if detection_overlay:
+                    # Çizilen detection sonucunun yaşı (eski overlay teşhisi)
+                    tracer.observe(camera_key, STAGE_OVERLAY, detection_overlay.get('frame_captured_at'))
+                    return self.draw_saas_overlay(view.frame.copy(), detection_overlay)
+                return view.frame
+            
+            return view.seq, render, view.release, view.captured_at
+        
+        def idle_part():
+            # Placeholder: Kamera worker henüz frame doldurmadıysa okunabilir mesaj
+            ring = ring_registry.get(camera_key)
+            if ring is not None and ring.has_frame():
+                return None
+            import cv2
+            import numpy as np
+            placeholder = np.zeros((480, 640, 3), dtype=np.uint8)
+            placeholder[:] = (40, 40, 40)  # Koyu gri arka plan (siyah değil)
+            cv2.putText(placeholder, 'Kamera hazirlaniyor...', (120, 220),
+                       cv2.FONT_HERSHEY_SIMPLEX, 1.2, (255, 255, 255), 2)
+            cv2.putText(placeholder, 'PPE Detection aktif', (180, 270),
+                       cv2.FONT_HERSHEY_SIMPLEX, 0.9, (200, 200, 200), 2)
+            ret, buffer = cv2.imencode('.jpg', placeholder)
+            return buffer.tobytes() if ret else None
+        
+        try:
+            yield from adaptive_mjpeg_stream(
+                camera_key, next_frame, tier=tier, boundary='frame',
+                is_active=lambda: ad.get(camera_key, False), idle_part=idle_part
+            )
+        except Exception as e:
+            logger.error(f"❌ Frame generation hatası: {e}")
+
+    def serve_restream_file(self, camera_key, filename, resolve_sources):
+        """Passthrough HLS dosyasını servis eder; oturum yoksa playlist isteği oturumu açar.
+        
+        resolve_sources: aday RTSP URL listesini döndüren callable (sadece yeni oturumda çağrılır).
+        Kaynak passthrough'a uygun değilse 409 + fallback=mjpeg döner.
+        """
+        restreamer = get_hls_restreamer()
+        if restreamer.get_session(camera_key) is None:
+            if filename != PLAYLIST_NAME:
+                return jsonify({'success': False, 'error': 'Restream session not found'}), 404
+            if not restreamer.available:
+                return jsonify({'success': False, 'fallback': 'mjpeg', 'reason': 'ffmpeg_unavailable'}), 409
+            source_url, reason = select_passthrough_source(resolve_sources() or [])
+            if not source_url:
+                return jsonify({'success': False, 'fallback': 'mjpeg', 'reason': reason}), 409
+            if restreamer.ensure_session(camera_key, source_url) is None or not restreamer.wait_until_ready(camera_key):
+                return jsonify({'success': False, 'fallback': 'mjpeg', 'reason': 'restream_start_failed'}), 503
+        
+        path = restreamer.resolve_file(camera_key, filename)
+        if path is None:
+            return jsonify({'success': False, 'error': 'Segment not found'}), 404
+        try:
+            # conditional: ETag (mtime + boyut) ile yeniden doğrulama aynı dosyada 304 döner
+            response = send_file(path, mimetype=content_type_for(filename), conditional=True)
+        except FileNotFoundError:
+            # Segment halkadan tam bu arada silindi
+            return jsonify({'success': False, 'error': 'Segment not found'}), 404
+        # Her oturum aynı URL'lerle (init.mp4, seg_000000.m4s) baştan başlar: yeniden başlatılan
+        # oturumda tarayıcı eski oturumun init/segmentini cache'ten oynatmasın diye hepsi no-cache
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
 
     def get_detection_overlay(self, camera_key):
         """Detection overlay bilgilerini al"""
@@ -15584,78 +15676,27 @@ smartsafe_requests_total 100
         
         return frame
 
-    def save_detection_to_db(self, detection_data):
-        """Detection sonuçlarını veritabanına kaydet - Production uyumlu"""
-        try:
-            # Local (SQLite) ortamda legacy 'detections' şeması (people_detected, violations_count vb.)
-            # zaten _save_detection_to_reports ile dolduruluyor. Bu fonksiyonun ek person_count
-            # kolonunu kullanması sadece PostgreSQL/Supabase tarafında anlamlı.
-            if not hasattr(self.db, 'db_adapter'):
-                return
-
-            db_type = getattr(self.db.db_adapter, 'db_type', 'sqlite')
-            if db_type == 'sqlite':
-                # SQLite'ta extra özet kayıt atlamayı tercih ediyoruz; mevcut şema bozulmuyor.
-                logger.debug("Skipping save_detection_to_db on sqlite (legacy detections schema is used).")
-                return
-
-            # PostgreSQL / Supabase tarafı: modern özet şema
-            conn = self.db.get_connection()
-            cursor = conn.cursor()
-            
-            placeholder = self.db.get_placeholder() if hasattr(self.db, 'get_placeholder') else '%s'
-            
-            cursor.execute(f'''
-                INSERT INTO detections (
-                    company_id, camera_id, timestamp, person_count, 
-                    ppe_compliant, compliance_rate, processing_time_ms
-                ) VALUES ({placeholder}, {placeholder}, {placeholder}, {placeholder}, {placeholder}, {placeholder}, {placeholder})
-            ''', (
-                detection_data['company_id'],
-                detection_data['camera_id'],
-                detection_data['timestamp'],
-                detection_data.get('person_count', detection_data.get('people_detected', 0)),
-                detection_data.get('ppe_compliant', True),
-                detection_data.get('compliance_rate', 100),
-                detection_data.get('processing_time_ms', 0)
-            ))
-            
-            conn.commit()
-            conn.close()
-            logger.debug(f"✅ Detection kaydedildi (summary): {detection_data.get('camera_id', 'unknown')}")
-            
-        except Exception as e:
-            logger.warning(f"⚠️ Detection DB kayıt hatası (devam ediliyor): {e}")
-            # Production'da DB hatası olsa bile detection devam etsin
-
     def save_violations_to_db(self, company_id, camera_id, violations):
-        """İhlalleri veritabanına kaydet - Production uyumlu"""
+        """İhlalleri veritabanına kaydet - Production uyumlu (write-behind)"""
         try:
-            conn = self.db.get_connection()
-            cursor = conn.cursor()
-            
-            placeholder = self.db.get_placeholder() if hasattr(self.db, 'get_placeholder') else '?'
-            
+            write_queue = get_write_behind_queue()
             for violation in violations:
                 # Production uyumlu şema - confidence kolonu kullan
-                cursor.execute(f'''
-                    INSERT INTO violations (
-                        company_id, camera_id, timestamp, violation_type, 
-                        missing_ppe, confidence, worker_id
-                    ) VALUES ({placeholder}, {placeholder}, {placeholder}, {placeholder}, {placeholder}, {placeholder}, {placeholder})
-                ''', (
-                    company_id,
-                    camera_id,
-                    datetime.now().isoformat(),
-                    'PPE_VIOLATION',
-                    ', '.join(violation.get('missing_ppe', [])),
-                    violation.get('confidence', 0.0),  # confidence
-                    violation.get('person_id', 'unknown')
-                ))
-            
-            conn.commit()
-            conn.close()
-            logger.debug(f"✅ Violation kaydedildi: {camera_id}")
+                write_queue.enqueue(
+                    'violations',
+                    ('company_id', 'camera_id', 'timestamp', 'violation_type',
+                     'missing_ppe', 'confidence', 'worker_id'),
+                    (
+                        company_id,
+                        camera_id,
+                        datetime.now(),
+                        'PPE_VIOLATION',
+                        ', '.join(violation.get('missing_ppe', [])),
+                        violation.get('confidence', 0.0),  # confidence
+                        violation.get('person_id', 'unknown')
+                    )
+                )
+            logger.debug(f"✅ Violation kuyruğa alındı: {camera_id}")
             
         except Exception as e:
             logger.warning(f"⚠️ Violation DB kayıt hatası (devam ediliyor): {e}")
@@ -16023,6 +16064,7 @@ smartsafe_requests_total 100
     </div>
 
     <script src="https://cdn.jsdelivr.net/npm/bootstrap@5.1.3/dist/js/bootstrap.bundle.min.js"></script>
+    <script src="https://cdn.jsdelivr.net/npm/hls.js@1.5.7/dist/hls.min.js"></script>
     <script>
         let currentCameraId = null;
         let detectionActive = false;
@@ -16065,13 +16107,8 @@ smartsafe_requests_total 100
                     document.getElementById('camera-status').textContent = 'Aktif';
                     document.getElementById('system-status').textContent = 'Çalışıyor';
                     
-                    // Video stream'i başlat - PPE overlay'li detection stream kullan
-                    const streamUrl = `/api/company/{{ company_id }}/cameras/${currentCameraId}/detection/stream`;
-                    document.getElementById('camera-display').innerHTML = 
-                        `<img src="${streamUrl}" alt="Kamera Görüntüsü" style="width: 100%; height: 100%; object-fit: cover; border-radius: 10px;">`;
-                    
-                    // İstatistikleri güncellemeye başla
-                    startStatsUpdate();
+                    // Canlı görüntü (passthrough HLS, olmazsa MJPEG), ardından istatistikler
+                    startLiveView().then(startStatsUpdate);
                     
                     showAlert('Tespit başarıyla başlatıldı!', 'success');
                 } else {
@@ -16103,6 +16140,7 @@ smartsafe_requests_total 100
                     document.getElementById('system-status').textContent = 'Hazır';
                     
                     // Video stream'i durdur
+                    stopLiveView();
                     document.getElementById('camera-display').innerHTML = `
                         <div class="text-center">
                             <i class="fas fa-camera fa-3x mb-3"></i>
@@ -16124,18 +16162,171 @@ smartsafe_requests_total 100
             });
         }
 
+        // Canlı görüntü: önce H.264 passthrough (HLS, sunucuda transcode yok) + istemci tarafı overlay,
+        // kaynak uygun değilse (HTTP/MJPEG kamera, H.265, ffmpeg yok) sunucuda çizilen MJPEG
+        let hlsPlayer = null;
+        let restreamActive = false;
+        let overlayBuffer = [];
+
+        function showMjpegStream() {
+            restreamActive = false;
+            const streamUrl = `/api/company/{{ company_id }}/cameras/${currentCameraId}/detection/stream`;
+            document.getElementById('camera-display').innerHTML = 
+                `<img src="${streamUrl}" alt="Kamera Görüntüsü" style="width: 100%; height: 100%; object-fit: cover; border-radius: 10px;">`;
+        }
+
+        function startLiveView() {
+            const playlistUrl = `/api/company/{{ company_id }}/cameras/${currentCameraId}/restream/index.m3u8`;
+            const nativeHls = document.createElement('video').canPlayType('application/vnd.apple.mpegurl');
+            if (!nativeHls && !(window.Hls && Hls.isSupported())) {
+                showMjpegStream();
+                return Promise.resolve();
+            }
+            
+            return fetch(playlistUrl)
+                .then(response => {
+                    if (!response.ok) {
+                        throw new Error('Restream kullanılamıyor');
+                    }
+                    document.getElementById('camera-display').innerHTML = `
+                        <div style="position: relative; width: 100%; height: 100%;">
+                            <video id="live-video" autoplay muted playsinline style="width: 100%; height: 100%; object-fit: contain; border-radius: 10px; background: #000;"></video>
+                            <canvas id="live-overlay" style="position: absolute; left: 0; top: 0; width: 100%; height: 100%; pointer-events: none;"></canvas>
+                        </div>
+                    `;
+                    const video = document.getElementById('live-video');
+                    if (nativeHls) {
+                        video.src = playlistUrl;
+                    } else {
+                        hlsPlayer = new Hls({ liveSyncDurationCount: 2 });
+                        hlsPlayer.loadSource(playlistUrl);
+                        hlsPlayer.attachMedia(video);
+                        hlsPlayer.on(Hls.Events.ERROR, (event, data) => {
+                            if (data.fatal) {
+                                stopLiveView();
+                                if (detectionActive) showMjpegStream();
+                            }
+                        });
+                    }
+                    restreamActive = true;
+                    requestAnimationFrame(drawOverlay);
+                })
+                .catch(() => showMjpegStream());
+        }
+
+        function stopLiveView() {
+            restreamActive = false;
+            overlayBuffer = [];
+            if (hlsPlayer) {
+                hlsPlayer.destroy();
+                hlsPlayer = null;
+            }
+        }
+
+        function videoWallClock(video) {
+            // Playlist'teki EXT-X-PROGRAM-DATE-TIME sayesinde oynatılan karenin duvar saati (saniye)
+            if (hlsPlayer && hlsPlayer.playingDate) {
+                return hlsPlayer.playingDate.getTime() / 1000;
+            }
+            if (video.getStartDate && !isNaN(video.getStartDate().getTime())) {
+                return video.getStartDate().getTime() / 1000 + video.currentTime;
+            }
+            return Date.now() / 1000;
+        }
+
+        function drawOverlay() {
+            if (!restreamActive) return;
+            const video = document.getElementById('live-video');
+            const canvas = document.getElementById('live-overlay');
+            if (video && canvas && video.videoWidth) {
+                const rect = canvas.getBoundingClientRect();
+                canvas.width = rect.width;
+                canvas.height = rect.height;
+                const ctx = canvas.getContext('2d');
+                ctx.clearRect(0, 0, canvas.width, canvas.height);
+                
+                // Oynatılan kareden önceki en yeni overlay (çok eskiyse çizme)
+                const playing = videoWallClock(video);
+                let overlay = null;
+                overlayBuffer.forEach(item => {
+                    if (item.frame_ts <= playing + 0.05) overlay = item;
+                });
+                if (overlay && playing - overlay.frame_ts < 1.5) {
+                    // object-fit: contain - video alanı ve detection frame boyutuna göre ölçekle
+                    const scale = Math.min(rect.width / video.videoWidth, rect.height / video.videoHeight);
+                    const offsetX = (rect.width - video.videoWidth * scale) / 2;
+                    const offsetY = (rect.height - video.videoHeight * scale) / 2;
+                    const sx = scale * video.videoWidth / (overlay.width || video.videoWidth);
+                    const sy = scale * video.videoHeight / (overlay.height || video.videoHeight);
+                    ctx.lineWidth = 2;
+                    ctx.font = '12px sans-serif';
+                    overlay.boxes.forEach(box => {
+                        const [x1, y1, x2, y2] = box.bbox;
+                        const missing = box.missing_ppe && box.missing_ppe.length > 0;
+                        ctx.strokeStyle = ctx.fillStyle = missing ? '#dc3545' : '#28a745';
+                        ctx.strokeRect(offsetX + x1 * sx, offsetY + y1 * sy, (x2 - x1) * sx, (y2 - y1) * sy);
+                        const label = missing ? box.missing_ppe.join(', ') : `${box.class_name} ${(box.confidence * 100).toFixed(0)}%`;
+                        ctx.fillText(label, offsetX + x1 * sx + 2, Math.max(12, offsetY + y1 * sy - 4));
+                    });
+                }
+            }
+            requestAnimationFrame(drawOverlay);
+        }
+
         // İstatistik güncelleme
+        let liveEventSource = null;
+
         function startStatsUpdate() {
-            statsInterval = setInterval(updateStats, 2000); // Her 2 saniyede bir
+            if (!detectionActive) return;
+            updateStats();
+            if (window.EventSource) {
+                // Detection sonuçları push ile gelir; DB özetleri (live-stats) seyrek yenilenir
+                const eventTypes = restreamActive ? 'detection,violation,status,overlay' : 'detection,violation,status';
+                liveEventSource = new EventSource(
+                    `/api/company/{{ company_id }}/events?camera_id=${encodeURIComponent(currentCameraId)}&events=${eventTypes}`);
+                liveEventSource.addEventListener('detection', (event) => {
+                    if (detectionActive) {
+                        renderLatestDetection(JSON.parse(event.data));
+                    }
+                });
+                liveEventSource.addEventListener('overlay', (event) => {
+                    overlayBuffer.push(JSON.parse(event.data));
+                    if (overlayBuffer.length > 50) overlayBuffer.shift();
+                });
+                // Canlı bağlantı limiti dolu (429) ise EventSource kapanır: polling'e dön
+                liveEventSource.onerror = () => {
+                    if (liveEventSource && liveEventSource.readyState === EventSource.CLOSED) {
+                        liveEventSource = null;
+                        clearInterval(statsInterval);
+                        statsInterval = setInterval(updateStats, 2000);
+                    }
+                };
+                statsInterval = setInterval(updateStats, 10000);
+            } else {
+                statsInterval = setInterval(updateStats, 2000); // Her 2 saniyede bir
+            }
         }
 
         function stopStatsUpdate() {
+            if (liveEventSource) {
+                liveEventSource.close();
+                liveEventSource = null;
+            }
             if (statsInterval) {
                 clearInterval(statsInterval);
                 statsInterval = null;
             }
         }
 
+        function renderLatestDetection(latest) {
+            document.getElementById('people-count').textContent = latest.people_detected || 0;
+            document.getElementById('compliant-count').textContent = latest.ppe_compliant || 0;
+            document.getElementById('violation-count').textContent = latest.violations ? latest.violations.length : 0;
+            
+            // İhlalleri göster
+            updateViolations(latest.violations || []);
+        }
+
         function updateStats() {
             if (!detectionActive || !currentCameraId) return;
             
@@ -16162,19 +16353,15 @@ smartsafe_requests_total 100
                 })
                 .catch(error => console.error('Stats update error:', error));
             
+            // SSE açıkken detection sonuçları push ile geliyor
+            if (liveEventSource) return;
+            
             // Detection durumu al
             fetch(`/api/company/{{ company_id }}/detection-status/${currentCameraId}`)
                 .then(response => response.json())
                 .then(data => {
                     if (data.success && data.recent_results.length > 0) {
-                        const latest = data.recent_results[data.recent_results.length - 1];
-                        
-                        document.getElementById('people-count').textContent = latest.people_detected || 0;
-                        document.getElementById('compliant-count').textContent = latest.ppe_compliant || 0;
-                        document.getElementById('violation-count').textContent = latest.ppe_violations ? latest.ppe_violations.length : 0;
-                        
-                        // İhlalleri göster
-                        updateViolations(latest.ppe_violations || []);
+                        renderLatestDetection(data.recent_results[data.recent_results.length - 1]);
                     }
                 })
                 .catch(error => console.error('Detection status error:', error));
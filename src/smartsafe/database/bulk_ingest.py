@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+SmartSafe AI - Bulk Detection Ingestion
+Yüksek hacimli detection / ihlal satırları için toplu yazma yolu
+
+- PostgreSQL: satırlar COPY ... FROM STDIN (text format) ile geçici bir staging
+  tablosuna akıtılır, tek INSERT ... SELECT ile hedef tabloya birleştirilir;
+  çakışma anahtarı olan kayıtlarda (violation_events.event_id) ON CONFLICT DO
+  NOTHING - tekrar gönderilen batch tüm COPY'yi düşürmez
+- Küçük batch'lerde (copy_min_rows altı) staging maliyeti yerine execute_values
+- SQLite: executemany, tek transaction (commit çağırana ait)
+- Kayıt türleri (RECORD_SPECS) add_camera_detection_result / add_dvr_detection_result /
+  add_violation_event ile aynı kolonları ve varsayılanları kullanır
+"""
+
+import io
+import itertools
+import logging
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Any, Dict, List, Sequence, Tuple
+
+from src.smartsafe.database.transactions import is_autocommit
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_COPY_MIN_ROWS = 100
+
+_stage_ids = itertools.count(1)
+
+
+@dataclass(frozen=True)
+class RecordSpec:
+    """Toplu yazılabilen kayıt türü"""
+    table: str
+    # (kolon, varsayılan) - kayıtta olmayan kolon varsayılanla yazılır
+    columns: Tuple[Tuple[str, Any], ...]
+    # Sadece batch'teki tüm kayıtlarda dolu ise yazılan kolonlar (yoksa DB varsayılanı)
+    optional: Tuple[str, ...] = ()
+    conflict_columns: Tuple[str, ...] = ()
+
+
+RECORD_SPECS: Dict[str, RecordSpec] = {
+    'camera_detection': RecordSpec('detections', (
+        ('company_id', None), ('camera_id', None), ('detection_type', 'ppe'), ('confidence', 0.0),
+        ('people_detected', 0), ('ppe_compliant', 0), ('violations_count', 0), ('total_people', 0),
+    ), optional=('timestamp',)),
+    'dvr_detection': RecordSpec('dvr_detection_results', (
+        ('stream_id', None), ('company_id', None), ('total_people', 0), ('compliant_people', 0),
+        ('violations_count', 0), ('missing_ppe', None), ('detection_confidence', 0.0), ('detection_time', 0.0),
+        ('frame_timestamp', None),
+    ), optional=('created_at',)),
+    'violation': RecordSpec('violations', (
+        ('company_id', None), ('camera_id', None), ('worker_id', None), ('missing_ppe', None),
+        ('violation_type', 'ppe'), ('confidence', 0.0),
+    ), optional=('timestamp',)),
+    'violation_event': RecordSpec('violation_events', (
+        ('event_id', None), ('company_id', None), ('camera_id', None), ('person_id', None),
+        ('violation_type', None), ('start_time', None), ('end_time', None), ('duration_seconds', None),
+        ('snapshot_path', None), ('severity', 'warning'), ('status', 'active'),
+    ), conflict_columns=('event_id',)),
+}
+
+
+def build_rows(spec: RecordSpec, records: Sequence[Dict[str, Any]]) -> Tuple[Tuple[str, ...], List[Tuple]]:
+    """Kayıt dict'lerini (kolonlar, satırlar) biçimine çevirir"""
+    optional = tuple(name for name in spec.optional
+                     if records and all(record.get(name) is not None for record in records))
+    columns = tuple(name for name, _ in spec.columns) + optional
+    defaults = dict(spec.columns)
+    rows = [tuple(defaults.get(name) if record.get(name) is None else record[name] for name in columns)
+            for record in records]
+    return columns, rows
+
+
+def _copy_value(value: Any) -> str:
+    """COPY text formatı: NULL -> \\N, ters bölü / sekme / satır sonu kaçışlı"""
+    if value is None:
+        return '\\N'
+    if isinstance(value, datetime):
+        value = value.isoformat(sep=' ')
+    elif isinstance(value, date):
+        value = value.isoformat()
+    elif isinstance(value, bool):
+        value = 't' if value else 'f'
+    return (str(value).replace('\\', '\\\\').replace('\t', '\\t')
+            .replace('\n', '\\n').replace('\r', '\\r'))
+
+
+def encode_copy_rows(rows: Sequence[Tuple]) -> io.StringIO:
+    """Satırları COPY FROM STDIN'e verilecek text formatına çevirir"""
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write('\t'.join(_copy_value(value) for value in row))
+        buffer.write('\n')
+    buffer.seek(0)
+    return buffer
+
+
+def _conflict_clause(conflict_columns: Sequence[str]) -> str:
+    return f" ON CONFLICT ({', '.join(conflict_columns)}) DO NOTHING" if conflict_columns else ''
+
+
+def _copy_merge(conn, table: str, columns: Sequence[str], rows: Sequence[Tuple],
+                conflict_columns: Sequence[str]) -> int:
+    column_list = ', '.join(columns)
+    stage = f'_stage_{table}_{next(_stage_ids)}'
+    cursor = conn.cursor()
+    # Autocommit bağlantıda ON COMMIT DROP her ifadede tetiklenir - staging açık transaction ister
+    manage = is_autocommit(conn)
+    if manage:
+        cursor.execute('BEGIN')
+    try:
+        cursor.execute(f'CREATE TEMP TABLE {stage} ON COMMIT DROP AS '
+                       f'SELECT {column_list} FROM {table} WITH NO DATA')
+        cursor.copy_expert(f'COPY {stage} ({column_list}) FROM STDIN', encode_copy_rows(rows))
+        cursor.execute(f'INSERT INTO {table} ({column_list}) SELECT {column_list} FROM {stage}'
+                       f'{_conflict_clause(conflict_columns)}')
+        inserted = cursor.rowcount
+        cursor.execute(f'DROP TABLE {stage}')
+        if manage:
+            cursor.execute('COMMIT')
+    except Exception:
+        if manage:
+            cursor.execute('ROLLBACK')
+        raise
+    return inserted
+
+
+def bulk_insert(conn, db_type: str, table: str, columns: Sequence[str], rows: Sequence[Tuple],
+                conflict_columns: Sequence[str] = (), copy_min_rows: int = DEFAULT_COPY_MIN_ROWS) -> int:
+    """Tek tablo için toplu INSERT; yazılan satır sayısı (commit çağırana ait)"""
+    if not rows:
+        return 0
+    column_list = ', '.join(columns)
+    if db_type == 'postgresql':
+        cursor = conn.cursor()
+        if len(rows) >= copy_min_rows and hasattr(cursor, 'copy_expert'):
+            return _copy_merge(conn, table, columns, rows, conflict_columns)
+        try:
+            from psycopg2.extras import execute_values
+            execute_values(cursor, f"INSERT INTO {table} ({column_list}) VALUES %s"
+                                   f"{_conflict_clause(conflict_columns)}", rows, page_size=500)
+            return len(rows)
+        except ImportError:
+            pass
+        values = ', '.join(['%s'] * len(columns))
+        cursor.executemany(f"INSERT INTO {table} ({column_list}) VALUES ({values})"
+                           f"{_conflict_clause(conflict_columns)}", rows)
+        return len(rows)
+
+    cursor = conn.cursor()
+    verb = 'INSERT OR IGNORE' if conflict_columns else 'INSERT'
+    cursor.executemany(f"{verb} INTO {table} ({column_list}) VALUES ({', '.join(['?'] * len(columns))})", rows)
+    return cursor.rowcount if cursor.rowcount is not None and cursor.rowcount >= 0 else len(rows)
+
+
+def insert_records(conn, db_type: str, kind: str, records: Sequence[Dict[str, Any]],
+                   copy_min_rows: int = DEFAULT_COPY_MIN_ROWS) -> int:
+    """RECORD_SPECS türündeki kayıtları toplu yazar (commit çağırana ait)"""
+    spec = RECORD_SPECS.get(kind)
+    if spec is None:
+        raise ValueError(f"Unknown bulk record type: {kind}")
+    columns, rows = build_rows(spec, records)
+    return bulk_insert(conn, db_type, spec.table, columns, rows, spec.conflict_columns, copy_min_rows)
@@ -36,15 +36,28 @@ def get_secure_db_connector():
         return None
 import time
 import traceback
-import threading
+from contextlib import contextmanager
+
+from src.smartsafe.database.bulk_ingest import insert_records
+from src.smartsafe.database.migrations import apply_migrations
+from src.smartsafe.database.pagination import (
+    KeysetPage, build_page, clamp_limit, decode_cursor, keyset_query
+)
+from src.smartsafe.database.partitions import PARTITIONED_TABLES, add_column, ensure_indexes
+from src.smartsafe.database.pg_pool import PoolTimeout, create_pg_pool
+from src.smartsafe.database.query_profiler import profiled_cursor
+from src.smartsafe.database.read_routing import (
+    ReadRouter, Replica, note_write, replica_urls_from_env, set_read_router
+)
+from src.smartsafe.database.sqlite_connections import get_sqlite_connection_manager
+from src.smartsafe.database.stream_policies import normalize_stream_policy, DEFAULT_STREAM_POLICY
+from src.smartsafe.database.transactions import commit
+from src.smartsafe.services.report_rollups import SOURCE_DETECTIONS, summarize
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Thread-local storage for SQLite connections
-_thread_local = threading.local()
-
 @dataclass
 class DatabaseConfig:
     """Database configuration"""
@@ -61,19 +74,14 @@ class DatabaseAdapter:
         self.secure_connector = get_secure_db_connector()
         self.connection_pool = None  # Will be initialized for PostgreSQL
         self._init_connection_pool()
+        self.read_router = self._init_read_router()
         logger.info(f"🗄️ Database adapter initialized: {self.db_type}")
     
     def _init_connection_pool(self):
         """Initialize connection pool for PostgreSQL"""
         try:
             if self.db_type == 'postgresql' and self.secure_connector:
-                # Connection pooling for PostgreSQL
-                try:
-                    from psycopg2 import pool
-                except ImportError:
-                    logger.warning("⚠️ psycopg2 pool not available, will use direct connections")
-                    return
-                
+                # Thread-safe, ölçümlü havuz (pg_pool) - boyut / timeout / ömür env ile ayarlanır
                 database_url = os.getenv('DATABASE_URL')
                 if database_url:
                     try:
@@ -86,21 +94,9 @@ class DatabaseAdapter:
                             return
                         
                         # Create connection pool
-                        self.connection_pool = pool.SimpleConnectionPool(
-                            minconn=1,
-                            maxconn=10,  # Max 10 connections
-                            host=parsed.hostname,
-                            port=parsed.port or 5432,
-                            database=parsed.path[1:] if parsed.path else 'postgres',
-                            user=parsed.username,
-                            password=parsed.password,
-                            connect_timeout=45,  # Match secure connector timeout
-                            keepalives=1,
-                            keepalives_idle=10,
-                            keepalives_interval=5,
-                            keepalives_count=10
-                        )
-                        logger.info("✅ PostgreSQL connection pool initialized (min=1, max=10)")
+                        self.connection_pool = create_pg_pool('primary', **self._pg_connect_kwargs(parsed))
+                        logger.info(f"✅ PostgreSQL connection pool initialized "
+                                    f"(min={self.connection_pool.min_size}, max={self.connection_pool.max_size})")
                     except Exception as pool_error:
                         logger.warning(f"⚠️ Connection pool creation failed: {pool_error}, will use direct connections")
                 else:
@@ -108,6 +104,56 @@ class DatabaseAdapter:
         except Exception as e:
             logger.warning(f"⚠️ Connection pool initialization failed: {e}, will use direct connections")
     
+    @staticmethod
+    def _pg_connect_kwargs(parsed) -> Dict[str, Any]:
+        """urlparse sonucundan psycopg2.connect parametreleri (primary ve replica havuzları)"""
+        return {
+            'host': parsed.hostname,
+            'port': parsed.port or 5432,
+            'database': parsed.path[1:] if parsed.path else 'postgres',
+            'user': parsed.username,
+            'password': parsed.password,
+            'connect_timeout': 45,  # Match secure connector timeout
+            'keepalives': 1,
+            'keepalives_idle': 10,
+            'keepalives_interval': 5,
+            'keepalives_count': 10,
+        }
+    
+    def _init_read_router(self) -> Optional[ReadRouter]:
+        """DATABASE_REPLICA_URLS varsa okuma replica'ları + gecikme izleyici"""
+        urls = replica_urls_from_env()
+        if not urls:
+            return None
+        try:
+            from urllib.parse import urlparse
+            replicas = []
+            for index, url in enumerate(urls, start=1):
+                name = f'replica{index}'
+                if self.db_type == 'postgresql':
+                    pool = create_pg_pool(name, **self._pg_connect_kwargs(urlparse(url)))
+                    replicas.append(Replica(name, pool.acquire))
+                else:
+                    path = url[len('sqlite:///'):] if url.startswith('sqlite:///') else url
+                    replicas.append(Replica(name, get_sqlite_connection_manager(path).connection))
+            router = ReadRouter(
+                replicas, self.db_type,
+                primary_write_connection=self.get_write_connection,
+                release_write_connection=self.release_write_connection,
+                max_lag_seconds=float(os.getenv('SMARTSAFE_REPLICA_MAX_LAG', '5')),
+                sticky_seconds=float(os.getenv('SMARTSAFE_REPLICA_STICKY_SECONDS', '5')),
+                check_interval=float(os.getenv('SMARTSAFE_REPLICA_CHECK_INTERVAL', '2')),
+            )
+            router.check_replicas()
+            router.start()
+            set_read_router(router)
+            logger.info(f"✅ Read routing enabled: {len(replicas)} replica(s), "
+                        f"max lag {router.max_lag_seconds}s")
+            return router
+        except Exception as e:
+            logger.warning(f"⚠️ Read replica setup failed: {e}, all reads use the primary")
+            return None
+    
     def _get_database_config(self) -> DatabaseConfig:
         """Get database configuration based on environment"""
         try:
@@ -142,18 +188,9 @@ class DatabaseAdapter:
             if conn is None:
                 return
             
-            if self.db_type == 'sqlite':
-                conn.close()
-            elif self.connection_pool and hasattr(conn, 'close'):
-                # Return connection to pool
-                try:
-                    self.connection_pool.putconn(conn)
-                    logger.debug("✅ Connection returned to pool")
-                except Exception as e:
-                    logger.warning(f"⚠️ Error returning connection to pool: {e}")
-                    conn.close()
-            else:
-                conn.close()
+            # SQLite ve havuz bağlantıları lease'tir: close() kapatmaz, thread'e / havuza iade eder.
+            # Havuz dışı (secure connector) bağlantılar gerçekten kapanır
+            conn.close()
         except Exception as e:
             logger.warning(f"⚠️ Error closing connection: {e}")
     
@@ -161,21 +198,19 @@ class DatabaseAdapter:
         """Get database connection with thread safety and connection pooling"""
         try:
             if self.db_type == 'sqlite':
-                # Create new connection for each request to avoid thread issues
-                connection = sqlite3.connect(
-                    self.config.database_url,
-                    timeout=timeout,
-                    check_same_thread=False  # Allow cross-thread usage
-                )
-                connection.row_factory = sqlite3.Row
-                return connection
+                # Thread başına kalıcı WAL bağlantısı (sqlite_connections)
+                return get_sqlite_connection_manager(self.config.database_url).connection()
             else:  # PostgreSQL
                 # Try to use connection pool first
                 if self.connection_pool:
                     try:
-                        conn = self.connection_pool.getconn()
+                        conn = self.connection_pool.acquire()
                         logger.debug("✅ Got connection from pool")
                         return conn
+                    except PoolTimeout as pool_error:
+                        # Havuz dolu: havuz dışı bağlantı açmak sunucu limitini aşar - çağıran hata alır
+                        logger.error(f"❌ {pool_error}")
+                        return None
                     except Exception as pool_error:
                         logger.warning(f"⚠️ Connection pool error: {pool_error}, using direct connection")
                 
@@ -200,6 +235,63 @@ class DatabaseAdapter:
             logger.error(f"❌ Database connection error: {e}")
             return None
     
+    @contextmanager
+    def connection(self):
+        """with adapter.connection() as conn: - bağlantı her durumda havuza / thread'e iade edilir"""
+        conn = self.get_connection()
+        if conn is None:
+            raise RuntimeError("Database connection unavailable")
+        try:
+            yield conn
+        finally:
+            self.close_connection(conn)
+
+    def get_read_connection(self, timeout: int = 30):
+        """Okuma bağlantısı - uygun (gecikmesi sınır içinde) replica'dan, yoksa primary'den
+
+        Yazma yapmayan dashboard / rapor sorguları için. İstek kapsamında yazma
+        olduysa read-your-writes için primary döner. close_connection ile bırakılır.
+        """
+        if self.read_router is None:
+            return self.get_connection(timeout)
+        try:
+            return self.read_router.connection(lambda: self.get_connection(timeout))
+        except Exception as e:
+            logger.warning(f"⚠️ Read routing failed, using primary: {e}")
+            return self.get_connection(timeout)
+
+    @contextmanager
+    def write_connection(self):
+        """with adapter.write_connection() as conn: - SQLite'ta tek yazıcı, her durumda bırakılır"""
+        conn = self.get_write_connection()
+        if conn is None:
+            raise RuntimeError("Database connection unavailable")
+        try:
+            yield conn
+        finally:
+            self.release_write_connection(conn)
+
+    def get_write_connection(self, timeout: int = 30):
+        """Yazma bağlantısı - SQLite'ta paylaşılan tek yazıcı (release_write_connection ile bırakılmalı)
+
+        Tek yazıcı sadece bu bağlantıdan geçen yazmaları sıralar; get_connection() ile
+        yapılan yazmalar thread bağlantısından gider ve SQLite busy_timeout ile bekler.
+        Yazıcı lease'i çöp toplanınca bırakılmaz: ya write_connection() kullanın ya da
+        alınır alınmaz try/finally içinde release_write_connection çağırın.
+        Yazıcı busy_timeout içinde alınamazsa None döner.
+        """
+        if self.db_type == 'sqlite':
+            try:
+                return get_sqlite_connection_manager(self.config.database_url).acquire_writer()
+            except Exception as e:
+                logger.error(f"❌ SQLite writer connection error: {e}")
+                return None
+        return self.get_connection(timeout)
+
+    def release_write_connection(self, conn):
+        """get_write_connection ile alınan bağlantıyı bırakır"""
+        self.close_connection(conn)
+
     def init_database(self):
         """Initialize database tables - Production Safe with Schema Sync"""
         try:
@@ -220,6 +312,7 @@ class DatabaseAdapter:
                 schema_ok = self._check_and_sync_schema(conn)
                 if schema_ok:
                     logger.info("✅ PostgreSQL schema synchronized successfully")
+                    self.run_migrations(conn)
                     return True
                 else:
                     logger.warning("⚠️ Schema sync failed, continuing with table creation")
@@ -450,6 +543,20 @@ class DatabaseAdapter:
                     )
                 ''')
             
+            # Öğrenilmiş RTSP URL kalıbı ve marka (her bağlantıda tüm kalıplar denenmesin)
+            if self.db_type == 'sqlite':
+                for column_ddl in ("rtsp_brand TEXT", "rtsp_url_pattern TEXT", "rtsp_learned_at TIMESTAMP"):
+                    try:
+                        cursor.execute(f"ALTER TABLE dvr_systems ADD COLUMN {column_ddl}")
+                    except Exception:
+                        pass  # Column already exists
+            else:
+                for column_ddl in ("rtsp_brand VARCHAR(50)", "rtsp_url_pattern TEXT", "rtsp_learned_at TIMESTAMP"):
+                    try:
+                        cursor.execute(f"ALTER TABLE dvr_systems ADD COLUMN IF NOT EXISTS {column_ddl}")
+                    except Exception as e:
+                        logger.warning(f"⚠️ DDL skipped: dvr_systems.{column_ddl.split()[0]} -> {e}")
+            
             # Create DVR channels table
             if self.db_type == 'sqlite':
                 cursor.execute('''
@@ -465,6 +572,7 @@ class DatabaseAdapter:
                         fps INTEGER DEFAULT 25,
                         rtsp_path TEXT DEFAULT '',
                         http_path TEXT DEFAULT '',
+                        stream_policy TEXT DEFAULT 'dual',
                         last_test_time TIMESTAMP,
                         created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                         updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
@@ -486,6 +594,7 @@ class DatabaseAdapter:
                         fps INTEGER DEFAULT 25,
                         rtsp_path VARCHAR(255) DEFAULT '',
                         http_path VARCHAR(255) DEFAULT '',
+                        stream_policy VARCHAR(10) DEFAULT 'dual',
                         last_test_time TIMESTAMP,
                         created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                         updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
@@ -494,6 +603,18 @@ class DatabaseAdapter:
                     )
                 ''')
             
+            # Dual-stream politikası (detection substream'de, snapshot main stream'de)
+            if self.db_type == 'sqlite':
+                try:
+                    cursor.execute("ALTER TABLE dvr_channels ADD COLUMN stream_policy TEXT DEFAULT 'dual'")
+                except Exception:
+                    pass  # Column already exists
+            else:
+                try:
+                    cursor.execute("ALTER TABLE dvr_channels ADD COLUMN IF NOT EXISTS stream_policy VARCHAR(10) DEFAULT 'dual'")
+                except Exception as e:
+                    logger.warning(f"⚠️ DDL skipped: dvr_channels.stream_policy -> {e}")
+            
             # Create DVR streams table for active streams
             if self.db_type == 'sqlite':
                 cursor.execute('''
@@ -749,9 +870,9 @@ class DatabaseAdapter:
                         FOREIGN KEY (company_id) REFERENCES companies (company_id)
                     )
                 ''')
-                # Detections tablosuna total_people kolonu ekle
+                # Detections tablosuna total_people kolonu ekle (bölümlenmişse her shard'a)
                 try:
-                    cursor.execute('ALTER TABLE detections ADD COLUMN total_people INTEGER DEFAULT 0')
+                    add_column(conn, self.db_type, 'detections', 'total_people', 'INTEGER DEFAULT 0')
                 except Exception:
                     pass
             else:  # PostgreSQL - Production Ready
@@ -811,9 +932,9 @@ class DatabaseAdapter:
                         FOREIGN KEY (company_id) REFERENCES companies (company_id)
                     )
                 ''')
-                # Detections tablosuna total_people kolonu ekle
+                # Detections tablosuna total_people kolonu ekle (bölümlenmişse her shard'a)
                 try:
-                    cursor.execute('ALTER TABLE detections ADD COLUMN total_people INTEGER DEFAULT 0')
+                    add_column(conn, self.db_type, 'detections', 'total_people', 'INTEGER DEFAULT 0')
                 except Exception:
                     pass
             
@@ -1122,6 +1243,9 @@ class DatabaseAdapter:
             if not (self.db_type == 'postgresql' and getattr(conn, 'autocommit', False)):
                 conn.commit()
                 logger.info("✅ Database tables created successfully")
+            
+            # Versiyonlu şema değişiklikleri (index'ler vb.) - sadece bekleyenler uygulanır
+            self.run_migrations(conn)
             return True
             
         except Exception as e:
@@ -1141,26 +1265,59 @@ class DatabaseAdapter:
             except Exception:
                 pass
     
+    def run_migrations(self, conn=None) -> List[int]:
+        """Bekleyen versiyonlu migration'ları uygula (src/smartsafe/database/migrations.py)"""
+        own_connection = conn is None
+        try:
+            if own_connection:
+                conn = self.get_connection()
+                if conn is None:
+                    return []
+            applied = apply_migrations(conn, self.db_type)
+            # Bölümlenebilir tabloların index'leri (bölümleme kapalı olsa da)
+            for spec in PARTITIONED_TABLES:
+                ensure_indexes(conn, self.db_type, spec)
+            return applied
+        except Exception as e:
+            logger.error(f"❌ Migration error: {e}")
+            return []
+        finally:
+            if own_connection:
+                self.close_connection(conn)
+    
     def execute_query(self, query: str, params: tuple = None, fetch_all: bool = True) -> Any:
         """Execute database query with improved error handling and retry logic"""
         max_retries = 3
         retry_delay = 0.1  # 100ms
         
+        statement = query.strip().upper()
+        is_write = statement.startswith(('INSERT', 'UPDATE', 'DELETE'))
+        # Saf SELECT'ler replica'ya gidebilir; DDL / kilitli okumalar primary'de kalır
+        is_read = statement.startswith('SELECT') and 'FOR UPDATE' not in statement
+        if is_write:
+            note_write()
         for attempt in range(max_retries):
             conn = None
             try:
-                conn = self.get_connection()
+                # SQLite yazmaları tek yazıcı bağlantısından geçer
+                if is_write:
+                    conn = self.get_write_connection()
+                elif is_read:
+                    conn = self.get_read_connection()
+                else:
+                    conn = self.get_connection()
                 if conn is None:
                     logger.error("❌ Database connection failed")
                     return None
                 
-                cursor = conn.cursor()
+                # Profilleme: parmak izi başına süre / satır, yavaş sorgu günlüğü, N+1
+                cursor = profiled_cursor(conn, self.db_type)
             
                 # Execute query
                 cursor.execute(query, params or ())
                     
                 # Handle different query types
-                if query.strip().upper().startswith(('INSERT', 'UPDATE', 'DELETE')):
+                if is_write:
                     result = cursor.rowcount
                     conn.commit()
                     logger.info(f"✅ Query executed successfully: {result} rows affected")
@@ -1220,12 +1377,9 @@ class DatabaseAdapter:
                 logger.error(f"❌ Query traceback: {traceback.format_exc()}")
                 return None
             finally:
-                # Always close SQLite connections
-                if conn and self.db_type == 'sqlite':
-                    try:
-                        conn.close()
-                    except Exception as e:
-                        logger.warning(f"⚠️ Error closing SQLite connection: {e}")
+                # Lease'i bırak (SQLite / havuz bağlantısı kapanmaz, yazıcı kilidi açılır, havuza döner)
+                if conn:
+                    self.close_connection(conn)
 
         logger.error(f"❌ Database query failed after {max_retries} attempts")
         return None
@@ -1429,10 +1583,13 @@ class DatabaseAdapter:
                 UPDATE dvr_systems 
                 SET name = ?, ip_address = ?, port = ?, username = ?, password = ?,
                     dvr_type = ?, protocol = ?, api_path = ?, rtsp_port = ?, 
-                    max_channels = ?, status = ?, updated_at = CURRENT_TIMESTAMP
+                    max_channels = ?, status = ?, updated_at = CURRENT_TIMESTAMP,
+                    rtsp_url_pattern = CASE WHEN ip_address = ? AND rtsp_port = ?
+                                            THEN rtsp_url_pattern ELSE NULL END
                 WHERE company_id = ? AND dvr_id = ?
             '''
             
+            # Adres/port değişirse öğrenilmiş RTSP kalıbı geçersizdir (bir sonraki bağlantıda yeniden öğrenilir)
             params = (
                 dvr_data.get('name'),
                 dvr_data.get('ip_address'),
@@ -1445,6 +1602,8 @@ class DatabaseAdapter:
                 dvr_data.get('rtsp_port', 554),
                 dvr_data.get('max_channels', 16),
                 dvr_data.get('status', 'active'),
+                dvr_data.get('ip_address'),
+                dvr_data.get('rtsp_port', 554),
                 company_id,
                 dvr_id
             )
@@ -1456,6 +1615,25 @@ class DatabaseAdapter:
             logger.error(f"❌ Update DVR system error: {e}")
             return False
     
+    def update_dvr_rtsp_learning(self, company_id: str, dvr_id: str, brand: str, pattern: str) -> bool:
+        """Save the RTSP URL pattern and brand that last worked for a DVR"""
+        try:
+            query = '''
+                UPDATE dvr_systems 
+                SET rtsp_brand = ?, rtsp_url_pattern = ?, rtsp_learned_at = CURRENT_TIMESTAMP
+                WHERE company_id = ? AND dvr_id = ?
+            '''
+            
+            result = self.execute_query(query, (brand, pattern, company_id, dvr_id), fetch_all=False)
+            if result:
+                logger.info(f"✅ RTSP pattern learned for DVR {dvr_id}: {brand} -> {pattern}")
+                return True
+            return False
+            
+        except Exception as e:
+            logger.error(f"❌ Update DVR RTSP learning error: {e}")
+            return False
+    
     def delete_dvr_system(self, company_id: str, dvr_id: str) -> bool:
         """Delete DVR system and all related data"""
         try:
@@ -1498,15 +1676,17 @@ class DatabaseAdapter:
                 query = '''
                     INSERT OR REPLACE INTO dvr_channels (
                         channel_id, dvr_id, company_id, name, channel_number,
-                        status, resolution_width, resolution_height, fps, rtsp_path, http_path
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                        status, resolution_width, resolution_height, fps, rtsp_path, http_path,
+                        stream_policy
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
                 '''
             else:  # PostgreSQL
                 query = '''
                     INSERT INTO dvr_channels (
                         channel_id, dvr_id, company_id, name, channel_number,
-                        status, resolution_width, resolution_height, fps, rtsp_path, http_path
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                        status, resolution_width, resolution_height, fps, rtsp_path, http_path,
+                        stream_policy
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
                     ON CONFLICT (channel_id) DO UPDATE SET
                         name = EXCLUDED.name,
                         status = EXCLUDED.status,
@@ -1515,6 +1695,7 @@ class DatabaseAdapter:
                         fps = EXCLUDED.fps,
                         rtsp_path = EXCLUDED.rtsp_path,
                         http_path = EXCLUDED.http_path,
+                        stream_policy = EXCLUDED.stream_policy,
                         updated_at = CURRENT_TIMESTAMP
                 '''
             
@@ -1529,7 +1710,8 @@ class DatabaseAdapter:
                 channel_data.get('resolution_height', 1080),
                 channel_data.get('fps', 25),
                 channel_data.get('rtsp_path', ''),
-                channel_data.get('http_path', '')
+                channel_data.get('http_path', ''),
+                normalize_stream_policy(channel_data.get('stream_policy'))
             )
             
             logger.info(f"🔧 Channel SQL Query: {query}")
@@ -1586,6 +1768,50 @@ class DatabaseAdapter:
             logger.error(f"❌ Update DVR channel status error: {e}")
             return False
     
+    def get_dvr_channel_stream_policy(self, company_id: str, dvr_id: str, channel_number: int) -> str:
+        """Get dual-stream policy for a DVR channel (dual/main/sub)"""
+        try:
+            query = '''
+                SELECT stream_policy FROM dvr_channels 
+                WHERE company_id = ? AND dvr_id = ? AND channel_number = ?
+            '''
+            
+            result = self.execute_query(query, (company_id, dvr_id, channel_number), fetch_all=False)
+            if result:
+                return normalize_stream_policy(result.get('stream_policy'))
+            return DEFAULT_STREAM_POLICY
+            
+        except Exception as e:
+            logger.error(f"❌ Get DVR channel stream policy error: {e}")
+            return DEFAULT_STREAM_POLICY
+    
+    def update_dvr_channel_stream_policy(self, company_id: str, dvr_id: str, channel_number: int, policy: str) -> bool:
+        """Update dual-stream policy for a DVR channel, creating the channel row if missing"""
+        try:
+            policy = normalize_stream_policy(policy)
+            query = '''
+                UPDATE dvr_channels 
+                SET stream_policy = ?, updated_at = CURRENT_TIMESTAMP
+                WHERE company_id = ? AND dvr_id = ? AND channel_number = ?
+            '''
+            
+            result = self.execute_query(query, (policy, company_id, dvr_id, channel_number), fetch_all=False)
+            if result:
+                logger.info(f"✅ DVR channel stream policy updated: {dvr_id} ch{channel_number} -> {policy}")
+                return True
+            
+            # Kanal henüz keşfedilmemiş - varsayılan değerlerle oluştur
+            return self.add_dvr_channel(company_id, dvr_id, {
+                'channel_id': f"{dvr_id}_ch{channel_number:02d}",
+                'name': f"Kamera {channel_number}",
+                'channel_number': channel_number,
+                'stream_policy': policy
+            })
+            
+        except Exception as e:
+            logger.error(f"❌ Update DVR channel stream policy error: {e}")
+            return False
+    
     # DVR Stream Methods
     def add_dvr_stream(self, company_id: str, dvr_id: str, channel_id: str, stream_url: str) -> bool:
         """Add active DVR stream"""
@@ -1677,28 +1903,35 @@ class DatabaseAdapter:
             logger.error(f"❌ Add DVR detection result error: {e}")
             return False
     
-    def get_dvr_detection_results(self, stream_id: str, limit: int = 50) -> List[Dict[str, Any]]:
+    def get_dvr_detection_results(self, stream_id: str, limit: int = 50,
+                                  cursor: Optional[str] = None) -> List[Dict[str, Any]]:
         """Get DVR detection results for a stream"""
+        return self.get_dvr_detection_page(stream_id, limit, cursor).items
+    
+    def get_dvr_detection_page(self, stream_ids, limit: int = 50, cursor: Optional[str] = None) -> KeysetPage:
+        """DVR detection sonuçları - (created_at, id) keyset sayfası, bir veya birden çok stream
+
+        Tüm stream'ler tek sorguda (stream_id IN (...)) okunur - session başına sorgu yok.
+        Geçersiz imleçte InvalidCursor yükselir.
+        """
+        stream_ids = [stream_ids] if isinstance(stream_ids, str) else list(dict.fromkeys(stream_ids))
+        key = decode_cursor('dvr_detections', cursor) if cursor else None
+        limit = clamp_limit(limit, 50)
+        if not stream_ids:
+            return KeysetPage()
         try:
-            query = """
-                SELECT * FROM dvr_detection_results 
-                WHERE stream_id = %s
-                ORDER BY created_at DESC
-                LIMIT %s
-            """
-            
-            if self.db_type == 'sqlite':
-                query = query.replace('%s', '?')
-            
-            result = self.execute_query(query, (stream_id, limit))
-            
-            if result and isinstance(result, list):
-                return result
-            return []
+            placeholder = '%s' if self.db_type == 'postgresql' else '?'
+            query, params = keyset_query('SELECT * FROM dvr_detection_results',
+                                         [f"stream_id IN ({', '.join([placeholder] * len(stream_ids))})"],
+                                         stream_ids, 'created_at', 'id', limit, key, placeholder)
+            result = self.execute_query(query, params)
+            if not result or not isinstance(result, list):
+                return KeysetPage()
+            return build_page('dvr_detections', result, limit, 'created_at', 'id')
             
         except Exception as e:
             logger.error(f"❌ Get DVR detection results error: {e}")
-            return []
+            return KeysetPage()
     
     def add_dvr_detection_session(self, session_data: Dict[str, Any]) -> bool:
         """Add DVR detection session to database"""
@@ -1804,15 +2037,15 @@ class DatabaseAdapter:
                 query = """
                     INSERT INTO detections (
                         company_id, camera_id, detection_type, confidence,
-                        people_detected, ppe_compliant, violations_count, total_people
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                        people_detected, ppe_compliant, violations_count, total_people, timestamp
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
                 """
             else:  # PostgreSQL
                 query = """
                     INSERT INTO detections (
                         company_id, camera_id, detection_type, confidence,
-                        people_detected, ppe_compliant, violations_count, total_people
-                    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+                        people_detected, ppe_compliant, violations_count, total_people, timestamp
+                    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
                 """
             
             params = (
@@ -1823,7 +2056,8 @@ class DatabaseAdapter:
                 detection_data.get('people_detected', 0),
                 detection_data.get('ppe_compliant', 0),
                 detection_data.get('violations_count', 0),
-                detection_data.get('total_people', 0)
+                detection_data.get('total_people', 0),
+                detection_data.get('timestamp') or datetime.now()
             )
             
             self.execute_query(query, params, fetch_all=False)
@@ -1834,25 +2068,51 @@ class DatabaseAdapter:
             logger.error(f"❌ Add camera detection result error: {e}")
             return False
     
-    def get_camera_detection_results(self, camera_id: str, company_id: str, limit: int = 100) -> List[Dict[str, Any]]:
+    def bulk_insert_records(self, kind: str, records: List[Dict[str, Any]]) -> int:
+        """Detection / ihlal kayıtlarını toplu yazar; yazılan satır sayısı (hatada 0)
+
+        kind: 'camera_detection', 'dvr_detection', 'violation', 'violation_event'
+        PostgreSQL'de COPY + staging tablosu, SQLite'ta tek transaction'da executemany.
+        """
+        if not records:
+            return 0
+        try:
+            with self.write_connection() as conn:
+                try:
+                    inserted = insert_records(conn, self.db_type, kind, records,
+                                              copy_min_rows=int(os.getenv('SMARTSAFE_COPY_MIN_ROWS', '100')))
+                    commit(conn)
+                except Exception:
+                    try:
+                        conn.rollback()
+                    except Exception:
+                        pass
+                    raise
+            logger.debug(f"✅ Bulk insert {kind}: {inserted}/{len(records)} rows")
+            return inserted
+        except Exception as e:
+            logger.error(f"❌ Bulk insert {kind} error ({len(records)} rows): {e}")
+            return 0
+    
+    def get_camera_detection_results(self, camera_id: str, company_id: str, limit: int = 100,
+                                     cursor: Optional[str] = None) -> List[Dict[str, Any]]:
         """Get IP camera detection results"""
+        return self.get_camera_detection_page(camera_id, company_id, limit, cursor).items
+    
+    def get_camera_detection_page(self, camera_id: str, company_id: str, limit: int = 100,
+                                  cursor: Optional[str] = None) -> KeysetPage:
+        """Kamera detection geçmişi - (timestamp, detection_id) keyset sayfası
+
+        Geçersiz imleçte InvalidCursor yükselir.
+        """
+        key = decode_cursor('camera_detections', cursor) if cursor else None
+        limit = clamp_limit(limit, 100)
         try:
-            if self.db_type == 'sqlite':
-                query = """
-                    SELECT * FROM detections
-                    WHERE camera_id = ? AND company_id = ?
-                    ORDER BY timestamp DESC
-                    LIMIT ?
-                """
-            else:  # PostgreSQL
-                query = """
-                    SELECT * FROM detections
-                    WHERE camera_id = %s AND company_id = %s
-                    ORDER BY timestamp DESC
-                    LIMIT %s
-                """
-            
-            params = (camera_id, company_id, limit)
+            placeholder = '%s' if self.db_type == 'postgresql' else '?'
+            query, params = keyset_query('SELECT * FROM detections',
+                                         [f'camera_id = {placeholder}', f'company_id = {placeholder}'],
+                                         [camera_id, company_id], 'timestamp', 'detection_id',
+                                         limit, key, placeholder)
             result = self.execute_query(query, params, fetch_all=True)
             
             if result and isinstance(result, list) and len(result) > 0:
@@ -1862,7 +2122,7 @@ class DatabaseAdapter:
                     if isinstance(row, dict):
                         # Zaten dict formatında
                         detection = {
-                            'id': row.get('id'),
+                            'id': row.get('detection_id', row.get('id')),
                             'camera_id': row.get('camera_id', camera_id),
                             'company_id': row.get('company_id', company_id),
                             'detection_type': row.get('detection_type', 'ppe'),
@@ -1890,14 +2150,14 @@ class DatabaseAdapter:
                             'compliant_people': row[7] if len(row) > 7 else 0
                         }
                     detections.append(detection)
-                return detections
-            return []
+                return build_page('camera_detections', detections, limit, 'timestamp', 'id')
+            return KeysetPage()
             
         except Exception as e:
             logger.error(f"❌ Get camera detection results error: {e}")
             import traceback
             logger.error(traceback.format_exc())
-            return []
+            return KeysetPage()
     
     def get_latest_camera_detection(self, camera_id: str, company_id: str) -> Optional[Dict[str, Any]]:
         """Get latest detection result for a camera"""
@@ -1988,76 +2248,38 @@ class DatabaseAdapter:
             return None
     
     def get_company_detection_stats(self, company_id: str, hours: int = 24) -> Dict[str, Any]:
-        """Get detection statistics for a company"""
+        """Get detection statistics for a company (kapanmış saatler rollup tablolarından)"""
+        conn = None
         try:
-            if self.db_type == 'sqlite':
-                query = """
-                    SELECT 
-                        COUNT(*) as total_detections,
-                        SUM(people_detected) as total_people,
-                        SUM(ppe_compliant) as total_compliant,
-                        SUM(violations_count) as total_violations,
-                        AVG(confidence) as avg_confidence
-                    FROM detections
-                    WHERE company_id = ?
-                    AND timestamp >= datetime('now', '-' || ? || ' hours')
-                """
-            else:  # PostgreSQL
-                query = """
-                    SELECT 
-                        COUNT(*) as total_detections,
-                        SUM(people_detected) as total_people,
-                        SUM(ppe_compliant) as total_compliant,
-                        SUM(violations_count) as total_violations,
-                        AVG(confidence) as avg_confidence
-                    FROM detections
-                    WHERE company_id = %s
-                    AND timestamp >= NOW() - INTERVAL '%s hours'
-                """
-            
-            params = (company_id, hours)
-            result = self.execute_query(query, params, fetch_all=True)
-            
-            if result and isinstance(result, list) and len(result) > 0:
-                row = result[0]
-                # Convert row to dict - execute_query zaten dict döndürüyor
-                if isinstance(row, dict):
-                    stats = {
-                        'total_detections': row.get('total_detections', 0) or 0,
-                        'total_people': row.get('total_people', 0) or 0,
-                        'total_compliant': row.get('total_compliant', 0) or 0,
-                        'total_violations': row.get('total_violations', 0) or 0,
-                        'avg_confidence': float(row.get('avg_confidence', 0.0)) or 0.0
-                    }
-                else:
-                    # Tuple/list formatında (fallback)
-                    stats = {
-                        'total_detections': row[0] if len(row) > 0 else 0,
-                        'total_people': row[1] if len(row) > 1 else 0,
-                        'total_compliant': row[2] if len(row) > 2 else 0,
-                        'total_violations': row[3] if len(row) > 3 else 0,
-                        'avg_confidence': float(row[4]) if len(row) > 4 else 0.0
-                    }
+            conn = self.get_connection()
+            if conn is None:
+                return {}
+            since = datetime.now() - timedelta(hours=hours)
+            row = summarize(conn, self.db_type, company_id, SOURCE_DETECTIONS, since=since).get(())
+            if not row:
                 return {
-                    'total_detections': stats.get('total_detections', 0) or 0,
-                    'total_people': stats.get('total_people', 0) or 0,
-                    'total_compliant': stats.get('total_compliant', 0) or 0,
-                    'total_violations': stats.get('total_violations', 0) or 0,
-                    'avg_confidence': float(stats.get('avg_confidence', 0) or 0),
-                    'compliance_rate': (stats.get('total_compliant', 0) or 0) / max(stats.get('total_people', 1) or 1, 1) * 100
+                    'total_detections': 0,
+                    'total_people': 0,
+                    'total_compliant': 0,
+                    'total_violations': 0,
+                    'avg_confidence': 0.0,
+                    'compliance_rate': 0.0
                 }
             return {
-                'total_detections': 0,
-                'total_people': 0,
-                'total_compliant': 0,
-                'total_violations': 0,
-                'avg_confidence': 0.0,
-                'compliance_rate': 0.0
+                'total_detections': row['detections'],
+                'total_people': row['people'],
+                'total_compliant': row['compliant'],
+                'total_violations': row['violations'],
+                'avg_confidence': row['confidence_sum'] / row['detections'] if row['detections'] else 0.0,
+                'compliance_rate': row['compliant'] / max(row['people'], 1) * 100
             }
             
         except Exception as e:
             logger.error(f"❌ Get company detection stats error: {e}")
             return {}
+        finally:
+            if conn is not None:
+                self.close_connection(conn)
 
     # ========================================
     # VIOLATION EVENTS METHODS
@@ -2222,31 +2444,32 @@ class DatabaseAdapter:
             logger.error(traceback.format_exc())
             return []
     
-    def get_violation_history(self, camera_id: str, hours: int = 24, limit: int = 100) -> List[Dict]:
+    def get_violation_history(self, camera_id: str, hours: int = 24, limit: int = 100,
+                              cursor: Optional[str] = None) -> List[Dict]:
         """İhlal geçmişini getir"""
+        return self.get_violation_history_page(camera_id, hours, limit, cursor).items
+    
+    def get_violation_history_page(self, camera_id: str, hours: int = 24, limit: int = 100,
+                                   cursor: Optional[str] = None) -> KeysetPage:
+        """İhlal geçmişi - (start_time, event_id) keyset sayfası
+
+        Geçersiz imleçte InvalidCursor yükselir.
+        """
+        key = decode_cursor('violation_history', cursor) if cursor else None
+        limit = clamp_limit(limit, 100)
         try:
             import time
             cutoff_time = time.time() - (hours * 3600)
             
-            if self.db_type == 'sqlite':
-                query = '''
-                    SELECT * FROM violation_events 
-                    WHERE camera_id = ? AND start_time >= ?
-                    ORDER BY start_time DESC
-                    LIMIT ?
-                '''
-            else:  # PostgreSQL
-                query = '''
-                    SELECT * FROM violation_events 
-                    WHERE camera_id = %s AND start_time >= %s
-                    ORDER BY start_time DESC
-                    LIMIT %s
-                '''
-            
-            results = self.execute_query(query, (camera_id, cutoff_time, limit), fetch_all=True)
+            placeholder = '%s' if self.db_type == 'postgresql' else '?'
+            query, params = keyset_query('SELECT * FROM violation_events',
+                                         [f'camera_id = {placeholder}', f'start_time >= {placeholder}'],
+                                         [camera_id, cutoff_time], 'start_time', 'event_id',
+                                         limit, key, placeholder)
+            results = self.execute_query(query, params, fetch_all=True)
             
             if not results or not isinstance(results, list):
-                return []
+                return KeysetPage()
             
             violations = []
             for row in results:
@@ -2282,13 +2505,13 @@ class DatabaseAdapter:
                     }
                 violations.append(violation)
             
-            return violations
+            return build_page('violation_history', violations, limit, 'start_time', 'event_id')
             
         except Exception as e:
             logger.error(f"❌ Get violation history error: {e}")
             import traceback
             logger.error(traceback.format_exc())
-            return []
+            return KeysetPage()
     
     # ========================================
     # PERSON VIOLATIONS METHODS
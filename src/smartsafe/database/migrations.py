@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+SmartSafe AI - Versioned Schema Migrations
+SQLite ve PostgreSQL için sıralı, tek seferlik şema değişiklikleri
+
+- Uygulanan sürümler schema_migrations tablosunda tutulur; her migration bir
+  kez ve sürüm sırasıyla çalışır (init_database her açılışta güvenle çağırabilir)
+- Her migration kendi transaction'ında uygulanır; hata olursa sürüm kaydedilmez
+  ve bir sonraki açılışta tekrar denenir
+- concurrent migration'lar PostgreSQL'de index'leri CREATE INDEX CONCURRENTLY ile
+  kurar (tablo yazmaya kilitlenmez): ifadeler transaction dışında (autocommit)
+  çalışır, sürüm ancak hepsi bittikten sonra kaydedilir. Yarıda kalan index
+  (INVALID) düşürülür ki sonraki denemede IF NOT EXISTS onu atlamasın
+- down ifadeleri benchmark / geri alma içindir (rollback_to)
+"""
+
+import re
+import logging
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Tuple
+
+from src.smartsafe.database.transactions import autocommit, commit
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_MIGRATIONS_TABLE = 'schema_migrations'
+
+
+@dataclass(frozen=True)
+class Migration:
+    """Tek bir şema sürümü"""
+    version: int
+    name: str
+    sqlite: Tuple[str, ...]
+    postgresql: Tuple[str, ...]
+    down: Tuple[str, ...] = ()
+    concurrent: bool = False  # PostgreSQL ifadeleri transaction dışında çalışır (CONCURRENTLY)
+
+    def statements(self, db_type: str) -> Tuple[str, ...]:
+        return self.postgresql if db_type == 'postgresql' else self.sqlite
+
+
+def _create_index(name: str, table: str, columns: str, concurrently: bool = False) -> str:
+    mode = ' CONCURRENTLY' if concurrently else ''
+    return f"CREATE INDEX{mode} IF NOT EXISTS {name} ON {table} ({columns})"
+
+
+_CONCURRENT_INDEX_RE = re.compile(r'CREATE INDEX CONCURRENTLY IF NOT EXISTS (?P<name>\w+) ON (?P<table>\w+)')
+
+
+# Rapor, istatistik ve oturum sorgularının sıcak yolları:
+# detections/violations -> company_id / camera_id + zaman aralığı,
+# violation_events -> camera_id + start_time (get_violation_history), company_id + status (aktif ihlaller),
+# sessions -> session_id + expires_at (validate_session)
+def _hot_path_indexes(concurrently: bool = False) -> Tuple[str, ...]:
+    return (
+        _create_index('idx_detections_company_ts', 'detections', 'company_id, timestamp', concurrently),
+        _create_index('idx_detections_camera_ts', 'detections', 'camera_id, timestamp', concurrently),
+        _create_index('idx_violations_company_ts', 'violations', 'company_id, timestamp', concurrently),
+        _create_index('idx_violations_camera_ts', 'violations', 'camera_id, timestamp', concurrently),
+        _create_index('idx_violation_events_camera_start', 'violation_events', 'camera_id, start_time', concurrently),
+        _create_index('idx_violation_events_company_status', 'violation_events', 'company_id, status', concurrently),
+        _create_index('idx_sessions_session_expires', 'sessions', 'session_id, expires_at', concurrently),
+    )
+
+
+# (camera_id, start_time) index'i yeni index'in öneki - yazma maliyeti için kaldırılır
+def _keyset_indexes(concurrently: bool = False) -> Tuple[str, ...]:
+    mode = ' CONCURRENTLY' if concurrently else ''
+    return (
+        _create_index('idx_violation_events_camera_start_id', 'violation_events',
+                      'camera_id, start_time, event_id', concurrently),
+        f'DROP INDEX{mode} IF EXISTS idx_violation_events_camera_start',
+    )
+
+
+def _rollup_tables(db_type: str) -> Tuple[str, ...]:
+    """Rapor rollup tabloları: (şirket, kamera, PPE tipi, saat/gün) başına sayaçlar
+
+    ppe_type = '' satırları detections'tan, diğerleri violations / violation_events'ten gelir
+    (bkz. src/smartsafe/services/report_rollups.py)
+    """
+    text = 'TEXT' if db_type == 'sqlite' else 'VARCHAR(255)'
+    real = 'REAL' if db_type == 'sqlite' else 'DOUBLE PRECISION'
+    hour_type = 'TEXT' if db_type == 'sqlite' else 'TIMESTAMP'
+    day_type = 'TEXT' if db_type == 'sqlite' else 'DATE'
+    statements = []
+    for table, bucket_type in (('detection_rollup_hourly', hour_type), ('detection_rollup_daily', day_type)):
+        statements.append(f'''
+            CREATE TABLE IF NOT EXISTS {table} (
+                company_id {text} NOT NULL,
+                camera_id {text} NOT NULL,
+                ppe_type {text} NOT NULL DEFAULT '',
+                bucket {bucket_type} NOT NULL,
+                detections INTEGER DEFAULT 0,
+                compliant_detections INTEGER DEFAULT 0,
+                people INTEGER DEFAULT 0,
+                compliant INTEGER DEFAULT 0,
+                violations INTEGER DEFAULT 0,
+                confidence_sum {real} DEFAULT 0,
+                violation_count INTEGER DEFAULT 0,
+                duration_seconds INTEGER DEFAULT 0,
+                last_at {hour_type},
+                PRIMARY KEY (company_id, camera_id, ppe_type, bucket)
+            )
+        ''')
+        statements.append(_create_index(f'idx_{table}_company_bucket', table, 'company_id, bucket'))
+    statements.append(f'''
+        CREATE TABLE IF NOT EXISTS rollup_watermarks (
+            name {text} PRIMARY KEY,
+            watermark {text} NOT NULL,
+            updated_at {'DATETIME' if db_type == 'sqlite' else 'TIMESTAMP'} DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    return tuple(statements)
+
+
+MIGRATIONS: Tuple[Migration, ...] = (
+    Migration(
+        version=1,
+        name='hot_path_indexes',
+        sqlite=_hot_path_indexes() + ('ANALYZE',),
+        postgresql=_hot_path_indexes(concurrently=True) + (
+            'ANALYZE detections', 'ANALYZE violations', 'ANALYZE violation_events', 'ANALYZE sessions',
+        ),
+        down=(
+            'DROP INDEX IF EXISTS idx_detections_company_ts',
+            'DROP INDEX IF EXISTS idx_detections_camera_ts',
+            'DROP INDEX IF EXISTS idx_violations_company_ts',
+            'DROP INDEX IF EXISTS idx_violations_camera_ts',
+            'DROP INDEX IF EXISTS idx_violation_events_camera_start',
+            'DROP INDEX IF EXISTS idx_violation_events_company_status',
+            'DROP INDEX IF EXISTS idx_sessions_session_expires',
+        ),
+        concurrent=True,
+    ),
+    Migration(
+        version=2,
+        name='report_rollups',
+        sqlite=_rollup_tables('sqlite'),
+        postgresql=_rollup_tables('postgresql'),
+        down=(
+            'DROP TABLE IF EXISTS detection_rollup_hourly',
+            'DROP TABLE IF EXISTS detection_rollup_daily',
+            'DROP TABLE IF EXISTS rollup_watermarks',
+        ),
+    ),
+    # Keyset sayfalama: get_violation_history (start_time, event_id) sırasıyla okur.
+    # detections / dvr_detection_results index'leri bölümlemeyle birlikte
+    # partitions.ensure_indexes tarafından yönetilir (SQLite'ta tablo view olabilir)
+    Migration(
+        version=3,
+        name='keyset_pagination_indexes',
+        sqlite=_keyset_indexes(),
+        postgresql=_keyset_indexes(concurrently=True),
+        down=(
+            _create_index('idx_violation_events_camera_start', 'violation_events', 'camera_id, start_time'),
+            'DROP INDEX IF EXISTS idx_violation_events_camera_start_id',
+        ),
+        concurrent=True,
+    ),
+)
+
+
+def _placeholder(db_type: str) -> str:
+    return '%s' if db_type == 'postgresql' else '?'
+
+
+def _ensure_version_table(cursor, db_type: str):
+    applied_type = 'TIMESTAMP' if db_type == 'postgresql' else 'DATETIME'
+    cursor.execute(f'''
+        CREATE TABLE IF NOT EXISTS {SCHEMA_MIGRATIONS_TABLE} (
+            version INTEGER PRIMARY KEY,
+            name VARCHAR(255) NOT NULL,
+            applied_at {applied_type} DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+
+def _is_partitioned_parent(cursor, table: str) -> bool:
+    cursor.execute('''SELECT c.relkind FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace
+                      WHERE c.relname = %s AND n.nspname = current_schema()''', (table,))
+    row = cursor.fetchone()
+    return row is not None and (row['relkind'] if hasattr(row, 'keys') else row[0]) == 'p'
+
+
+def _execute_concurrently(conn, statements: Sequence[str]):
+    """PostgreSQL: ifadeleri transaction dışında tek tek çalıştırır (CONCURRENTLY şartı)"""
+    with autocommit(conn):
+        cursor = conn.cursor()
+        for statement in statements:
+            match = _CONCURRENT_INDEX_RE.match(statement.strip())
+            if match and _is_partitioned_parent(cursor, match.group('table')):
+                # Bölümlenmiş parent tabloda CONCURRENTLY desteklenmez
+                statement = statement.replace(' CONCURRENTLY', '', 1)
+            try:
+                cursor.execute(statement)
+            except Exception:
+                if match:
+                    # Yarıda kalan index INVALID kalır; IF NOT EXISTS sonraki denemede onu atlamasın
+                    try:
+                        cursor.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {match.group('name')}")
+                    except Exception:
+                        pass
+                raise
+
+
+def applied_versions(conn, db_type: str) -> List[int]:
+    """Uygulanmış migration sürümleri (artan sırada)"""
+    cursor = conn.cursor()
+    _ensure_version_table(cursor, db_type)
+    commit(conn)
+    cursor.execute(f'SELECT version FROM {SCHEMA_MIGRATIONS_TABLE} ORDER BY version')
+    return [row[0] for row in cursor.fetchall()]
+
+
+def apply_migrations(conn, db_type: str, migrations: Sequence[Migration] = MIGRATIONS,
+                     target: Optional[int] = None) -> List[int]:
+    """Bekleyen migration'ları sırayla uygular; uygulanan sürümleri döndürür"""
+    done = set(applied_versions(conn, db_type))
+    applied = []
+    for migration in sorted(migrations, key=lambda m: m.version):
+        if migration.version in done or (target is not None and migration.version > target):
+            continue
+        cursor = conn.cursor()
+        try:
+            if migration.concurrent and db_type == 'postgresql':
+                _execute_concurrently(conn, migration.statements(db_type))
+            else:
+                for statement in migration.statements(db_type):
+                    cursor.execute(statement)
+            cursor.execute(
+                f'INSERT INTO {SCHEMA_MIGRATIONS_TABLE} (version, name) VALUES '
+                f'({_placeholder(db_type)}, {_placeholder(db_type)})',
+                (migration.version, migration.name)
+            )
+            commit(conn)
+        except Exception as e:
+            logger.error(f"❌ Migration {migration.version} ({migration.name}) failed: {e}")
+            try:
+                conn.rollback()
+            except Exception:
+                pass
+            break
+        applied.append(migration.version)
+        logger.info(f"✅ Migration applied: {migration.version} {migration.name}")
+    return applied
+
+
+def rollback_to(conn, db_type: str, version: int, migrations: Sequence[Migration] = MIGRATIONS) -> List[int]:
+    """version'dan yeni migration'ları (down ifadeleriyle) geri alır"""
+    done = set(applied_versions(conn, db_type))
+    reverted = []
+    for migration in sorted(migrations, key=lambda m: m.version, reverse=True):
+        if migration.version <= version or migration.version not in done:
+            continue
+        cursor = conn.cursor()
+        for statement in migration.down:
+            cursor.execute(statement)
+        cursor.execute(f'DELETE FROM {SCHEMA_MIGRATIONS_TABLE} WHERE version = {_placeholder(db_type)}',
+                       (migration.version,))
+        commit(conn)
+        reverted.append(migration.version)
+        logger.info(f"↩️ Migration reverted: {migration.version} {migration.name}")
+    return reverted
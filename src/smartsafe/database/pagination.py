@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+SmartSafe AI - Keyset Pagination
+Detection / ihlal geçmişi için (zaman, id) anahtarlı sayfalama
+
+- OFFSET / büyüyen LIMIT yerine son görülen (zaman, id) çiftinden devam:
+  WHERE (zaman, id) < (?, ?) ORDER BY zaman DESC, id DESC LIMIT n+1
+  (eşleşen bileşik index ile her sayfa ilk sayfa kadar ucuz)
+- İmleç (cursor) istemciye opak bir token olarak verilir: base64url(JSON);
+  hangi sorguya ait olduğu (scope) token içinde taşınır, başka bir geçmişin
+  token'ı reddedilir. Değerler SQL'e sadece parametre olarak girer
+- n+1 satır okunur; fazladan satır varsa son satırdan next_cursor üretilir
+- Sıralama değeri NULL olan satırlar listelenmez: imlece yazılamaz ve row-value
+  karşılaştırmasıyla hiçbir sayfadan sonra gelmez (PostgreSQL'de DESC sıralamada başa düşer)
+"""
+
+import base64
+import json
+import logging
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+CURSOR_VERSION = 1
+MAX_PAGE_SIZE = 500
+
+
+class InvalidCursor(ValueError):
+    """Çözülemeyen ya da başka bir sorguya ait imleç"""
+
+
+@dataclass
+class KeysetPage:
+    """Tek sayfa sonuç + sonraki sayfanın imleci"""
+    items: List[Dict[str, Any]] = field(default_factory=list)
+    next_cursor: Optional[str] = None
+
+    @property
+    def has_more(self) -> bool:
+        return self.next_cursor is not None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'results': self.items, 'next_cursor': self.next_cursor, 'has_more': self.has_more}
+
+
+def clamp_limit(limit: Optional[int], default: int = 100) -> int:
+    if not limit or limit < 1:
+        return default
+    return min(limit, MAX_PAGE_SIZE)
+
+
+def _plain(value: Any) -> Any:
+    # PostgreSQL datetime döndürür; ISO metin olarak geri verildiğinde aynı değerle karşılaştırılır
+    if isinstance(value, datetime):
+        return value.isoformat(sep=' ')
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+
+def encode_cursor(scope: str, sort_value: Any, row_id: Any) -> str:
+    payload = json.dumps({'v': CURSOR_VERSION, 's': scope, 'k': [_plain(sort_value), _plain(row_id)]},
+                         separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(scope: str, token: str) -> Tuple[Any, Any]:
+    """Token -> (sıralama değeri, id); geçersizse InvalidCursor"""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        payload = json.loads(raw.decode('utf-8'))
+        sort_value, row_id = payload['k']
+    except Exception:
+        raise InvalidCursor("Malformed pagination cursor")
+    if payload.get('v') != CURSOR_VERSION or payload.get('s') != scope:
+        raise InvalidCursor("Pagination cursor does not belong to this listing")
+    for value in (sort_value, row_id):
+        if value is None or not isinstance(value, (str, int, float)) or isinstance(value, bool):
+            raise InvalidCursor("Malformed pagination cursor")
+    return sort_value, row_id
+
+
+def keyset_query(select: str, where: Sequence[str], params: Sequence[Any], sort_column: str, id_column: str,
+                 limit: int, cursor: Optional[Tuple[Any, Any]], placeholder: str = '?') -> Tuple[str, Tuple]:
+    """Yeni -> eski sıralı, imleçten sonraki limit+1 satırı okuyan sorgu"""
+    conditions = list(where) + [f'{sort_column} IS NOT NULL']
+    params = list(params)
+    if cursor is not None:
+        # Row-value karşılaştırması - (zaman, id) index'inde tek aralık taraması
+        conditions.append(f'({sort_column}, {id_column}) < ({placeholder}, {placeholder})')
+        params.extend(cursor)
+    sql = select
+    if conditions:
+        sql += ' WHERE ' + ' AND '.join(conditions)
+    sql += f' ORDER BY {sort_column} DESC, {id_column} DESC LIMIT {placeholder}'
+    params.append(limit + 1)
+    return sql, tuple(params)
+
+
+def build_page(scope: str, rows: Sequence[Dict[str, Any]], limit: int, sort_key: str, id_key: str) -> KeysetPage:
+    """limit+1 satırdan sayfa; fazlası varsa son görünen satırdan imleç (NULL anahtarlı satırlar atlanır)"""
+    rows = [row for row in rows if row[sort_key] is not None and row[id_key] is not None]
+    items = list(rows[:limit])
+    next_cursor = None
+    if len(rows) > limit and items:
+        last = items[-1]
+        next_cursor = encode_cursor(scope, last[sort_key], last[id_key])
+    return KeysetPage(items, next_cursor)
@@ -0,0 +1,712 @@
+#!/usr/bin/env python3
+"""
+SmartSafe AI - Time Partitioned Detection Storage
+detections ve dvr_detection_results için aylık bölümler + bölüm bazlı saklama süresi
+
+- PostgreSQL: native RANGE partitioning (tablo_pYYYYMM + tablo_pdefault);
+  zaman filtresi olan sorgular sadece ilgili ayların bölümlerine dokunur
+- SQLite: aylık shard tabloları (tablo_pYYYYMM + tablo_pdefault) + aynı isimli
+  UNION ALL view; INSERT/UPDATE/DELETE view üzerindeki INSTEAD OF trigger'larla
+  shard'lara yönlendirilir, id'ler partition_sequences ile tüm shard'larda tekil
+- Mevcut tablo ilk bakımda tek transaction'da bölümlenir; sonraki bakımlar
+  ileriye dönük ayları önceden açar (default bölümde kalan satırlar taşınır)
+- Saklama: tüm şirketlerin saklama süresini aşan ay bölümü DROP edilir; sadece
+  bazı şirketler için süresi dolan eski bölümlerde o şirketlerin satırları silinir
+  (sıcak, güncel bölüm kilitlenmez). detections bölümleri rollup watermark'ını
+  geçmeden silinmez - raporlar rollup tablolarından okunmaya devam eder
+- Bakım varsayılan kapalıdır (SMARTSAFE_PARTITIONING=1 ile açılır); saklama
+  süresi silmeleri ayrıca SMARTSAFE_RETENTION=1 ister
+- Şema değişiklikleri add_column / update_rows ile yapılır: SQLite'ta view'a
+  ALTER TABLE uygulanamaz ve view üzerinden UPDATE her satır için tüm shard'ları
+  gezen trigger'dan geçer
+"""
+
+import json
+import os
+import re
+import threading
+import time
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from src.smartsafe.database.transactions import commit
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PARTITION = 'default'
+SEQUENCE_TABLE = 'partition_sequences'
+
+# Abonelik planına göre ham detection verisinin saklama süresi (gün)
+DEFAULT_RETENTION_DAYS = {
+    'trial': 30,
+    'demo': 30,
+    'starter': 90,
+    'professional': 365,
+    'enterprise': 730,
+}
+
+
+@dataclass(frozen=True)
+class PartitionedTable:
+    """Aylık bölümlenen tablo"""
+    name: str
+    time_column: str
+    id_column: str
+    # (index son eki, kolonlar) - her bölümde (SQLite) / parent tabloda (PostgreSQL)
+    indexes: Tuple[Tuple[str, str], ...] = ()
+    # True ise bölümler rapor rollup watermark'ını geçmeden silinmez
+    rolled_up: bool = False
+
+    def partition_name(self, month: Optional[datetime]) -> str:
+        return f"{self.name}_p{month.strftime('%Y%m') if month else DEFAULT_PARTITION}"
+
+
+PARTITIONED_TABLES: Tuple[PartitionedTable, ...] = (
+    # *_id son ekli index'ler geçmiş ekranlarının keyset sayfalaması içindir (bkz. pagination.py)
+    PartitionedTable('detections', 'timestamp', 'detection_id',
+                     indexes=(('company_ts', 'company_id, timestamp'), ('camera_ts', 'camera_id, timestamp'),
+                              ('camera_company_ts_id', 'camera_id, company_id, timestamp, detection_id')),
+                     rolled_up=True),
+    PartitionedTable('dvr_detection_results', 'created_at', 'id',
+                     indexes=(('company_created', 'company_id, created_at'),
+                              ('stream_created', 'stream_id, created_at'),
+                              ('stream_created_id', 'stream_id, created_at, id'))),
+)
+
+
+def _begin(conn, db_type: str):
+    """SQLite'ta DDL örtük transaction açmaz - bölümleme tek transaction'da yapılsın"""
+    if db_type == 'sqlite' and not conn.in_transaction:
+        conn.execute('BEGIN IMMEDIATE')
+
+
+def _col(row, index: int, name: str) -> Any:
+    return row[name] if hasattr(row, 'keys') else row[index]
+
+
+def _month_start(value: datetime) -> datetime:
+    return value.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def _add_months(month: datetime, count: int) -> datetime:
+    index = month.year * 12 + month.month - 1 + count
+    return month.replace(year=index // 12, month=index % 12 + 1)
+
+
+def _bound(month: datetime) -> str:
+    return month.strftime('%Y-%m-%d')
+
+
+def _parse_ts(value: Any) -> Optional[datetime]:
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.replace(tzinfo=None)
+    try:
+        return datetime.fromisoformat(str(value).strip().replace('T', ' '))
+    except ValueError:
+        return None
+
+
+def is_partitioned(conn, db_type: str, table: str) -> Optional[bool]:
+    """True: bölümlenmiş, False: düz tablo, None: tablo yok"""
+    cursor = conn.cursor()
+    if db_type == 'postgresql':
+        cursor.execute('''SELECT c.relkind AS kind FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace
+                          WHERE c.relname = %s AND n.nspname = current_schema()''', (table,))
+        row = cursor.fetchone()
+        return None if row is None else _col(row, 0, 'kind') == 'p'
+    cursor.execute("SELECT type FROM sqlite_master WHERE name = ? AND type IN ('table', 'view')", (table,))
+    row = cursor.fetchone()
+    return None if row is None else _col(row, 0, 'type') == 'view'
+
+
+def list_partitions(conn, db_type: str, spec: PartitionedTable) -> List[Tuple[str, Optional[datetime]]]:
+    """(bölüm adı, ay başlangıcı) - default bölüm None ayıyla başta, aylar artan sırada"""
+    cursor = conn.cursor()
+    if db_type == 'postgresql':
+        cursor.execute('''SELECT c.relname AS name FROM pg_inherits i
+                          JOIN pg_class c ON c.oid = i.inhrelid
+                          JOIN pg_class p ON p.oid = i.inhparent
+                          WHERE p.relname = %s''', (spec.name,))
+    else:
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE ?",
+                       (f'{spec.name}_p%',))
+    pattern = re.compile(rf'^{re.escape(spec.name)}_p(\d{{6}}|{DEFAULT_PARTITION})$')
+    partitions = []
+    for row in cursor.fetchall():
+        match = pattern.match(_col(row, 0, 'name'))
+        if match:
+            suffix = match.group(1)
+            partitions.append((match.group(0), None if suffix == DEFAULT_PARTITION
+                               else datetime.strptime(suffix, '%Y%m')))
+    return sorted(partitions, key=lambda item: (item[1] is not None, item[1] or datetime.min))
+
+
+def _months(first: datetime, last: datetime) -> List[datetime]:
+    months, month = [], _month_start(first)
+    while month <= last:
+        months.append(month)
+        month = _add_months(month, 1)
+    return months
+
+
+def _first_month(cursor, spec: PartitionedTable, source: str, now: datetime, max_months_back: int) -> datetime:
+    cursor.execute(f'SELECT MIN({spec.time_column}) AS first FROM {source}')
+    row = cursor.fetchone()
+    first = _parse_ts(_col(row, 0, 'first')) if row else None
+    floor = _add_months(_month_start(now), -max_months_back)
+    # Çok eski / bozuk zaman damgaları default bölüme düşer
+    return max(_month_start(first), floor) if first else _month_start(now)
+
+
+# =============================================================================
+# SQLITE SHARDS
+# =============================================================================
+
+_CREATE_TABLE = re.compile(r'^\s*CREATE\s+TABLE\s+(?:"[^"]+"|\[[^\]]+\]|`[^`]+`|\S+?)\s*\(', re.IGNORECASE)
+
+
+def _shard_ddl(ddl: str, shard: str) -> str:
+    return _CREATE_TABLE.sub(f'CREATE TABLE IF NOT EXISTS {shard} (', ddl, count=1)
+
+
+def _sqlite_create_shard(cursor, spec: PartitionedTable, ddl: str, shard: str):
+    cursor.execute(_shard_ddl(ddl, shard))
+    for suffix, columns in spec.indexes:
+        cursor.execute(f'CREATE INDEX IF NOT EXISTS idx_{shard}_{suffix} ON {shard} ({columns})')
+
+
+def _sqlite_rebuild_view(cursor, spec: PartitionedTable, shards: List[Tuple[str, Optional[datetime]]]):
+    """UNION ALL view'u ve INSTEAD OF trigger'ları mevcut shard listesinden yeniden kurar"""
+    table, ts, pk = spec.name, spec.time_column, spec.id_column
+    cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = ?", (table,))
+    for row in cursor.fetchall():
+        cursor.execute(f'DROP TRIGGER IF EXISTS {_col(row, 0, "name")}')
+    cursor.execute(f'DROP VIEW IF EXISTS {table}')
+    cursor.execute(f"CREATE VIEW {table} AS {' UNION ALL '.join(f'SELECT * FROM {name}' for name, _ in shards)}")
+
+    cursor.execute(f'PRAGMA table_info({shards[0][0]})')
+    columns = [(_col(row, 1, 'name'), _col(row, 4, 'dflt_value')) for row in cursor.fetchall()]
+    names = ', '.join(name for name, _ in columns)
+    # View'a yapılan INSERT'te kolon varsayılanları uygulanmaz - trigger'da COALESCE ile verilir
+    values = ', '.join(
+        f"COALESCE(NEW.{name}, (SELECT seq FROM {SEQUENCE_TABLE} WHERE name = '{table}'))" if name == pk
+        else f'COALESCE(NEW.{name}, {default})' if default is not None
+        else f'NEW.{name}'
+        for name, default in columns
+    )
+    ts_default = dict(columns).get(ts) or 'CURRENT_TIMESTAMP'
+    ts_expr = f'COALESCE(NEW.{ts}, {ts_default})'
+
+    def insert_trigger(trigger: str, shard: str, condition: str):
+        cursor.execute(f'''
+            CREATE TRIGGER {trigger} INSTEAD OF INSERT ON {table} WHEN {condition}
+            BEGIN
+                UPDATE {SEQUENCE_TABLE} SET seq = MAX(seq + 1, COALESCE(NEW.{pk}, 0)) WHERE name = '{table}';
+                INSERT INTO {shard} ({names}) VALUES ({values});
+            END''')
+
+    monthly = [(name, month) for name, month in shards if month is not None]
+    for name, month in monthly:
+        insert_trigger(f'{name}_insert', name,
+                       f"{ts_expr} >= '{_bound(month)}' AND {ts_expr} < '{_bound(_add_months(month, 1))}'")
+    default = spec.partition_name(None)
+    if monthly:
+        first, last = monthly[0][1], _add_months(monthly[-1][1], 1)
+        insert_trigger(f'{default}_insert', default,
+                       f"NOT ({ts_expr} >= '{_bound(first)}' AND {ts_expr} < '{_bound(last)}')")
+    else:
+        insert_trigger(f'{default}_insert', default, '1')
+
+    assignments = ', '.join(f'{name} = NEW.{name}' for name, _ in columns if name != pk)
+    cursor.execute(f'''
+        CREATE TRIGGER {table}_update INSTEAD OF UPDATE ON {table}
+        BEGIN
+            {' '.join(f'UPDATE {name} SET {assignments} WHERE {pk} = OLD.{pk};' for name, _ in shards)}
+        END''')
+    cursor.execute(f'''
+        CREATE TRIGGER {table}_delete INSTEAD OF DELETE ON {table}
+        BEGIN
+            {' '.join(f'DELETE FROM {name} WHERE {pk} = OLD.{pk};' for name, _ in shards)}
+        END''')
+
+
+def _sqlite_partition(conn, spec: PartitionedTable, now: datetime, months_ahead: int, max_months_back: int):
+    table, ts, pk = spec.name, spec.time_column, spec.id_column
+    legacy = f'{table}_legacy'
+    cursor = conn.cursor()
+    cursor.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (table,))
+    ddl = _col(cursor.fetchone(), 0, 'sql')
+    months = _months(_first_month(cursor, spec, table, now, max_months_back),
+                     _add_months(_month_start(now), months_ahead))
+
+    cursor.execute(f'ALTER TABLE {table} RENAME TO {legacy}')
+    for suffix, _ in spec.indexes:
+        # Eski tablonun aynı isimli index'leri (migration 1) legacy ile birlikte silinir
+        cursor.execute(f'DROP INDEX IF EXISTS idx_{table}_{suffix}')
+    shards = [(spec.partition_name(None), None)] + [(spec.partition_name(month), month) for month in months]
+    for name, month in shards:
+        _sqlite_create_shard(cursor, spec, ddl, name)
+        if month is not None:
+            cursor.execute(f'INSERT INTO {name} SELECT * FROM {legacy} WHERE {ts} >= ? AND {ts} < ?',
+                           (_bound(month), _bound(_add_months(month, 1))))
+    cursor.execute(f'INSERT INTO {shards[0][0]} SELECT * FROM {legacy} WHERE {ts} IS NULL OR {ts} < ? OR {ts} >= ?',
+                   (_bound(months[0]), _bound(_add_months(months[-1], 1))))
+
+    cursor.execute(f'CREATE TABLE IF NOT EXISTS {SEQUENCE_TABLE} (name TEXT PRIMARY KEY, seq INTEGER NOT NULL)')
+    cursor.execute(f'SELECT MAX({pk}) AS max_id FROM {legacy}')
+    max_id = _col(cursor.fetchone(), 0, 'max_id') or 0
+    cursor.execute("SELECT name FROM sqlite_master WHERE name = 'sqlite_sequence'")
+    if cursor.fetchone():
+        # AUTOINCREMENT sayacı silinmiş satırların id'lerini de kapsar
+        cursor.execute('SELECT seq FROM sqlite_sequence WHERE name = ?', (legacy,))
+        row = cursor.fetchone()
+        max_id = max(max_id, (_col(row, 0, 'seq') or 0) if row else 0)
+    cursor.execute(f'INSERT OR REPLACE INTO {SEQUENCE_TABLE} (name, seq) VALUES (?, ?)', (table, max_id))
+
+    cursor.execute(f'DROP TABLE {legacy}')
+    _sqlite_rebuild_view(cursor, spec, shards)
+    return len(months)
+
+
+def _sqlite_add_partition(cursor, spec: PartitionedTable, month: datetime):
+    """Yeni ay shard'ı; default shard'a düşmüş o aya ait satırlar taşınır"""
+    shard, default, ts = spec.partition_name(month), spec.partition_name(None), spec.time_column
+    cursor.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (default,))
+    _sqlite_create_shard(cursor, spec, _col(cursor.fetchone(), 0, 'sql'), shard)
+    bounds = (_bound(month), _bound(_add_months(month, 1)))
+    cursor.execute(f'INSERT INTO {shard} SELECT * FROM {default} WHERE {ts} >= ? AND {ts} < ?', bounds)
+    cursor.execute(f'DELETE FROM {default} WHERE {ts} >= ? AND {ts} < ?', bounds)
+
+
+# =============================================================================
+# POSTGRESQL NATIVE PARTITIONS
+# =============================================================================
+
+def _pg_create_partition(cursor, spec: PartitionedTable, month: Optional[datetime]):
+    name = spec.partition_name(month)
+    if month is None:
+        cursor.execute(f'CREATE TABLE IF NOT EXISTS {name} PARTITION OF {spec.name} DEFAULT')
+    else:
+        cursor.execute(f'''CREATE TABLE IF NOT EXISTS {name} PARTITION OF {spec.name}
+                           FOR VALUES FROM ('{_bound(month)}') TO ('{_bound(_add_months(month, 1))}')''')
+
+
+def _pg_add_partition(cursor, spec: PartitionedTable, month: datetime):
+    """Yeni ay bölümü; default bölümde o aya ait satır varsa detach -> oluştur -> taşı -> attach"""
+    default, ts = spec.partition_name(None), spec.time_column
+    bounds = (_bound(month), _bound(_add_months(month, 1)))
+    cursor.execute(f'SELECT EXISTS (SELECT 1 FROM {default} WHERE {ts} >= %s AND {ts} < %s) AS found', bounds)
+    if not _col(cursor.fetchone(), 0, 'found'):
+        _pg_create_partition(cursor, spec, month)
+        return
+    cursor.execute(f'ALTER TABLE {spec.name} DETACH PARTITION {default}')
+    _pg_create_partition(cursor, spec, month)
+    cursor.execute(f'INSERT INTO {spec.name} SELECT * FROM {default} WHERE {ts} >= %s AND {ts} < %s', bounds)
+    cursor.execute(f'DELETE FROM {default} WHERE {ts} >= %s AND {ts} < %s', bounds)
+    cursor.execute(f'ALTER TABLE {spec.name} ATTACH PARTITION {default} DEFAULT')
+
+
+def _pg_partition(conn, spec: PartitionedTable, now: datetime, months_ahead: int, max_months_back: int):
+    table, ts, pk = spec.name, spec.time_column, spec.id_column
+    legacy = f'{table}_legacy'
+    cursor = conn.cursor()
+    cursor.execute('SELECT pg_get_serial_sequence(%s, %s) AS seq', (table, pk))
+    row = cursor.fetchone()
+    sequence = _col(row, 0, 'seq') if row else None
+    cursor.execute('''SELECT column_name FROM information_schema.columns
+                      WHERE table_name = %s AND table_schema = current_schema() ORDER BY ordinal_position''',
+                   (table,))
+    columns = [_col(row, 0, 'column_name') for row in cursor.fetchall()]
+    months = _months(_first_month(cursor, spec, table, now, max_months_back),
+                     _add_months(_month_start(now), months_ahead))
+
+    cursor.execute(f'ALTER TABLE {table} RENAME TO {legacy}')
+    if sequence:
+        # Sequence legacy tabloyla birlikte silinmesin, yeni tablo aynı sayaçtan devam etsin
+        cursor.execute(f'ALTER SEQUENCE {sequence} OWNED BY NONE')
+    cursor.execute(f'CREATE TABLE {table} (LIKE {legacy} INCLUDING DEFAULTS INCLUDING CONSTRAINTS) '
+                   f'PARTITION BY RANGE ({ts})')
+    cursor.execute(f'ALTER TABLE {table} ADD PRIMARY KEY ({pk}, {ts})')
+    cursor.execute("SELECT pg_get_constraintdef(oid) AS definition FROM pg_constraint "
+                   "WHERE conrelid = %s::regclass AND contype = 'f'", (legacy,))
+    for row in cursor.fetchall():
+        cursor.execute(f'ALTER TABLE {table} ADD {_col(row, 0, "definition")}')
+    for month in [None] + months:
+        _pg_create_partition(cursor, spec, month)
+
+    select = ', '.join(f'COALESCE({name}, CURRENT_TIMESTAMP)' if name == ts else name for name in columns)
+    cursor.execute(f"INSERT INTO {table} ({', '.join(columns)}) SELECT {select} FROM {legacy}")
+    cursor.execute(f'DROP TABLE {legacy}')
+    if sequence:
+        cursor.execute(f'ALTER SEQUENCE {sequence} OWNED BY {table}.{pk}')
+    for suffix, index_columns in spec.indexes:
+        cursor.execute(f'CREATE INDEX IF NOT EXISTS idx_{table}_{suffix} ON {table} ({index_columns})')
+    cursor.execute(f'ANALYZE {table}')
+    return len(months)
+
+
+# =============================================================================
+# SCHEMA EVOLUTION
+# =============================================================================
+
+def _spec_for(table: str) -> Optional[PartitionedTable]:
+    return next((spec for spec in PARTITIONED_TABLES if spec.name == table), None)
+
+
+def _sqlite_columns(cursor, table: str) -> List[str]:
+    cursor.execute(f'PRAGMA table_info({table})')
+    return [_col(row, 1, 'name') for row in cursor.fetchall()]
+
+
+def add_column(conn, db_type: str, table: str, column: str, definition: str) -> bool:
+    """Tabloya kolon ekler; bölümlenmiş SQLite tabloda her shard'a ekleyip view'u yeniden kurar
+
+    PostgreSQL'de parent'a eklenen kolon tüm bölümlere geçer. Kolon zaten varsa False.
+    """
+    cursor = conn.cursor()
+    if db_type == 'postgresql':
+        cursor.execute(f'ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {column} {definition}')
+        return True
+    spec = _spec_for(table)
+    if spec is None or not is_partitioned(conn, db_type, table):
+        if column in _sqlite_columns(cursor, table):
+            return False
+        cursor.execute(f'ALTER TABLE {table} ADD COLUMN {column} {definition}')
+        return True
+
+    partitions = list_partitions(conn, db_type, spec)
+    missing = [name for name, _ in partitions if column not in _sqlite_columns(cursor, name)]
+    if not missing:
+        return False
+    try:
+        _begin(conn, db_type)
+        for name in missing:
+            cursor.execute(f'ALTER TABLE {name} ADD COLUMN {column} {definition}')
+        _sqlite_rebuild_view(cursor, spec, partitions)
+        commit(conn)
+    except Exception:
+        conn.rollback()
+        raise
+    logger.info(f"✅ {table}.{column} added to {len(missing)} partitions")
+    return True
+
+
+def update_rows(conn, db_type: str, table: str, assignments: str, where: str = '', params: Tuple = ()) -> int:
+    """Toplu UPDATE (backfill); bölümlenmiş SQLite tabloda doğrudan shard'lara uygulanır
+
+    View'daki INSTEAD OF UPDATE trigger'ı her satır için tüm shard'larda UPDATE çalıştırır;
+    toplu güncellemeler shard başına tek ifadeyle yapılır. Güncellenen satır sayısı.
+    """
+    cursor = conn.cursor()
+    clause = f' WHERE {where}' if where else ''
+    spec = _spec_for(table)
+    if db_type == 'postgresql' or spec is None or not is_partitioned(conn, db_type, table):
+        targets = [table]
+    else:
+        targets = [name for name, _ in list_partitions(conn, db_type, spec)]
+    updated = 0
+    for target in targets:
+        cursor.execute(f'UPDATE {target} SET {assignments}{clause}', params)
+        if cursor.rowcount and cursor.rowcount > 0:
+            updated += cursor.rowcount
+    return updated
+
+
+# =============================================================================
+# MAINTENANCE
+# =============================================================================
+
+def ensure_indexes(conn, db_type: str, spec: PartitionedTable) -> int:
+    """spec.indexes'i düz tabloda, SQLite'ta her shard'da, PostgreSQL'de parent'ta oluşturur
+
+    Yeni eklenen index'ler bölümlenmiş / bölümlenmemiş mevcut kurulumlara da gelir
+    (IF NOT EXISTS - var olanlar için maliyetsiz). Hedeflenen tablo sayısını döndürür.
+    """
+    state = is_partitioned(conn, db_type, spec.name)
+    if state is None:
+        return 0
+    if db_type == 'sqlite' and state:
+        targets = [name for name, _ in list_partitions(conn, db_type, spec)]
+    else:
+        targets = [spec.name]
+    cursor = conn.cursor()
+    for target in targets:
+        for suffix, columns in spec.indexes:
+            cursor.execute(f'CREATE INDEX IF NOT EXISTS idx_{target}_{suffix} ON {target} ({columns})')
+    commit(conn)
+    return len(targets)
+
+
+def partition_table(conn, db_type: str, spec: PartitionedTable, now: Optional[datetime] = None,
+                    months_ahead: int = 2, max_months_back: int = 120) -> int:
+    """Düz tabloyu aylık bölümlere çevirir (tek transaction); oluşturulan ay bölümü sayısı"""
+    now = now or datetime.now()
+    try:
+        _begin(conn, db_type)
+        if db_type == 'postgresql':
+            created = _pg_partition(conn, spec, now, months_ahead, max_months_back)
+        else:
+            created = _sqlite_partition(conn, spec, now, months_ahead, max_months_back)
+        commit(conn)
+    except Exception:
+        conn.rollback()
+        raise
+    logger.info(f"✅ {spec.name} partitioned into {created} monthly partitions")
+    return created
+
+
+def ensure_partitions(conn, db_type: str, spec: PartitionedTable, now: Optional[datetime] = None,
+                      months_ahead: int = 2) -> List[str]:
+    """Son bölümden now + months_ahead ayına kadar eksik ay bölümlerini açar"""
+    now = now or datetime.now()
+    partitions = list_partitions(conn, db_type, spec)
+    monthly = [month for _, month in partitions if month is not None]
+    target = _add_months(_month_start(now), months_ahead)
+    start = _add_months(monthly[-1], 1) if monthly else _month_start(now)
+    missing = _months(start, target) if start <= target else []
+    if not missing:
+        return []
+    try:
+        _begin(conn, db_type)
+        cursor = conn.cursor()
+        for month in missing:
+            if db_type == 'postgresql':
+                _pg_add_partition(cursor, spec, month)
+            else:
+                _sqlite_add_partition(cursor, spec, month)
+        if db_type == 'sqlite':
+            _sqlite_rebuild_view(cursor, spec, list_partitions(conn, db_type, spec))
+        commit(conn)
+    except Exception:
+        conn.rollback()
+        raise
+    return [spec.partition_name(month) for month in missing]
+
+
+def load_company_retention(conn, db_type: str, tier_days: Optional[Dict[str, int]] = None,
+                           default_days: int = 365) -> Dict[str, int]:
+    """company_id -> saklama günü (compliance_settings.retention_days > plan > varsayılan)"""
+    tier_days = dict(DEFAULT_RETENTION_DAYS, **(tier_days or {}))
+    cursor = conn.cursor()
+    cursor.execute('SELECT company_id, subscription_type, compliance_settings FROM companies')
+    retention = {}
+    for row in cursor.fetchall():
+        company_id = _col(row, 0, 'company_id')
+        days = tier_days.get(str(_col(row, 1, 'subscription_type') or '').lower(), default_days)
+        settings = _col(row, 2, 'compliance_settings')
+        if isinstance(settings, str):
+            try:
+                settings = json.loads(settings)
+            except ValueError:
+                settings = None
+        if isinstance(settings, dict) and settings.get('retention_days'):
+            try:
+                days = int(settings['retention_days'])
+            except (TypeError, ValueError):
+                pass
+        retention[company_id] = max(days, 1)
+    return retention
+
+
+def apply_retention(conn, db_type: str, spec: PartitionedTable, company_days: Dict[str, int],
+                    default_days: int = 365, now: Optional[datetime] = None,
+                    watermark: Optional[datetime] = None) -> Dict[str, Any]:
+    """Saklama süresi dolan ay bölümlerini düşürür / bölüm içinden şirket satırlarını siler
+
+    Sadece tamamen kapanmış aylar (ve rolled_up tablolarda watermark'tan önce bitenler)
+    değerlendirilir; bugünün bölümüne hiç dokunulmaz.
+    """
+    now = now or datetime.now()
+    p = '%s' if db_type == 'postgresql' else '?'
+    horizon = now - timedelta(days=max([default_days] + list(company_days.values())))
+    current_month = _month_start(now)
+    dropped, purged = [], {}
+    partitions = list_partitions(conn, db_type, spec)
+    try:
+        _begin(conn, db_type)
+        cursor = conn.cursor()
+        for name, month in partitions:
+            if month is None:
+                continue
+            end = _add_months(month, 1)
+            if end > current_month or (spec.rolled_up and (watermark is None or end > watermark)):
+                break
+            if end <= horizon:
+                cursor.execute(f'DROP TABLE {name}')
+                dropped.append(name)
+                continue
+            expired = sorted(c for c, days in company_days.items() if end <= now - timedelta(days=days))
+            if expired:
+                cursor.execute(f"DELETE FROM {name} WHERE company_id IN ({', '.join([p] * len(expired))})",
+                               tuple(expired))
+                if cursor.rowcount and cursor.rowcount > 0:
+                    purged[name] = cursor.rowcount
+        if not spec.rolled_up or watermark is not None:
+            limit = min(horizon, watermark) if spec.rolled_up else horizon
+            cursor.execute(f'DELETE FROM {spec.partition_name(None)} WHERE {spec.time_column} < {p}',
+                           (limit.strftime('%Y-%m-%d %H:%M:%S'),))
+            if cursor.rowcount and cursor.rowcount > 0:
+                purged[spec.partition_name(None)] = cursor.rowcount
+        if dropped and db_type == 'sqlite':
+            _sqlite_rebuild_view(cursor, spec, [item for item in partitions if item[0] not in dropped])
+        commit(conn)
+    except Exception:
+        conn.rollback()
+        raise
+    if dropped or purged:
+        logger.info(f"🧹 Retention {spec.name}: dropped {dropped}, purged {purged}")
+    return {'dropped': dropped, 'purged': purged}
+
+
+def _default_connection_provider():
+    """Global database adapter'dan (bağlantı al, bağlantı bırak, db_type) - SQLite'ta tek yazıcı bağlantısı"""
+    from src.smartsafe.database.database_adapter import get_db_adapter
+    adapter = get_db_adapter()
+    return adapter.get_write_connection, adapter.release_write_connection, adapter.db_type
+
+
+class PartitionMaintainer:
+    """Bölümleme, ileri ay bölümleri ve saklama süresi için periyodik bakım thread'i"""
+
+    def __init__(self, tables: Tuple[PartitionedTable, ...] = PARTITIONED_TABLES, interval_seconds: float = 3600,
+                 months_ahead: int = 2, tier_days: Optional[Dict[str, int]] = None, default_days: int = 365,
+                 connection_provider: Optional[Callable[[], Tuple[Callable, Callable, str]]] = None,
+                 clock: Callable[[], datetime] = datetime.now, enabled: bool = True, retention: bool = True):
+        self.tables = tables
+        self.enabled = enabled
+        self.retention = retention
+        self.interval_seconds = interval_seconds
+        self.months_ahead = months_ahead
+        self.tier_days = tier_days
+        self.default_days = default_days
+        self.connection_provider = connection_provider or _default_connection_provider
+        self.clock = clock
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._run_lock = threading.Lock()
+
+        # İstatistikler
+        self.runs = 0
+        self.errors = 0
+        self.partitions_created = 0
+        self.partitions_dropped = 0
+        self.rows_purged = 0
+        self.last_run_ms = 0.0
+        self.partition_counts: Dict[str, int] = {}
+
+    def _maintain(self, conn, db_type: str, spec: PartitionedTable, company_days: Dict[str, int]):
+        now = self.clock()
+        state = is_partitioned(conn, db_type, spec.name)
+        if state is None:
+            return
+        if state is False:
+            self.partitions_created += partition_table(conn, db_type, spec, now=now, months_ahead=self.months_ahead)
+        self.partitions_created += len(ensure_partitions(conn, db_type, spec, now=now,
+                                                         months_ahead=self.months_ahead))
+        ensure_indexes(conn, db_type, spec)
+        self.partition_counts[spec.name] = len(list_partitions(conn, db_type, spec))
+        if not self.retention:
+            return
+        watermark = None
+        if spec.rolled_up:
+            from src.smartsafe.services.report_rollups import read_watermark
+            watermark = read_watermark(conn, db_type)
+        result = apply_retention(conn, db_type, spec, company_days, default_days=self.default_days,
+                                 now=now, watermark=watermark)
+        self.partitions_dropped += len(result['dropped'])
+        self.rows_purged += sum(result['purged'].values())
+        if result['dropped']:
+            self.partition_counts[spec.name] = len(list_partitions(conn, db_type, spec))
+
+    def run_once(self):
+        with self._run_lock:
+            started = time.perf_counter()
+            try:
+                get_connection, release, db_type = self.connection_provider()
+                conn = get_connection()
+                if conn is None:
+                    raise RuntimeError("database connection unavailable")
+                try:
+                    company_days = (load_company_retention(conn, db_type, self.tier_days, self.default_days)
+                                    if self.retention else {})
+                    for spec in self.tables:
+                        try:
+                            self._maintain(conn, db_type, spec, company_days)
+                        except Exception as e:
+                            self.errors += 1
+                            logger.error(f"❌ Partition maintenance failed for {spec.name}: {e}")
+                finally:
+                    release(conn)
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"❌ Partition maintenance failed: {e}")
+            self.runs += 1
+            self.last_run_ms = round((time.perf_counter() - started) * 1000, 2)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.run_once()
+            self._stop.wait(self.interval_seconds)
+
+    def start(self):
+        if not self.enabled:
+            logger.info("ℹ️ Partition maintenance disabled (set SMARTSAFE_PARTITIONING=1 to enable)")
+            return
+        if not self.retention:
+            logger.info("ℹ️ Partition retention disabled (set SMARTSAFE_RETENTION=1 to drop expired data)")
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='partition-maintainer', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        if self._thread is not None and self._thread.is_alive():
+            self._thread.join(timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'enabled': self.enabled,
+            'retention': self.retention,
+            'runs': self.runs,
+            'errors': self.errors,
+            'partitions_created': self.partitions_created,
+            'partitions_dropped': self.partitions_dropped,
+            'rows_purged': self.rows_purged,
+            'last_run_ms': self.last_run_ms,
+            'partitions': dict(self.partition_counts),
+        }
+
+
+# Global maintainer
+_partition_maintainer = None
+
+
+def _tier_days_from_env() -> Dict[str, int]:
+    """SMARTSAFE_RETENTION_DAYS='starter=60,enterprise=1095'"""
+    tiers = {}
+    for item in os.getenv('SMARTSAFE_RETENTION_DAYS', '').split(','):
+        if '=' in item:
+            tier, days = item.split('=', 1)
+            tiers[tier.strip().lower()] = int(days)
+    return tiers
+
+
+def get_partition_maintainer() -> PartitionMaintainer:
+    """Global partition maintainer instance'ını döndürür"""
+    global _partition_maintainer
+    if _partition_maintainer is None:
+        _partition_maintainer = PartitionMaintainer(
+            interval_seconds=float(os.getenv('SMARTSAFE_PARTITION_INTERVAL', '3600')),
+            months_ahead=int(os.getenv('SMARTSAFE_PARTITION_MONTHS_AHEAD', '2')),
+            tier_days=_tier_days_from_env(),
+            default_days=int(os.getenv('SMARTSAFE_RETENTION_DEFAULT_DAYS', '365')),
+            enabled=os.getenv('SMARTSAFE_PARTITIONING', '0') == '1',
+            retention=os.getenv('SMARTSAFE_RETENTION', '0') == '1',
+        )
+    return _partition_maintainer
@@ -0,0 +1,345 @@
+#!/usr/bin/env python3
+"""
+SmartSafe AI - PostgreSQL Connection Pool
+psycopg2 SimpleConnectionPool yerine thread-safe, ölçümlü bağlantı havuzu
+
+- min/max boyut; havuz doluysa acquire() timeout'a kadar bekler (PoolTimeout),
+  sessizce yeni doğrudan bağlantı açılmaz
+- Checkout'ta sağlık kontrolü: kapalı bağlantı atılır, health_check_idle
+  saniyeden uzun boşta kalan bağlantıda SELECT 1 çalıştırılır
+- max_lifetime'ı dolan bağlantılar iade edilirken kapatılır (sunucu tarafı
+  bellek şişmesi, failover sonrası eski bağlantılar)
+- Çağıranlara lease verilir: close() bağlantıyı kapatmaz, havuza iade eder -
+  putconn yerine conn.close() çağıran eski kod da bağlantı sızdırmaz.
+  with pool.connection() as conn: her yolda iade garantisi
+- Metrikler: kullanımda / boşta / bekleyen, timeout, atılan bağlantılar ve
+  bekleme süresi histogramı
+"""
+
+import os
+import threading
+import time
+import logging
+import weakref
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Deque, Dict, Iterator, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Bekleme süresi histogramı üst sınırları (saniye)
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0)
+
+
+class PoolTimeout(Exception):
+    """Havuzda timeout süresi içinde boş bağlantı bulunamadı"""
+
+
+class _PooledConnection:
+    """Havuz bağlantısının tek kullanımlık görünümü (close() havuza iade eder)"""
+
+    __slots__ = ('_conn', '_release', '__weakref__')
+
+    def __init__(self, conn, release):
+        object.__setattr__(self, '_conn', conn)
+        object.__setattr__(self, '_release', release)
+
+    def __getattr__(self, name):
+        conn = object.__getattribute__(self, '_conn')
+        if conn is None:
+            raise RuntimeError("connection already returned to the pool")
+        return getattr(conn, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._conn, name, value)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # psycopg2 connection context manager davranışı: commit / rollback, kapatmaz
+        return self._conn.__exit__(exc_type, exc, tb)
+
+    @property
+    def raw_connection(self):
+        return self._conn
+
+    def close(self, broken: bool = False):
+        release = self._release
+        if release is not None:
+            object.__setattr__(self, '_release', None)
+            object.__setattr__(self, '_conn', None)
+            release(broken)
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+class _Slot:
+    __slots__ = ('conn', 'created_at', 'last_used')
+
+    def __init__(self, conn, now: float):
+        self.conn = conn
+        self.created_at = now
+        self.last_used = now
+
+
+class PostgresConnectionPool:
+    """Thread-safe bloklayan bağlantı havuzu"""
+
+    def __init__(self, connect: Callable[[], Any], min_size: int = 1, max_size: int = 10,
+                 acquire_timeout: float = 10.0, max_lifetime: float = 1800.0, health_check_idle: float = 5.0,
+                 name: str = 'default', clock: Callable[[], float] = time.monotonic):
+        if max_size < 1 or min_size > max_size:
+            raise ValueError(f"Invalid pool size: min={min_size} max={max_size}")
+        self.connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.acquire_timeout = acquire_timeout
+        self.max_lifetime = max_lifetime
+        self.health_check_idle = health_check_idle
+        self.name = name
+        self.clock = clock
+        self._cond = threading.Condition(threading.Lock())
+        self._idle: Deque[_Slot] = deque()
+        self._in_use: Dict[int, _Slot] = {}
+        self._opening = 0
+        self._closed = False
+
+        # İstatistikler
+        self.waiters = 0
+        self.acquires = 0
+        self.timeouts = 0
+        self.connections_created = 0
+        self.connections_discarded = 0
+        self.wait_buckets = [0] * (len(WAIT_BUCKETS) + 1)
+        self.wait_sum = 0.0
+
+        try:
+            self._prefill()
+        except Exception as e:
+            logger.warning(f"⚠️ PostgreSQL pool prefill failed ({name}): {e}")
+
+    # ------------------------------------------------------------------
+    # Bağlantı yaşam döngüsü
+    # ------------------------------------------------------------------
+
+    def _prefill(self):
+        while True:
+            with self._cond:
+                if len(self._idle) + len(self._in_use) + self._opening >= self.min_size:
+                    return
+                self._opening += 1
+            slot = self._open()
+            with self._cond:
+                self._idle.append(slot)
+                self._cond.notify()
+
+    def _open(self) -> _Slot:
+        """_opening sayacı çağıran tarafından artırılmış olmalı"""
+        try:
+            conn = self.connect()
+        except Exception:
+            with self._cond:
+                self._opening -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self._opening -= 1
+            self.connections_created += 1
+        return _Slot(conn, self.clock())
+
+    def _discard(self, slot: _Slot, reason: str):
+        self.connections_discarded += 1
+        logger.debug(f"🔌 PostgreSQL pool ({self.name}) discarding connection: {reason}")
+        try:
+            slot.conn.close()
+        except Exception:
+            pass
+
+    def _expired(self, slot: _Slot, now: float) -> bool:
+        return bool(self.max_lifetime) and now - slot.created_at >= self.max_lifetime
+
+    def _healthy(self, slot: _Slot, now: float) -> bool:
+        if getattr(slot.conn, 'closed', 0):
+            return False
+        if now - slot.last_used < self.health_check_idle:
+            return True
+        try:
+            cursor = slot.conn.cursor()
+            cursor.execute('SELECT 1')
+            cursor.fetchone()
+            cursor.close()
+            if getattr(slot.conn, 'autocommit', False) is not True:
+                slot.conn.rollback()
+            return True
+        except Exception:
+            return False
+
+    # ------------------------------------------------------------------
+    # Checkout / iade
+    # ------------------------------------------------------------------
+
+    def _observe_wait(self, seconds: float):
+        self.wait_sum += seconds
+        for index, bound in enumerate(WAIT_BUCKETS):
+            if seconds <= bound:
+                self.wait_buckets[index] += 1
+                return
+        self.wait_buckets[-1] += 1
+
+    def _checkout(self, deadline: float) -> Tuple[_Slot, bool]:
+        """(slot, yeni_mi) - havuz kilidi altında boş slot ya da açma hakkı"""
+        with self._cond:
+            waiting = False
+            try:
+                while True:
+                    if self._closed:
+                        raise RuntimeError(f"PostgreSQL pool {self.name} is closed")
+                    if self._idle:
+                        # LIFO: en son kullanılan (sıcak) bağlantı; kontrol sırasında da kapasiteden sayılır
+                        slot = self._idle.pop()
+                        self._in_use[id(slot.conn)] = slot
+                        return slot, False
+                    if len(self._in_use) + self._opening < self.max_size:
+                        self._opening += 1
+                        return None, True
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.timeouts += 1
+                        raise PoolTimeout(f"PostgreSQL pool {self.name} exhausted "
+                                          f"({self.max_size} connections in use)")
+                    if not waiting:
+                        waiting = True
+                        self.waiters += 1
+                    self._cond.wait(remaining)
+            finally:
+                if waiting:
+                    self.waiters -= 1
+
+    def acquire(self, timeout: Optional[float] = None) -> _PooledConnection:
+        """Havuzdan bağlantı (lease); timeout içinde boş bağlantı yoksa PoolTimeout"""
+        started = time.monotonic()
+        deadline = started + (self.acquire_timeout if timeout is None else timeout)
+        while True:
+            slot, new = self._checkout(deadline)
+            if new:
+                slot = self._open()
+                with self._cond:
+                    self._in_use[id(slot.conn)] = slot
+                break
+            now = self.clock()
+            if self._expired(slot, now):
+                reason = 'max lifetime reached'
+            elif not self._healthy(slot, now):
+                reason = 'health check failed'
+            else:
+                break
+            with self._cond:
+                self._in_use.pop(id(slot.conn), None)
+                self._cond.notify()
+            self._discard(slot, reason)
+
+        with self._cond:
+            self.acquires += 1
+            self._observe_wait(time.monotonic() - started)
+
+        def release(broken: bool = False):
+            self._return(slot, broken)
+
+        return _PooledConnection(slot.conn, release)
+
+    def _return(self, slot: _Slot, broken: bool = False):
+        now = self.clock()
+        keep = not broken and not self._closed and not getattr(slot.conn, 'closed', 0)
+        if keep and getattr(slot.conn, 'autocommit', False) is not True:
+            try:
+                # Yarım kalan transaction bir sonraki kullanıcıya taşınmasın
+                slot.conn.rollback()
+            except Exception:
+                keep = False
+        if keep and self._expired(slot, now):
+            keep = False
+        with self._cond:
+            self._in_use.pop(id(slot.conn), None)
+            if keep:
+                slot.last_used = now
+                self._idle.append(slot)
+            self._cond.notify()
+        if not keep:
+            self._discard(slot, 'broken or expired on return')
+
+    @contextmanager
+    def connection(self, timeout: Optional[float] = None) -> Iterator[Any]:
+        """with pool.connection() as conn: - her durumda havuza iade"""
+        lease = self.acquire(timeout)
+        try:
+            yield lease
+        finally:
+            lease.close()
+
+    # psycopg2.pool uyumluluğu
+    def getconn(self, key=None) -> _PooledConnection:
+        return self.acquire()
+
+    def putconn(self, conn, key=None, close: bool = False):
+        if isinstance(conn, _PooledConnection):
+            conn.close(broken=close)
+        else:
+            raise ValueError("connection was not acquired from this pool")
+
+    def closeall(self):
+        """Boştaki bağlantıları kapatır; kullanımdakiler iade edilince kapanır"""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = list(self._idle), deque()
+            self._cond.notify_all()
+        for slot in idle:
+            self._discard(slot, 'pool closed')
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            in_use, idle, opening = len(self._in_use), len(self._idle), self._opening
+        return {
+            'min_size': self.min_size,
+            'max_size': self.max_size,
+            'in_use': in_use,
+            'idle': idle,
+            'opening': opening,
+            'waiters': self.waiters,
+            'acquires': self.acquires,
+            'timeouts': self.timeouts,
+            'connections_created': self.connections_created,
+            'connections_discarded': self.connections_discarded,
+            'wait_buckets': list(zip(WAIT_BUCKETS + (float('inf'),), self.wait_buckets)),
+            'wait_sum_seconds': round(self.wait_sum, 6),
+        }
+
+
+# Açık havuzlar (metrikler için)
+_pg_pools: 'weakref.WeakValueDictionary[str, PostgresConnectionPool]' = weakref.WeakValueDictionary()
+
+
+def create_pg_pool(name: str = 'primary', **connect_kwargs) -> PostgresConnectionPool:
+    """psycopg2.connect(**connect_kwargs) ile env ayarlı havuz oluşturur ve kaydeder"""
+    import psycopg2
+
+    pool = PostgresConnectionPool(
+        lambda: psycopg2.connect(**connect_kwargs),
+        min_size=int(os.getenv('SMARTSAFE_PG_POOL_MIN', '1')),
+        max_size=int(os.getenv('SMARTSAFE_PG_POOL_MAX', '10')),
+        acquire_timeout=float(os.getenv('SMARTSAFE_PG_POOL_TIMEOUT', '10')),
+        max_lifetime=float(os.getenv('SMARTSAFE_PG_POOL_MAX_LIFETIME', '1800')),
+        health_check_idle=float(os.getenv('SMARTSAFE_PG_POOL_HEALTH_IDLE', '5')),
+        name=name,
+    )
+    _pg_pools[name] = pool
+    return pool
+
+
+def pg_pool_stats() -> Dict[str, Dict[str, Any]]:
+    """Açık tüm havuzların istatistikleri"""
+    return {name: pool.stats() for name, pool in list(_pg_pools.items())}
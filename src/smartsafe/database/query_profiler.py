@@ -0,0 +1,538 @@
+#!/usr/bin/env python3
+"""
+SmartSafe AI - Query Profiler
+execute_query ve blueprint'lerin ham cursor'ları için SQL profilleme
+
+- Her ifade parmak izine (fingerprint) indirgenir: literal / placeholder -> ?,
+  IN (...) ve çok satırlı VALUES listeleri tek elemana, boşluklar tek boşluğa.
+  Sonuç ham SQL başına sınırlı bir LRU'da tutulur: aynı ifade tekrar geldiğinde
+  regex'ler ve SHA-1 yeniden çalışmaz (çok uzun ifadeler cache'lenmez)
+- Parmak izi başına çağrı, hata, toplam / ortalama / p95 / max süre (ms) ve
+  dönen satır sayısı; p95 sabit boyutlu pencereden okunurken hesaplanır
+- slow_ms üstündeki sorgular uyarı olarak loglanır ve yavaş sorgu günlüğüne
+  (sınırlı deque) yazılır; EXPLAIN çıktısı istenirse (admin endpoint) son
+  yavaş örneğin SQL + parametreleriyle alınır, SMARTSAFE_SLOW_QUERY_EXPLAIN
+  açıksa yavaş sorgu anında otomatik eklenir
+- N+1: istek kapsamında (begin_request / end_request) aynı parmak izi
+  n_plus_one_threshold kez veya daha fazla çalıştıysa uyarı + sayaç
+- ProfiledConnection / ProfiledCursor: mevcut kodu değiştirmeden ölçüm için
+  sarmalayıcı; bilinmeyen her şey alttaki bağlantı / cursor'a devredilir.
+  Sonuç kümesi tükenene (fetchone None / fetchall / close / sonraki execute)
+  kadar fetch süresi ölçüme eklenir. Tamamlanmadan çöp toplanan cursor'ın
+  ölçümü kilit almadan ertelenir (GC profiler kilidi tutulurken çalışabilir)
+  ve sonraki kayıt / rapor çağrısında işlenir
+"""
+
+import hashlib
+import os
+import re
+import threading
+import time
+import logging
+from collections import deque
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Deque, Dict, List, Optional, Sequence, Tuple
+
+from src.smartsafe.services.latency_tracer import percentile
+
+logger = logging.getLogger(__name__)
+
+_COMMENT_RE = re.compile(r'--[^\n]*|/\*.*?\*/', re.S)
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_PLACEHOLDER_RE = re.compile(r'%\(\w+\)s|%s|\$\d+|\?')
+_NUMBER_RE = re.compile(r'(?<![\w.])-?\d+(?:\.\d+)?(?![\w.])')
+_IN_LIST_RE = re.compile(r'\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)', re.I)
+_VALUES_ROWS_RE = re.compile(r'(\(\s*\?(?:\s*,\s*\?)*\s*\))(?:\s*,\s*\(\s*\?(?:\s*,\s*\?)*\s*\))+')
+_SPACE_RE = re.compile(r'\s+')
+
+_EXPLAINABLE = ('SELECT', 'WITH', 'INSERT', 'UPDATE', 'DELETE')
+_MEMO_MAX_SQL_LEN = 4096  # Daha uzun (ör. literal gömülü toplu INSERT) ifadeler LRU'ya girmez
+_READS = ('SELECT', 'WITH')
+
+
+def normalize_sql(sql: str) -> str:
+    """SQL'i parmak izi metnine indirger (değerlerden bağımsız)"""
+    text = _COMMENT_RE.sub(' ', sql)
+    text = _STRING_RE.sub('?', text)
+    text = _PLACEHOLDER_RE.sub('?', text)
+    text = _NUMBER_RE.sub('?', text)
+    text = _IN_LIST_RE.sub('IN (?)', text)
+    text = _VALUES_ROWS_RE.sub(r'\1', text)
+    return _SPACE_RE.sub(' ', text).strip().rstrip(';').strip()
+
+
+def fingerprint(sql: str) -> str:
+    """Normalize edilmiş SQL'in kısa özeti (metrik etiketi / endpoint anahtarı)"""
+    return _normalized(sql)[1]
+
+
+def _digest(text: str) -> str:
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()[:12]
+
+
+@lru_cache(maxsize=2048)
+def _normalized_memo(sql: str) -> Tuple[str, str]:
+    text = normalize_sql(sql)
+    return text, _digest(text)
+
+
+def _normalized(sql: str) -> Tuple[str, str]:
+    """(normalize edilmiş SQL, parmak izi) - aynı ham SQL için bir kez hesaplanır"""
+    if len(sql) > _MEMO_MAX_SQL_LEN:
+        text = normalize_sql(sql)
+        return text, _digest(text)
+    return _normalized_memo(sql)
+
+
+def explain_query(conn, db_type: str, sql: str, params: Optional[Sequence] = None) -> List[str]:
+    """EXPLAIN planını satır listesi olarak döndürür (sorguyu çalıştırmaz)"""
+    if not sql.strip().upper().startswith(_EXPLAINABLE):
+        raise ValueError("Only SELECT/WITH/INSERT/UPDATE/DELETE statements can be explained")
+    prefix = 'EXPLAIN ' if db_type == 'postgresql' else 'EXPLAIN QUERY PLAN '
+    cursor = conn.cursor()
+    cursor.execute(prefix + sql, params or ())
+    plan = []
+    for row in cursor.fetchall():
+        if db_type == 'postgresql':
+            plan.append(str(list(row.values())[0] if hasattr(row, 'values') else row[0]))
+        else:
+            plan.append(str(row['detail'] if hasattr(row, 'keys') else row[-1]))
+    return plan
+
+
+@dataclass
+class QueryStats:
+    """Tek parmak izinin birikmiş ölçümleri"""
+    fingerprint_id: str
+    sql: str
+    calls: int = 0
+    errors: int = 0
+    rows: int = 0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+    slow: int = 0
+    n_plus_one: int = 0
+    last_seen: Optional[float] = None
+    samples: Deque[float] = field(default_factory=deque, repr=False)
+
+    def to_dict(self) -> Dict[str, Any]:
+        values = sorted(self.samples)
+        return {
+            'fingerprint': self.fingerprint_id,
+            'sql': self.sql,
+            'calls': self.calls,
+            'errors': self.errors,
+            'rows': self.rows,
+            'total_ms': round(self.total_ms, 2),
+            'avg_ms': round(self.total_ms / self.calls, 3) if self.calls else 0.0,
+            'p95_ms': round(percentile(values, 95), 3),
+            'max_ms': round(self.max_ms, 3),
+            'slow': self.slow,
+            'n_plus_one': self.n_plus_one,
+        }
+
+
+class _RequestQueries:
+    __slots__ = ('label', 'counts')
+
+    def __init__(self, label: Optional[str]):
+        self.label = label
+        self.counts: Dict[str, int] = {}
+
+
+_request: ContextVar[Optional[_RequestQueries]] = ContextVar('smartsafe_query_request', default=None)
+
+
+class QueryProfiler:
+    """Parmak izi başına sorgu istatistikleri, yavaş sorgu günlüğü ve N+1 tespiti"""
+
+    def __init__(self, slow_ms: float = 200.0, window: int = 512, n_plus_one_threshold: int = 10,
+                 explain_slow: bool = False, max_fingerprints: int = 2000, slow_log_size: int = 100,
+                 enabled: bool = True):
+        self.slow_ms = slow_ms
+        self.window = window
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self.explain_slow = explain_slow
+        self.max_fingerprints = max_fingerprints
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._stats: Dict[str, QueryStats] = {}
+        self._slow_log: Deque[Dict[str, Any]] = deque(maxlen=slow_log_size)
+        self._n_plus_one_log: Deque[Dict[str, Any]] = deque(maxlen=slow_log_size)
+        # EXPLAIN için son yavaş örnek (sql, params, db_type) - API'de parametreler gösterilmez
+        self._slow_samples: Dict[str, tuple] = {}
+        self._explained_at: Dict[str, float] = {}
+        # __del__'den gelen ölçümler: deque.append kilit gerektirmez
+        self._deferred: Deque[tuple] = deque(maxlen=10000)
+
+        # İstatistikler
+        self.total_queries = 0
+        self.dropped_fingerprints = 0
+
+    # ------------------------------------------------------------------
+    # Kayıt
+    # ------------------------------------------------------------------
+
+    def record(self, sql: str, duration_ms: float, rows: int = 0, error: bool = False,
+               params: Optional[Sequence] = None, db_type: Optional[str] = None, conn=None) -> Optional[str]:
+        """Tek ifade ölçümü; parmak izi kimliğini döndürür"""
+        if not self.enabled:
+            return None
+        self._drain_deferred()
+        return self._record(sql, duration_ms, rows, error, params, db_type, conn, _request.get())
+
+    def defer(self, sql: str, duration_ms: float, rows: int = 0, params: Optional[Sequence] = None,
+              db_type: Optional[str] = None, scope: Optional[_RequestQueries] = None):
+        """Kilit almadan ölçümü sıraya koyar (__del__ / GC içinden güvenli)"""
+        if self.enabled:
+            self._deferred.append((sql, duration_ms, rows, params, db_type, scope))
+
+    def _drain_deferred(self):
+        while True:
+            try:
+                sql, duration_ms, rows, params, db_type, scope = self._deferred.popleft()
+            except IndexError:
+                return
+            self._record(sql, duration_ms, rows, False, params, db_type, None, scope)
+
+    def _record(self, sql: str, duration_ms: float, rows: int, error: bool, params: Optional[Sequence],
+                db_type: Optional[str], conn, scope: Optional[_RequestQueries]) -> str:
+        text, fp = _normalized(sql)
+        slow = not error and duration_ms >= self.slow_ms
+        now = time.time()
+        with self._lock:
+            self.total_queries += 1
+            stats = self._stats.get(fp)
+            if stats is None:
+                if len(self._stats) >= self.max_fingerprints:
+                    self.dropped_fingerprints += 1
+                else:
+                    stats = self._stats[fp] = QueryStats(fp, text, samples=deque(maxlen=self.window))
+            if stats is not None:
+                stats.calls += 1
+                stats.errors += 1 if error else 0
+                stats.rows += max(rows or 0, 0)
+                stats.total_ms += duration_ms
+                stats.max_ms = max(stats.max_ms, duration_ms)
+                stats.last_seen = now
+                stats.samples.append(duration_ms)
+                if slow:
+                    stats.slow += 1
+                    self._slow_samples[fp] = (sql, tuple(params) if params else (), db_type)
+
+        if scope is not None:
+            scope.counts[fp] = scope.counts.get(fp, 0) + 1
+
+        if slow:
+            self._log_slow(fp, text, duration_ms, rows, scope, sql, params, db_type, conn)
+        return fp
+
+    def _log_slow(self, fp: str, text: str, duration_ms: float, rows: int, scope: Optional[_RequestQueries],
+                  sql: str, params, db_type: Optional[str], conn):
+        entry = {
+            'fingerprint': fp,
+            'sql': text,
+            'duration_ms': round(duration_ms, 2),
+            'rows': rows,
+            'request': scope.label if scope is not None else None,
+            'at': datetime.now().isoformat(),
+            'plan': None,
+        }
+        logger.warning(f"🐢 Slow query ({duration_ms:.1f} ms, {fp}): {text[:300]}")
+        # Otomatik EXPLAIN sadece okumalarda - PostgreSQL'de hata açık transaction'ı bozar
+        if self.explain_slow and conn is not None and db_type and sql.strip().upper().startswith(_READS):
+            # Aynı parmak izi için dakikada en fazla bir EXPLAIN
+            if time.monotonic() - self._explained_at.get(fp, -60.0) >= 60.0:
+                self._explained_at[fp] = time.monotonic()
+                try:
+                    entry['plan'] = explain_query(conn, db_type, sql, params)
+                except Exception as e:
+                    logger.debug(f"EXPLAIN failed for {fp}: {e}")
+        with self._lock:
+            self._slow_log.append(entry)
+
+    # ------------------------------------------------------------------
+    # İstek kapsamı (N+1 tespiti)
+    # ------------------------------------------------------------------
+
+    def begin_request(self, label: Optional[str] = None):
+        """İstek başında çağrılır; token end_request'e verilir"""
+        if not self.enabled:
+            return None
+        return _request.set(_RequestQueries(label))
+
+    def end_request(self, token) -> List[Dict[str, Any]]:
+        """İstek sonunda N+1 şüphelilerini işaretler ve döndürür"""
+        if token is None:
+            return []
+        self._drain_deferred()
+        scope = _request.get()
+        _request.reset(token)
+        if scope is None:
+            return []
+        offenders = []
+        for fp, count in scope.counts.items():
+            if count < self.n_plus_one_threshold:
+                continue
+            with self._lock:
+                stats = self._stats.get(fp)
+                if stats is not None:
+                    stats.n_plus_one += 1
+                entry = {
+                    'fingerprint': fp,
+                    'sql': stats.sql if stats is not None else None,
+                    'count': count,
+                    'request': scope.label,
+                    'at': datetime.now().isoformat(),
+                }
+                self._n_plus_one_log.append(entry)
+            offenders.append(entry)
+            logger.warning(f"⚠️ N+1 query pattern: {count}x {fp} in {scope.label}: {(entry['sql'] or '')[:200]}")
+        return offenders
+
+    # ------------------------------------------------------------------
+    # Raporlama
+    # ------------------------------------------------------------------
+
+    def explain(self, fp: str, conn) -> Dict[str, Any]:
+        """Son yavaş örneğin EXPLAIN planı (admin isteğiyle)"""
+        with self._lock:
+            sample = self._slow_samples.get(fp)
+            stats = self._stats.get(fp)
+        if sample is None:
+            raise KeyError(fp)
+        sql, params, db_type = sample
+        return {'fingerprint': fp, 'sql': stats.sql if stats else normalize_sql(sql),
+                'plan': explain_query(conn, db_type, sql, params)}
+
+    def top(self, sort: str = 'total_ms', limit: int = 50) -> List[Dict[str, Any]]:
+        self._drain_deferred()
+        with self._lock:
+            entries = [stats.to_dict() for stats in self._stats.values()]
+        if entries and sort not in entries[0]:
+            sort = 'total_ms'
+        entries.sort(key=lambda entry: entry[sort] or 0, reverse=True)
+        return entries[:limit]
+
+    def stats(self, sort: str = 'total_ms', limit: int = 50) -> Dict[str, Any]:
+        queries = self.top(sort, limit)
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'slow_ms': self.slow_ms,
+                'n_plus_one_threshold': self.n_plus_one_threshold,
+                'total_queries': self.total_queries,
+                'fingerprints': len(self._stats),
+                'dropped_fingerprints': self.dropped_fingerprints,
+                'queries': queries,
+                'slow_log': list(self._slow_log)[::-1],
+                'n_plus_one': list(self._n_plus_one_log)[::-1],
+            }
+
+    def reset(self):
+        self._deferred.clear()
+        with self._lock:
+            self._stats.clear()
+            self._slow_log.clear()
+            self._n_plus_one_log.clear()
+            self._slow_samples.clear()
+            self._explained_at.clear()
+            self.total_queries = 0
+            self.dropped_fingerprints = 0
+
+
+# =============================================================================
+# SARMALAYICILAR
+# =============================================================================
+
+class ProfiledCursor:
+    """Ölçümlü cursor: execute'tan son fetch'e kadar geçen süreyi kaydeder"""
+
+    _own = ('_cursor', '_conn', '_profiler', '_db_type', '_pending')
+
+    def __init__(self, cursor, profiler: QueryProfiler, db_type: Optional[str] = None, conn=None):
+        object.__setattr__(self, '_cursor', cursor)
+        object.__setattr__(self, '_conn', conn)
+        object.__setattr__(self, '_profiler', profiler)
+        object.__setattr__(self, '_db_type', db_type)
+        # Sonuç kümesi okunurken tamamlanacak ölçüm: [sql, params, ms, rows, istek kapsamı]
+        object.__setattr__(self, '_pending', None)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __setattr__(self, name, value):
+        if name in self._own:
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self._cursor, name, value)
+
+    def __iter__(self):
+        return iter(self.fetchall())
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def __del__(self):
+        # record() profiler kilidini alır - GC kilit tutulurken tetiklenebilir, ölçüm ertelenir
+        try:
+            self._finish(defer=True)
+        except Exception:
+            pass
+
+    def _finish(self, defer: bool = False):
+        pending = self._pending
+        if pending is not None:
+            self._pending = None
+            sql, params, duration_ms, rows, scope = pending
+            if defer:
+                self._profiler.defer(sql, duration_ms, rows, params, self._db_type, scope)
+                return
+            profiler = self._profiler
+            if profiler.enabled:
+                profiler._drain_deferred()
+                # N+1 sayımı sorgunun çalıştığı isteğe yazılır (fetch başka yerde bitse de)
+                profiler._record(sql, duration_ms, rows, False, params, self._db_type, self._conn, scope)
+
+    def _run(self, method, sql, params):
+        self._finish()
+        started = time.perf_counter()
+        try:
+            result = method(sql, params) if params is not None else method(sql)
+        except Exception:
+            self._profiler.record(sql, (time.perf_counter() - started) * 1000.0, error=True,
+                                  params=params, db_type=self._db_type)
+            raise
+        duration_ms = (time.perf_counter() - started) * 1000.0
+        if getattr(self._cursor, 'description', None):
+            self._pending = [sql, params, duration_ms, 0, _request.get()]
+        else:
+            rowcount = getattr(self._cursor, 'rowcount', 0)
+            self._profiler.record(sql, duration_ms, rowcount if rowcount and rowcount > 0 else 0,
+                                  params=params, db_type=self._db_type, conn=self._conn)
+        return result
+
+    def execute(self, sql, params=None):
+        return self._run(self._cursor.execute, sql, params)
+
+    def executemany(self, sql, seq_of_params):
+        return self._run(self._cursor.executemany, sql, seq_of_params)
+
+    def _fetch(self, method, *args):
+        started = time.perf_counter()
+        result = method(*args)
+        pending = self._pending
+        if pending is not None:
+            pending[2] += (time.perf_counter() - started) * 1000.0
+        return result
+
+    def fetchone(self):
+        # while fetchone() döngüleri: ölçüm sonuç kümesi bitince (None) tamamlanır; tek satır
+        # okuyan kullanımlarda close / sonraki execute / çöp toplama tamamlar
+        row = self._fetch(self._cursor.fetchone)
+        if self._pending is not None:
+            if row is None:
+                self._finish()
+            else:
+                self._pending[3] += 1
+        return row
+
+    def fetchmany(self, *args):
+        rows = self._fetch(self._cursor.fetchmany, *args)
+        if self._pending is not None:
+            self._pending[3] += len(rows)
+            if not rows:
+                self._finish()
+        return rows
+
+    def fetchall(self):
+        rows = self._fetch(self._cursor.fetchall)
+        if self._pending is not None:
+            self._pending[3] += len(rows)
+            self._finish()
+        return rows
+
+    def close(self):
+        self._finish()
+        return self._cursor.close()
+
+
+class ProfiledConnection:
+    """cursor() / execute() ölçümlü bağlantı; geri kalanı alttaki bağlantıya devredilir"""
+
+    _own = ('_conn', '_profiler', '_db_type')
+
+    def __init__(self, conn, profiler: QueryProfiler, db_type: Optional[str] = None):
+        object.__setattr__(self, '_conn', conn)
+        object.__setattr__(self, '_profiler', profiler)
+        object.__setattr__(self, '_db_type', db_type)
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def __setattr__(self, name, value):
+        if name in self._own:
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self._conn, name, value)
+
+    def __enter__(self):
+        self._conn.__enter__()
+        return self
+
+    def __exit__(self, *exc):
+        return self._conn.__exit__(*exc)
+
+    def cursor(self, *args, **kwargs):
+        cursor = self._conn.cursor(*args, **kwargs)
+        if args or kwargs.get('name'):
+            # Sunucu taraflı (named) cursor'lar akış içindir - ölçülmez
+            return cursor
+        return ProfiledCursor(cursor, self._profiler, self._db_type, self._conn)
+
+    def execute(self, sql, params=None):
+        """sqlite3.Connection.execute kısayolu"""
+        cursor = self.cursor()
+        cursor.execute(sql, params)
+        return cursor
+
+
+def profile_connection(conn, db_type: Optional[str] = None):
+    """Profilleme açıksa bağlantıyı sarmalar (None / kapalıysa aynen döner)"""
+    profiler = get_query_profiler()
+    if conn is None or not profiler.enabled or isinstance(conn, ProfiledConnection):
+        return conn
+    return ProfiledConnection(conn, profiler, db_type)
+
+
+def profiled_cursor(conn, db_type: Optional[str] = None, **kwargs):
+    """Ham cursor kullanan kod için ölçümlü cursor"""
+    profiler = get_query_profiler()
+    cursor = conn.cursor(**kwargs)
+    if not profiler.enabled or isinstance(cursor, ProfiledCursor):
+        return cursor
+    return ProfiledCursor(cursor, profiler, db_type, conn)
+
+
+# Global profiler
+_query_profiler = None
+
+
+def get_query_profiler() -> QueryProfiler:
+    """Global query profiler instance'ını döndürür"""
+    global _query_profiler
+    if _query_profiler is None:
+        _query_profiler = QueryProfiler(
+            slow_ms=float(os.getenv('SMARTSAFE_SLOW_QUERY_MS', '200')),
+            n_plus_one_threshold=int(os.getenv('SMARTSAFE_N_PLUS_ONE_THRESHOLD', '10')),
+            explain_slow=os.getenv('SMARTSAFE_SLOW_QUERY_EXPLAIN', 'false').lower() in ('1', 'true', 'yes'),
+            enabled=os.getenv('SMARTSAFE_QUERY_PROFILING', 'true').lower() not in ('0', 'false', 'no'),
+        )
+    return _query_profiler
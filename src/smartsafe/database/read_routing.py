@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""
+SmartSafe AI - Read Replica Routing
+Dashboard / rapor / istatistik okumalarını read-replica'lara yönlendirir
+
+- Replica başına bağlantı kaynağı (PostgreSQL: ayrı pg_pool havuzu, SQLite:
+  ayrı dosya için kalıcı bağlantı yöneticisi); close() her durumda iade eder
+- Gecikme izleme: arka plan thread'i her replica'nın gecikmesini ölçer
+  (PostgreSQL: pg_last_xact_replay_timestamp, SQLite: primary'ye yazılan
+  replica_heartbeat satırının replica'daki yaşı); max_lag_seconds üstündeki
+  veya ölçülemeyen replica kullanılmaz, uygun replica yoksa primary'ye düşülür
+- Read-your-writes: istek kapsamında yazma olduysa (veya aynı istemci son
+  sticky_seconds içinde yazdıysa) okumalar primary'den yapılır
+"""
+
+import os
+import threading
+import time
+import logging
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from src.smartsafe.database.transactions import commit
+
+logger = logging.getLogger(__name__)
+
+HEARTBEAT_TABLE = 'replica_heartbeat'
+
+
+# =============================================================================
+# READ-YOUR-WRITES SCOPE
+# =============================================================================
+
+class _ReadScope:
+    __slots__ = ('key', 'wrote')
+
+    def __init__(self, key: Optional[str], wrote: bool = False):
+        self.key = key
+        self.wrote = wrote
+
+
+_scope: ContextVar[Optional[_ReadScope]] = ContextVar('smartsafe_read_scope', default=None)
+_recent_writes: Dict[str, float] = {}
+_recent_lock = threading.Lock()
+_MAX_STICKY_KEYS = 10000
+
+
+def note_write(now: Optional[float] = None):
+    """Aktif istek kapsamında yazma oldu - sonraki okumalar primary'den"""
+    scope = _scope.get()
+    if scope is None:
+        return
+    scope.wrote = True
+    if scope.key:
+        now = time.monotonic() if now is None else now
+        with _recent_lock:
+            if len(_recent_writes) >= _MAX_STICKY_KEYS:
+                # En eski yarısı düşer - yapışkanlık en kötü durumda erken biter
+                for key in sorted(_recent_writes, key=_recent_writes.get)[:_MAX_STICKY_KEYS // 2]:
+                    del _recent_writes[key]
+            _recent_writes[scope.key] = now
+
+
+def begin_read_scope(key: Optional[str] = None, write: bool = False):
+    """İstek başında çağrılır (key: oturum / istemci); token end_read_scope'a verilir"""
+    token = _scope.set(_ReadScope(key))
+    if write:
+        note_write()
+    return token
+
+
+def end_read_scope(token):
+    if token is not None:
+        _scope.reset(token)
+
+
+def prefer_primary(sticky_seconds: float, now: Optional[float] = None) -> bool:
+    """Bu istek primary'den okumalı mı (kendi yazısını görmesi için)"""
+    scope = _scope.get()
+    if scope is None:
+        return False
+    if scope.wrote:
+        return True
+    if scope.key:
+        written = _recent_writes.get(scope.key)
+        now = time.monotonic() if now is None else now
+        return written is not None and now - written < sticky_seconds
+    return False
+
+
+# =============================================================================
+# REPLICAS
+# =============================================================================
+
+@dataclass
+class Replica:
+    """Okuma replica'sı: bağlantı kaynağı + son ölçülen gecikme"""
+    name: str
+    connect: Callable[[], Any]
+    lag_seconds: Optional[float] = None
+    healthy: bool = False
+    last_error: Optional[str] = None
+    reads: int = 0
+    checked_at: Optional[float] = field(default=None, repr=False)
+
+
+def _scalar(row) -> Any:
+    if row is None:
+        return None
+    return list(row.values())[0] if hasattr(row, 'values') else row[0]
+
+
+def _parse_heartbeat(value) -> Optional[datetime]:
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.replace(tzinfo=None)
+    return datetime.fromisoformat(str(value))
+
+
+class ReadRouter:
+    """Replica seçimi, gecikme izleme ve primary'ye düşüş"""
+
+    def __init__(self, replicas: List[Replica], db_type: str,
+                 primary_write_connection: Optional[Callable[[], Any]] = None,
+                 release_write_connection: Optional[Callable[[Any], None]] = None,
+                 max_lag_seconds: float = 5.0, sticky_seconds: float = 5.0, check_interval: float = 2.0,
+                 clock: Callable[[], datetime] = datetime.now):
+        self.replicas = replicas
+        self.db_type = db_type
+        self.primary_write_connection = primary_write_connection
+        self.release_write_connection = release_write_connection
+        self.max_lag_seconds = max_lag_seconds
+        self.sticky_seconds = sticky_seconds
+        self.check_interval = check_interval
+        self.clock = clock
+        self._next = 0
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+        # İstatistikler
+        self.replica_reads = 0
+        self.primary_reads = 0
+        self.sticky_reads = 0
+        self.fallbacks = 0
+
+    # ------------------------------------------------------------------
+    # Gecikme ölçümü
+    # ------------------------------------------------------------------
+
+    def write_heartbeat(self):
+        """SQLite: primary'ye zaman damgası yazar (replica'daki yaşı = gecikme)"""
+        if self.db_type == 'postgresql' or self.primary_write_connection is None:
+            return
+        conn = self.primary_write_connection()
+        if conn is None:
+            return
+        try:
+            conn.execute(f'CREATE TABLE IF NOT EXISTS {HEARTBEAT_TABLE} (id INTEGER PRIMARY KEY, beat_at TEXT)')
+            conn.execute(f'INSERT OR REPLACE INTO {HEARTBEAT_TABLE} (id, beat_at) VALUES (1, ?)',
+                         (self.clock().isoformat(sep=' '),))
+            commit(conn)
+        finally:
+            (self.release_write_connection or (lambda c: c.close()))(conn)
+
+    def _measure_lag(self, replica: Replica) -> float:
+        conn = replica.connect()
+        try:
+            cursor = conn.cursor()
+            if self.db_type == 'postgresql':
+                # WAL alındığı kadar uygulanmışsa replica güncel (boşta primary'de replay zamanı eskir)
+                cursor.execute('''SELECT CASE WHEN NOT pg_is_in_recovery() THEN 0
+                                              WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+                                              ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+                                         END AS lag''')
+                return float(_scalar(cursor.fetchone()) or 0)
+            cursor.execute(f'SELECT beat_at FROM {HEARTBEAT_TABLE} WHERE id = 1')
+            beat = _parse_heartbeat(_scalar(cursor.fetchone()))
+            if beat is None:
+                raise RuntimeError('no heartbeat replicated yet')
+            return max((self.clock() - beat).total_seconds(), 0.0)
+        finally:
+            conn.close()
+
+    def check_replicas(self):
+        """Heartbeat yazar ve her replica'nın gecikmesini günceller"""
+        try:
+            self.write_heartbeat()
+        except Exception as e:
+            logger.warning(f"⚠️ Replica heartbeat write failed: {e}")
+        for replica in self.replicas:
+            try:
+                replica.lag_seconds = self._measure_lag(replica)
+                replica.healthy, replica.last_error = True, None
+            except Exception as e:
+                if replica.healthy:
+                    logger.warning(f"⚠️ Read replica {replica.name} unavailable: {e}")
+                replica.healthy, replica.last_error = False, str(e)
+            replica.checked_at = time.monotonic()
+
+    # ------------------------------------------------------------------
+    # Yönlendirme
+    # ------------------------------------------------------------------
+
+    def _eligible(self) -> List[Replica]:
+        return [replica for replica in self.replicas
+                if replica.healthy and replica.lag_seconds is not None
+                and replica.lag_seconds <= self.max_lag_seconds]
+
+    def choose(self) -> Optional[Replica]:
+        """Okuma için replica; primary kullanılmalıysa None"""
+        if prefer_primary(self.sticky_seconds):
+            self.sticky_reads += 1
+            self.primary_reads += 1
+            return None
+        eligible = self._eligible()
+        if not eligible:
+            if self.replicas:
+                self.fallbacks += 1
+            self.primary_reads += 1
+            return None
+        with self._lock:
+            replica = eligible[self._next % len(eligible)]
+            self._next += 1
+        return replica
+
+    def connection(self, primary: Callable[[], Any]):
+        """Okuma bağlantısı: uygun replica'dan, olmazsa primary() ile"""
+        replica = self.choose()
+        if replica is not None:
+            try:
+                conn = replica.connect()
+                if conn is not None:
+                    replica.reads += 1
+                    self.replica_reads += 1
+                    return conn
+            except Exception as e:
+                replica.healthy, replica.last_error = False, str(e)
+                logger.warning(f"⚠️ Read replica {replica.name} connection failed, using primary: {e}")
+            self.fallbacks += 1
+            self.primary_reads += 1
+        return primary()
+
+    # ------------------------------------------------------------------
+    # Arka plan izleme
+    # ------------------------------------------------------------------
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.check_replicas()
+            self._stop.wait(self.check_interval)
+
+    def start(self):
+        if not self.replicas or (self._thread is not None and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='replica-lag-monitor', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        if self._thread is not None and self._thread.is_alive():
+            self._thread.join(timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'replica_reads': self.replica_reads,
+            'primary_reads': self.primary_reads,
+            'sticky_reads': self.sticky_reads,
+            'fallbacks': self.fallbacks,
+            'max_lag_seconds': self.max_lag_seconds,
+            'replicas': {
+                replica.name: {
+                    'healthy': replica.healthy,
+                    'lag_seconds': None if replica.lag_seconds is None else round(replica.lag_seconds, 3),
+                    'reads': replica.reads,
+                    'error': replica.last_error,
+                }
+                for replica in self.replicas
+            },
+        }
+
+
+def replica_urls_from_env() -> List[str]:
+    """DATABASE_REPLICA_URLS='postgresql://...,postgresql://...' (SQLite'ta dosya yolları)"""
+    return [url.strip() for url in os.getenv('DATABASE_REPLICA_URLS', '').split(',') if url.strip()]
+
+
+# Global router (DatabaseAdapter replica yapılandırıldığında kaydeder)
+_read_router = None
+
+
+def set_read_router(router: Optional[ReadRouter]):
+    global _read_router
+    _read_router = router
+
+
+def get_read_router() -> Optional[ReadRouter]:
+    """Global read router; replica yapılandırılmadıysa None"""
+    return _read_router
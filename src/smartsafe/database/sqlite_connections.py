@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""
+SmartSafe AI - Persistent SQLite Connections
+Sorgu başına sqlite3.connect yerine thread başına kalıcı bağlantı + tek yazıcı
+
+- Her thread kendi bağlantısını tutar (threading.local); kullanımdan önce
+  SELECT 1 ile sağlık kontrolü yapılır, bozuk/kapalı bağlantı yeniden açılır
+- Bağlantılar WAL modunda açılır: okuyucular yazıcıyı, yazıcı okuyucuları
+  beklemez; synchronous=NORMAL, mmap_size, cache_size ve busy_timeout ayarlanır
+- Yazmalar tek bir paylaşılan yazıcı bağlantısından (lock ile) geçer, böylece
+  eşzamanlı detection yazıcıları "database is locked" ile geri çekilmez. Tek
+  yazıcıyı sadece acquire_writer() / writer() kullananlar paylaşır (adapter'da
+  execute_query yazmaları, bulk_insert_records, write-behind, rollup ve partition
+  bakımı); connection() ile alınan thread bağlantısından yapılan yazmalar (ör.
+  blueprint'lerdeki doğrudan INSERT/UPDATE) SQLite'ın kendi kilidi ve busy_timeout
+  ile sıraya girer
+- Çağıranlara bağlantının kendisi değil bir lease verilir: close() (veya okuma
+  lease'inin çöp toplanması) bağlantıyı kapatmaz, thread'e geri bırakır; son lease
+  bırakılırken commit edilmemiş transaction eski davranıştaki gibi geri alınır
+- Yazıcı lease'i sadece açıkça close() ile bırakılır: __del__ başka bir thread'de
+  çalışabilir ve RLock'u sahibi olmayan thread açamaz. Bırakılmadan çöp toplanan
+  yazıcı lease'i hata olarak loglanır ve writer_leaks'te sayılır. Yazıcı kilidi
+  busy_timeout kadar beklenir; süre dolarsa OperationalError yükselir (sızan bir
+  lease diğer yazıcıları sonsuza kadar bekletmez). Yazıcıyı writer() ya da
+  try/finally içinde alın
+- :memory: veritabanında her bağlantı ayrı veritabanıdır - dosya yolu kullanın
+"""
+
+import os
+import threading
+import time
+import sqlite3
+import logging
+import weakref
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class _ConnectionLease:
+    """Kalıcı bağlantının tek kullanımlık görünümü (close() bağlantıyı kapatmaz)"""
+
+    __slots__ = ('_conn', '_release', '_on_leak', '__weakref__')
+
+    def __init__(self, conn: sqlite3.Connection, release, on_leak=None):
+        object.__setattr__(self, '_conn', conn)
+        object.__setattr__(self, '_release', release)
+        # on_leak verilmişse lease çöp toplanırken bırakılmaz, on_leak çağrılır
+        object.__setattr__(self, '_on_leak', on_leak)
+
+    def __getattr__(self, name):
+        conn = object.__getattribute__(self, '_conn')
+        if conn is None:
+            raise sqlite3.ProgrammingError("Cannot operate on a closed database.")
+        return getattr(conn, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._conn, name, value)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # sqlite3.Connection context manager davranışı: commit / rollback, kapatmaz
+        return self._conn.__exit__(exc_type, exc, tb)
+
+    def close(self):
+        release = self._release
+        if release is not None:
+            object.__setattr__(self, '_release', None)
+            object.__setattr__(self, '_conn', None)
+            release()
+
+    def __del__(self):
+        try:
+            if self._release is None:
+                return
+            if self._on_leak is not None:
+                self._on_leak()
+            else:
+                self.close()
+        except Exception:
+            pass
+
+
+class _Connection(sqlite3.Connection):
+    """sqlite3.Connection weakref desteklemez - alt sınıf WeakSet'te izlenebilir"""
+
+
+class _ThreadState:
+    __slots__ = ('conn', 'depth')
+
+    def __init__(self):
+        self.conn: Optional[sqlite3.Connection] = None
+        self.depth = 0
+
+
+class SQLiteConnectionManager:
+    """Thread başına kalıcı okuma bağlantısı + kilitli tek yazıcı bağlantısı"""
+
+    def __init__(self, db_path: str, busy_timeout_ms: int = 5000, cache_size_kb: int = 16384,
+                 mmap_size: int = 256 * 1024 * 1024, synchronous: str = 'NORMAL', wal: bool = True):
+        self.db_path = db_path
+        self.busy_timeout_ms = busy_timeout_ms
+        self.cache_size_kb = cache_size_kb
+        self.mmap_size = mmap_size
+        self.synchronous = synchronous
+        self.wal = wal
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._writer_lock = threading.RLock()
+        self._writer: Optional[sqlite3.Connection] = None
+        self._writer_depth = 0
+        self._connections = weakref.WeakSet()
+        self.journal_mode: Optional[str] = None
+
+        # İstatistikler
+        self.connects = 0
+        self.reconnects = 0
+        self.acquires = 0
+        self.write_acquires = 0
+        self.write_wait_ms = 0.0
+        self.writer_leaks = 0
+        self.write_timeouts = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=self.busy_timeout_ms / 1000.0, check_same_thread=False,
+                               factory=_Connection)
+        conn.row_factory = sqlite3.Row
+        if self.wal:
+            mode = conn.execute('PRAGMA journal_mode=WAL').fetchone()[0]
+            if self.journal_mode != mode:
+                self.journal_mode = mode
+                if mode.lower() != 'wal':
+                    logger.warning(f"⚠️ SQLite WAL not available for {self.db_path} (journal_mode={mode})")
+        conn.execute(f'PRAGMA synchronous={self.synchronous}')
+        conn.execute(f'PRAGMA busy_timeout={int(self.busy_timeout_ms)}')
+        conn.execute(f'PRAGMA cache_size=-{int(self.cache_size_kb)}')
+        conn.execute(f'PRAGMA mmap_size={int(self.mmap_size)}')
+        conn.execute('PRAGMA temp_store=MEMORY')
+        with self._lock:
+            self.connects += 1
+            self._connections.add(conn)
+        return conn
+
+    @staticmethod
+    def _healthy(conn: Optional[sqlite3.Connection]) -> bool:
+        if conn is None:
+            return False
+        try:
+            conn.execute('SELECT 1').fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def _reset(self, conn: sqlite3.Connection):
+        """Son kullanıcı bıraktığında: yarım kalan transaction'ı geri al, row_factory'yi düzelt"""
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            conn.row_factory = sqlite3.Row
+        except sqlite3.Error as e:
+            logger.warning(f"⚠️ SQLite connection reset failed: {e}")
+
+    def connection(self):
+        """Bu thread'in kalıcı bağlantısı (lease olarak)"""
+        state = getattr(self._local, 'state', None)
+        if state is None:
+            state = self._local.state = _ThreadState()
+        if state.depth == 0 and not self._healthy(state.conn):
+            if state.conn is not None:
+                self.reconnects += 1
+                logger.warning(f"⚠️ SQLite connection unhealthy, reconnecting ({self.db_path})")
+                self._close_quietly(state.conn)
+            state.conn = self._connect()
+        state.depth += 1
+        self.acquires += 1
+        conn = state.conn
+
+        def release():
+            # Lease başka thread'de çöp toplanabilir - thread-local'e değil state'e bağlı
+            state.depth -= 1
+            if state.depth == 0:
+                self._reset(conn)
+
+        return _ConnectionLease(conn, release)
+
+    def acquire_writer(self, timeout: Optional[float] = None):
+        """Paylaşılan yazıcı bağlantısını kilitleyip lease olarak döndürür
+
+        Kilit timeout (varsayılan busy_timeout) içinde alınamazsa sqlite3.OperationalError.
+        """
+        started = time.perf_counter()
+        if timeout is None:
+            timeout = self.busy_timeout_ms / 1000.0
+        if not self._writer_lock.acquire(timeout=timeout):
+            self.write_timeouts += 1
+            raise sqlite3.OperationalError(
+                f"database is locked: SQLite writer busy for {timeout:.1f}s ({self.db_path})")
+        try:
+            if self._writer_depth == 0 and not self._healthy(self._writer):
+                if self._writer is not None:
+                    self.reconnects += 1
+                    logger.warning(f"⚠️ SQLite writer connection unhealthy, reconnecting ({self.db_path})")
+                    self._close_quietly(self._writer)
+                self._writer = self._connect()
+            self._writer_depth += 1
+        except Exception:
+            self._writer_lock.release()
+            raise
+        self.write_acquires += 1
+        self.write_wait_ms += (time.perf_counter() - started) * 1000
+        writer = self._writer
+
+        def release():
+            self._writer_depth -= 1
+            if self._writer_depth == 0:
+                self._reset(writer)
+            self._writer_lock.release()
+
+        return _ConnectionLease(writer, release, on_leak=self._writer_leaked)
+
+    def _writer_leaked(self):
+        self.writer_leaks += 1
+        logger.error(f"❌ SQLite writer lease was garbage collected without close() - "
+                     f"writer lock stays held ({self.db_path})")
+
+    @contextmanager
+    def writer(self) -> Iterator[Any]:
+        """with manager.writer() as conn: - başarıda commit, hatada rollback"""
+        lease = self.acquire_writer()
+        try:
+            yield lease
+            lease.commit()
+        except Exception:
+            lease.rollback()
+            raise
+        finally:
+            lease.close()
+
+    @staticmethod
+    def _close_quietly(conn: sqlite3.Connection):
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+    def close_all(self):
+        """Tüm bağlantıları kapatır (test / kapanış); thread'ler sonraki kullanımda yeniden açar"""
+        with self._writer_lock:
+            with self._lock:
+                connections = list(self._connections)
+                self._connections = weakref.WeakSet()
+            for conn in connections:
+                self._close_quietly(conn)
+            self._writer = None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            open_connections = len(self._connections)
+        return {
+            'db_path': self.db_path,
+            'journal_mode': self.journal_mode,
+            'open_connections': open_connections,
+            'connects': self.connects,
+            'reconnects': self.reconnects,
+            'acquires': self.acquires,
+            'write_acquires': self.write_acquires,
+            'avg_write_wait_ms': round(self.write_wait_ms / self.write_acquires, 3) if self.write_acquires else 0.0,
+            'writer_leaks': self.writer_leaks,
+            'write_timeouts': self.write_timeouts,
+        }
+
+
+# Veritabanı dosyası başına global manager
+_sqlite_connection_managers: Dict[str, SQLiteConnectionManager] = {}
+_managers_lock = threading.Lock()
+
+
+def get_sqlite_connection_manager(db_path: str) -> SQLiteConnectionManager:
+    """db_path için global SQLite connection manager'ı döndürür"""
+    manager = _sqlite_connection_managers.get(db_path)
+    if manager is None:
+        with _managers_lock:
+            manager = _sqlite_connection_managers.get(db_path)
+            if manager is None:
+                manager = SQLiteConnectionManager(
+                    db_path,
+                    busy_timeout_ms=int(os.getenv('SMARTSAFE_SQLITE_BUSY_TIMEOUT_MS', '5000')),
+                    cache_size_kb=int(os.getenv('SMARTSAFE_SQLITE_CACHE_KB', '16384')),
+                    mmap_size=int(os.getenv('SMARTSAFE_SQLITE_MMAP_BYTES', str(256 * 1024 * 1024))),
+                    synchronous=os.getenv('SMARTSAFE_SQLITE_SYNCHRONOUS', 'NORMAL'),
+                )
+                _sqlite_connection_managers[db_path] = manager
+    return manager
+
+
+def sqlite_connection_stats() -> Dict[str, Dict[str, Any]]:
+    """Açık tüm manager'ların istatistikleri"""
+    return {path: manager.stats() for path, manager in list(_sqlite_connection_managers.items())}
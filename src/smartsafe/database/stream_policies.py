@@ -0,0 +1,27 @@
+#!/usr/bin/env python3
+"""
+SmartSafe AI - DVR Kanal Stream Politikaları
+dvr_channels.stream_policy kolonunun geçerli değerleri ve normalizasyonu
+
+Değerler veritabanı katmanına aittir; DVR entegrasyonu ve API bu modülden okur.
+"""
+
+from typing import Optional
+
+# Kanal politikaları
+#   dual: detection substream'de, ihlal snapshot'ı main stream'den (varsayılan)
+#   main: her şey main stream'de (eski davranış)
+#   sub:  her şey substream'de (bant genişliği kısıtlı sahalar)
+STREAM_POLICY_DUAL = 'dual'
+STREAM_POLICY_MAIN = 'main'
+STREAM_POLICY_SUB = 'sub'
+STREAM_POLICIES = (STREAM_POLICY_DUAL, STREAM_POLICY_MAIN, STREAM_POLICY_SUB)
+DEFAULT_STREAM_POLICY = STREAM_POLICY_DUAL
+
+
+def normalize_stream_policy(policy: Optional[str]) -> str:
+    """Geçersiz/boş politika değerlerini varsayılana çevirir"""
+    if not policy:
+        return DEFAULT_STREAM_POLICY
+    policy = str(policy).strip().lower()
+    return policy if policy in STREAM_POLICIES else DEFAULT_STREAM_POLICY
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+SmartSafe AI - Transaction Helpers
+Bağlantı türünden bağımsız commit kararı (sqlite3, psycopg2, secure connector, lease)
+
+- Secure connector PostgreSQL bağlantıyı autocommit açık verebilir: commit gerekmez,
+  çok ifadeli işler transaction() ile tek transaction olarak yazılır
+- sqlite3 (Python 3.12+) legacy modda autocommit=-1 döner; sadece gerçek True
+  autocommit sayılır
+"""
+
+from contextlib import contextmanager
+
+
+def is_autocommit(conn) -> bool:
+    """Bağlantı her ifadeyi kendisi commit ediyor mu"""
+    return getattr(conn, 'autocommit', False) is True
+
+
+def commit(conn):
+    """Autocommit değilse transaction'ı commit eder"""
+    if not is_autocommit(conn):
+        conn.commit()
+
+
+@contextmanager
+def autocommit(conn):
+    """Blok autocommit modunda çalışır (transaction içinde çalışamayan ifadeler için,
+    ör. CREATE INDEX CONCURRENTLY); açık transaction önce commit edilir"""
+    restore = not is_autocommit(conn)
+    if restore:
+        conn.commit()
+        conn.autocommit = True
+    try:
+        yield conn
+    finally:
+        if restore:
+            try:
+                conn.autocommit = False
+            except Exception:
+                pass
+
+
+@contextmanager
+def transaction(conn):
+    """Blok tek transaction'da çalışır (hata olursa geri alınır)
+
+    Autocommit bağlantıda blok süresince autocommit kapatılır; aksi halde her
+    ifade ayrı commit edilir ve yarıda kalan iş kısmen yazılmış olur.
+    """
+    restore = is_autocommit(conn)
+    if restore:
+        conn.autocommit = False
+    try:
+        yield conn
+        conn.commit()
+    except Exception:
+        try:
+            conn.rollback()
+        except Exception:
+            pass
+        raise
+    finally:
+        if restore:
+            try:
+                conn.autocommit = True
+            except Exception:
+                pass
@@ -216,8 +216,10 @@ class PoseAwarePPEDetector:
             start_time = time.time()
             
             # 🔧 Ensure frame is on CPU for model inference
+            # Model girdiyi değiştirmez (letterbox yeni array üretir); read-only ring
+            # görünümleri de kopyalanmadan kullanılabilir
             if isinstance(frame, np.ndarray):
-                frame_for_inference = frame.copy()
+                frame_for_inference = np.ascontiguousarray(frame)
             else:
                 frame_for_inference = frame
             
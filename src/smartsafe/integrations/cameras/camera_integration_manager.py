@@ -23,6 +23,8 @@ import xml.etree.ElementTree as ET
 # Violation tracking imports
 from src.smartsafe.detection.violation_tracker import get_violation_tracker
 from src.smartsafe.detection.snapshot_manager import get_snapshot_manager
+from src.smartsafe.integrations.dvr.rtsp_prober import mask_credentials, probe_channels_sync, probe_url_sync
+from src.smartsafe.services.tenant_cache import get_tenant_config_cache
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -513,10 +515,47 @@ class DVRManager:
         logger.info(f"📺 Generic discovery: {len(channels)} channels configured")
         return channels
     
+    def _probe_hikvision_channels(self, dvr_config: DVRConfig) -> List[DVRChannel]:
+        """Find Hikvision channels with RTSP DESCRIBE (all channels probed concurrently)"""
+        base_url = dvr_config.get_rtsp_base_url()
+        channel_urls = {
+            channel_num: [
+                f"{base_url}/Streaming/Channels/{channel_num}01",
+                f"{base_url}/ISAPI/Streaming/channels/{channel_num}01"
+            ]
+            for channel_num in range(1, dvr_config.max_channels + 1)
+        }
+        results = probe_channels_sync(channel_urls, timeout=min(dvr_config.timeout, 3))
+        
+        channels = []
+        for channel_num, probe in sorted(results.items()):
+            if not probe.ok:
+                continue
+            channels.append(DVRChannel(
+                channel_id=f"{dvr_config.dvr_id}_CH{channel_num:02d}",
+                name=f"Hikvision Channel {channel_num}",
+                dvr_id=dvr_config.dvr_id,
+                channel_number=channel_num,
+                resolution=probe.resolution or (1920, 1080),
+                fps=int(probe.fps) or 25,
+                rtsp_path=probe.url[len(base_url):],
+                http_path=f"/ISAPI/Streaming/channels/{channel_num}01/picture"
+            ))
+        return channels
+    
     def _discover_hikvision_channels(self, dvr_config: DVRConfig) -> List[DVRChannel]:
         """Discover channels on Hikvision DVR"""
         channels = []
         
+        # RTSP DESCRIBE ile gerçekten yayın yapan kanallar ve çözünürlükleri
+        try:
+            channels = self._probe_hikvision_channels(dvr_config)
+            if channels:
+                logger.info(f"📺 Hikvision RTSP discovery: {len(channels)} channels found")
+                return channels
+        except Exception as e:
+            logger.warning(f"⚠️ Hikvision RTSP probe failed, falling back to ISAPI: {e}")
+        
         try:
             # Hikvision API endpoint for device info
             api_url = f"{dvr_config.get_api_url()}/ISAPI/System/deviceInfo"
@@ -597,13 +636,13 @@ class DVRManager:
                 first_channel = self.dvr_channels[dvr_config.dvr_id][0]
                 rtsp_url = first_channel.get_rtsp_url(dvr_config)
                 
-                cap = cv2.VideoCapture(rtsp_url)
-                if cap.isOpened():
-                    ret, frame = cap.read()
-                    cap.release()
-                    if ret:
-                        logger.info(f"✅ RTSP test successful: {rtsp_url}")
-                        return True
+                # DESCRIBE: decoder açmadan kanalın yayın verdiğini doğrular
+                probe = probe_url_sync(rtsp_url, timeout=min(dvr_config.timeout, 5))
+                if probe.ok:
+                    logger.info(f"✅ RTSP test successful: {mask_credentials(rtsp_url)} "
+                                f"({probe.codec or '?'} {probe.width}x{probe.height}, {probe.elapsed_ms:.0f} ms)")
+                    return True
+                logger.warning(f"⚠️ RTSP DESCRIBE failed: {mask_credentials(rtsp_url)} -> {probe.error}")
             
             logger.warning(f"⚠️ RTSP test failed for {dvr_config.ip_address}")
             return False
@@ -1532,6 +1571,8 @@ class ProfessionalCameraManager:
         self.ppe_detector = None
         self.detection_results: Dict[str, Dict] = {}
         self.detection_frequency = 5  # Her 5 frame'de bir detection (daha sık)
+        self._camera_company_ids: Dict[str, str] = {}  # camera_id -> company_id (detection kayıtları için)
+        self._camera_company_misses: Dict[str, float] = {}  # camera_id -> son başarısız arama (monotonic)
         
         # Performance tracking
         self.fps_counters: Dict[str, List[float]] = {}
@@ -1895,8 +1936,8 @@ class ProfessionalCameraManager:
                 ret, frame = cap.read()
                 
                 if ret and frame is not None:
-                    # Store frame
-                    self.frame_buffers[camera_id] = frame.copy()
+                    # Store frame - cap.read() her çağrıda yeni array döndürür, kopyaya gerek yok
+                    self.frame_buffers[camera_id] = frame
                     self.last_frames[camera_id] = datetime.now()
                     
                     # Update statistics
@@ -2501,28 +2542,11 @@ class ProfessionalCameraManager:
                     # Fall through to standard detection
             
             # 🎯 FAZ 1-2: STANDARD ANATOMICAL DETECTION (FALLBACK)
-            # Sector resolution: fetch from DB if not explicitly provided
+            # Sector resolution: tenant snapshot'tan (frame başına DB sorgusu yok)
             if not sector:
-                try:
-                    if not company_id:
-                        # Attempt to resolve company_id from camera mapping
-                        from src.smartsafe.database.database_adapter import get_db_adapter
-                        db_local = get_db_adapter()
-                        # Reuse existing helper if available; fallback to cameras table scan
-                        camera_info = db_local.get_camera_by_id(camera_id, company_id or '') if hasattr(db_local, 'get_camera_by_id') else None
-                        if camera_info and camera_info.get('company_id'):
-                            company_id = camera_info.get('company_id')
-                    if company_id:
-                        from src.smartsafe.database.database_adapter import get_db_adapter
-                        db_local = get_db_adapter()
-                        company = db_local.get_company(company_id) if hasattr(db_local, 'get_company') else None
-                        if company:
-                            if isinstance(company, dict):
-                                sector = company.get('sector') or sector
-                            elif isinstance(company, (list, tuple)) and len(company) >= 5:
-                                sector = company[4] or sector  # typical index for sector
-                except Exception as sector_resolve_error:
-                    logger.warning(f"⚠️ Sector resolve failed for camera {camera_id}: {sector_resolve_error}")
+                company_id = company_id or self._resolve_camera_company(camera_id)
+                if company_id:
+                    sector = get_tenant_config_cache().snapshot(company_id).sector
             if not sector:
                 logger.warning(f"⚠️ Sector not set for camera {camera_id}, using company configuration fallback if any")
             if self.ppe_detector is None:
@@ -2864,31 +2888,9 @@ class ProfessionalCameraManager:
                             try:
                                 violation_tracker = get_violation_tracker()
                                 
-                                # Company ID'yi al (parametre veya database'den)
+                                # Company ID'yi al (parametre veya cache'lenmiş kamera eşlemesi)
                                 if company_id is None:
-                                    from src.smartsafe.database.database_adapter import get_db_adapter
-                                    db = get_db_adapter()
-                                    # Önce camera_id ile company_id'yi bulmaya çalış (tüm company'lerde ara)
-                                    try:
-                                        # SQLite için: company_id olmadan arama yap
-                                        if db.db_type == 'sqlite':
-                                            query = 'SELECT company_id FROM cameras WHERE camera_id = ? AND status != ? LIMIT 1'
-                                        else:  # PostgreSQL
-                                            query = 'SELECT company_id FROM cameras WHERE camera_id = %s AND status != %s LIMIT 1'
-                                        
-                                        result = db.execute_query(query, (camera_id, 'deleted'), fetch_all=False)
-                                        if result and isinstance(result, dict):
-                                            company_id = result.get('company_id', 'UNKNOWN')
-                                        elif result:
-                                            # Eğer dict değilse (fallback)
-                                            company_id = str(result).strip() if result else 'UNKNOWN'
-                                        else:
-                                            company_id = 'UNKNOWN'
-                                    except Exception as db_error:
-                                        logger.warning(f"⚠️ Company ID bulunamadı: {db_error}, UNKNOWN kullanılıyor")
-                                        import traceback
-                                        logger.debug(f"⚠️ Company ID traceback: {traceback.format_exc()}")
-                                        company_id = 'UNKNOWN'
+                                    company_id = self._resolve_camera_company(camera_id) or 'UNKNOWN'
                                 
                                 if company_id == 'UNKNOWN':
                                     logger.warning(f"⚠️ Company ID UNKNOWN olarak kullanılıyor - camera_id: {camera_id}")
@@ -3010,29 +3012,12 @@ class ProfessionalCameraManager:
                             except Exception as vt_error:
                                 logger.error(f"❌ Violation tracker error: {vt_error}")
                 
-                # Sektöre göre gereklilik seti (varsa DB'den oku)
+                # Şirketin zorunlu PPE seti (tenant snapshot), konfig yoksa helmet + yelek
                 required_set = {'helmet','safety_vest'}
-                try:
-                    from src.smartsafe.database.database_adapter import get_db_adapter
-                    db_local = get_db_adapter()
-                    company = db_local.get_company(company_id) if company_id else None
-                    if company:
-                        import json
-                        rp = None
-                        if isinstance(company, dict):
-                            rp = company.get('required_ppe') or company.get('ppe_config')
-                        elif isinstance(company, (list, tuple)):
-                            # sütun ismi bilinmiyorsa atla
-                            rp = None
-                        if rp:
-                            if isinstance(rp, str):
-                                rp = json.loads(rp)
-                            if isinstance(rp, dict) and 'required' in rp:
-                                required_set = set(rp['required'])
-                            elif isinstance(rp, list):
-                                required_set = set(rp)
-                except Exception:
-                    pass
+                if company_id and company_id != 'UNKNOWN':
+                    tenant = get_tenant_config_cache().snapshot(company_id)
+                    if tenant.required_ppe is not None:
+                        required_set = set(tenant.required_ppe)
 
                 # Compliance rate hesapla (sadece required olanlara göre)
                 # Minimum gereklilik: required_set'teki öğeler
@@ -3109,39 +3094,51 @@ class ProfessionalCameraManager:
         """Detection overlay bilgilerini al"""
         return self.detection_results.get(camera_id)
     
-    def save_detection_to_database(self, camera_id: str, detection_result: Dict, sector: str):
-        """Detection sonucunu database'e kaydet"""
+    def _resolve_camera_company(self, camera_id: str) -> Optional[str]:
+        """camera_id -> company_id (cache'lenir; bulunamayan kamera 60 sn'de bir tekrar sorgulanır)"""
+        company_id = self._camera_company_ids.get(camera_id)
+        if company_id:
+            return company_id
+        missed_at = self._camera_company_misses.get(camera_id)
+        if missed_at is not None and time.monotonic() - missed_at < 60:
+            return None
         try:
             from src.smartsafe.database.database_adapter import get_db_adapter
             db = get_db_adapter()
+            # Camera_id ile company_id'yi bul (tüm company'lerde ara)
+            if db.db_type == 'sqlite':
+                query = 'SELECT company_id FROM cameras WHERE camera_id = ? AND status != ? LIMIT 1'
+            else:  # PostgreSQL
+                query = 'SELECT company_id FROM cameras WHERE camera_id = %s AND status != %s LIMIT 1'
+            
+            result = db.execute_query(query, (camera_id, 'deleted'), fetch_all=False)
+            if result and isinstance(result, dict):
+                company_id = result.get('company_id')
+            elif result:
+                # Eğer dict değilse (fallback)
+                company_id = str(result).strip()
+        except Exception as db_error:
+            logger.warning(f"⚠️ Company ID bulunamadı: {db_error}")
+            import traceback
+            logger.debug(f"⚠️ Company ID traceback: {traceback.format_exc()}")
+        
+        if company_id:
+            self._camera_company_ids[camera_id] = company_id
+            self._camera_company_misses.pop(camera_id, None)
+        else:
+            self._camera_company_misses[camera_id] = time.monotonic()
+        return company_id or None
+    
+    def save_detection_to_database(self, camera_id: str, detection_result: Dict, sector: str):
+        """Detection sonucunu database'e kaydet (write-behind - detection thread'i DB'yi beklemez)"""
+        try:
+            from src.smartsafe.services.write_behind import get_write_behind_queue
             
-            # Company ID'yi detection_result'tan al veya database'den bul
-            company_id = detection_result.get('company_id')
+            # Company ID'yi detection_result'tan al, yoksa önceden çözülmüş değeri veya database'i kullan
+            company_id = detection_result.get('company_id') or self._camera_company_ids.get(camera_id)
             
             if not company_id:
-                # Camera bilgisinden company_id bul (tüm company'lerde ara)
-                try:
-                    from src.smartsafe.database.database_adapter import get_db_adapter
-                    db = get_db_adapter()
-                    # Camera_id ile company_id'yi bul
-                    if db.db_type == 'sqlite':
-                        query = 'SELECT company_id FROM cameras WHERE camera_id = ? AND status != ? LIMIT 1'
-                    else:  # PostgreSQL
-                        query = 'SELECT company_id FROM cameras WHERE camera_id = %s AND status != %s LIMIT 1'
-                    
-                    result = db.execute_query(query, (camera_id, 'deleted'), fetch_all=False)
-                    if result and isinstance(result, dict):
-                        company_id = result.get('company_id', 'UNKNOWN')
-                    elif result:
-                        # Eğer dict değilse (fallback)
-                        company_id = str(result).strip() if result else 'UNKNOWN'
-                    else:
-                        company_id = 'UNKNOWN'
-                except Exception as db_error:
-                    logger.warning(f"⚠️ Company ID bulunamadı: {db_error}")
-                    import traceback
-                    logger.debug(f"⚠️ Company ID traceback: {traceback.format_exc()}")
-                    company_id = 'UNKNOWN'
+                company_id = self._resolve_camera_company(camera_id) or 'UNKNOWN'
             
             # Detection data hazırla
             detection_data = {
@@ -3155,9 +3152,23 @@ class ProfessionalCameraManager:
                 'total_people': detection_result.get('total_people', detection_result.get('people_detected', 0))
             }
             
-            # Database'e kaydet
-            db.add_camera_detection_result(detection_data)
-            logger.debug(f"💾 Detection saved to database: {camera_id}")
+            if company_id == 'UNKNOWN':
+                # Şirketi çözülemeyen kamera: companies FK'sı olmayan satır kuyruğu tıkar
+                logger.debug(f"⚠️ Detection skipped, company unknown: {camera_id}")
+                return
+            self._camera_company_ids[camera_id] = company_id
+            
+            # Database kuyruğuna ekle (add_camera_detection_result ile aynı kolonlar); zaman yerel
+            # saatle verilir - SQLite varsayılanı UTC'dir, rapor saat kovaları kayardı
+            get_write_behind_queue().enqueue(
+                'detections',
+                ('company_id', 'camera_id', 'detection_type', 'confidence',
+                 'people_detected', 'ppe_compliant', 'violations_count', 'total_people', 'timestamp'),
+                (detection_data['company_id'], detection_data['camera_id'], detection_data['detection_type'],
+                 detection_data['confidence'], detection_data['people_detected'], detection_data['ppe_compliant'],
+                 detection_data['violations_count'], detection_data['total_people'], datetime.now())
+            )
+            logger.debug(f"💾 Detection queued for database: {camera_id}")
             
         except Exception as e:
             logger.error(f"❌ Save detection to database error: {e}")
@@ -19,6 +19,16 @@ from src.smartsafe.integrations.cameras.ppe_detection_manager import PPEDetectio
 from src.smartsafe.database.database_adapter import get_db_adapter
 from src.smartsafe.detection.violation_tracker import get_violation_tracker
 from src.smartsafe.detection.snapshot_manager import get_snapshot_manager
+from src.smartsafe.integrations.dvr.dvr_stream_handler import get_stream_handler
+from src.smartsafe.integrations.dvr.evidence_grabber import MainStreamGrabber
+from src.smartsafe.database.stream_policies import normalize_stream_policy
+from src.smartsafe.integrations.dvr.stream_policy import resolve_policy_urls, scale_bbox
+from src.smartsafe.services.detection_log import get_detection_log
+from src.smartsafe.services.event_broker import EVENT_OVERLAY, get_event_broker, overlay_payload
+from src.smartsafe.services.latency_tracer import (
+    STAGE_ASSOCIATION, STAGE_DB_ENQUEUE, STAGE_DEQUEUE, STAGE_INFERENCE_END, STAGE_INFERENCE_START,
+    get_latency_tracer
+)
 
 logger = logging.getLogger(__name__)
 
@@ -39,8 +49,12 @@ class DVRStreamProcessor:
         
         logger.info("✅ DVR Stream Processor initialized")
     
-    def start_dvr_detection(self, dvr_id: str, channel: int, company_id: str, detection_mode: Optional[str] = None, use_sh17: bool = False) -> Dict[str, Any]:
-        """DVR kanalından PPE detection başlatır"""
+    def start_dvr_detection(self, dvr_id: str, channel: int, company_id: str, detection_mode: Optional[str] = None, use_sh17: bool = False, stream_policy: Optional[str] = None) -> Dict[str, Any]:
+        """DVR kanalından PPE detection başlatır
+        
+        stream_policy: 'dual' (detection substream'de, ihlal snapshot'ı main stream'den),
+        'main' veya 'sub'. Verilmezse kanalın kayıtlı politikası kullanılır.
+        """
         
         try:
             # Stream ID oluştur
@@ -51,11 +65,24 @@ class DVRStreamProcessor:
             if not dvr_system:
                 raise RuntimeError(f"DVR system not found for company={company_id} dvr_id={dvr_id}")
 
-            rtsp_url = (
-                f"rtsp://{dvr_system['ip_address']}:{dvr_system.get('rtsp_port', 554)}"
-                f"/user={dvr_system['username']}&password={dvr_system['password']}"
-                f"&channel={channel}&stream=0.sdp"
+            # Kanal politikası: istek > kanal ayarı > varsayılan (dual)
+            if not stream_policy:
+                stream_policy = self.db_adapter.get_dvr_channel_stream_policy(company_id, dvr_id, channel)
+            stream_policy = normalize_stream_policy(stream_policy)
+            
+            # Öğrenilmiş marka (ilk bağlantıda tespit edilen) kayıtlı dvr_type'tan daha güvenilir
+            stream_urls = get_stream_handler().get_dual_stream_urls(
+                dvr_system['ip_address'],
+                dvr_system['username'],
+                dvr_system['password'],
+                dvr_system.get('rtsp_port', 554),
+                channel,
+                brand=dvr_system.get('rtsp_brand') or dvr_system.get('dvr_type'),
+                company_id=company_id,
+                dvr_id=dvr_id
             )
+            policy_urls = resolve_policy_urls(stream_urls, stream_policy)
+            rtsp_url = policy_urls['detection'][0]
             
             # Resolve sector/detection_mode from company configuration when not provided
             if not detection_mode:
@@ -69,12 +96,16 @@ class DVRStreamProcessor:
                 except Exception as sec_err:
                     logger.warning(f"⚠️ DVR sector resolve failed for company {company_id}: {sec_err}")
             logger.info(f"🎥 Starting DVR detection: {stream_id} - {rtsp_url}")
-            logger.info(f"🔧 Detection System: {'SH17' if use_sh17 else 'Klasik'}")
+            logger.info(f"🔧 Detection System: {'SH17' if use_sh17 else 'Klasik'} - Stream policy: {stream_policy}")
             
             # Detection thread'i başlat
             detection_thread = threading.Thread(
                 target=self.process_dvr_stream,
                 args=(stream_id, rtsp_url, company_id, detection_mode, use_sh17),
+                kwargs={
+                    'alternative_urls': policy_urls['detection'][1:],
+                    'snapshot_urls': policy_urls['snapshot']
+                },
                 daemon=True
             )
             
@@ -90,19 +121,27 @@ class DVRStreamProcessor:
                 "rtsp_url": rtsp_url,
                 "channel": channel,
                 "detection_mode": detection_mode,
-                "detection_system": "SH17" if use_sh17 else "Klasik"
+                "detection_system": "SH17" if use_sh17 else "Klasik",
+                "stream_policy": stream_policy
             }
             
         except Exception as e:
             logger.error(f"❌ DVR detection start error: {e}")
             return {"success": False, "error": str(e)}
     
-    def process_dvr_stream(self, stream_id: str, rtsp_url: str, company_id: str, detection_mode: str, use_sh17: bool = False):
-        """RTSP stream'i işler ve PPE detection yapar"""
+    def process_dvr_stream(self, stream_id: str, rtsp_url: str, company_id: str, detection_mode: str, use_sh17: bool = False,
+                           alternative_urls: Optional[List[str]] = None, snapshot_urls: Optional[List[str]] = None):
+        """RTSP stream'i işler ve PPE detection yapar
+        
+        snapshot_urls verilirse (dual-stream politikası) detection düşük çözünürlüklü
+        stream'de yapılır; main stream arka planda açık tutulur ve yeni ihlalin kanıt
+        snapshot'ı detection frame'inin zamanına en yakın main stream frame'inden kesilir.
+        """
         
         logger.info(f"🔄 Processing DVR stream: {stream_id}")
         logger.info(f"🔧 Detection System: {'SH17' if use_sh17 else 'Klasik'}")
         
+        evidence_grabber = None
         try:
             # 🎯 PRODUCTION-GRADE: RTSP stream açma - Fallback mekanizması ile
             cap = cv2.VideoCapture(rtsp_url)
@@ -112,11 +151,12 @@ class DVRStreamProcessor:
                 logger.info(f"🔄 Trying alternative RTSP formats...")
                 
                 # Alternative RTSP URLs'leri dene
-                alternative_urls = [
-                    rtsp_url.replace('&', '?'),  # & yerine ? kullan
-                    rtsp_url.replace('stream=0.sdp', 'stream=1'),  # stream parametresi değiştir
-                    rtsp_url.split('&stream')[0],  # stream parametresini kaldır
-                ]
+                if alternative_urls is None:
+                    alternative_urls = [
+                        rtsp_url.replace('&', '?'),  # & yerine ? kullan
+                        rtsp_url.replace('stream=0.sdp', 'stream=1'),  # stream parametresi değiştir
+                        rtsp_url.split('&stream')[0],  # stream parametresini kaldır
+                    ]
                 
                 for alt_url in alternative_urls:
                     logger.info(f"🔄 Trying alternative URL: {alt_url}")
@@ -134,6 +174,13 @@ class DVRStreamProcessor:
             # Stream'i active streams'e ekle
             self.active_streams[stream_id] = cap
             
+            # Detection zaten main stream'de çalışıyorsa (substream açılamadı) ayrıca main stream açma
+            if snapshot_urls and rtsp_url in snapshot_urls:
+                logger.info(f"ℹ️ {stream_id}: substream açılamadı, detection main stream'de - ek snapshot stream'i kullanılmayacak")
+                snapshot_urls = None
+            if snapshot_urls:
+                evidence_grabber = MainStreamGrabber(stream_id, snapshot_urls).start()
+            
             frame_count = 0
             detection_count = 0
             start_time = time.time()
@@ -148,6 +195,8 @@ class DVRStreamProcessor:
                         logger.warning(f"⚠️ Failed to read frame from {stream_id}")
                         time.sleep(1)
                         continue
+                    frame_ts = time.time()
+                    captured_at = time.monotonic()
                     
                     frame_count += 1
                     
@@ -155,8 +204,12 @@ class DVRStreamProcessor:
                     if frame_count % self.frame_skip != 0:
                         continue
                     
+                    trace = get_latency_tracer().start(stream_id, frame_count, captured_at)
+                    trace.mark(STAGE_DEQUEUE)
+                    
                     # 🎯 PPE Detection yap - PRODUCTION-GRADE SH17 veya Klasik sistem
                     detection_start = time.time()
+                    trace.mark(STAGE_INFERENCE_START)
                     try:
                         if use_sh17 and hasattr(self, 'sh17_manager'):
                             # 🎯 PRODUCTION-GRADE SH17 detection - Lowered confidence threshold
@@ -170,13 +223,27 @@ class DVRStreamProcessor:
                             ppe_result = self.ppe_manager.detect_ppe_comprehensive(frame, detection_mode)
                             detection_time = time.time() - detection_start
                         
+                        trace.mark(STAGE_INFERENCE_END)
+                        
                         if ppe_result and ppe_result.get('success', False):
                             detection_count += 1
                             
+                            # Her inference sonucu ikili detection günlüğüne (replay / denetim)
+                            get_detection_log().append(
+                                company_id, stream_id, frame_ts, ppe_result.get('detections') or [],
+                                people=ppe_result.get('total_people', 0),
+                                compliant=ppe_result.get('compliant_people', 0),
+                                violations=ppe_result.get('violations_count', 0),
+                                frame_size=(frame.shape[1], frame.shape[0]), seq=frame_count,
+                                inference_ms=detection_time * 1000
+                            )
+                            
                             # 🚨 VIOLATION TRACKER ENTEGRASYONU
                             # DVR stream'den gelen ihlalleri event-based olarak takip et
                             try:
                                 violations_list = ppe_result.get('ppe_violations', [])
+                                evidence_frame = None  # Main stream frame'i - bu detection için en fazla bir kez aranır
+                                evidence_looked_up = False
                                 
                                 for person_violation in violations_list:
                                     person_bbox = person_violation.get('bbox', [])
@@ -212,15 +279,27 @@ class DVRStreamProcessor:
                                                 self.db_adapter.add_violation_event(new_violation)
                                                 continue
                                             
-                                            # Snapshot çek
+                                            # Snapshot çek - dual-stream'de main stream'den yüksek çözünürlüklü kanıt
+                                            snapshot_frame, snapshot_bbox = frame, person_bbox
+                                            if evidence_grabber is not None:
+                                                if not evidence_looked_up:
+                                                    # Bloklamaz: arka planda okunan frame'lerden detection anına en yakını
+                                                    evidence_frame = evidence_grabber.frame_near(frame_ts)
+                                                    evidence_looked_up = True
+                                                if evidence_frame is not None:
+                                                    snapshot_frame = evidence_frame
+                                                    snapshot_bbox = scale_bbox(person_bbox, frame.shape, evidence_frame.shape)
+                                                else:
+                                                    logger.warning(f"⚠️ DVR main stream frame alınamadı, substream frame kullanılıyor: {stream_id}")
+                                            
                                             snapshot_manager = get_snapshot_manager()
                                             snapshot_path = snapshot_manager.capture_violation_snapshot(
-                                                frame=frame,
+                                                frame=snapshot_frame,
                                                 company_id=company_id,
                                                 camera_id=stream_id,
                                                 person_id=new_violation['person_id'],
                                                 violation_type=new_violation['violation_type'],
-                                                person_bbox=person_bbox,
+                                                person_bbox=snapshot_bbox,
                                                 event_id=new_violation['event_id']
                                             )
                                             
@@ -289,9 +368,11 @@ class DVRStreamProcessor:
                             
                             except Exception as vt_error:
                                 logger.error(f"❌ DVR violation tracker error: {vt_error}")
+                            trace.mark(STAGE_ASSOCIATION)
                             
                             # Sonuçları kaydet (eski sistem)
                             self.save_detection_result(stream_id, company_id, ppe_result, detection_time)
+                            trace.mark(STAGE_DB_ENQUEUE)
                             
                             # Real-time dashboard için queue'ya ekle
                             self.results_queue.put({
@@ -300,9 +381,19 @@ class DVRStreamProcessor:
                                 'ppe_result': ppe_result,
                                 'detection_time': detection_time,
                                 'frame_count': frame_count,
+                                'frame_seq': frame_count,
+                                'frame_captured_at': captured_at,
+                                'latency_ms': trace.ages_ms(),
                                 'detection_system': 'SH17' if use_sh17 else 'Klasik'
                             })
                             
+                            # Restream izleyicileri için bbox overlay (istemci tarafında çizilir, boyuta göre ölçeklenir)
+                            overlay_items = [item for key in ('detections', 'ppe_violations')
+                                             if isinstance(ppe_result.get(key), list) for item in ppe_result[key]]
+                            get_event_broker().publish(company_id, EVENT_OVERLAY, overlay_payload(
+                                stream_id, overlay_items, frame_ts, (frame.shape[1], frame.shape[0])
+                            ), camera_id=stream_id)
+                            
                             # Performance logging
                             if detection_count % 30 == 0:  # Her 30 detection'da bir log
                                 fps = detection_count / (time.time() - start_time)
@@ -314,6 +405,8 @@ class DVRStreamProcessor:
                         logger.error(f"❌ PPE detection error for {stream_id}: {e}")
                         # Continue processing other frames
                     
+                    get_latency_tracer().finish(trace)
+                    
                     # Frame rate control
                     time.sleep(1 / self.max_frames_per_second)
                     
@@ -325,11 +418,15 @@ class DVRStreamProcessor:
             cap.release()
             if stream_id in self.active_streams:
                 del self.active_streams[stream_id]
+            get_detection_log().close_camera(company_id, stream_id)
             
             logger.info(f"🛑 DVR stream processing stopped: {stream_id}")
             
         except Exception as e:
             logger.error(f"❌ DVR stream processing error: {e}")
+        finally:
+            if evidence_grabber is not None:
+                evidence_grabber.stop()
     
     def _convert_sh17_to_classic_format_production(self, sh17_result: List[Dict], detection_mode: str, frame: np.ndarray) -> Dict[str, Any]:
         """🎯 PRODUCTION-GRADE: SH17 sonuçlarını klasik PPE formatına çevirir - Advanced spatial reasoning ile"""
@@ -607,7 +704,7 @@ class EnhancedPPEDetectionManager:
             logger.warning(f"⚠️ SH17 Model Manager yüklenemedi: {e}")
             self.sh17_available = False
         
-    def start_dvr_ppe_detection(self, dvr_id: str, channels: List[int], company_id: str, detection_mode: str = 'construction') -> Dict[str, Any]:
+    def start_dvr_ppe_detection(self, dvr_id: str, channels: List[int], company_id: str, detection_mode: str = 'construction', stream_policy: Optional[str] = None) -> Dict[str, Any]:
         """Birden fazla DVR kanalında PPE detection başlatır"""
         
         # SH17 kullanımını kontrol et
@@ -622,7 +719,7 @@ class EnhancedPPEDetectionManager:
         
         for channel in channels:
             result = self.dvr_processor.start_dvr_detection(
-                dvr_id, channel, company_id, detection_mode, use_sh17
+                dvr_id, channel, company_id, detection_mode, use_sh17, stream_policy
             )
             
             if result['success']:
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+DVR Preview Service - Grid görünümü için hızlı kanal önizlemeleri
+- Kanallar sınırlı bir thread pool'da paralel yakalanır
+- Aktif stream varsa son frame'i kullanılır (DVR'a yeni bağlantı açılmaz)
+- Küçültülmüş thumbnail'lar kanal bazında kısa süreli cache'lenir
+"""
+
+import base64
+import threading
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor, Future, wait
+from typing import Dict, List, Optional, Tuple, Any
+
+import cv2
+
+from src.smartsafe.integrations.dvr.dvr_stream_handler import get_stream_handler
+
+logger = logging.getLogger(__name__)
+
+
+class DVRPreviewService:
+    """Paralel, cache'li DVR kanal önizlemeleri"""
+
+    def __init__(self, max_workers: int = 12, cache_ttl: float = 15.0,
+                 thumbnail_width: int = 320, jpeg_quality: int = 60,
+                 grab_timeout_ms: int = 1500):
+        self.cache_ttl = cache_ttl
+        self.thumbnail_width = thumbnail_width
+        self.jpeg_quality = jpeg_quality
+        self.grab_timeout_ms = grab_timeout_ms
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='dvr-preview')
+        self._lock = threading.Lock()
+        self._cache: Dict[Tuple[str, str, int], Tuple[float, str]] = {}  # (company, dvr, ch) -> (ts, b64)
+        self._inflight: Dict[Tuple[str, str, int], Future] = {}
+
+        # İstatistikler
+        self.cache_hits = 0
+        self.live_hits = 0
+        self.rtsp_grabs = 0
+
+    # --- Thumbnail yardımcıları ---
+    def _encode_thumbnail(self, frame) -> Optional[str]:
+        try:
+            height, width = frame.shape[:2]
+            if width > self.thumbnail_width:
+                new_height = int(height * self.thumbnail_width / width)
+                frame = cv2.resize(frame, (self.thumbnail_width, new_height), interpolation=cv2.INTER_AREA)
+            ok, jpeg = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+            if not ok:
+                return None
+            return base64.b64encode(jpeg).decode('utf-8')
+        except Exception as e:
+            logger.debug(f"Thumbnail encode hatası: {e}")
+            return None
+
+    def _thumbnail_from_jpeg_b64(self, frame_b64: str) -> Optional[str]:
+        """Aktif stream'in base64 JPEG frame'inden thumbnail üretir (yarı çözünürlükte decode)"""
+        try:
+            import numpy as np
+            data = np.frombuffer(base64.b64decode(frame_b64), np.uint8)
+            frame = cv2.imdecode(data, cv2.IMREAD_REDUCED_COLOR_2)
+            if frame is None:
+                return None
+            return self._encode_thumbnail(frame)
+        except Exception as e:
+            logger.debug(f"Aktif stream frame decode hatası: {e}")
+            return None
+
+    # --- Kaynaklar ---
+    def _from_cache(self, key: Tuple[str, str, int]) -> Optional[str]:
+        with self._lock:
+            entry = self._cache.get(key)
+        if entry and (time.time() - entry[0]) < self.cache_ttl:
+            return entry[1]
+        return None
+
+    def _store(self, key: Tuple[str, str, int], thumbnail: Optional[str]):
+        if thumbnail:
+            with self._lock:
+                self._cache[key] = (time.time(), thumbnail)
+
+    def _from_active_stream(self, dvr_id: str, channel_number: int) -> Optional[str]:
+        stream_handler = get_stream_handler()
+        stream_id = f"{dvr_id}_ch{channel_number:02d}"
+        status = stream_handler.get_stream_status(stream_id)
+        if not status or status.get('status') != 'active':
+            return None
+        frame_b64 = stream_handler.get_latest_frame(stream_id)
+        if not frame_b64:
+            return None
+        return self._thumbnail_from_jpeg_b64(frame_b64)
+
+    def _grab_channel(self, key: Tuple[str, str, int], dvr_system: Dict[str, Any]) -> Optional[str]:
+        """DVR'dan tek frame yakalar - önce düşük çözünürlüklü substream denenir"""
+        company_id, dvr_id, channel_number = key
+        stream_handler = get_stream_handler()
+        brand = dvr_system.get('rtsp_brand') or dvr_system.get('dvr_type') or 'generic'
+        ip_address = dvr_system['ip_address']
+        username = dvr_system['username']
+        password = dvr_system['password']
+        rtsp_port = dvr_system.get('rtsp_port', 554)
+
+        # brand verilmezse generate_rtsp_urls her çağrıda marka tespiti için DVR'ı yoklar;
+        # 'generic' ile ilk adaylar (XM + Dahua evrensel kalıpları) aynı kalır.
+        # Öğrenilmiş kalıp varsa onun sub/main karşılıkları listenin başındadır
+        stream_urls = stream_handler.get_dual_stream_urls(
+            ip_address, username, password, rtsp_port, channel_number, brand=brand,
+            company_id=company_id, dvr_id=dvr_id
+        )
+        candidates = stream_urls['sub'][:3] + stream_urls['main'][:2]
+
+        try:
+            self.rtsp_grabs += 1
+            frame = stream_handler.grab_frame(candidates, timeout_ms=self.grab_timeout_ms)
+            thumbnail = self._encode_thumbnail(frame) if frame is not None else None
+            self._store(key, thumbnail)
+            return thumbnail
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def _submit_grab(self, key: Tuple[str, str, int], dvr_system: Dict[str, Any]) -> Future:
+        """Aynı kanal için zaten yakalama sürüyorsa onu paylaşır (tekrarlı yenilemelerde çift bağlantı yok)"""
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is None:
+                future = self._executor.submit(self._grab_channel, key, dvr_system)
+                self._inflight[key] = future
+            return future
+
+    # --- Public API ---
+    def get_previews(self, company_id: str, dvr_id: str, dvr_system: Dict[str, Any],
+                     channels: List[int], timeout: float = 8.0) -> List[Dict[str, Any]]:
+        """Kanal önizlemelerini döndürür; timeout içinde yakalanamayan kanallar frame=None döner"""
+        results: Dict[int, Dict[str, Any]] = {}
+        pending: Dict[int, Future] = {}
+
+        for channel_number in channels:
+            key = (company_id, dvr_id, channel_number)
+
+            thumbnail = self._from_cache(key)
+            if thumbnail:
+                self.cache_hits += 1
+                results[channel_number] = {'channel_number': channel_number, 'frame': thumbnail, 'source': 'cache'}
+                continue
+
+            thumbnail = self._from_active_stream(dvr_id, channel_number)
+            if thumbnail:
+                self.live_hits += 1
+                self._store(key, thumbnail)
+                results[channel_number] = {'channel_number': channel_number, 'frame': thumbnail, 'source': 'live'}
+                continue
+
+            pending[channel_number] = self._submit_grab(key, dvr_system)
+
+        if pending:
+            wait(list(pending.values()), timeout=timeout)
+            for channel_number, future in pending.items():
+                thumbnail = None
+                if future.done():
+                    try:
+                        thumbnail = future.result()
+                    except Exception as e:
+                        logger.warning(f"⚠️ DVR preview grab error ch{channel_number}: {e}")
+                results[channel_number] = {'channel_number': channel_number, 'frame': thumbnail, 'source': 'rtsp'}
+
+        return [results[ch] for ch in channels]
+
+    def invalidate(self, company_id: str, dvr_id: str):
+        """DVR ayarları değiştiğinde cache'i temizler"""
+        with self._lock:
+            for key in [k for k in self._cache if k[0] == company_id and k[1] == dvr_id]:
+                del self._cache[key]
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            cached = len(self._cache)
+            inflight = len(self._inflight)
+        return {
+            'cached_thumbnails': cached,
+            'inflight_grabs': inflight,
+            'cache_hits': self.cache_hits,
+            'live_hits': self.live_hits,
+            'rtsp_grabs': self.rtsp_grabs,
+        }
+
+
+# Global preview service instance
+_preview_service = None
+
+
+def get_preview_service() -> DVRPreviewService:
+    """Global DVR preview service instance'ını döndürür"""
+    global _preview_service
+    if _preview_service is None:
+        _preview_service = DVRPreviewService()
+    return _preview_service
@@ -14,8 +14,50 @@ import re
 from typing import Dict, Optional, List, Tuple
 import logging
 
+from src.smartsafe.integrations.dvr.stream_policy import split_stream_urls
+from src.smartsafe.integrations.dvr.rtsp_url_learning import (
+    RTSPPatternCache, brand_from_url, probe_in_priority, render_pattern, url_to_pattern
+)
+from src.smartsafe.integrations.dvr.rtsp_prober import RTSPProbeResult, probe_channels_sync
+from src.smartsafe.services.frame_ring import get_frame_ring_registry
+
 logger = logging.getLogger(__name__)
 
+
+def frame_ring_key(stream_id: str) -> str:
+    """DVR stream'inin frame ring anahtarı (SaaS kamera anahtarlarıyla çakışmaz)"""
+    return f"dvr:{stream_id}"
+
+
+def video_capture(url: str, open_timeout_ms: int, read_timeout_ms: Optional[int] = None):
+    """Timeout'ları açılış anında vererek VideoCapture açar
+
+    VideoCapture(url) bağlantıyı constructor içinde kurar; sonradan cap.set ile verilen
+    CAP_PROP_OPEN/READ_TIMEOUT_MSEC etkisizdir ve FFmpeg varsayılan timeout'unda asılı kalır.
+    Parametreli constructor'ı olmayan eski OpenCV'de eski yola düşülür.
+    """
+    read_timeout_ms = open_timeout_ms if read_timeout_ms is None else read_timeout_ms
+    try:
+        return cv2.VideoCapture(url, cv2.CAP_FFMPEG, [cv2.CAP_PROP_OPEN_TIMEOUT_MSEC, int(open_timeout_ms),
+                                                      cv2.CAP_PROP_READ_TIMEOUT_MSEC, int(read_timeout_ms)])
+    except (TypeError, AttributeError, cv2.error):
+        cap = cv2.VideoCapture(url)
+        try:
+            cap.set(cv2.CAP_PROP_READ_TIMEOUT_MSEC, int(read_timeout_ms))
+        except Exception:
+            pass
+        return cap
+
+
+def _url_priority(u: str) -> tuple:
+    """Vendor-specific working URLs first: XM stream.sdp, then cam/realmonitor, then ISAPI, then /chXX/main"""
+    is_xm = ('stream=0.sdp' in u or 'stream=1.sdp' in u) and '/user=' in u
+    is_cam = 'cam/realmonitor' in u
+    is_isapi = "ISAPI/Streaming/channels" in u
+    is_ch_main = "/ch" in u and u.endswith("/main")
+    return (0 if is_xm else (1 if is_cam else (2 if is_isapi else (3 if is_ch_main else 4))))
+
+
 class DVRStreamHandler:
     """Advanced DVR stream handler with multi-brand support"""
     
@@ -23,10 +65,15 @@ class DVRStreamHandler:
         self._lock = threading.Lock()
         self.active_streams: Dict[str, Dict] = {}
         self.frame_buffers: Dict[str, list] = {}
+        self._jpeg_cache: Dict[str, Tuple[int, str]] = {}  # stream_id -> (ring seq, base64 JPEG)
         self.max_buffer_size = 5  # Reduced from 10 to 5 for smoother playback
         self.connection_timeout = 3000  # Reduced from 5000 to 3000 ms for faster connection
         self.read_timeout = 2000  # Reduced from 3000 to 2000 ms for faster frame reading
         
+        # DVR başına öğrenilmiş marka + RTSP URL kalıbı (dvr_systems tablosunda da saklanır)
+        self.pattern_cache = RTSPPatternCache()
+        self.learning_workers = 6  # Öğrenme sırasında DVR'a açılan eşzamanlı bağlantı sayısı
+        
         # DVR brand-specific URL patterns
         self.dvr_url_patterns = {
             'hikvision': [
@@ -127,8 +174,7 @@ class DVRStreamHandler:
             
             for url in test_urls:
                 try:
-                    cap = cv2.VideoCapture(url)
-                    cap.set(cv2.CAP_PROP_OPEN_TIMEOUT_MSEC, 2000)
+                    cap = video_capture(url, 2000)
                     if cap.isOpened():
                         cap.release()
                         if 'stream=0.sdp' in url and '/user=' in url:
@@ -155,11 +201,15 @@ class DVRStreamHandler:
             return 'generic'
     
     def generate_rtsp_urls(self, ip_address: str, username: str, password: str, 
-                          rtsp_port: int, channel_number: int, brand: str = None) -> List[str]:
+                          rtsp_port: int, channel_number: int, brand: str = None,
+                          company_id: str = None, dvr_id: str = None) -> List[str]:
         """Generate multiple RTSP URLs for a channel"""
         urls = []
         
-        # Detect brand if not provided
+        # Detect brand if not provided (learned brand skips the probe)
+        if not brand:
+            learned = self.pattern_cache.get(ip_address, rtsp_port, company_id, dvr_id)
+            brand = learned.get('brand') if learned else None
         if not brand:
             brand = self.detect_dvr_brand(ip_address, username, password, rtsp_port)
             logger.info(f"🔍 Detected DVR brand: {brand}")
@@ -265,52 +315,59 @@ class DVRStreamHandler:
         logger.info(f"🎯 Generated {len(unique_urls)} RTSP URLs for channel {channel_number} (brand: {brand})")
         return unique_urls
 
+    def probe_channels(self, ip_address: str, username: str, password: str,
+                       rtsp_port: int, max_channels: int = 32, timeout: float = 2.0,
+                       company_id: str = None, dvr_id: str = None) -> Dict[int, RTSPProbeResult]:
+        """RTSP DESCRIBE ile kanalları yoklar (decoder açmadan, tüm kanallar eşzamanlı).
+
+        Öğrenilmiş kalıp varsa kanal başına tek URL, yoksa öncelikli aday kalıplar
+        denenir; başarılı URL'den marka/kalıp hafızaya alınır.
+        """
+        learned = self.pattern_cache.get(ip_address, rtsp_port, company_id, dvr_id) or {}
+        channel_urls: Dict[int, List[str]] = {}
+        for channel in range(1, max_channels + 1):
+            learned_url = self.get_learned_url(ip_address, username, password, rtsp_port, channel,
+                                               company_id=company_id, dvr_id=dvr_id)
+            if learned_url:
+                channel_urls[channel] = [learned_url]
+            else:
+                channel_urls[channel] = self._learning_candidates(
+                    ip_address, username, password, rtsp_port, channel, brand=learned.get('brand')
+                )[:6]
+
+        started = time.time()
+        results = probe_channels_sync(channel_urls, timeout=timeout)
+        found = sorted(ch for ch, result in results.items() if result.ok)
+        logger.info(f"📡 RTSP DESCRIBE probe {ip_address}:{rtsp_port}: {len(found)}/{max_channels} channels "
+                    f"in {time.time() - started:.1f}s")
+
+        if found and not learned.get('pattern'):
+            first = results[found[0]]
+            pattern = url_to_pattern(first.url, ip_address, username, password, rtsp_port, found[0])
+            if pattern:
+                self.pattern_cache.remember(ip_address, rtsp_port, brand=brand_from_url(first.url), pattern=pattern,
+                                            company_id=company_id, dvr_id=dvr_id)
+        return results
+
     def detect_available_channels(self, ip_address: str, username: str, password: str,
-                                  rtsp_port: int, max_channels: int = 32) -> List[int]:
+                                  rtsp_port: int, max_channels: int = 32,
+                                  company_id: str = None, dvr_id: str = None) -> List[int]:
         """Probe DVR to detect which channel numbers are available.
 
-        Tries multiple brand-specific URL patterns per channel and returns
-        a list of channel numbers that successfully yielded at least one frame.
+        Sends RTSP DESCRIBE requests for all channels concurrently and returns
+        the channel numbers that answered with a video SDP.
         """
-        available_channels: List[int] = []
-
         try:
             if not self.test_network_connectivity(ip_address, rtsp_port):
                 logger.error(f"❌ No network connectivity to {ip_address}:{rtsp_port}")
-                return available_channels
+                return []
 
-            for channel in range(1, max_channels + 1):
-                try:
-                    urls = self.generate_rtsp_urls(ip_address, username, password, rtsp_port, channel)
-                    found = False
-                    for url in urls[:8]:  # limit attempts per channel for speed
-                        cap = None
-                        try:
-                            cap = cv2.VideoCapture(url)
-                            cap.set(cv2.CAP_PROP_OPEN_TIMEOUT_MSEC, 1500)
-                            cap.set(cv2.CAP_PROP_READ_TIMEOUT_MSEC, 1500)
-                            if cap.isOpened():
-                                ret, frame = cap.read()
-                                if ret and frame is not None:
-                                    available_channels.append(channel)
-                                    found = True
-                                    logger.info(f"✅ Channel probe success: {channel} via {url}")
-                                    break
-                        except Exception:
-                            pass
-                        finally:
-                            if cap:
-                                cap.release()
-                    if not found:
-                        logger.debug(f"ℹ️ Channel probe failed: {channel}")
-                except Exception as e:
-                    logger.warning(f"⚠️ Channel probe error for channel {channel}: {e}")
-                    continue
+            results = self.probe_channels(ip_address, username, password, rtsp_port, max_channels,
+                                          company_id=company_id, dvr_id=dvr_id)
+            return sorted(ch for ch, result in results.items() if result.ok)
         except Exception as e:
             logger.error(f"❌ Channel detection error: {e}")
-
-        # Ensure unique and sorted
-        return sorted(list(set(available_channels)))
+            return []
     
     def test_network_connectivity(self, ip_address: str, rtsp_port: int) -> bool:
         """Test basic network connectivity to DVR"""
@@ -327,7 +384,7 @@ class DVRStreamHandler:
     def start_stream(self, stream_id: str, rtsp_url: str, 
                     ip_address: str = None, username: str = None, 
                     password: str = None, rtsp_port: int = None, 
-                    channel_number: int = None) -> bool:
+                    channel_number: int = None, company_id: str = None, dvr_id: str = None) -> bool:
         """Start streaming with enhanced URL handling"""
         try:
             if stream_id in self.active_streams:
@@ -351,13 +408,16 @@ class DVRStreamHandler:
                         'username': username,
                         'password': password,
                         'rtsp_port': rtsp_port,
-                        'channel_number': channel_number
+                        'channel_number': channel_number,
+                        'company_id': company_id,
+                        'dvr_id': dvr_id
                     })
                     if stream_id not in self.frame_buffers:
                         self.frame_buffers[stream_id] = []
                     thread = threading.Thread(
                         target=self._stream_worker,
-                        args=(stream_id, rtsp_url, ip_address, username, password, rtsp_port, channel_number),
+                        args=(stream_id, rtsp_url, ip_address, username, password, rtsp_port, channel_number,
+                              company_id, dvr_id),
                         daemon=True
                     )
                     thread.start()
@@ -375,6 +435,8 @@ class DVRStreamHandler:
                 'password': password,
                 'rtsp_port': rtsp_port,
                 'channel_number': channel_number,
+                'company_id': company_id,
+                'dvr_id': dvr_id,
                 'detection_result': {
                     'detections': [],
                     'people_detected': 0,
@@ -389,7 +451,8 @@ class DVRStreamHandler:
             # Start streaming thread
             thread = threading.Thread(
                 target=self._stream_worker,
-                args=(stream_id, rtsp_url, ip_address, username, password, rtsp_port, channel_number),
+                args=(stream_id, rtsp_url, ip_address, username, password, rtsp_port, channel_number,
+                      company_id, dvr_id),
                 daemon=True
             )
             thread.start()
@@ -417,6 +480,21 @@ class DVRStreamHandler:
     def get_latest_frame(self, stream_id: str) -> Optional[str]:
         """Get latest frame as base64 encoded JPEG"""
         try:
+            # Worker ham frame'i ring'e yazar; JPEG sadece isteyen olunca (frame başına bir kez) üretilir
+            ring = get_frame_ring_registry().get(frame_ring_key(stream_id))
+            if ring is not None and ring.has_frame():
+                cached = self._jpeg_cache.get(stream_id)
+                if cached is not None and cached[0] == ring.latest_seq:
+                    return cached[1]
+                view = ring.acquire_latest()
+                if view is not None:
+                    with view:
+                        ok, jpeg_data = cv2.imencode('.jpg', view.frame, [cv2.IMWRITE_JPEG_QUALITY, 70])
+                    if ok:
+                        jpeg_base64 = base64.b64encode(jpeg_data).decode('utf-8')
+                        self._jpeg_cache[stream_id] = (view.seq, jpeg_base64)
+                        return jpeg_base64
+            
             with self._lock:
                 if stream_id in self.frame_buffers and self.frame_buffers[stream_id]:
                     frame_data = self.frame_buffers[stream_id][-1]
@@ -552,21 +630,20 @@ class DVRStreamHandler:
             return None
 
     def capture_single_frame(self, ip_address: str, username: str, password: str,
-                              rtsp_port: int, channel_number: int) -> Optional[str]:
+                              rtsp_port: int, channel_number: int,
+                              company_id: str = None, dvr_id: str = None) -> Optional[str]:
         """Open RTSP briefly, grab a single frame, and close (base64). Designed to be fast and resilient for previews."""
-        urls = self.generate_rtsp_urls(ip_address, username, password, rtsp_port, channel_number)
-        # Try a very small subset first for speed (most likely to work)
-        candidates = urls[:4]
+        urls = self.generate_rtsp_urls(ip_address, username, password, rtsp_port, channel_number,
+                                       company_id=company_id, dvr_id=dvr_id)
+        # Try a very small subset first for speed (most likely to work), learned pattern first
+        learned_url = self.get_learned_url(ip_address, username, password, rtsp_port, channel_number,
+                                           company_id=company_id, dvr_id=dvr_id)
+        candidates = ([learned_url] if learned_url else []) + [u for u in urls[:4] if u != learned_url]
         for url in candidates:
             cap = None
             try:
-                cap = cv2.VideoCapture(url)
                 # Conservative timeouts to avoid blocking the endpoint
-                try:
-                    cap.set(cv2.CAP_PROP_OPEN_TIMEOUT_MSEC, 1200)
-                    cap.set(cv2.CAP_PROP_READ_TIMEOUT_MSEC, 1200)
-                except Exception:
-                    pass
+                cap = video_capture(url, 1200)
                 if cap.isOpened():
                     ret, frame = cap.read()
                     if ret and frame is not None:
@@ -583,6 +660,144 @@ class DVRStreamHandler:
                     cap.release()
         return None
 
+    def get_dual_stream_urls(self, ip_address: str, username: str, password: str,
+                             rtsp_port: int, channel_number: int, brand: str = None,
+                             company_id: str = None, dvr_id: str = None) -> Dict[str, List[str]]:
+        """Main (yüksek çözünürlük) ve sub (düşük çözünürlük) stream URL adaylarını döndürür.
+
+        Adaylar generate_rtsp_urls'ten türetilir: önce öğrenilmiş kalıbın URL'i, sonra
+        markaya uyan adaylar. Marka bilinmiyorsa DVR yoklanmaz ('generic' sırası kullanılır).
+        """
+        learned = self.pattern_cache.get(ip_address, rtsp_port, company_id, dvr_id) or {}
+        brand = brand or learned.get('brand') or 'generic'
+        candidates = self.generate_rtsp_urls(ip_address, username, password, rtsp_port, channel_number,
+                                             brand=brand, company_id=company_id, dvr_id=dvr_id)
+        if brand != 'generic':
+            candidates.sort(key=lambda u: brand_from_url(u) != brand)
+        learned_url = self.get_learned_url(ip_address, username, password, rtsp_port, channel_number,
+                                           company_id=company_id, dvr_id=dvr_id)
+        if learned_url:
+            candidates.insert(0, learned_url)
+        return split_stream_urls(candidates)
+
+    def grab_frame(self, urls: List[str], timeout_ms: int = 1500) -> Optional[np.ndarray]:
+        """İlk açılan URL'den tek bir ham frame (BGR ndarray) alır ve bağlantıyı kapatır.
+        Violation snapshot'ları için main stream'i kısa süreliğine açmak amacıyla kullanılır."""
+        for url in urls:
+            cap = None
+            try:
+                cap = video_capture(url, timeout_ms)
+                if not cap.isOpened():
+                    continue
+                # İlk frame'ler keyframe öncesi bozuk gelebilir, birkaç deneme yap
+                for _ in range(3):
+                    ret, frame = cap.read()
+                    if ret and frame is not None:
+                        return frame
+            except Exception:
+                continue
+            finally:
+                if cap:
+                    cap.release()
+        return None
+
+    # --- Learned RTSP URL patterns (per DVR) ---
+    def load_learned_pattern(self, company_id: str, dvr_system: Dict) -> None:
+        """dvr_systems kaydındaki öğrenilmiş marka/kalıbı şirket/DVR anahtarıyla belleğe alır"""
+        try:
+            self.pattern_cache.remember(
+                dvr_system['ip_address'], dvr_system.get('rtsp_port', 554),
+                brand=dvr_system.get('rtsp_brand'),
+                pattern=dvr_system.get('rtsp_url_pattern'),
+                company_id=company_id, dvr_id=dvr_system.get('dvr_id')
+            )
+        except Exception as e:
+            logger.warning(f"⚠️ Learned RTSP pattern load failed: {e}")
+
+    def get_learned_url(self, ip_address: str, username: str, password: str,
+                        rtsp_port: int, channel_number: int,
+                        company_id: str = None, dvr_id: str = None) -> Optional[str]:
+        """Öğrenilmiş kalıptan kanal URL'i (yoksa None)"""
+        learned = self.pattern_cache.get(ip_address, rtsp_port, company_id, dvr_id)
+        if not learned or not learned.get('pattern'):
+            return None
+        return render_pattern(learned['pattern'], ip_address, username, password, rtsp_port, channel_number)
+
+    def _open_capture(self, url: str):
+        """URL'i açar ve test frame'i okur; başarılıysa açık VideoCapture, değilse None"""
+        cap = None
+        try:
+            cap = video_capture(url, self.connection_timeout, self.read_timeout)
+            if cap.isOpened():
+                ret, test_frame = cap.read()
+                if ret and test_frame is not None:
+                    return cap
+            cap.release()
+        except Exception as e:
+            logger.debug(f"RTSP open failed for {url}: {e}")
+            if cap:
+                cap.release()
+        return None
+
+    def _learning_candidates(self, ip_address: str, username: str, password: str,
+                             rtsp_port: int, channel_number: int, brand: str = None,
+                             extra_urls: List[str] = None) -> List[str]:
+        """Öğrenme adayları; marka bilinmiyorsa detect_dvr_brand yoklaması yerine tüm
+        markaların kalıpları birlikte (paralel) denenir"""
+        urls = list(extra_urls or [])
+        brands = [brand] if brand else ['xm', 'dahua', 'hikvision', 'generic']
+        for candidate_brand in brands:
+            urls.extend(self.generate_rtsp_urls(ip_address, username, password, rtsp_port,
+                                                channel_number, brand=candidate_brand))
+        unique_urls = list(dict.fromkeys(u for u in urls if u))
+        unique_urls.sort(key=_url_priority)  # stable: same-priority URLs keep their order
+        return unique_urls
+
+    def _persist_learned_pattern(self, company_id: str, dvr_id: str, brand: str, pattern: str):
+        try:
+            from src.smartsafe.database.database_adapter import get_db_adapter
+            get_db_adapter().update_dvr_rtsp_learning(company_id, dvr_id, brand, pattern)
+        except Exception as e:
+            logger.warning(f"⚠️ Learned RTSP pattern could not be saved for {dvr_id}: {e}")
+
+    def open_learned_stream(self, ip_address: str, username: str, password: str,
+                            rtsp_port: int, channel_number: int, extra_urls: List[str] = None,
+                            company_id: str = None, dvr_id: str = None) -> Tuple[Optional[str], Optional[object]]:
+        """Kanal stream'ini açar: önce öğrenilmiş kalıp, başarısız olursa adaylar paralel
+        denenerek kalıp yeniden öğrenilir. (url, açık VideoCapture) veya (None, None) döner."""
+        learned = self.pattern_cache.get(ip_address, rtsp_port, company_id, dvr_id) or {}
+
+        learned_url = self.get_learned_url(ip_address, username, password, rtsp_port, channel_number,
+                                           company_id=company_id, dvr_id=dvr_id)
+        if learned_url:
+            cap = self._open_capture(learned_url)
+            if cap is not None:
+                logger.info(f"✅ Channel {channel_number}: Opened with learned RTSP pattern: {learned_url}")
+                return learned_url, cap
+            logger.warning(f"⚠️ Channel {channel_number}: Learned RTSP pattern failed, re-learning: {learned_url}")
+
+        candidates = self._learning_candidates(ip_address, username, password, rtsp_port, channel_number,
+                                               brand=learned.get('brand'), extra_urls=extra_urls)
+        logger.info(f"🎯 Channel {channel_number}: Probing {len(candidates)} RTSP URL patterns concurrently")
+        started = time.time()
+        url, cap = probe_in_priority(candidates, self._open_capture, lambda c: c.release(),
+                                     max_workers=self.learning_workers)
+        if url is None:
+            logger.error(f"❌ Channel {channel_number}: No RTSP URL pattern worked ({time.time() - started:.1f}s)")
+            return None, None
+
+        pattern = url_to_pattern(url, ip_address, username, password, rtsp_port, channel_number)
+        if pattern:
+            # Kalıp DVR'a ait değilse (ör. gateway URL'i) marka/kalıp öğrenilmez
+            brand = brand_from_url(url)
+            self.pattern_cache.remember(ip_address, rtsp_port, brand=brand, pattern=pattern,
+                                        company_id=company_id, dvr_id=dvr_id)
+            logger.info(f"🧠 Learned RTSP pattern for {ip_address}:{rtsp_port} in {time.time() - started:.1f}s "
+                        f"(brand: {brand}): {pattern}")
+            if pattern != learned.get('pattern') and company_id and dvr_id:
+                self._persist_learned_pattern(company_id, dvr_id, brand, pattern)
+        return url, cap
+
     # --- Lightweight image hashing utilities for stream verification ---
     @staticmethod
     def _compute_average_hash_from_frame(frame) -> Optional[int]:
@@ -610,9 +825,10 @@ class DVRStreamHandler:
     def _stream_worker(self, stream_id: str, rtsp_url: str, 
                       ip_address: str = None, username: str = None, 
                       password: str = None, rtsp_port: int = None, 
-                      channel_number: int = None):
+                      channel_number: int = None, company_id: str = None, dvr_id: str = None):
         """Enhanced worker thread for streaming with multiple URL fallbacks"""
         cap = None
+        ring = None
         max_reconnect_attempts = 3
         reconnect_delay = 5  # seconds
         
@@ -626,66 +842,20 @@ class DVRStreamHandler:
                     self.active_streams[stream_id]['status'] = 'error'
                     return
             
-            # Generate multiple URLs to try
-            urls_to_try = [rtsp_url]  # Start with original URL
-            
-            # Add brand-specific URLs if we have the parameters
-            if all([ip_address, username, password, rtsp_port, channel_number]):
-                brand_urls = self.generate_rtsp_urls(ip_address, username, password, rtsp_port, channel_number)
-                urls_to_try.extend(brand_urls)
-                logger.info(f"🎯 Channel {channel_number}: Will try {len(urls_to_try)} different URL patterns")
-            else:
-                logger.warning(f"⚠️ Channel {channel_number}: Missing parameters for enhanced URL generation")
-            
-            # Try each URL, prioritize Hikvision ISAPI channels if present
+            # Open stream: learned pattern first, concurrent re-learning only on failure
             cap = None
             successful_url = None
+            has_dvr_params = all([ip_address, username, password, rtsp_port, channel_number])
             
-            # Prioritize vendor-specific working URLs: XM stream.sdp first, then cam/realmonitor,
-            # then ISAPI, then /chXX/main and others
-            def _prio(u: str) -> tuple:
-                is_xm = ('stream=0.sdp' in u or 'stream=1.sdp' in u) and '/user=' in u
-                is_cam = 'cam/realmonitor' in u
-                is_isapi = "ISAPI/Streaming/channels" in u
-                is_ch_main = "/ch" in u and u.endswith("/main")
-                return ((0 if is_xm else (1 if is_cam else (2 if is_isapi else (3 if is_ch_main else 4)))), u)
-            urls_to_try.sort(key=_prio)
-            for i, url in enumerate(urls_to_try):
-                try:
-                    logger.info(f"🔄 Channel {channel_number}: Trying RTSP URL {i+1}/{len(urls_to_try)}: {url}")
-                    
-                    cap = cv2.VideoCapture(url)
-                    cap.set(cv2.CAP_PROP_OPEN_TIMEOUT_MSEC, self.connection_timeout)
-                    cap.set(cv2.CAP_PROP_READ_TIMEOUT_MSEC, self.read_timeout)
-                    
-                    if cap.isOpened():
-                        # Test if we can actually read a frame
-                        ret, test_frame = cap.read()
-                        if ret and test_frame is not None:
-                            logger.info(f"✅ Channel {channel_number}: Successfully opened RTSP stream: {url}")
-                            successful_url = url
-                            break
-                        else:
-                            logger.warning(f"⚠️ Channel {channel_number}: Failed to open URL: {url}")
-                            if cap:
-                                cap.release()
-                                cap = None
-                            else:
-                                logger.warning(f"⚠️ Channel {channel_number}: URL opened but no frame data: {url}")
-                                cap.release()
-                                cap = None
-                    else:
-                        logger.warning(f"⚠️ Channel {channel_number}: Failed to open URL: {url}")
-                        if cap:
-                            cap.release()
-                            cap = None
-                        
-                except Exception as e:
-                    logger.warning(f"⚠️ Channel {channel_number}: Failed to open URL {url}: {e}")
-                    if cap:
-                        cap.release()
-                        cap = None
-                    continue
+            if has_dvr_params:
+                successful_url, cap = self.open_learned_stream(
+                    ip_address, username, password, rtsp_port, channel_number, extra_urls=[rtsp_url],
+                    company_id=company_id, dvr_id=dvr_id
+                )
+            else:
+                logger.warning(f"⚠️ Channel {channel_number}: Missing parameters for enhanced URL generation")
+                cap = self._open_capture(rtsp_url)
+                successful_url = rtsp_url if cap is not None else None
             
             if not cap or not cap.isOpened():
                 logger.error(f"❌ Failed to open any RTSP stream for {stream_id}")
@@ -717,6 +887,7 @@ class DVRStreamHandler:
             frame_count = 0
             consecutive_errors = 0
             max_consecutive_errors = 10
+            ring = get_frame_ring_registry().get_or_create(frame_ring_key(stream_id))
             
             while self.active_streams.get(stream_id, {}).get('status') == 'active':
                 try:
@@ -733,37 +904,26 @@ class DVRStreamHandler:
                             cap.release()
                             cap = None
                             
-                            # Try reconnection with different URLs
+                            # Reconnect: learned pattern first, re-learn only if it fails
                             for attempt in range(max_reconnect_attempts):
                                 logger.info(f"🔄 Channel {channel_number}: Reconnection attempt {attempt + 1}/{max_reconnect_attempts}")
+                                reconnect_started = time.time()
                                 
-                                if all([ip_address, username, password, rtsp_port, channel_number]):
-                                    reconnect_urls = self.generate_rtsp_urls(ip_address, username, password, rtsp_port, channel_number)
-                                    logger.info(f"🔄 Channel {channel_number}: Trying {len(reconnect_urls)} URLs for reconnection")
+                                if has_dvr_params:
+                                    url, cap = self.open_learned_stream(
+                                        ip_address, username, password, rtsp_port, channel_number,
+                                        extra_urls=[successful_url], company_id=company_id, dvr_id=dvr_id
+                                    )
                                 else:
-                                    reconnect_urls = [successful_url] if successful_url else urls_to_try
+                                    url = successful_url
+                                    cap = self._open_capture(successful_url)
                                 
-                                for url in reconnect_urls:
-                                    try:
-                                        cap = cv2.VideoCapture(url)
-                                        cap.set(cv2.CAP_PROP_OPEN_TIMEOUT_MSEC, self.connection_timeout)
-                                        cap.set(cv2.CAP_PROP_READ_TIMEOUT_MSEC, self.read_timeout)
-                                        
-                                        if cap.isOpened():
-                                            ret, test_frame = cap.read()
-                                            if ret and test_frame is not None:
-                                                logger.info(f"✅ Channel {channel_number}: Reconnection successful: {url}")
-                                                successful_url = url
-                                                consecutive_errors = 0
-                                                break
-                                            else:
-                                                cap.release()
-                                                cap = None
-                                    except Exception as e:
-                                        logger.warning(f"⚠️ Channel {channel_number}: Reconnection attempt failed for {url}: {e}")
-                                        if cap:
-                                            cap.release()
-                                            cap = None
+                                if cap is not None:
+                                    logger.info(f"✅ Channel {channel_number}: Reconnection successful in "
+                                                f"{time.time() - reconnect_started:.1f}s: {url}")
+                                    successful_url = url
+                                    consecutive_errors = 0
+                                    self.active_streams[stream_id]['rtsp_url'] = successful_url
                                 
                                 if cap and cap.isOpened():
                                     break
@@ -781,20 +941,10 @@ class DVRStreamHandler:
                     # Reset error count on successful frame
                     consecutive_errors = 0
                     
-                    # Convert frame to JPEG
+                    # Ham frame'i ring'e yaz - JPEG encode izleyici başına tier'a göre
+                    # (adaptive MJPEG) veya get_latest_frame ile talep anında yapılır
                     try:
-                        # Frame quality'yi düşür ve boyutu optimize et
-                        _, jpeg_data = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 70])
-                        jpeg_base64 = base64.b64encode(jpeg_data).decode('utf-8')
-                        
-                        # Add to buffer - Optimized buffer management
-                        if stream_id in self.frame_buffers:
-                            buffer = self.frame_buffers[stream_id]
-                            buffer.append(jpeg_base64)
-                            
-                            # Keep only latest frames - Smaller buffer for smoother playback
-                            if len(buffer) > 5:  # Reduced from max_buffer_size to 5
-                                buffer.pop(0)
+                        ring.write(frame)
                         
                         frame_count += 1
                         self.active_streams[stream_id]['frame_count'] = frame_count
@@ -822,21 +972,6 @@ class DVRStreamHandler:
                         if frame_count % 120 == 0:
                             logger.info(f"📊 {stream_id}: {frame_count} frames captured")
                         
-                        # 🚀 FRAME SKIP OPTIMIZATION - Her 3 frame'de bir işle (smooth playback)
-                        if frame_count % 3 == 0:
-                            # Frame quality'yi düşür ve boyutu optimize et
-                            _, jpeg_data = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 75])
-                            jpeg_base64 = base64.b64encode(jpeg_data).decode('utf-8')
-                            
-                            # Add to buffer - Optimized buffer management
-                            if stream_id in self.frame_buffers:
-                                buffer = self.frame_buffers[stream_id]
-                                buffer.append(jpeg_base64)
-                                
-                                # Keep only latest frames - Smaller buffer for smoother playback
-                                if len(buffer) > 3:  # Reduced buffer size for faster switching
-                                    buffer.pop(0)
-                        
                     except Exception as e:
                         logger.error(f"❌ Frame processing error for {stream_id}: {e}")
                     
@@ -855,6 +990,9 @@ class DVRStreamHandler:
         finally:
             if cap:
                 cap.release()
+            if ring is not None:
+                get_frame_ring_registry().remove(frame_ring_key(stream_id), ring)
+            self._jpeg_cache.pop(stream_id, None)
             if stream_id in self.active_streams:
                 self.active_streams[stream_id]['status'] = 'stopped'
             logger.info(f"🛑 Stream worker stopped: {stream_id}")
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+SmartSafe AI - Main Stream Evidence Grabber
+Dual-stream politikasında ihlal kanıtı için yüksek çözünürlüklü frame kaynağı
+
+- Detection substream'de çalışırken main stream arka plan thread'inde açık tutulur;
+  ihlal anında RTSP oturumu açılmaz, detection döngüsü beklemez
+- Frame'ler sabit aralıkla (varsayılan 5 FPS) zaman damgalı küçük bir FrameRing'e
+  decode edilir, aradaki frame'ler sadece grab() ile atlanır (decode maliyeti yok)
+- frame_near(ts) detection frame'inin zaman damgasına en yakın main stream frame'ini
+  döndürür; böylece substream'deki kişi kutusu aynı ana ait frame'e ölçeklenir
+- Bağlantı koparsa aday URL'ler reconnect_delay aralıklarla yeniden denenir
+"""
+
+import threading
+import time
+import logging
+from typing import Any, Callable, Dict, List, Optional
+
+from src.smartsafe.integrations.dvr.dvr_stream_handler import video_capture
+from src.smartsafe.services.frame_ring import FrameRing
+
+logger = logging.getLogger(__name__)
+
+
+class MainStreamGrabber:
+    """Main stream'i açık tutup son frame'leri zaman damgasıyla saklayan arka plan okuyucu"""
+
+    def __init__(self, key: str, urls: List[str], fps: float = 5.0, num_slots: int = 8,
+                 open_timeout_ms: int = 3000, reconnect_delay: float = 2.0, max_read_failures: int = 25,
+                 capture_factory: Optional[Callable[[str, int], Any]] = None):
+        self.key = key
+        self.urls = list(urls)
+        self.interval = 1.0 / fps if fps > 0 else 0.0
+        self.open_timeout_ms = open_timeout_ms
+        self.reconnect_delay = reconnect_delay
+        self.max_read_failures = max_read_failures
+        self.capture_factory = capture_factory or video_capture
+        self.ring = FrameRing(f"evidence:{key}", num_slots=num_slots)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.url: Optional[str] = None
+
+        # İstatistikler
+        self.frames_kept = 0
+        self.reconnects = 0
+        self.lookups = 0
+        self.misses = 0
+
+    def start(self) -> 'MainStreamGrabber':
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name=f'evidence-{self.key}', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _open(self):
+        for url in self.urls:
+            cap = None
+            try:
+                cap = self.capture_factory(url, self.open_timeout_ms)
+                if cap.isOpened():
+                    if self.url != url:
+                        logger.info(f"📸 Evidence stream opened for {self.key}: {url.split('@')[-1]}")
+                    self.url = url
+                    return cap
+            except Exception as e:
+                logger.debug(f"Evidence stream open failed {self.key}: {e}")
+            if cap is not None:
+                cap.release()
+        return None
+
+    def _run(self):
+        while not self._stop.is_set():
+            cap = self._open()
+            if cap is None:
+                self._stop.wait(self.reconnect_delay)
+                continue
+            failures = 0
+            next_keep = 0.0
+            try:
+                while not self._stop.is_set() and failures < self.max_read_failures:
+                    now = time.monotonic()
+                    if now >= next_keep:
+                        ok = self.ring.read_into(cap)
+                        if ok:
+                            self.frames_kept += 1
+                            next_keep = now + self.interval
+                    else:
+                        # Aradaki frame'ler decode edilmez; stream gecikmesi birikmez
+                        ok = bool(cap.grab())
+                    failures = 0 if ok else failures + 1
+            except Exception as e:
+                logger.warning(f"⚠️ Evidence stream read error for {self.key}: {e}")
+            finally:
+                cap.release()
+            if not self._stop.is_set():
+                self.reconnects += 1
+                self._stop.wait(self.reconnect_delay)
+
+    def frame_near(self, timestamp: float, max_skew: float = 1.0):
+        """timestamp'e (time.time()) en yakın main stream frame'inin yazılabilir kopyası; yoksa None"""
+        self.lookups += 1
+        view = self.ring.acquire_nearest(timestamp, max_skew)
+        if view is None:
+            self.misses += 1
+            return None
+        with view:
+            return view.frame.copy()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'key': self.key,
+            'url_connected': self.url is not None,
+            'frames_kept': self.frames_kept,
+            'reconnects': self.reconnects,
+            'lookups': self.lookups,
+            'misses': self.misses,
+        }
@@ -0,0 +1,425 @@
+#!/usr/bin/env python3
+"""
+RTSP Prober - Socket seviyesinde hafif RTSP istemcisi
+- OPTIONS/DESCRIBE istekleri (Basic ve Digest kimlik doğrulama)
+- SDP'den codec, çözünürlük ve FPS çıkarımı (H.264 SPS dahil)
+- Tüm kanal URL'leri tek event loop'ta eşzamanlı yoklanır
+
+cv2.VideoCapture her deneme için decoder açıp ilk frame'i beklerken DESCRIBE
+tek bir istek/cevap ile kanalın var olup olmadığını söyler. Keşif ve sağlık
+kontrolleri için kullanılır; stream açmak için değil.
+"""
+
+import asyncio
+import base64
+import hashlib
+import os
+import re
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, asdict
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit, unquote
+
+logger = logging.getLogger(__name__)
+
+RTSP_USER_AGENT = 'SmartSafe-RTSP-Prober/1.0'
+_MAX_HEADER_BYTES = 16 * 1024
+_MAX_BODY_BYTES = 64 * 1024
+
+
+@dataclass
+class RTSPProbeResult:
+    """Tek bir RTSP URL yoklamasının sonucu"""
+    url: str
+    ok: bool = False
+    status_code: int = 0
+    codec: Optional[str] = None
+    width: int = 0
+    height: int = 0
+    fps: float = 0.0
+    auth: str = 'none'  # none, basic, digest
+    error: Optional[str] = None
+    elapsed_ms: float = 0.0
+
+    @property
+    def resolution(self) -> Optional[Tuple[int, int]]:
+        if self.width and self.height:
+            return (self.width, self.height)
+        return None
+
+    def to_dict(self) -> Dict:
+        data = asdict(self)
+        data['url'] = mask_credentials(self.url)
+        return data
+
+
+def mask_credentials(url: str) -> str:
+    """Log/API çıktısı için URL'deki şifreyi gizler"""
+    url = re.sub(r'(rtsp://[^:/@]+:)[^@]*@', r'\1***@', url)
+    return re.sub(r'(password=)[^&]*', r'\1***', url)
+
+
+# --- SDP ---
+class _BitReader:
+    def __init__(self, data: bytes):
+        self.data = data
+        self.pos = 0
+
+    def u(self, bits: int) -> int:
+        value = 0
+        for _ in range(bits):
+            byte = self.data[self.pos >> 3]
+            value = (value << 1) | ((byte >> (7 - (self.pos & 7))) & 1)
+            self.pos += 1
+        return value
+
+    def ue(self) -> int:
+        zeros = 0
+        while self.u(1) == 0:
+            zeros += 1
+            if zeros > 31:
+                raise ValueError("Geçersiz Exp-Golomb kodu")
+        return (1 << zeros) - 1 + self.u(zeros)
+
+    def se(self) -> int:
+        value = self.ue()
+        return (value + 1) // 2 if value & 1 else -(value // 2)
+
+
+def _unescape_rbsp(nal: bytes) -> bytes:
+    """Emulation prevention byte'larını (00 00 03) kaldırır"""
+    return nal.replace(b'\x00\x00\x03', b'\x00\x00')
+
+
+def parse_h264_sps(nal: bytes) -> Optional[Tuple[int, int]]:
+    """H.264 SPS NAL biriminden (genişlik, yükseklik) çıkarır"""
+    try:
+        if not nal or (nal[0] & 0x1F) != 7:
+            return None
+        r = _BitReader(_unescape_rbsp(nal[1:]))
+        profile_idc = r.u(8)
+        r.u(8)  # constraint flags
+        r.u(8)  # level_idc
+        r.ue()  # seq_parameter_set_id
+
+        chroma_format_idc = 1
+        separate_colour_plane = 0
+        if profile_idc in (100, 110, 122, 244, 44, 83, 86, 118, 128, 138, 139, 134, 135):
+            chroma_format_idc = r.ue()
+            if chroma_format_idc == 3:
+                separate_colour_plane = r.u(1)
+            r.ue()  # bit_depth_luma_minus8
+            r.ue()  # bit_depth_chroma_minus8
+            r.u(1)  # qpprime_y_zero_transform_bypass_flag
+            if r.u(1):  # seq_scaling_matrix_present_flag
+                for i in range(8 if chroma_format_idc != 3 else 12):
+                    if r.u(1):
+                        size = 16 if i < 6 else 64
+                        last, next_scale = 8, 8
+                        for _ in range(size):
+                            if next_scale != 0:
+                                next_scale = (last + r.se() + 256) % 256
+                            last = next_scale if next_scale != 0 else last
+
+        r.ue()  # log2_max_frame_num_minus4
+        pic_order_cnt_type = r.ue()
+        if pic_order_cnt_type == 0:
+            r.ue()
+        elif pic_order_cnt_type == 1:
+            r.u(1)
+            r.se()
+            r.se()
+            for _ in range(r.ue()):
+                r.se()
+        r.ue()  # max_num_ref_frames
+        r.u(1)  # gaps_in_frame_num_value_allowed_flag
+        width_mbs = r.ue() + 1
+        height_map_units = r.ue() + 1
+        frame_mbs_only = r.u(1)
+        if not frame_mbs_only:
+            r.u(1)  # mb_adaptive_frame_field_flag
+        r.u(1)  # direct_8x8_inference_flag
+
+        crop_left = crop_right = crop_top = crop_bottom = 0
+        if r.u(1):
+            crop_left, crop_right, crop_top, crop_bottom = r.ue(), r.ue(), r.ue(), r.ue()
+
+        if chroma_format_idc == 0 or separate_colour_plane:
+            crop_unit_x, crop_unit_y = 1, 2 - frame_mbs_only
+        else:
+            sub_width = 1 if chroma_format_idc == 3 else 2
+            sub_height = 2 if chroma_format_idc == 1 else 1
+            crop_unit_x, crop_unit_y = sub_width, sub_height * (2 - frame_mbs_only)
+
+        width = width_mbs * 16 - (crop_left + crop_right) * crop_unit_x
+        height = (2 - frame_mbs_only) * height_map_units * 16 - (crop_top + crop_bottom) * crop_unit_y
+        return (width, height)
+    except Exception as e:
+        logger.debug(f"SPS parse hatası: {e}")
+        return None
+
+
+def parse_sdp(sdp: str) -> Dict:
+    """SDP'deki ilk video medyasından codec, çözünürlük ve FPS bilgisi"""
+    info = {'has_video': False, 'codec': None, 'width': 0, 'height': 0, 'fps': 0.0}
+    in_video = False
+    payload_types: List[str] = []
+
+    for raw_line in sdp.splitlines():
+        line = raw_line.strip()
+        if line.startswith('m='):
+            if info['has_video']:
+                break  # Sadece ilk video medyası
+            parts = line[2:].split()
+            in_video = bool(parts) and parts[0] == 'video'
+            if in_video:
+                info['has_video'] = True
+                payload_types = parts[3:]
+                if '26' in payload_types:
+                    info['codec'] = 'JPEG'
+            continue
+        if not in_video or not line.startswith('a='):
+            continue
+
+        attr, _, value = line[2:].partition(':')
+        if attr == 'rtpmap':
+            encoding = value.split(None, 1)[1] if ' ' in value else ''
+            codec = encoding.split('/')[0].upper()
+            if codec:
+                info['codec'] = 'H265' if codec == 'HEVC' else codec
+        elif attr == 'fmtp' and 'sprop-parameter-sets=' in value and not info['width']:
+            sprop = re.search(r'sprop-parameter-sets=([^;\s]+)', value)
+            if sprop:
+                for encoded in sprop.group(1).split(','):
+                    try:
+                        nal = base64.b64decode(encoded + '=' * (-len(encoded) % 4))
+                    except Exception:
+                        continue
+                    size = parse_h264_sps(nal)
+                    if size:
+                        info['width'], info['height'] = size
+                        break
+        elif attr == 'framesize':
+            size = re.search(r'(\d+)-(\d+)', value)
+            if size:
+                info['width'], info['height'] = int(size.group(1)), int(size.group(2))
+        elif attr == 'x-dimensions':
+            size = re.search(r'(\d+),\s*(\d+)', value)
+            if size:
+                info['width'], info['height'] = int(size.group(1)), int(size.group(2))
+        elif attr == 'cliprect' and not info['width']:
+            rect = [int(v) for v in re.findall(r'\d+', value)]
+            if len(rect) == 4:
+                info['width'], info['height'] = rect[3] - rect[1], rect[2] - rect[0]
+        elif attr in ('framerate', 'x-framerate'):
+            try:
+                info['fps'] = float(value.strip())
+            except ValueError:
+                pass
+    return info
+
+
+# --- Kimlik doğrulama ---
+def _parse_auth_params(header: str) -> Dict[str, str]:
+    return {k.lower(): quoted or plain
+            for k, quoted, plain in re.findall(r'(\w+)=(?:"([^"]*)"|([^,\s]*))', header)}
+
+
+def _md5(text: str) -> str:
+    return hashlib.md5(text.encode('utf-8')).hexdigest()
+
+
+def build_authorization(challenges: List[str], method: str, uri: str,
+                        username: str, password: str, nc: int = 1) -> Tuple[Optional[str], str]:
+    """WWW-Authenticate başlıklarından Authorization başlığı üretir (Digest tercih edilir)"""
+    digest = next((c for c in challenges if c.lower().startswith('digest')), None)
+    if digest:
+        params = _parse_auth_params(digest[len('digest'):])
+        realm, nonce = params.get('realm', ''), params.get('nonce', '')
+        ha1 = _md5(f"{username}:{realm}:{password}")
+        ha2 = _md5(f"{method}:{uri}")
+        qop_options = [q.strip() for q in params.get('qop', '').split(',') if q.strip()]
+        fields = [f'username="{username}"', f'realm="{realm}"', f'nonce="{nonce}"', f'uri="{uri}"']
+        if 'auth' in qop_options:
+            cnonce = os.urandom(8).hex()
+            nc_value = f"{nc:08x}"
+            response = _md5(f"{ha1}:{nonce}:{nc_value}:{cnonce}:auth:{ha2}")
+            fields += [f'response="{response}"', 'qop=auth', f'nc={nc_value}', f'cnonce="{cnonce}"']
+        else:
+            response = _md5(f"{ha1}:{nonce}:{ha2}")
+            fields.append(f'response="{response}"')
+        if params.get('opaque'):
+            fields.append(f'opaque="{params["opaque"]}"')
+        return 'Digest ' + ', '.join(fields), 'digest'
+    if any(c.lower().startswith('basic') for c in challenges):
+        token = base64.b64encode(f"{username}:{password}".encode('utf-8')).decode('ascii')
+        return f'Basic {token}', 'basic'
+    return None, 'none'
+
+
+# --- RTSP istemcisi ---
+class _RTSPConnection:
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self.reader: Optional[asyncio.StreamReader] = None
+        self.writer: Optional[asyncio.StreamWriter] = None
+        self.cseq = 0
+
+    async def open(self):
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+
+    def close(self):
+        if self.writer is not None:
+            try:
+                self.writer.close()
+            except Exception:
+                pass
+            self.writer = None
+
+    async def request(self, method: str, uri: str, headers: Dict[str, str] = None) -> Tuple[int, Dict[str, List[str]], bytes]:
+        self.cseq += 1
+        lines = [f"{method} {uri} RTSP/1.0", f"CSeq: {self.cseq}", f"User-Agent: {RTSP_USER_AGENT}"]
+        for name, value in (headers or {}).items():
+            lines.append(f"{name}: {value}")
+        self.writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('utf-8'))
+        await self.writer.drain()
+
+        head = await self.reader.readuntil(b'\r\n\r\n')
+        if len(head) > _MAX_HEADER_BYTES:
+            raise ValueError("RTSP başlığı çok büyük")
+        header_lines = head.decode('utf-8', 'replace').split('\r\n')
+        status_match = re.match(r'RTSP/\d\.\d\s+(\d{3})', header_lines[0])
+        if not status_match:
+            raise ValueError(f"Geçersiz RTSP cevabı: {header_lines[0][:60]}")
+
+        response_headers: Dict[str, List[str]] = {}
+        for line in header_lines[1:]:
+            name, sep, value = line.partition(':')
+            if sep:
+                response_headers.setdefault(name.strip().lower(), []).append(value.strip())
+
+        body = b''
+        length = int(response_headers.get('content-length', ['0'])[0] or 0)
+        if length > 0:
+            body = await self.reader.readexactly(min(length, _MAX_BODY_BYTES))
+        return int(status_match.group(1)), response_headers, body
+
+
+def _split_url(url: str) -> Tuple[str, int, str, str, str]:
+    """(host, port, request_uri, username, password) - kimlik bilgisi URI'dan çıkarılır"""
+    parts = urlsplit(url)
+    host = parts.hostname or ''
+    port = parts.port or 554
+    path = parts.path or '/'
+    uri = f"rtsp://{host}:{port}{path}" + (f"?{parts.query}" if parts.query else '')
+    return host, port, uri, unquote(parts.username or ''), unquote(parts.password or '')
+
+
+async def _probe(url: str, method: str) -> RTSPProbeResult:
+    result = RTSPProbeResult(url=url)
+    host, port, uri, username, password = _split_url(url)
+    headers = {'Accept': 'application/sdp'} if method == 'DESCRIBE' else {}
+
+    conn = _RTSPConnection(host, port)
+    try:
+        await conn.open()
+        status, response_headers, body = await conn.request(method, uri, headers)
+
+        if status == 401 and username:
+            challenges = response_headers.get('www-authenticate', [])
+            authorization, scheme = build_authorization(challenges, method, uri, username, password)
+            if authorization:
+                result.auth = scheme
+                auth_headers = dict(headers, Authorization=authorization)
+                try:
+                    status, response_headers, body = await conn.request(method, uri, auth_headers)
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    # Bazı DVR'lar 401 sonrası bağlantıyı kapatır - yeni bağlantıyla tekrar dene
+                    conn.close()
+                    conn = _RTSPConnection(host, port)
+                    await conn.open()
+                    status, response_headers, body = await conn.request(method, uri, auth_headers)
+
+        result.status_code = status
+        if status != 200:
+            result.error = f"RTSP {status}"
+            return result
+
+        if method == 'DESCRIBE':
+            sdp = parse_sdp(body.decode('utf-8', 'replace'))
+            if body and not sdp['has_video']:
+                result.error = 'SDP video içermiyor'
+                return result
+            result.codec = sdp['codec']
+            result.width, result.height = sdp['width'], sdp['height']
+            result.fps = sdp['fps']
+        result.ok = True
+        return result
+    finally:
+        conn.close()
+
+
+async def probe_url(url: str, timeout: float = 2.0, method: str = 'DESCRIBE') -> RTSPProbeResult:
+    """Tek URL'i OPTIONS veya DESCRIBE ile yoklar (hata fırlatmaz)"""
+    started = time.perf_counter()
+    try:
+        result = await asyncio.wait_for(_probe(url, method), timeout=timeout)
+    except asyncio.TimeoutError:
+        result = RTSPProbeResult(url=url, error='timeout')
+    except Exception as e:
+        result = RTSPProbeResult(url=url, error=str(e) or e.__class__.__name__)
+    result.elapsed_ms = round((time.perf_counter() - started) * 1000, 1)
+    return result
+
+
+async def probe_urls(urls: List[str], timeout: float = 2.0, concurrency: int = 32,
+                     method: str = 'DESCRIBE') -> List[RTSPProbeResult]:
+    """URL'leri eşzamanlı yoklar; sonuçlar verilen sırayla döner"""
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def _limited(url: str) -> RTSPProbeResult:
+        async with semaphore:
+            return await probe_url(url, timeout=timeout, method=method)
+
+    return list(await asyncio.gather(*(_limited(url) for url in urls)))
+
+
+async def probe_channels(channel_urls: Dict[int, List[str]], timeout: float = 2.0,
+                         concurrency: int = 32) -> Dict[int, RTSPProbeResult]:
+    """Tüm kanalların aday URL'lerini tek seferde yoklar.
+
+    Her kanal için listede en önde olan başarılı sonuç döner; hiçbiri başarılı
+    değilse ilk adayın hata sonucu döner.
+    """
+    flat = [(channel, url) for channel, urls in channel_urls.items() for url in urls]
+    results = await probe_urls([url for _, url in flat], timeout=timeout, concurrency=concurrency)
+
+    best: Dict[int, RTSPProbeResult] = {}
+    for (channel, _), result in zip(flat, results):
+        current = best.get(channel)
+        if current is None or (result.ok and not current.ok):
+            best[channel] = result
+    return best
+
+
+def run_sync(coro):
+    """Coroutine'i senkron koddan çalıştırır (Flask route'ları ve worker thread'leri için)"""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    # Zaten bir event loop içindeysek ayrı thread'de çalıştır
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, coro).result()
+
+
+def probe_url_sync(url: str, timeout: float = 2.0, method: str = 'DESCRIBE') -> RTSPProbeResult:
+    return run_sync(probe_url(url, timeout=timeout, method=method))
+
+
+def probe_channels_sync(channel_urls: Dict[int, List[str]], timeout: float = 2.0,
+                        concurrency: int = 32) -> Dict[int, RTSPProbeResult]:
+    return run_sync(probe_channels(channel_urls, timeout=timeout, concurrency=concurrency))
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+DVR RTSP URL Öğrenme
+- Çalışan RTSP URL'i kanal bağımsız bir kalıba (pattern) dönüştürülür ve DVR başına saklanır
+- Sonraki bağlantılarda önce öğrenilmiş kalıp denenir; sadece başarısız olursa yeniden öğrenilir
+- Öğrenme sırasında aday URL'ler sıralı değil, paralel denenir (öncelik sırası korunur)
+
+cv2'ye bağımlı değildir; URL açma işlemi çağıran tarafından verilir.
+"""
+
+import re
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Kalıplarda kullanılan yer tutucular: {username} {password} {ip} {port} {channel} {channel:02d}
+# (regex, iki haneli değer her zaman sıfır dolgulu mu) - kanal numarası 2. grupta
+_CHANNEL_RULES = [
+    # Hikvision ISAPI: kanal 1 -> 101/102/103, kanal 12 -> 1201
+    (re.compile(r'(/(?:ISAPI/)?[Ss]treaming/[Cc]hannels/)(\d+)(0[1-3])(?=$|[/?&])'), False),
+    (re.compile(r'(channel=)(\d+)(?=$|&)'), False),
+    (re.compile(r'(camera=)(\d+)(?=$|&)'), False),
+    # /ch01, /ch12 -> {channel:02d}; /ch1 -> {channel}
+    (re.compile(r'(/ch)(\d+)(?=$|/)'), True),
+    (re.compile(r'(/(?:channel|camera))(\d+)(?=$|/)'), False),
+    (re.compile(r'(/live/)(\d+)(?=\.sdp)'), False),
+    (re.compile(r'(/h264/)(\d+)(?=/)'), False),
+]
+
+
+def _escape(text: str) -> str:
+    return text.replace('{', '{{').replace('}', '}}')
+
+
+def brand_from_url(url: str) -> str:
+    """Çalışan URL'den DVR markasını çıkarır (detect_dvr_brand ile aynı sınıflandırma)"""
+    if '/user=' in url and ('stream=0.sdp' in url or 'stream=1.sdp' in url):
+        return 'xm'
+    if 'ISAPI' in url or '/Streaming/Channels/' in url:
+        return 'hikvision'
+    if 'cam/realmonitor' in url:
+        return 'dahua'
+    if 'axis-media' in url:
+        return 'axis'
+    return 'generic'
+
+
+def url_to_pattern(url: str, ip_address: str, username: str, password: str,
+                   rtsp_port: int, channel_number: int) -> Optional[str]:
+    """Kanal URL'ini DVR kalıbına dönüştürür.
+
+    Kalıp tekrar aynı kanal için üretildiğinde birebir aynı URL'i vermiyorsa
+    (ör. kanal numarası path'te tanınmayan bir biçimde) None döner.
+    """
+    try:
+        prefix = f"rtsp://{username}:{password}@{ip_address}:{rtsp_port}"
+        bare_prefix = f"rtsp://{ip_address}:{rtsp_port}"
+        if url.startswith(prefix):
+            head, path = 'rtsp://{username}:{password}@{ip}:{port}', url[len(prefix):]
+        elif url.startswith(bare_prefix):
+            head, path = 'rtsp://{ip}:{port}', url[len(bare_prefix):]
+        else:
+            return None
+
+        credentials = f"user={username}&password={password}"
+        parts = path.split(credentials, 1) if username else [path]
+
+        def templatize(segment: str) -> str:
+            out = []
+            pos = 0
+            matches = []
+            for regex, pad_two_digits in _CHANNEL_RULES:
+                for m in regex.finditer(segment):
+                    if int(m.group(2)) == channel_number:
+                        matches.append((m.start(2), m.end(2), m.group(2), pad_two_digits))
+            for start, end, digits, pad_two_digits in sorted(set(matches)):
+                if start < pos:
+                    continue
+                out.append(_escape(segment[pos:start]))
+                padded = len(digits) == 2 and (digits.startswith('0') or pad_two_digits)
+                out.append('{channel:02d}' if padded else '{channel}')
+                pos = end
+            out.append(_escape(segment[pos:]))
+            return ''.join(out)
+
+        body = templatize(parts[0])
+        if len(parts) == 2:
+            body += 'user={username}&password={password}' + templatize(parts[1])
+        pattern = head + body
+
+        if render_pattern(pattern, ip_address, username, password, rtsp_port, channel_number) != url:
+            return None
+        return pattern
+    except Exception as e:
+        logger.debug(f"URL kalıba dönüştürülemedi: {e}")
+        return None
+
+
+def render_pattern(pattern: str, ip_address: str, username: str, password: str,
+                   rtsp_port: int, channel_number: int) -> Optional[str]:
+    """Öğrenilmiş kalıptan kanal URL'i üretir"""
+    try:
+        return pattern.format(ip=ip_address, port=rtsp_port, username=username,
+                              password=password, channel=int(channel_number))
+    except Exception as e:
+        logger.debug(f"Kalıp URL'e dönüştürülemedi: {pattern} -> {e}")
+        return None
+
+
+def probe_in_priority(urls: List[str], opener: Callable[[str], Any],
+                      closer: Callable[[Any], None] = None,
+                      max_workers: int = 6) -> Tuple[Optional[str], Any]:
+    """Aday URL'leri paralel dener, listede en önde olan başarılı URL'i döndürür.
+
+    opener(url) başarılıysa bir kaynak (ör. açık VideoCapture), değilse None döner.
+    Bir aday başarılı olduğunda sadece ondan önceki adayların sonucu beklenir;
+    kazanan dışındaki açık kaynaklar closer ile kapatılır. Toplam süre, adayların
+    bağlantı sürelerinin toplamı yerine yaklaşık en yavaş öncelikli adayın süresidir.
+    """
+    if not urls:
+        return None, None
+
+    results: List[Any] = [None] * len(urls)
+    finished = [False] * len(urls)
+    state_lock = threading.Lock()
+    decided = {'index': None}
+
+    def _close(resource):
+        if resource is not None and closer is not None:
+            try:
+                closer(resource)
+            except Exception:
+                pass
+
+    def _run(index: int):
+        with state_lock:
+            if decided['index'] is not None and index > decided['index']:
+                return  # Daha öncelikli aday zaten kazandı
+        try:
+            resource = opener(urls[index])
+        except Exception as e:
+            logger.debug(f"RTSP aday hatası: {urls[index]} -> {e}")
+            resource = None
+        with state_lock:
+            late = decided['index'] is not None
+            if not late:
+                results[index] = resource
+        if late:
+            _close(resource)
+
+    executor = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(urls))),
+                                  thread_name_prefix='rtsp-probe')
+    futures = {executor.submit(_run, i): i for i in range(len(urls))}
+    pending = set(futures)
+    winner = None
+    try:
+        while pending and winner is None:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            with state_lock:
+                for future in done:
+                    finished[futures[future]] = True
+                for index in range(len(urls)):
+                    if results[index] is not None:
+                        winner = index
+                        decided['index'] = index
+                        break
+                    if not finished[index]:
+                        break
+    finally:
+        with state_lock:
+            if decided['index'] is None:
+                decided['index'] = len(urls)
+            losers = [r for i, r in enumerate(results) if r is not None and i != winner]
+            for i in range(len(results)):
+                if i != winner:
+                    results[i] = None
+        for resource in losers:
+            _close(resource)
+        for future in pending:
+            future.cancel()
+        # Hâlâ bağlanmaya çalışan adaylar arka planda biter ve kendi kaynaklarını kapatır
+        executor.shutdown(wait=False)
+
+    if winner is None:
+        return None, None
+    return urls[winner], results[winner]
+
+
+class RTSPPatternCache:
+    """(company_id, dvr_id, ip, rtsp_port) başına öğrenilmiş marka ve URL kalıbı
+
+    Farklı şirketlerin DVR'ları aynı özel IP'yi (ör. 192.168.1.100:554) kullanabilir;
+    kayıtlar şirket/DVR kimliğiyle ayrılır, bir kiracının kalıbı diğerine sızmaz.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: Dict[Tuple[Optional[str], Optional[str], str, int], Dict[str, Any]] = {}
+
+    @staticmethod
+    def _key(ip_address: str, rtsp_port: int, company_id: Optional[str],
+             dvr_id: Optional[str]) -> Tuple[Optional[str], Optional[str], str, int]:
+        return (company_id, dvr_id, str(ip_address), int(rtsp_port or 554))
+
+    def get(self, ip_address: str, rtsp_port: int, company_id: str = None,
+            dvr_id: str = None) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(self._key(ip_address, rtsp_port, company_id, dvr_id))
+            return dict(entry) if entry else None
+
+    def remember(self, ip_address: str, rtsp_port: int, brand: Optional[str] = None,
+                 pattern: Optional[str] = None, company_id: str = None, dvr_id: str = None):
+        """Marka/kalıp bilgisini kaydeder; verilmeyen alanlar korunur"""
+        with self._lock:
+            entry = self._entries.setdefault(self._key(ip_address, rtsp_port, company_id, dvr_id), {})
+            if brand:
+                entry['brand'] = brand
+            if pattern:
+                entry['pattern'] = pattern
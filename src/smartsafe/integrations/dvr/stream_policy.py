@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+DVR Dual-Stream Policy
+Kanal bazlı main/sub stream seçimi - detection substream'de, kanıt snapshot'ı main stream'de
+
+URL tablosu tutulmaz: main/sub adayları DVRStreamHandler.generate_rtsp_urls adaylarından
+(veya öğrenilmiş kalıptan) stream soneki (stream=/subtype=/Channels/x01-x02, /main-/sub)
+değiştirilerek türetilir.
+"""
+
+import re
+from typing import Dict, List, Optional, Sequence
+
+from src.smartsafe.database.stream_policies import (
+    STREAM_POLICY_MAIN, STREAM_POLICY_SUB, normalize_stream_policy
+)
+
+# (regex, main değeri, sub değeri) - 1. grup korunur, 2. grup stream seçicisidir
+_STREAM_VARIANT_RULES = [
+    # XM: stream=0.sdp / stream=1.sdp, Dahua: &stream=0 / &stream=1
+    (re.compile(r'([?&/]stream=)([01])(?=\.sdp|&|$)'), '0', '1'),
+    # Dahua: subtype=0 / subtype=1
+    (re.compile(r'([?&]subtype=)([01])(?=&|$)'), '0', '1'),
+    # Hikvision: kanal 1 -> 101 / 102, kanal 12 -> 1201 / 1202
+    (re.compile(r'([Ss]treaming/[Cc]hannels/\d+)(0[12])(?=$|[/?&])'), '01', '02'),
+    # Generic: /ch01/main / /ch01/sub
+    (re.compile(r'(/)(main|sub)(?=$|/)'), 'main', 'sub'),
+]
+
+
+def stream_variant(url: str, stream: str) -> Optional[str]:
+    """URL'in main ('main') ya da sub ('sub') stream karşılığı; stream soneki tanınmıyorsa None"""
+    result, matched = url, False
+    for regex, main_value, sub_value in _STREAM_VARIANT_RULES:
+        value = main_value if stream == 'main' else sub_value
+        result, count = regex.subn(lambda m: m.group(1) + value, result)
+        matched = matched or count > 0
+    return result if matched else None
+
+
+def split_stream_urls(candidates: Sequence[str]) -> Dict[str, List[str]]:
+    """Aday URL'leri sırası korunarak main ve sub listelerine ayırır.
+
+    Her adayın karşı stream'i sonekinden türetilir; soneki tanınmayan (tek stream'li)
+    adaylar sadece main listesine girer.
+    """
+    main_urls: List[str] = []
+    sub_urls: List[str] = []
+    for url in candidates:
+        main_url = stream_variant(url, 'main')
+        sub_url = stream_variant(url, 'sub') if main_url else None
+        main_url = main_url or url
+        if main_url not in main_urls:
+            main_urls.append(main_url)
+        if sub_url and sub_url not in sub_urls:
+            sub_urls.append(sub_url)
+    return {'main': main_urls, 'sub': sub_urls}
+
+
+def resolve_policy_urls(stream_urls: Dict[str, List[str]], policy: Optional[str]) -> Dict[str, List[str]]:
+    """Politikaya göre detection ve snapshot için kullanılacak URL listelerini döndürür"""
+    policy = normalize_stream_policy(policy)
+    if policy == STREAM_POLICY_MAIN:
+        return {'detection': stream_urls['main'], 'snapshot': []}
+    if policy == STREAM_POLICY_SUB:
+        return {'detection': stream_urls['sub'], 'snapshot': []}
+    # dual: substream açılamazsa main stream'e düş
+    return {'detection': stream_urls['sub'] + stream_urls['main'], 'snapshot': stream_urls['main']}
+
+
+def scale_bbox(bbox: Sequence[float], src_shape: Sequence[int], dst_shape: Sequence[int]) -> List[int]:
+    """Substream koordinatlarındaki bbox'ı main stream çözünürlüğüne ölçekler.
+
+    src_shape/dst_shape: frame.shape (height, width[, channels])
+    """
+    if not bbox or len(bbox) != 4:
+        return list(bbox or [])
+    src_h, src_w = src_shape[0], src_shape[1]
+    dst_h, dst_w = dst_shape[0], dst_shape[1]
+    if not src_w or not src_h:
+        return [int(v) for v in bbox]
+
+    sx = dst_w / float(src_w)
+    sy = dst_h / float(src_h)
+    x1, y1, x2, y2 = bbox
+    return [
+        max(0, min(dst_w, int(round(x1 * sx)))),
+        max(0, min(dst_h, int(round(y1 * sy)))),
+        max(0, min(dst_w, int(round(x2 * sx)))),
+        max(0, min(dst_h, int(round(y2 * sy)))),
+    ]
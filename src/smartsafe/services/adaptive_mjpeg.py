@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+"""
+SmartSafe AI - Adaptive MJPEG Streaming
+İstemci başına kalite / çözünürlük / FPS kademesi (tier) seçen MJPEG üretici
+
+- Backpressure ölçümü: generator yield'den geri döndüğünde WSGI worker önceki
+  parçayı sokete yazmış olur; aradaki süre istemcinin tüketim hızıdır
+- Yazma süresi frame aralığını doldurursa bir alt tier'a inilir, uzun süre
+  rahat kalırsa bir üst tier'a çıkılır; en alt tier'da bile takılan istemci
+  kesilir (gthread worker'ı bloke etmesin)
+- Aynı kaynak + aynı tier'daki istemciler encode edilmiş JPEG'i paylaşır
+  (frame başına tier başına tek encode)
+- ?tier=high|medium|low|minimal ile sabit tier, ?tier=auto (varsayılan) ile adaptif
+"""
+
+import threading
+import time
+import logging
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+from src.smartsafe.services.latency_tracer import STAGE_ENCODE, STAGE_SEND, LatencyTracer, get_latency_tracer
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class MJPEGTier:
+    name: str
+    quality: int
+    scale: float
+    fps: float
+
+    @property
+    def frame_interval(self) -> float:
+        return 1.0 / self.fps
+
+
+# Yüksekten düşüğe sıralı
+TIERS = (
+    MJPEGTier('high', 85, 1.0, 20.0),
+    MJPEGTier('medium', 70, 0.75, 12.0),
+    MJPEGTier('low', 55, 0.5, 6.0),
+    MJPEGTier('minimal', 40, 0.35, 2.0),
+)
+TIER_BY_NAME = {tier.name: tier for tier in TIERS}
+AUTO_TIER = 'auto'
+
+
+def resolve_tier(value: Optional[str]) -> Tuple[MJPEGTier, bool]:
+    """Query parametresinden (tier, adaptif mi) - bilinmeyen değer adaptif sayılır"""
+    name = (value or AUTO_TIER).strip().lower()
+    if name in TIER_BY_NAME:
+        return TIER_BY_NAME[name], False
+    return TIERS[0], True
+
+
+class TierController:
+    """İstemcinin yazma süresine göre tier seçer"""
+
+    def __init__(self, tier: MJPEGTier = TIERS[0], adaptive: bool = True,
+                 downgrade_ratio: float = 0.8, upgrade_ratio: float = 0.3,
+                 downgrade_after: int = 3, upgrade_after_seconds: float = 5.0,
+                 stall_seconds: float = 15.0):
+        self.index = TIERS.index(tier)
+        self.adaptive = adaptive
+        self.downgrade_ratio = downgrade_ratio
+        self.upgrade_ratio = upgrade_ratio
+        self.downgrade_after = downgrade_after
+        self.upgrade_after_seconds = upgrade_after_seconds
+        self.stall_seconds = stall_seconds
+        self.stalled = False
+        self.bytes_per_second = 0.0
+        self._slow_streak = 0
+        self._fast_since: Optional[float] = None
+
+    @property
+    def tier(self) -> MJPEGTier:
+        return TIERS[self.index]
+
+    def record(self, write_seconds: float, nbytes: int = 0, now: Optional[float] = None) -> Optional[MJPEGTier]:
+        """Bir parçanın yazılma süresini kaydeder; tier değiştiyse yeni tier'ı döndürür"""
+        now = time.monotonic() if now is None else now
+        if write_seconds > 0 and nbytes:
+            rate = nbytes / write_seconds
+            self.bytes_per_second = rate if not self.bytes_per_second else 0.8 * self.bytes_per_second + 0.2 * rate
+        if write_seconds >= self.stall_seconds and (not self.adaptive or self.index == len(TIERS) - 1):
+            self.stalled = True
+        if not self.adaptive:
+            return None
+
+        ratio = write_seconds / self.tier.frame_interval
+        if ratio >= self.downgrade_ratio:
+            self._fast_since = None
+            self._slow_streak += 1
+            if self._slow_streak >= self.downgrade_after and self.index < len(TIERS) - 1:
+                return self._move(+1)
+        else:
+            self._slow_streak = 0
+            if ratio <= self.upgrade_ratio:
+                if self._fast_since is None:
+                    self._fast_since = now
+                elif now - self._fast_since >= self.upgrade_after_seconds and self.index > 0:
+                    return self._move(-1)
+            else:
+                self._fast_since = None
+        return None
+
+    def _move(self, step: int) -> MJPEGTier:
+        self.index += step
+        self._slow_streak = 0
+        self._fast_since = None
+        return self.tier
+
+
+def _cv2_encode(frame, tier: MJPEGTier) -> Optional[bytes]:
+    import cv2
+    if tier.scale < 1.0:
+        frame = cv2.resize(frame, None, fx=tier.scale, fy=tier.scale, interpolation=cv2.INTER_AREA)
+    ok, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, tier.quality])
+    return buffer.tobytes() if ok else None
+
+
+class TieredEncodeCache:
+    """Kaynak + tier başına son encode edilmiş frame (aynı tier'daki istemciler paylaşır)
+
+    Kaynağın son istemcisi ayrılınca o kaynağın frame'leri ve anahtar kilitleri silinir.
+    """
+
+    def __init__(self, encoder: Callable[[Any, MJPEGTier], Optional[bytes]] = None):
+        self.encoder = encoder or _cv2_encode
+        self._lock = threading.Lock()
+        self._entries: Dict[Tuple[str, str], Tuple[int, bytes]] = {}
+        self._key_locks: Dict[Tuple[str, str], threading.Lock] = {}
+        self._clients: Counter = Counter()
+        self._source_clients: Counter = Counter()
+
+        # İstatistikler
+        self.encodes = 0
+        self.hits = 0
+
+    def get(self, source_key: str, seq: int, tier: MJPEGTier, render: Callable[[], Any]) -> Optional[bytes]:
+        """seq numaralı frame'in tier'daki JPEG'i; yoksa render() edilip bir kez encode edilir"""
+        key = (source_key, tier.name)
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == seq:
+            self.hits += 1
+            return entry[1]
+
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            # Aynı frame'i bekleyen diğer istemci encode etmiş olabilir
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == seq:
+                self.hits += 1
+                return entry[1]
+            frame = render()
+            if frame is None:
+                return None
+            data = self.encoder(frame, tier)
+            if data is None:
+                return None
+            self._entries[key] = (seq, data)
+            self.encodes += 1
+            return data
+
+    def drop_source(self, source_key: str):
+        with self._lock:
+            self._drop_source(source_key)
+
+    def _drop_source(self, source_key: str):
+        for key in [k for k in self._entries if k[0] == source_key]:
+            del self._entries[key]
+        for key in [k for k in self._key_locks if k[0] == source_key]:
+            del self._key_locks[key]
+
+    def client_joined(self, tier: MJPEGTier, source_key: Optional[str] = None):
+        with self._lock:
+            self._clients[tier.name] += 1
+            if source_key is not None:
+                self._source_clients[source_key] += 1
+
+    def client_left(self, tier: MJPEGTier, source_key: Optional[str] = None):
+        with self._lock:
+            self._clients[tier.name] -= 1
+            if self._clients[tier.name] <= 0:
+                del self._clients[tier.name]
+            if source_key is not None:
+                self._source_clients[source_key] -= 1
+                if self._source_clients[source_key] <= 0:
+                    del self._source_clients[source_key]
+                    self._drop_source(source_key)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            clients = {tier.name: self._clients.get(tier.name, 0) for tier in TIERS}
+        total = self.encodes + self.hits
+        return {
+            'clients_by_tier': clients,
+            'encodes': self.encodes,
+            'shared_hits': self.hits,
+            'share_ratio': round(self.hits / total, 3) if total else 0.0,
+        }
+
+
+def mjpeg_part(jpeg: bytes, boundary: str = 'frame') -> bytes:
+    return (b"--" + boundary.encode() + b"\r\n"
+            b"Content-Type: image/jpeg\r\n"
+            b"Content-Length: " + str(len(jpeg)).encode() + b"\r\n\r\n"
+            + jpeg + b"\r\n")
+
+
+def adaptive_mjpeg_stream(source_key: str,
+                          next_frame: Callable[[int], Optional[Tuple[int, Callable[[], Any], Callable[[], None], Optional[float]]]],
+                          tier: Optional[str] = None, boundary: str = 'frame',
+                          is_active: Callable[[], bool] = lambda: True,
+                          idle_part: Optional[Callable[[], Optional[bytes]]] = None,
+                          cache: Optional['TieredEncodeCache'] = None,
+                          tracer: Optional[LatencyTracer] = None,
+                          clock: Callable[[], float] = time.monotonic,
+                          sleep: Callable[[float], None] = time.sleep) -> Iterator[bytes]:
+    """Adaptif multipart MJPEG generator
+
+    next_frame(min_seq) -> (seq, render, release, captured_at) veya yeni frame yoksa None.
+    render() encode edilecek frame'i (overlay çizilmiş) döndürür, release() frame'i serbest bırakır,
+    captured_at frame'in monotonic yakalanma zamanıdır (encode/send gecikmesi için, None olabilir).
+    idle_part() henüz frame yokken (saniyede en fazla bir kez) gönderilecek parça.
+    """
+    start_tier, adaptive = resolve_tier(tier)
+    controller = TierController(start_tier, adaptive=adaptive)
+    cache = cache or get_tiered_encode_cache()
+    tracer = tracer or get_latency_tracer()
+    current = controller.tier
+    cache.client_joined(current, source_key)
+    last_seq = 0
+    last_idle = 0.0
+    try:
+        while is_active():
+            frame_started = clock()
+            item = next_frame(last_seq)
+            jpeg = None
+            captured_at = None
+            if item is not None:
+                seq, render, release, captured_at = item
+                try:
+                    jpeg = cache.get(source_key, seq, current, render)
+                finally:
+                    release()
+                last_seq = seq
+                if jpeg:
+                    tracer.observe(source_key, STAGE_ENCODE, captured_at)
+            elif idle_part is not None and frame_started - last_idle >= 1.0:
+                jpeg = idle_part()
+                last_idle = frame_started
+
+            if jpeg:
+                write_started = clock()
+                yield mjpeg_part(jpeg, boundary)
+                changed = controller.record(clock() - write_started, len(jpeg))
+                tracer.observe(source_key, STAGE_SEND, captured_at, seq=last_seq)
+                if controller.stalled:
+                    logger.warning(f"⚠️ MJPEG client stalled on {source_key} (tier={current.name}), closing stream")
+                    return
+                if changed is not None:
+                    logger.info(f"📶 MJPEG tier {current.name} -> {changed.name} for {source_key} "
+                                f"({controller.bytes_per_second / 1024:.0f} KB/s)")
+                    # Önce katıl: tek istemcili kaynağın cache'i tier değişiminde silinmesin
+                    cache.client_joined(changed, source_key)
+                    cache.client_left(current, source_key)
+                    current = changed
+
+            # Tier FPS'ine göre bekle (yeni frame yoksa kısa bekle)
+            remaining = current.frame_interval - (clock() - frame_started)
+            sleep(remaining if remaining > 0 else 0.005)
+    finally:
+        cache.client_left(current, source_key)
+
+
+# Global encode cache
+_tiered_encode_cache = None
+
+
+def get_tiered_encode_cache() -> TieredEncodeCache:
+    """Global tier encode cache instance'ını döndürür"""
+    global _tiered_encode_cache
+    if _tiered_encode_cache is None:
+        _tiered_encode_cache = TieredEncodeCache()
+    return _tiered_encode_cache
@@ -0,0 +1,484 @@
+#!/usr/bin/env python3
+"""
+SmartSafe AI - Binary Detection Log
+Her inference sonucunu kamera + gün başına sıkıştırılmış ikili günlüğe yazar
+(replay, denetim ve uyum kurallarının çevrimdışı yeniden çalıştırılması için)
+
+- Dizin: <root>/<company_id>/<camera_id>/<YYYYMMDD>.frames / .boxes + classes.json
+- Sadece sona ekleme; sabit genişlikli kayıtlar (little-endian struct):
+    frame (28 B): gün başından ms ofset u32, frame seq u32, ilk box indeksi u32,
+                  box sayısı u16, kişi / uyumlu / ihlal u16, genişlik / yükseklik u16,
+                  inference süresi float16 (ms)
+    box   (16 B): x1, y1, x2, y2 int16 (piksel), sınıf id u16, güven float16, track id int32
+- Sınıf adları kamera başına classes.json sözlüğünde (id = listedeki sıra)
+- Box'lar frame kaydından önce yazılır/flush edilir: okuyucu gördüğü her frame'in
+  box'larını da görür; yarım kalmış kuyruk kayıtları açılışta kırpılır
+- Okuma: dosyalar mmap ile açılır, frame'ler zamana göre sıralı olduğundan zaman
+  aralığının başı ms ofset üzerinde ikili arama ile bulunur (tarama yok)
+- Tipik frame (5 box) ~108 B - aynı sonucun JSON'u (detection_data) birkaç KB
+"""
+
+import json
+import mmap
+import os
+import re
+import struct
+import threading
+import time
+import logging
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'SSDL'
+VERSION = 1
+
+# magic, sürüm, kayıt boyutu, gün başlangıcı (epoch saniye) + rezerv
+HEADER = struct.Struct('<4sHHd16x')
+FRAME = struct.Struct('<IIIHHHHHHe2x')
+BOX = struct.Struct('<hhhhHei')
+
+_U16_MAX = 0xFFFF
+_I16_MIN, _I16_MAX = -0x8000, 0x7FFF
+_F16_MAX = 65504.0
+_I32_MASK = 0x7FFFFFFF
+_SAFE_NAME = re.compile(r'[^A-Za-z0-9_.-]')
+
+
+def _u16(value) -> int:
+    try:
+        return min(max(int(value or 0), 0), _U16_MAX)
+    except (TypeError, ValueError):
+        return 0
+
+
+def _i16(value) -> int:
+    return min(max(int(round(float(value))), _I16_MIN), _I16_MAX)
+
+
+def _f16(value) -> float:
+    try:
+        return min(max(float(value or 0.0), -_F16_MAX), _F16_MAX)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _track_id(value) -> int:
+    """BOX kaydındaki int32 alana sığan takip id'si; yoksa / geçersizse -1
+
+    Büyük id'ler alt 31 bite indirgenir (sınırda kırpmak farklı track'leri birleştirirdi).
+    """
+    if isinstance(value, bool) or value is None:
+        return -1
+    if isinstance(value, (int, float)):
+        try:
+            track_id = int(value)
+        except (OverflowError, ValueError):
+            return -1
+        return track_id & _I32_MASK if track_id >= 0 else -1
+    digits = re.sub(r'\D', '', str(value))
+    return int(digits[-9:]) if digits else -1
+
+
+def _safe(name: str) -> str:
+    safe = _SAFE_NAME.sub('_', str(name))
+    if not safe.strip('.'):
+        raise ValueError(f"Invalid detection log path component: {name!r}")
+    return safe
+
+
+def _day_start(day: date) -> float:
+    return datetime(day.year, day.month, day.day).timestamp()
+
+
+@dataclass
+class BoxRecord:
+    bbox: Tuple[int, int, int, int]
+    class_name: str
+    confidence: float
+    track_id: Optional[int]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'bbox': list(self.bbox), 'class_name': self.class_name,
+                'confidence': round(self.confidence, 3), 'track_id': self.track_id}
+
+
+@dataclass
+class FrameRecord:
+    timestamp: float
+    seq: int
+    people: int
+    compliant: int
+    violations: int
+    width: int
+    height: int
+    inference_ms: float
+    boxes: List[BoxRecord] = field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'timestamp': round(self.timestamp, 3),
+            'frame_seq': self.seq,
+            'people_detected': self.people,
+            'ppe_compliant': self.compliant,
+            'violations_count': self.violations,
+            'width': self.width or None,
+            'height': self.height or None,
+            'inference_ms': round(self.inference_ms, 1),
+            'detections': [box.to_dict() for box in self.boxes],
+        }
+
+
+class ClassVocabulary:
+    """Kamera başına sınıf adı <-> id sözlüğü (classes.json, atomik yeniden yazım)"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self.names: List[str] = []
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as handle:
+                self.names = list(json.load(handle))
+        self._ids = {name: index for index, name in enumerate(self.names)}
+
+    def id_for(self, name: str) -> int:
+        class_id = self._ids.get(name)
+        if class_id is not None:
+            return class_id
+        with self._lock:
+            class_id = self._ids.get(name)
+            if class_id is None:
+                class_id = len(self.names)
+                self.names.append(name)
+                self._ids[name] = class_id
+                tmp = f"{self.path}.tmp"
+                with open(tmp, 'w', encoding='utf-8') as handle:
+                    json.dump(self.names, handle)
+                os.replace(tmp, self.path)
+            return class_id
+
+    def name_for(self, class_id: int) -> str:
+        return self.names[class_id] if 0 <= class_id < len(self.names) else f'class_{class_id}'
+
+
+def _open_append(path: str, record: struct.Struct, day_start: float):
+    """Dosyayı ekleme için açar: yoksa header yazar, yarım kuyruk kaydını kırpar; (handle, kayıt sayısı)"""
+    exists = os.path.exists(path) and os.path.getsize(path) >= HEADER.size
+    if exists:
+        size = os.path.getsize(path)
+        count = (size - HEADER.size) // record.size
+        if HEADER.size + count * record.size != size:
+            os.truncate(path, HEADER.size + count * record.size)
+        return open(path, 'ab'), count
+    handle = open(path, 'wb')
+    handle.write(HEADER.pack(MAGIC, VERSION, record.size, day_start))
+    return handle, 0
+
+
+class _DayWriter:
+    """Tek kamera + gün için ekleme tamponu"""
+
+    def __init__(self, directory: str, day: date, vocabulary: ClassVocabulary):
+        self.day = day
+        self.day_start = _day_start(day)
+        self.vocabulary = vocabulary
+        stem = os.path.join(directory, day.strftime('%Y%m%d'))
+        self.boxes_file, self.box_count = _open_append(f'{stem}.boxes', BOX, self.day_start)
+        self.frames_file, self.frame_count = _open_append(f'{stem}.frames', FRAME, self.day_start)
+        self.pending = 0
+        self.last_flush = time.monotonic()
+        self.bytes_written = 0
+
+    def append(self, frame_ts: float, detections: Iterable[Dict[str, Any]], people: int, compliant: int,
+               violations: int, width: int, height: int, seq: int, inference_ms: float):
+        box_start = self.box_count
+        box_bytes = bytearray()
+        for detection in detections:
+            if not isinstance(detection, dict):
+                continue
+            bbox = detection.get('bbox') or []
+            if len(bbox) != 4:
+                continue
+            try:
+                coords = [_i16(coord) for coord in bbox]
+            except (TypeError, ValueError):
+                continue
+            name = detection.get('class_name')
+            if not name:
+                name = f"class_{detection.get('class_id', 'unknown')}"
+            box_bytes += BOX.pack(*coords, self.vocabulary.id_for(str(name)),
+                                  _f16(detection.get('confidence')),
+                                  _track_id(detection.get('track_id', detection.get('person_id'))))
+        count = len(box_bytes) // BOX.size
+        offset_ms = min(max(int(round((frame_ts - self.day_start) * 1000)), 0), 0xFFFFFFFF)
+        frame = FRAME.pack(offset_ms, seq & 0xFFFFFFFF, box_start, min(count, _U16_MAX),
+                           _u16(people), _u16(compliant), _u16(violations), _u16(width), _u16(height),
+                           _f16(inference_ms))
+        self.boxes_file.write(box_bytes)
+        self.frames_file.write(frame)
+        self.box_count += count
+        self.frame_count += 1
+        self.pending += 1
+        self.bytes_written += len(box_bytes) + len(frame)
+
+    def flush(self):
+        # Box'lar önce - okuyucu box'ı olmayan frame görmez
+        self.boxes_file.flush()
+        self.frames_file.flush()
+        self.pending = 0
+        self.last_flush = time.monotonic()
+
+    def close(self):
+        self.flush()
+        self.boxes_file.close()
+        self.frames_file.close()
+
+
+class DetectionLogReader:
+    """Tek kamera + gün dosyasının mmap okuyucusu"""
+
+    def __init__(self, frames_path: str, boxes_path: str, vocabulary: ClassVocabulary):
+        self.vocabulary = vocabulary
+        self._maps = []
+        self.frames, self.day_start, self.frame_count = self._map(frames_path, FRAME)
+        self.boxes, _, self.box_count = self._map(boxes_path, BOX)
+
+    def _map(self, path: str, record: struct.Struct):
+        with open(path, 'rb') as handle:
+            header = handle.read(HEADER.size)
+            if len(header) < HEADER.size:
+                raise ValueError(f"Truncated detection log header: {path}")
+            magic, version, record_size, day_start = HEADER.unpack(header)
+            if magic != MAGIC or version != VERSION or record_size != record.size:
+                raise ValueError(f"Unsupported detection log file: {path}")
+            size = os.fstat(handle.fileno()).st_size
+            count = (size - HEADER.size) // record.size
+            if count == 0:
+                return None, day_start, 0
+            mapped = mmap.mmap(handle.fileno(), HEADER.size + count * record.size, access=mmap.ACCESS_READ)
+        self._maps.append(mapped)
+        return mapped, day_start, count
+
+    def _offset_ms(self, index: int) -> int:
+        return struct.unpack_from('<I', self.frames, HEADER.size + index * FRAME.size)[0]
+
+    def index_at(self, timestamp: float) -> int:
+        """timestamp'ten önce olmayan ilk frame'in indeksi (ikili arama)"""
+        target = int(round((timestamp - self.day_start) * 1000))
+        if target <= 0 or self.frame_count == 0:
+            return 0
+        return bisect_left(range(self.frame_count), target, key=self._offset_ms)
+
+    def frame(self, index: int) -> FrameRecord:
+        (offset_ms, seq, box_start, box_count, people, compliant, violations,
+         width, height, inference_ms) = FRAME.unpack_from(self.frames, HEADER.size + index * FRAME.size)
+        boxes = []
+        for box_index in range(box_start, min(box_start + box_count, self.box_count)):
+            x1, y1, x2, y2, class_id, confidence, track_id = BOX.unpack_from(
+                self.boxes, HEADER.size + box_index * BOX.size)
+            boxes.append(BoxRecord((x1, y1, x2, y2), self.vocabulary.name_for(class_id), confidence,
+                                   None if track_id < 0 else track_id))
+        return FrameRecord(self.day_start + offset_ms / 1000.0, seq, people, compliant, violations,
+                           width, height, inference_ms, boxes)
+
+    def read(self, start: Optional[float] = None, end: Optional[float] = None) -> Iterator[FrameRecord]:
+        """[start, end) aralığındaki frame'ler, zaman sırasıyla"""
+        index = self.index_at(start) if start is not None else 0
+        end_ms = None if end is None else (end - self.day_start) * 1000
+        while index < self.frame_count:
+            if end_ms is not None and self._offset_ms(index) >= end_ms:
+                return
+            yield self.frame(index)
+            index += 1
+
+    def close(self):
+        for mapped in self._maps:
+            mapped.close()
+        self._maps = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+class DetectionLog:
+    """Kamera + gün başına ikili detection günlüğü (yazma + zaman aralığı okuma)"""
+
+    def __init__(self, root: str = 'detection_logs', enabled: bool = True, flush_every: int = 64,
+                 flush_interval: float = 1.0, retention_days: int = 30):
+        self.root = root
+        self.enabled = enabled
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.retention_days = retention_days
+        self._lock = threading.Lock()
+        self._writers: Dict[Tuple[str, str], _DayWriter] = {}
+        self._vocabularies: Dict[Tuple[str, str], ClassVocabulary] = {}
+        self._last_purge = 0.0
+
+        # İstatistikler
+        self.frames_written = 0
+        self.boxes_written = 0
+        self.bytes_written = 0
+        self.write_errors = 0
+        self.files_purged = 0
+
+    def _directory(self, company_id: str, camera_id: str) -> str:
+        return os.path.join(self.root, _safe(company_id), _safe(camera_id))
+
+    def _vocabulary(self, company_id: str, camera_id: str) -> ClassVocabulary:
+        """Kameranın sınıf sözlüğü - self._lock altında çağrılır"""
+        key = (company_id, camera_id)
+        vocabulary = self._vocabularies.get(key)
+        if vocabulary is None:
+            directory = self._directory(company_id, camera_id)
+            vocabulary = self._vocabularies[key] = ClassVocabulary(os.path.join(directory, 'classes.json'))
+        return vocabulary
+
+    def append(self, company_id: str, camera_id: str, frame_ts: float, detections: Iterable[Dict[str, Any]],
+               people: int = 0, compliant: int = 0, violations: int = 0,
+               frame_size: Optional[Tuple[int, int]] = None, seq: int = 0, inference_ms: float = 0.0) -> bool:
+        """Tek inference sonucunu ekler (inference thread'inden çağrılır, dosya I/O tamponlu)"""
+        if not self.enabled:
+            return False
+        width, height = (tuple(frame_size) + (0, 0))[:2] if frame_size else (0, 0)
+        day = datetime.fromtimestamp(frame_ts).date()
+        key = (company_id, camera_id)
+        try:
+            with self._lock:
+                writer = self._writers.get(key)
+                if writer is None or writer.day != day:
+                    if writer is not None:
+                        writer.close()
+                        del self._writers[key]
+                    self._maybe_purge()
+                    directory = self._directory(company_id, camera_id)
+                    os.makedirs(directory, exist_ok=True)
+                    writer = self._writers[key] = _DayWriter(directory, day,
+                                                             self._vocabulary(company_id, camera_id))
+                boxes_before, bytes_before = writer.box_count, writer.bytes_written
+                writer.append(frame_ts, detections or [], people, compliant, violations, width, height,
+                              seq, inference_ms)
+                self.frames_written += 1
+                self.boxes_written += writer.box_count - boxes_before
+                self.bytes_written += writer.bytes_written - bytes_before
+                if writer.pending >= self.flush_every or \
+                        time.monotonic() - writer.last_flush >= self.flush_interval:
+                    writer.flush()
+            return True
+        except Exception as e:
+            self.write_errors += 1
+            logger.error(f"❌ Detection log write failed for {camera_id}: {e}")
+            return False
+
+    def flush(self, company_id: Optional[str] = None, camera_id: Optional[str] = None):
+        with self._lock:
+            for (company, camera), writer in self._writers.items():
+                if (company_id is None or company == company_id) and (camera_id is None or camera == camera_id):
+                    writer.flush()
+
+    def close_camera(self, company_id: str, camera_id: str):
+        """Kamera durunca tamponu yazar ve dosyaları kapatır"""
+        with self._lock:
+            writer = self._writers.pop((company_id, camera_id), None)
+            if writer is not None:
+                writer.close()
+
+    def close(self):
+        with self._lock:
+            for writer in self._writers.values():
+                writer.close()
+            self._writers.clear()
+
+    def days(self, company_id: str, camera_id: str) -> List[date]:
+        directory = self._directory(company_id, camera_id)
+        if not os.path.isdir(directory):
+            return []
+        return sorted(datetime.strptime(name[:8], '%Y%m%d').date() for name in os.listdir(directory)
+                      if name.endswith('.frames') and name[:8].isdigit())
+
+    def reader(self, company_id: str, camera_id: str, day: date) -> Optional[DetectionLogReader]:
+        stem = os.path.join(self._directory(company_id, camera_id), day.strftime('%Y%m%d'))
+        if not os.path.exists(f'{stem}.frames') or not os.path.exists(f'{stem}.boxes'):
+            return None
+        with self._lock:
+            vocabulary = self._vocabulary(company_id, camera_id)
+        return DetectionLogReader(f'{stem}.frames', f'{stem}.boxes', vocabulary)
+
+    def read_range(self, company_id: str, camera_id: str, start: float, end: float) -> Iterator[FrameRecord]:
+        """[start, end) aralığındaki frame'ler (epoch saniye), gün dosyaları arasında sıralı"""
+        self.flush(company_id, camera_id)
+        day = datetime.fromtimestamp(start).date()
+        last = datetime.fromtimestamp(end).date()
+        while day <= last:
+            reader = self.reader(company_id, camera_id, day)
+            if reader is not None:
+                with reader:
+                    yield from reader.read(start, end)
+            day += timedelta(days=1)
+
+    def _maybe_purge(self):
+        # Gün değişiminde çağrılır; en fazla saatte bir
+        if self.retention_days <= 0 or time.monotonic() - self._last_purge < 3600:
+            return
+        self._last_purge = time.monotonic()
+        try:
+            self.purge()
+        except Exception as e:
+            logger.warning(f"⚠️ Detection log purge failed: {e}")
+
+    def purge(self, today: Optional[date] = None) -> int:
+        """retention_days'ten eski gün dosyalarını siler (açık yazıcıların dosyaları hariç)"""
+        cutoff = ((today or date.today()) - timedelta(days=self.retention_days)).strftime('%Y%m%d')
+        removed = 0
+        if not os.path.isdir(self.root):
+            return 0
+        open_files = {os.path.abspath(writer.frames_file.name) for writer in self._writers.values()}
+        open_files |= {os.path.abspath(writer.boxes_file.name) for writer in self._writers.values()}
+        for directory, _, names in os.walk(self.root):
+            for name in names:
+                path = os.path.abspath(os.path.join(directory, name))
+                if name.endswith(('.frames', '.boxes')) and name[:8].isdigit() and name[:8] < cutoff \
+                        and path not in open_files:
+                    os.remove(path)
+                    removed += 1
+        self.files_purged += removed
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            open_writers = len(self._writers)
+        return {
+            'enabled': self.enabled,
+            'root': self.root,
+            'open_writers': open_writers,
+            'frames_written': self.frames_written,
+            'boxes_written': self.boxes_written,
+            'bytes_written': self.bytes_written,
+            'avg_frame_bytes': round(self.bytes_written / self.frames_written, 1) if self.frames_written else 0,
+            'write_errors': self.write_errors,
+            'files_purged': self.files_purged,
+            'retention_days': self.retention_days,
+        }
+
+
+# Global detection log
+_detection_log = None
+
+
+def get_detection_log() -> DetectionLog:
+    """Global detection log instance'ını döndürür"""
+    global _detection_log
+    if _detection_log is None:
+        _detection_log = DetectionLog(
+            root=os.getenv('SMARTSAFE_DETECTION_LOG_DIR', 'detection_logs'),
+            enabled=os.getenv('SMARTSAFE_DETECTION_LOG', 'true').lower() not in ('0', 'false', 'no'),
+            retention_days=int(os.getenv('SMARTSAFE_DETECTION_LOG_DAYS', '30')),
+        )
+    return _detection_log
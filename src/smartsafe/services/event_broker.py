@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+"""
+SmartSafe AI - Live Event Broker (Server-Sent Events)
+Detection özetleri ve ihlal olaylarını dashboard'lara anında iletir
+
+- Tek bir abonelik kaydı: şirket bazlı, opsiyonel kamera filtresi
+- Her abone için sınırlı buffer; buffer dolan (yavaş) istemci düşürülür,
+  producer (detection worker) hiçbir zaman istemciyi beklemez
+- Polling yerine push: istek sayısı bağlantı başına 1'e iner, gecikme
+  polling aralığı yerine inference süresi kadardır
+- gthread worker'da her SSE akışı bir thread'i tutar: gunicorn.conf.py SSE için
+  GUNICORN_THREADS'e ek olarak SMARTSAFE_SSE_MAX_SUBSCRIBERS kadar thread ayırır ve
+  toplam abone sayısı aynı değerle sınırlanır (max_subscribers), böylece normal
+  istekler hiçbir zaman SSE yüzünden thread beklemez. Kapasite: worker başına
+  SMARTSAFE_SSE_MAX_SUBSCRIBERS eşzamanlı akış (varsayılan 16); akışlar stream_lifetime
+  sonunda kapatılır ve EventSource yeniden bağlanır
+"""
+
+import os
+import json
+import threading
+import time
+import logging
+from collections import deque
+from typing import Any, Deque, Dict, Iterable, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+EVENT_DETECTION = 'detection'
+EVENT_VIOLATION = 'violation'
+EVENT_STATUS = 'status'
+EVENT_OVERLAY = 'overlay'
+EVENT_DROPPED = 'dropped'
+
+# Worker başına eşzamanlı SSE akışı; gunicorn.conf.py bu kadar ek thread açar
+DEFAULT_SSE_MAX_SUBSCRIBERS = 16
+
+# Overlay (bbox) olayları büyük ve sık; sadece açıkça isteyen istemciye (?events=overlay) gider
+DEFAULT_EVENT_TYPES = frozenset({EVENT_DETECTION, EVENT_VIOLATION, EVENT_STATUS})
+
+# Detection özetinde gönderilen alanlar (bbox listesi gibi büyük alanlar hariç)
+DETECTION_SUMMARY_FIELDS = (
+    'camera_id', 'timestamp', 'frame_count', 'detection_count', 'total_people',
+    'people_detected', 'ppe_compliant', 'violations', 'compliance_rate',
+    'processing_time', 'processing_time_ms', 'detection_mode',
+)
+
+
+def detection_summary(detection_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Detection sonucundan SSE ile gönderilecek özet"""
+    return {key: detection_data[key] for key in DETECTION_SUMMARY_FIELDS if key in detection_data}
+
+
+def overlay_payload(camera_id: str, detections: Iterable[Dict[str, Any]], frame_ts: float,
+                    frame_size: Optional[Iterable[int]] = None) -> Dict[str, Any]:
+    """İstemci tarafında çizilecek bbox listesi (restream videosu ile frame_ts üzerinden eşlenir)
+
+    frame_ts: frame'in yakalandığı an (epoch saniye), frame_size: (genişlik, yükseklik)
+    """
+    boxes = []
+    for detection in detections or []:
+        if not isinstance(detection, dict):
+            continue
+        bbox = detection.get('bbox') or []
+        if len(bbox) != 4:
+            continue
+        try:
+            boxes.append({
+                'bbox': [int(coord) for coord in bbox],
+                'class_name': detection.get('class_name', 'unknown'),
+                'confidence': round(float(detection.get('confidence', 0.0)), 3),
+                'missing_ppe': detection.get('missing_ppe') or [],
+            })
+        except (TypeError, ValueError):
+            continue
+    width, height = (list(frame_size) + [None, None])[:2] if frame_size else (None, None)
+    return {
+        'camera_id': camera_id,
+        'frame_ts': round(float(frame_ts), 3),
+        'width': width,
+        'height': height,
+        'boxes': boxes,
+    }
+
+
+class Subscription:
+    """Tek bir SSE istemcisinin aboneliği"""
+
+    def __init__(self, broker: 'EventBroker', subscription_id: int, company_id: str,
+                 camera_ids: Optional[Set[str]], max_buffer: int,
+                 event_types: Optional[Set[str]] = None):
+        self.broker = broker
+        self.subscription_id = subscription_id
+        self.company_id = company_id
+        self.camera_ids = camera_ids
+        self.event_types = event_types or DEFAULT_EVENT_TYPES
+        self.max_buffer = max_buffer
+        self.created_at = time.time()
+        self.delivered = 0
+        self.dropped = False
+        self.closed = False
+        self._buffer: Deque[Dict[str, Any]] = deque()
+        self._cond = threading.Condition()
+
+    def matches(self, company_id: str, camera_id: Optional[str], event_type: Optional[str] = None) -> bool:
+        if self.company_id != company_id:
+            return False
+        if event_type is not None and event_type not in self.event_types:
+            return False
+        return self.camera_ids is None or camera_id is None or str(camera_id) in self.camera_ids
+
+    def offer(self, event: Dict[str, Any]) -> bool:
+        """Olayı buffer'a ekler; buffer doluysa False döner (istemci yavaş)"""
+        with self._cond:
+            if self.closed:
+                return True
+            if len(self._buffer) >= self.max_buffer:
+                return False
+            self._buffer.append(event)
+            self._cond.notify()
+            return True
+
+    def get(self, timeout: float) -> Optional[Dict[str, Any]]:
+        """Sıradaki olay; timeout dolarsa veya abonelik kapanırsa None"""
+        with self._cond:
+            if not self._buffer and not self.closed:
+                self._cond.wait(timeout)
+            if self._buffer:
+                self.delivered += 1
+                return self._buffer.popleft()
+            return None
+
+    def close(self, dropped: bool = False):
+        with self._cond:
+            self.closed = True
+            if dropped:
+                # Yavaş istemciye birikmiş olaylar gönderilmez
+                self.dropped = True
+                self._buffer.clear()
+            self._cond.notify_all()
+
+    @property
+    def pending(self) -> int:
+        return len(self._buffer)
+
+
+class EventBroker:
+    """Şirket bazlı canlı olay yayıncısı"""
+
+    def __init__(self, max_buffer: int = 64, max_subscribers_per_company: int = 50,
+                 max_subscribers: Optional[int] = None, stream_lifetime: Optional[float] = None):
+        self.max_buffer = max_buffer
+        self.max_subscribers_per_company = max_subscribers_per_company
+        self.max_subscribers = max_subscribers  # Tüm şirketler toplamı (None = sınırsız)
+        self.stream_lifetime = stream_lifetime  # Saniye; stream_events'e verilir
+        self._lock = threading.Lock()
+        self._subscriptions: Dict[str, Dict[int, Subscription]] = {}
+        self._next_id = 0
+        self._event_seq = 0
+        # Şirket -> kamera -> son detection olayı (yeni bağlanan istemciye ilk durum olarak gönderilir)
+        self._retained: Dict[str, Dict[str, Dict[str, Any]]] = {}
+
+        # İstatistikler
+        self.events_published = 0
+        self.events_delivered = 0
+        self.clients_dropped = 0
+        self.clients_rejected = 0
+
+    def subscribe(self, company_id: str, camera_ids: Optional[Iterable[str]] = None,
+                  event_types: Optional[Iterable[str]] = None) -> Optional[Subscription]:
+        """Yeni abonelik; toplam veya şirket abone limiti doluysa None"""
+        camera_filter = {str(c) for c in camera_ids if c} if camera_ids else None
+        type_filter = {str(t) for t in event_types if t} if event_types else None
+        with self._lock:
+            if self.max_subscribers is not None and \
+                    sum(len(subs) for subs in self._subscriptions.values()) >= self.max_subscribers:
+                self.clients_rejected += 1
+                logger.warning(f"⚠️ SSE subscriber limit reached ({self.max_subscribers} streams)")
+                return None
+            company_subs = self._subscriptions.setdefault(company_id, {})
+            if len(company_subs) >= self.max_subscribers_per_company:
+                self.clients_rejected += 1
+                logger.warning(f"⚠️ SSE subscriber limit reached for company {company_id}")
+                return None
+            self._next_id += 1
+            subscription = Subscription(self, self._next_id, company_id, camera_filter or None,
+                                        self.max_buffer, type_filter or None)
+            company_subs[subscription.subscription_id] = subscription
+        logger.info(f"📡 SSE subscribe: company={company_id} cameras={sorted(camera_filter) if camera_filter else 'all'}")
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        subscription.close()
+        with self._lock:
+            company_subs = self._subscriptions.get(subscription.company_id)
+            if company_subs is not None:
+                company_subs.pop(subscription.subscription_id, None)
+                if not company_subs:
+                    del self._subscriptions[subscription.company_id]
+                self.events_delivered += subscription.delivered
+                subscription.delivered = 0
+
+    def publish(self, company_id: str, event_type: str, data: Dict[str, Any],
+                camera_id: Optional[str] = None, retain: bool = False) -> int:
+        """Olayı eşleşen abonelere iletir; teslim edilen abone sayısını döndürür.
+        retain=True ise kameranın son olayı saklanır (yeni istemciler için)."""
+        with self._lock:
+            self._event_seq += 1
+            event = {'id': self._event_seq, 'event': event_type, 'data': data}
+            if retain and camera_id is not None:
+                self._retained.setdefault(company_id, {})[str(camera_id)] = event
+            company_subs = self._subscriptions.get(company_id)
+            if not company_subs:
+                return 0
+            targets = [s for s in company_subs.values() if s.matches(company_id, camera_id, event_type)]
+            if not targets:
+                return 0
+            self.events_published += 1
+
+        slow: List[Subscription] = []
+        delivered = 0
+        for subscription in targets:
+            if subscription.offer(event):
+                delivered += 1
+            else:
+                slow.append(subscription)
+
+        for subscription in slow:
+            # Buffer'ı dolan istemci düşürülür; EventSource otomatik yeniden bağlanır
+            logger.warning(f"⚠️ SSE client too slow, dropping: company={company_id} "
+                           f"sub={subscription.subscription_id} pending={subscription.pending}")
+            subscription.close(dropped=True)
+            with self._lock:
+                self.clients_dropped += 1
+            self.unsubscribe(subscription)
+        return delivered
+
+    def retained_events(self, company_id: str, camera_ids: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]:
+        """Kameraların son saklanan olayları (kamera filtresi opsiyonel)"""
+        camera_filter = {str(c) for c in camera_ids if c} if camera_ids else None
+        with self._lock:
+            retained = self._retained.get(company_id, {})
+            return [event for camera_id, event in retained.items()
+                    if camera_filter is None or camera_id in camera_filter]
+
+    def forget_camera(self, company_id: str, camera_id: str):
+        """Tespit durdurulunca kameranın saklanan son olayını siler"""
+        with self._lock:
+            retained = self._retained.get(company_id)
+            if retained is not None:
+                retained.pop(str(camera_id), None)
+                if not retained:
+                    del self._retained[company_id]
+
+    def subscriber_count(self, company_id: Optional[str] = None) -> int:
+        with self._lock:
+            if company_id is not None:
+                return len(self._subscriptions.get(company_id, {}))
+            return sum(len(subs) for subs in self._subscriptions.values())
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            companies = {company_id: len(subs) for company_id, subs in self._subscriptions.items()}
+            live_delivered = sum(s.delivered for subs in self._subscriptions.values() for s in subs.values())
+        return {
+            'subscribers': sum(companies.values()),
+            'companies': companies,
+            'events_published': self.events_published,
+            'events_delivered': self.events_delivered + live_delivered,
+            'clients_dropped': self.clients_dropped,
+            'clients_rejected': self.clients_rejected,
+            'max_subscribers': self.max_subscribers,
+            'max_buffer': self.max_buffer,
+        }
+
+
+def format_sse(event: Dict[str, Any]) -> str:
+    """Olayı text/event-stream formatına çevirir"""
+    payload = json.dumps(event['data'], default=str, ensure_ascii=False)
+    return f"id: {event['id']}\nevent: {event['event']}\ndata: {payload}\n\n"
+
+
+def stream_events(subscription: Subscription, initial_events: Iterable[Dict[str, Any]] = (),
+                  heartbeat: float = 15.0, retry_ms: int = 3000, max_lifetime: Optional[float] = None):
+    """SSE generator: önce başlangıç olayları, sonra canlı olaylar ve heartbeat yorumları
+
+    max_lifetime dolunca akış kapanır (thread serbest kalır); EventSource retry_ms
+    sonra yeniden bağlanır ve retained olaylarla güncel durumu tekrar alır.
+    """
+    deadline = time.monotonic() + max_lifetime if max_lifetime else None
+    try:
+        yield f"retry: {retry_ms}\n\n"
+        for event in initial_events:
+            yield format_sse(event)
+        while True:
+            timeout = heartbeat
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                timeout = min(heartbeat, remaining)
+            event = subscription.get(timeout=timeout)
+            if event is not None:
+                yield format_sse(event)
+            elif subscription.closed:
+                if subscription.dropped:
+                    yield format_sse({'id': 0, 'event': EVENT_DROPPED, 'data': {'reason': 'slow_client'}})
+                break
+            elif deadline is not None and time.monotonic() >= deadline:
+                break
+            else:
+                # Yorum satırı: bağlantıyı canlı tutar ve kopan istemciyi ortaya çıkarır
+                yield ": keepalive\n\n"
+    finally:
+        subscription.broker.unsubscribe(subscription)
+
+
+# Global broker
+_event_broker = None
+
+
+def get_event_broker() -> EventBroker:
+    """Global event broker instance'ını döndürür"""
+    global _event_broker
+    if _event_broker is None:
+        # SSE'nin kendi thread bütçesi var (gunicorn.conf.py); normal istek thread'leri sayılmaz
+        _event_broker = EventBroker(
+            max_subscribers=int(os.getenv('SMARTSAFE_SSE_MAX_SUBSCRIBERS', str(DEFAULT_SSE_MAX_SUBSCRIBERS))),
+            stream_lifetime=float(os.getenv('SMARTSAFE_SSE_STREAM_LIFETIME_S', '60')),
+        )
+    return _event_broker
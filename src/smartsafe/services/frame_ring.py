@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""
+SmartSafe AI - Frame Ring Buffer
+Kamera başına önceden ayrılmış numpy buffer halkası (zero-copy frame paylaşımı)
+
+Producer (kamera worker) frame'i doğrudan boş bir slot'a decode eder
+(cap.read(buffer)), consumer'lar (detection, MJPEG stream) en son frame'in
+read-only görünümünü alır ve işleri bitene kadar slot'u pinler. Pinli slot'lar
+producer tarafından üzerine yazılmaz; böylece frame başına memcpy ve 4K
+çözünürlükte GC çalkantısı ortadan kalkar, kamera başına bellek
+num_slots * frame_bytes ile sınırlanır.
+"""
+
+import threading
+import time
+import logging
+from typing import Dict, Any, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_WRITING = -1  # Producer'ın yazdığı slot (reader'lar pinleyemez)
+
+
+def get_peak_rss_mb() -> float:
+    """Process peak RSS (MB)"""
+    try:
+        import resource
+        import sys
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux KB, macOS byte döndürür
+        return round(peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024, 1)
+    except Exception:
+        try:
+            import psutil
+            return round(psutil.Process().memory_info().rss / (1024 * 1024), 1)
+        except Exception:
+            return 0.0
+
+
+class FrameView:
+    """Bir ring slot'una pinlenmiş read-only frame görünümü"""
+
+    __slots__ = ('frame', 'seq', 'timestamp', 'captured_at', '_ring', '_slot', '_released')
+
+    def __init__(self, ring: 'FrameRing', slot: int, frame: np.ndarray, seq: int, timestamp: float,
+                 captured_at: float = 0.0):
+        self.frame = frame
+        self.seq = seq
+        self.timestamp = timestamp  # Wall clock (overlay senkronu)
+        self.captured_at = captured_at  # time.monotonic() - gecikme ölçümü
+        self._ring = ring
+        self._slot = slot
+        self._released = False
+
+    def release(self):
+        """Slot'u producer'a geri ver (birden fazla çağrılabilir)"""
+        if not self._released:
+            self._released = True
+            self.frame = None
+            self._ring._unpin(self._slot)
+
+    def __enter__(self) -> 'FrameView':
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+        return False
+
+
+class FrameRing:
+    """Kamera başına referans sayımlı frame halkası"""
+
+    def __init__(self, camera_key: str, num_slots: int = 4):
+        if num_slots < 2:
+            raise ValueError("FrameRing en az 2 slot gerektirir")
+        self.camera_key = camera_key
+        self.num_slots = num_slots
+        self._lock = threading.Lock()
+        self._buffers = [None] * num_slots
+        self._refcounts = [0] * num_slots
+        self._seqs = [0] * num_slots
+        self._timestamps = [0.0] * num_slots
+        self._captured = [0.0] * num_slots
+        self._latest = -1
+        self._seq = 0
+
+        # İstatistikler
+        self.frames_written = 0
+        self.frames_dropped = 0
+        self.reallocations = 0
+        self.peak_bytes = 0
+
+    # --- Producer API ---
+    def _acquire_write_slot(self) -> int:
+        """Pinli olmayan ve en son frame'i tutmayan en eski slot'u yazma için ayırır"""
+        with self._lock:
+            candidate = -1
+            for slot in range(self.num_slots):
+                if slot == self._latest or self._refcounts[slot] != 0:
+                    continue
+                if candidate < 0 or self._seqs[slot] < self._seqs[candidate]:
+                    candidate = slot
+            if candidate >= 0:
+                self._refcounts[candidate] = _WRITING
+            return candidate
+
+    def _commit(self, slot: int, frame: np.ndarray):
+        with self._lock:
+            if self._buffers[slot] is not frame:
+                self._buffers[slot] = frame
+                self.reallocations += 1
+                self._update_peak_locked()
+            self._seq += 1
+            self._seqs[slot] = self._seq
+            self._timestamps[slot] = time.time()
+            self._captured[slot] = time.monotonic()
+            self._refcounts[slot] = 0
+            self._latest = slot
+            self.frames_written += 1
+
+    def _abort(self, slot: int):
+        with self._lock:
+            # Yarım decode edilmiş buffer eski zaman damgasıyla okunmasın
+            self._seqs[slot] = 0
+            self._refcounts[slot] = 0
+
+    def _update_peak_locked(self):
+        allocated = sum(b.nbytes for b in self._buffers if b is not None)
+        if allocated > self.peak_bytes:
+            self.peak_bytes = allocated
+
+    def read_into(self, cap) -> bool:
+        """cv2.VideoCapture'dan frame'i doğrudan slot buffer'ına decode eder.
+
+        Tüm slot'lar pinliyse frame decode edilmeden atlanır (cap.grab) - stream
+        gecikmesi birikmez. Frame okunamazsa False döner.
+        """
+        slot = self._acquire_write_slot()
+        if slot < 0:
+            self.frames_dropped += 1
+            return bool(cap.grab())
+
+        buffer = self._buffers[slot]
+        try:
+            if buffer is not None:
+                ret, frame = cap.read(buffer)
+            else:
+                ret, frame = cap.read()
+        except Exception:
+            self._abort(slot)
+            raise
+
+        if not ret or frame is None:
+            self._abort(slot)
+            return False
+        # Çözünürlük değişirse OpenCV yeni array ayırır; slot onu sahiplenir
+        self._commit(slot, frame)
+        return True
+
+    def publish(self, frame: np.ndarray) -> bool:
+        """Producer'a ait yeni bir array'i kopyalamadan slot'a yerleştirir (örn. cv2.imdecode çıktısı).
+        Çağıran frame'i bu noktadan sonra değiştirmemelidir."""
+        slot = self._acquire_write_slot()
+        if slot < 0:
+            self.frames_dropped += 1
+            return False
+        self._commit(slot, frame)
+        return True
+
+    def write(self, frame: np.ndarray) -> bool:
+        """Frame'i slot buffer'ına kopyalar (frame'in sahibi producer değilse)"""
+        slot = self._acquire_write_slot()
+        if slot < 0:
+            self.frames_dropped += 1
+            return False
+        buffer = self._buffers[slot]
+        if buffer is not None and buffer.shape == frame.shape and buffer.dtype == frame.dtype:
+            np.copyto(buffer, frame)
+        else:
+            buffer = frame.copy()
+        self._commit(slot, buffer)
+        return True
+
+    # --- Consumer API ---
+    def acquire_latest(self, min_seq: int = 0) -> Optional[FrameView]:
+        """En son frame'in read-only görünümünü döndürür; release() edilene kadar slot pinli kalır.
+        min_seq verilirse sadece daha yeni bir frame varsa döner."""
+        with self._lock:
+            slot = self._latest
+            if slot < 0 or self._seqs[slot] <= min_seq:
+                return None
+            self._refcounts[slot] += 1
+            seq = self._seqs[slot]
+            timestamp = self._timestamps[slot]
+            captured_at = self._captured[slot]
+            buffer = self._buffers[slot]
+
+        view = buffer.view()
+        view.flags.writeable = False
+        return FrameView(self, slot, view, seq, timestamp, captured_at)
+
+    def acquire_nearest(self, timestamp: float, max_skew: Optional[float] = None) -> Optional[FrameView]:
+        """Duvar saati timestamp'ine en yakın frame'in görünümü (ör. kanıt frame'ini detection anına eşleme).
+        max_skew (saniye) verilirse daha uzak frame'ler için None döner."""
+        with self._lock:
+            best = -1
+            for slot in range(self.num_slots):
+                if self._seqs[slot] == 0 or self._refcounts[slot] == _WRITING or self._buffers[slot] is None:
+                    continue
+                if best < 0 or abs(self._timestamps[slot] - timestamp) < abs(self._timestamps[best] - timestamp):
+                    best = slot
+            if best < 0 or (max_skew is not None and abs(self._timestamps[best] - timestamp) > max_skew):
+                return None
+            self._refcounts[best] += 1
+            seq = self._seqs[best]
+            frame_ts = self._timestamps[best]
+            captured_at = self._captured[best]
+            buffer = self._buffers[best]
+
+        view = buffer.view()
+        view.flags.writeable = False
+        return FrameView(self, best, view, seq, frame_ts, captured_at)
+
+    def _unpin(self, slot: int):
+        with self._lock:
+            if self._refcounts[slot] > 0:
+                self._refcounts[slot] -= 1
+
+    def has_frame(self) -> bool:
+        return self._latest >= 0
+
+    @property
+    def latest_seq(self) -> int:
+        return self._seq
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            allocated = sum(b.nbytes for b in self._buffers if b is not None)
+            pinned = sum(1 for r in self._refcounts if r > 0)
+            shape = self._buffers[self._latest].shape if self._latest >= 0 else None
+        return {
+            'camera_key': self.camera_key,
+            'num_slots': self.num_slots,
+            'pinned_slots': pinned,
+            'frame_shape': list(shape) if shape else None,
+            'allocated_mb': round(allocated / (1024 * 1024), 2),
+            'peak_mb': round(self.peak_bytes / (1024 * 1024), 2),
+            'frames_written': self.frames_written,
+            'frames_dropped': self.frames_dropped,
+            'reallocations': self.reallocations,
+        }
+
+
+class FrameRingRegistry:
+    """Kamera anahtarı -> FrameRing eşlemesi"""
+
+    def __init__(self, num_slots: int = 4):
+        self.num_slots = num_slots
+        self._lock = threading.Lock()
+        self._rings: Dict[str, FrameRing] = {}
+
+    def get_or_create(self, camera_key: str) -> FrameRing:
+        with self._lock:
+            ring = self._rings.get(camera_key)
+            if ring is None:
+                ring = FrameRing(camera_key, self.num_slots)
+                self._rings[camera_key] = ring
+                logger.info(f"🎞️ Frame ring oluşturuldu: {camera_key} ({self.num_slots} slot)")
+            return ring
+
+    def get(self, camera_key: str) -> Optional[FrameRing]:
+        return self._rings.get(camera_key)
+
+    def remove(self, camera_key: str, ring: Optional[FrameRing] = None):
+        """Ring'i kaldırır; ring verilirse sadece hâlâ aynı ring kayıtlıysa (yeniden başlatma yarışı)"""
+        with self._lock:
+            current = self._rings.get(camera_key)
+            if current is not None and (ring is None or current is ring):
+                del self._rings[camera_key]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            rings = list(self._rings.values())
+        cameras = {ring.camera_key: ring.stats() for ring in rings}
+        return {
+            'cameras': cameras,
+            'total_allocated_mb': round(sum(c['allocated_mb'] for c in cameras.values()), 2),
+            'process_peak_rss_mb': get_peak_rss_mb(),
+        }
+
+
+# Global registry
+_frame_ring_registry = None
+
+
+def get_frame_ring_registry() -> FrameRingRegistry:
+    """Global frame ring registry instance'ını döndürür"""
+    global _frame_ring_registry
+    if _frame_ring_registry is None:
+        _frame_ring_registry = FrameRingRegistry()
+    return _frame_ring_registry
@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+"""
+SmartSafe AI - H.264 Passthrough Restreamer (HLS / fMP4)
+Canlı izleme için kameranın H.264 yayınını transcode etmeden HLS'e remux eder
+
+- ffmpeg `-c:v copy`: decode/encode yok, izleyici başına sunucu CPU'su ~0
+- Segmentler fMP4 (init.mp4 + seg_XXXXXX.m4s), kısa bir dosya halkasında tutulur
+  (delete_segments); /dev/shm varsa bellekte
+- Playlist EXT-X-PROGRAM-DATE-TIME içerir; istemci detection overlay'lerini
+  (frame_ts) video zamanına bu sayede eşler
+- Oturum izleyici isteği ile açılır, idle_timeout boyunca istek gelmezse kapanır
+- H.264 dışı kaynaklar (H.265, MJPEG, snapshot) MJPEG yoluna düşer
+"""
+
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+FFMPEG_PATH = os.environ.get('SMARTSAFE_FFMPEG_PATH') or shutil.which('ffmpeg')
+RESTREAM_AVAILABLE = FFMPEG_PATH is not None
+
+PLAYLIST_NAME = 'index.m3u8'
+INIT_SEGMENT_NAME = 'init.mp4'
+SEGMENT_PATTERN = 'seg_%06d.m4s'
+
+# Sadece bu isimler servis edilir (path traversal yok)
+_SERVABLE_NAME_RE = re.compile(r'^(index\.m3u8|init\.mp4|seg_\d{6}\.m4s)$')
+
+CONTENT_TYPES = {
+    '.m3u8': 'application/vnd.apple.mpegurl',
+    '.mp4': 'video/mp4',
+    '.m4s': 'video/iso.segment',
+}
+
+# Tarayıcıların MSE/native HLS ile fMP4 içinde oynatabildiği codec
+PASSTHROUGH_CODECS = ('H264',)
+
+
+def default_segment_root() -> str:
+    """Segment halkası için kök dizin - tmpfs (/dev/shm) varsa bellekte tutulur"""
+    shm = '/dev/shm'
+    if os.path.isdir(shm) and os.access(shm, os.W_OK):
+        return os.path.join(shm, 'smartsafe_hls')
+    return os.path.join(tempfile.gettempdir(), 'smartsafe_hls')
+
+
+def build_ffmpeg_command(source_url: str, out_dir: str, segment_seconds: float = 1.0,
+                         list_size: int = 6, ffmpeg_path: Optional[str] = None) -> List[str]:
+    """Transcode etmeden (copy) fMP4 HLS üreten ffmpeg komutu
+
+    Not: copy modunda segmentler keyframe'lerde kesilir; gerçek segment süresi
+    kameranın GOP uzunluğuna bağlıdır (segment_seconds alt sınırdır).
+    """
+    cmd = [ffmpeg_path or FFMPEG_PATH or 'ffmpeg', '-hide_banner', '-loglevel', 'error', '-nostdin']
+    if source_url.lower().startswith('rtsp://'):
+        cmd += ['-rtsp_transport', 'tcp']
+    cmd += [
+        '-fflags', 'nobuffer',
+        '-i', source_url,
+        '-map', '0:v:0', '-c:v', 'copy', '-an',
+        '-f', 'hls',
+        '-hls_time', f"{segment_seconds:g}",
+        '-hls_list_size', str(int(list_size)),
+        '-hls_delete_threshold', '2',
+        '-hls_flags', 'delete_segments+independent_segments+program_date_time+omit_endlist',
+        '-hls_segment_type', 'fmp4',
+        '-hls_fmp4_init_filename', INIT_SEGMENT_NAME,
+        '-hls_segment_filename', os.path.join(out_dir, SEGMENT_PATTERN),
+        os.path.join(out_dir, PLAYLIST_NAME),
+    ]
+    return cmd
+
+
+def content_type_for(name: str) -> str:
+    return CONTENT_TYPES.get(os.path.splitext(name)[1], 'application/octet-stream')
+
+
+def select_passthrough_source(candidate_urls: List[str], timeout: float = 2.0) -> Tuple[Optional[str], str]:
+    """Adaylar arasından passthrough'a uygun RTSP URL'ini seçer (DESCRIBE ile codec kontrolü)
+
+    Returns: (url veya None, sebep)
+    """
+    rtsp_urls = [url for url in candidate_urls if url and url.lower().startswith('rtsp://')]
+    if not rtsp_urls:
+        return None, 'not_rtsp'
+    try:
+        from src.smartsafe.integrations.dvr.rtsp_prober import probe_channels_sync
+        result = probe_channels_sync({0: rtsp_urls}, timeout=timeout)[0]
+    except Exception as e:
+        logger.warning(f"⚠️ Restream source probe failed: {e}")
+        return None, 'probe_failed'
+    if not result.ok:
+        return None, result.error or f"rtsp_{result.status_code}"
+    if result.codec and result.codec.upper() not in PASSTHROUGH_CODECS:
+        return None, f"codec_{result.codec}"
+    return result.url, 'ok'
+
+
+def _safe_dir_name(camera_key: str) -> str:
+    return re.sub(r'[^A-Za-z0-9_.-]', '_', camera_key)
+
+
+class RestreamSession:
+    """Tek kamera için çalışan ffmpeg remux süreci"""
+
+    def __init__(self, camera_key: str, source_url: str, out_dir: str, process: subprocess.Popen):
+        self.camera_key = camera_key
+        self.source_url = source_url
+        self.out_dir = out_dir
+        self.process = process
+        self.started_at = time.time()
+        self.last_access = self.started_at
+        self.requests = 0
+
+    def is_alive(self) -> bool:
+        return self.process.poll() is None
+
+    def is_ready(self) -> bool:
+        return os.path.exists(os.path.join(self.out_dir, PLAYLIST_NAME))
+
+    def touch(self):
+        self.last_access = time.time()
+        self.requests += 1
+
+    def stop(self):
+        try:
+            if self.is_alive():
+                self.process.terminate()
+                try:
+                    self.process.wait(timeout=3)
+                except subprocess.TimeoutExpired:
+                    self.process.kill()
+                    self.process.wait(timeout=3)
+        except Exception as e:
+            logger.warning(f"⚠️ Restream process stop error ({self.camera_key}): {e}")
+        shutil.rmtree(self.out_dir, ignore_errors=True)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'camera_key': self.camera_key,
+            'alive': self.is_alive(),
+            'ready': self.is_ready(),
+            'uptime_seconds': round(time.time() - self.started_at, 1),
+            'idle_seconds': round(time.time() - self.last_access, 1),
+            'requests': self.requests,
+        }
+
+
+class HLSRestreamer:
+    """İzleyici isteğiyle açılan, boşta kalınca kapanan passthrough HLS oturumları"""
+
+    def __init__(self, base_dir: Optional[str] = None, segment_seconds: float = 1.0, list_size: int = 6,
+                 idle_timeout: float = 30.0, max_sessions: int = 16, restart_backoff: float = 10.0,
+                 ffmpeg_path: Optional[str] = None):
+        self.base_dir = base_dir or default_segment_root()
+        self.segment_seconds = segment_seconds
+        self.list_size = list_size
+        self.idle_timeout = idle_timeout
+        self.max_sessions = max_sessions
+        self.restart_backoff = restart_backoff
+        self.ffmpeg_path = ffmpeg_path or FFMPEG_PATH
+        self._lock = threading.Lock()
+        self._sessions: Dict[str, RestreamSession] = {}
+        self._failed_at: Dict[str, float] = {}
+        self._reaper: Optional[threading.Thread] = None
+
+        # İstatistikler
+        self.sessions_started = 0
+        self.sessions_failed = 0
+
+    @property
+    def available(self) -> bool:
+        return self.ffmpeg_path is not None
+
+    def _spawn(self, cmd: List[str]) -> subprocess.Popen:
+        return subprocess.Popen(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                                stderr=subprocess.DEVNULL)
+
+    def ensure_session(self, camera_key: str, source_url: str) -> Optional[RestreamSession]:
+        """Çalışan oturumu döndürür, yoksa başlatır; başlatılamıyorsa None"""
+        if not self.available:
+            return None
+
+        stale = []
+        with self._lock:
+            session = self._sessions.get(camera_key)
+            if session is not None:
+                if session.is_alive() and session.source_url == source_url:
+                    session.touch()
+                    return session
+                # Süreç düştü (kaynak koptu / codec uyumsuz) veya kaynak değişti
+                if not session.is_alive():
+                    self._failed_at[camera_key] = time.time()
+                    self.sessions_failed += 1
+                stale.append(self._sessions.pop(camera_key))
+
+            if time.time() - self._failed_at.get(camera_key, 0) < self.restart_backoff:
+                session = None
+            elif len(self._sessions) >= self.max_sessions:
+                logger.warning(f"⚠️ Restream session limit reached ({self.max_sessions}), {camera_key} falls back to MJPEG")
+                session = None
+            else:
+                # Her oturuma ayrı dizin: kapanan eski oturumun temizliği yenisini silmesin
+                out_dir = os.path.join(self.base_dir, f"{_safe_dir_name(camera_key)}_{int(time.time() * 1000)}")
+                os.makedirs(out_dir, exist_ok=True)
+                cmd = build_ffmpeg_command(source_url, out_dir, self.segment_seconds,
+                                           self.list_size, self.ffmpeg_path)
+                try:
+                    process = self._spawn(cmd)
+                except Exception as e:
+                    logger.error(f"❌ Restream start error ({camera_key}): {e}")
+                    self._failed_at[camera_key] = time.time()
+                    self.sessions_failed += 1
+                    session = None
+                else:
+                    session = RestreamSession(camera_key, source_url, out_dir, process)
+                    session.touch()
+                    self._sessions[camera_key] = session
+                    self.sessions_started += 1
+                    logger.info(f"📺 Restream started (H.264 passthrough): {camera_key}")
+
+        for old in stale:
+            old.stop()
+        if session is not None:
+            self._start_reaper()
+        return session
+
+    def get_session(self, camera_key: str) -> Optional[RestreamSession]:
+        """Çalışan oturum (yoksa veya süreç düştüyse None)"""
+        session = self._sessions.get(camera_key)
+        if session is None or not session.is_alive():
+            return None
+        return session
+
+    def wait_until_ready(self, camera_key: str, timeout: float = 8.0) -> bool:
+        """İlk playlist yazılana kadar bekler (ilk izleyici için)"""
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            session = self._sessions.get(camera_key)
+            if session is None or not session.is_alive():
+                return False
+            if session.is_ready():
+                return True
+            time.sleep(0.1)
+        return False
+
+    def resolve_file(self, camera_key: str, name: str) -> Optional[str]:
+        """Servis edilecek playlist/segment dosya yolu (geçersiz isim veya oturum yoksa None)"""
+        if not _SERVABLE_NAME_RE.match(name or ''):
+            return None
+        session = self._sessions.get(camera_key)
+        if session is None:
+            return None
+        session.touch()
+        path = os.path.join(session.out_dir, name)
+        return path if os.path.isfile(path) else None
+
+    def stop(self, camera_key: str) -> bool:
+        with self._lock:
+            session = self._sessions.pop(camera_key, None)
+        if session is None:
+            return False
+        session.stop()
+        logger.info(f"🛑 Restream stopped: {camera_key}")
+        return True
+
+    def stop_all(self):
+        for camera_key in list(self._sessions.keys()):
+            self.stop(camera_key)
+
+    def reap_idle(self) -> List[str]:
+        """İzleyicisi kalmayan veya süreci düşen oturumları kapatır"""
+        now = time.time()
+        with self._lock:
+            expired = [key for key, session in self._sessions.items()
+                       if now - session.last_access > self.idle_timeout or not session.is_alive()]
+        for camera_key in expired:
+            self.stop(camera_key)
+        return expired
+
+    def _start_reaper(self):
+        with self._lock:
+            if self._reaper is not None and self._reaper.is_alive():
+                return
+            self._reaper = threading.Thread(target=self._reap_loop, daemon=True, name='hls-restream-reaper')
+            self._reaper.start()
+
+    def _reap_loop(self):
+        interval = max(1.0, self.idle_timeout / 3)
+        while True:
+            time.sleep(interval)
+            try:
+                self.reap_idle()
+            except Exception as e:
+                logger.error(f"❌ Restream reaper error: {e}")
+            if not self._sessions:
+                with self._lock:
+                    if not self._sessions:
+                        self._reaper = None
+                        return
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            sessions = {key: session.to_dict() for key, session in self._sessions.items()}
+        return {
+            'available': self.available,
+            'active_sessions': len(sessions),
+            'sessions_started': self.sessions_started,
+            'sessions_failed': self.sessions_failed,
+            'sessions': sessions,
+        }
+
+
+# Global restreamer
+_hls_restreamer = None
+
+
+def get_hls_restreamer() -> HLSRestreamer:
+    """Global HLS restreamer instance'ını döndürür"""
+    global _hls_restreamer
+    if _hls_restreamer is None:
+        _hls_restreamer = HLSRestreamer()
+    return _hls_restreamer
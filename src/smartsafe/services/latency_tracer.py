@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+SmartSafe AI - Frame Latency Tracer
+Yakalamadan overlay'e kadar frame gecikmesini aşama aşama ölçer
+
+- Her frame monotonic yakalanma zamanı (time.monotonic) ve sıra numarası taşır
+  (FrameRing slot'unda saklanır, FrameView ile consumer'lara geçer)
+- Aşamalar: capture, dequeue, inference_start, inference_end, association,
+  db_enqueue, encode, send; ayrıca overlay = gönderilen frame üzerine çizilen
+  detection sonucunun yaşı (eski overlay'in kaynağı)
+- Her ölçüm "yakalanmadan bu aşamaya kadar geçen süre" (ms); aşamalar arası
+  fark hangi adımın gecikme eklediğini gösterir
+- Kamera + aşama başına sabit boyutlu pencere (deque); kayıt O(1), yüzdelikler
+  sadece okunurken hesaplanır - 30 FPS'te maliyet frame süresinin %1'inin çok altında
+"""
+
+import math
+import os
+import threading
+import time
+import logging
+from collections import deque
+from typing import Any, Deque, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+STAGE_CAPTURE = 'capture'
+STAGE_DEQUEUE = 'dequeue'
+STAGE_INFERENCE_START = 'inference_start'
+STAGE_INFERENCE_END = 'inference_end'
+STAGE_ASSOCIATION = 'association'
+STAGE_DB_ENQUEUE = 'db_enqueue'
+STAGE_ENCODE = 'encode'
+STAGE_SEND = 'send'
+STAGE_OVERLAY = 'overlay'
+
+# Pipeline sırası (raporlama sırası)
+STAGES = (
+    STAGE_CAPTURE, STAGE_DEQUEUE, STAGE_INFERENCE_START, STAGE_INFERENCE_END,
+    STAGE_ASSOCIATION, STAGE_DB_ENQUEUE, STAGE_ENCODE, STAGE_SEND, STAGE_OVERLAY,
+)
+
+PERCENTILES = (50, 95, 99)
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank yüzdelik (sorted_values sıralı olmalı)"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100.0 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+class FrameTrace:
+    """Tek bir frame'in aşama zaman damgaları (monotonic saniye)"""
+
+    __slots__ = ('camera_key', 'seq', 'captured_at', 'marks')
+
+    def __init__(self, camera_key: str, seq: int, captured_at: float):
+        self.camera_key = camera_key
+        self.seq = seq
+        self.captured_at = captured_at
+        self.marks: List[Tuple[str, float]] = []
+
+    def mark(self, stage: str, at: Optional[float] = None):
+        self.marks.append((stage, time.monotonic() if at is None else at))
+
+    def ages_ms(self) -> Dict[str, float]:
+        """Aşama -> yakalanmadan itibaren geçen süre (ms)"""
+        return {stage: round((at - self.captured_at) * 1000.0, 2) for stage, at in self.marks}
+
+
+class LatencyTracer:
+    """Kamera + aşama başına kayan pencere gecikme istatistikleri"""
+
+    def __init__(self, window: int = 512, enabled: bool = True):
+        self.window = window
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._samples: Dict[str, Dict[str, Deque[float]]] = {}
+        self._last_seq: Dict[str, int] = {}
+
+    def start(self, camera_key: str, seq: int, captured_at: float) -> FrameTrace:
+        """Frame için trace başlatır (capture = 0 ms)"""
+        trace = FrameTrace(camera_key, seq, captured_at)
+        trace.mark(STAGE_CAPTURE, captured_at)
+        return trace
+
+    def observe(self, camera_key: str, stage: str, captured_at: Optional[float],
+                now: Optional[float] = None, seq: Optional[int] = None):
+        """Tek aşama ölçümü: yakalanmadan now'a kadar geçen süre"""
+        if not self.enabled or captured_at is None:
+            return
+        now = time.monotonic() if now is None else now
+        self._add(camera_key, [(stage, now)], captured_at, seq)
+
+    def finish(self, trace: Optional[FrameTrace]):
+        """Trace'in tüm aşamalarını pencerelere ekler"""
+        if not self.enabled or trace is None:
+            return
+        self._add(trace.camera_key, trace.marks, trace.captured_at, trace.seq)
+
+    def _add(self, camera_key: str, marks: Iterable[Tuple[str, float]], captured_at: float, seq: Optional[int]):
+        with self._lock:
+            stages = self._samples.get(camera_key)
+            if stages is None:
+                stages = self._samples[camera_key] = {}
+            for stage, at in marks:
+                samples = stages.get(stage)
+                if samples is None:
+                    samples = stages[stage] = deque(maxlen=self.window)
+                samples.append((at - captured_at) * 1000.0)
+            if seq is not None:
+                self._last_seq[camera_key] = seq
+
+    def forget(self, camera_key: str):
+        """Kamera durdurulunca pencerelerini siler"""
+        with self._lock:
+            self._samples.pop(camera_key, None)
+            self._last_seq.pop(camera_key, None)
+
+    def stats(self, camera_key: Optional[str] = None) -> Dict[str, Any]:
+        """Kamera -> aşama -> {count, p50, p95, p99, max} (ms)"""
+        with self._lock:
+            snapshot = {key: {stage: list(samples) for stage, samples in stages.items()}
+                        for key, stages in self._samples.items()
+                        if camera_key is None or key == camera_key}
+            last_seq = dict(self._last_seq)
+
+        cameras = {}
+        for key, stages in snapshot.items():
+            stage_stats = {}
+            for stage in sorted(stages, key=lambda s: STAGES.index(s) if s in STAGES else len(STAGES)):
+                values = sorted(stages[stage])
+                if not values:
+                    continue
+                entry = {'count': len(values)}
+                for pct in PERCENTILES:
+                    entry[f'p{pct}'] = round(percentile(values, pct), 2)
+                entry['max'] = round(values[-1], 2)
+                stage_stats[stage] = entry
+            cameras[key] = {'last_seq': last_seq.get(key), 'stages_ms': stage_stats}
+        return {'enabled': self.enabled, 'window': self.window, 'cameras': cameras}
+
+
+# Global tracer
+_latency_tracer = None
+
+
+def get_latency_tracer() -> LatencyTracer:
+    """Global latency tracer instance'ını döndürür"""
+    global _latency_tracer
+    if _latency_tracer is None:
+        enabled = os.getenv('SMARTSAFE_LATENCY_TRACING', 'true').lower() not in ('0', 'false', 'no')
+        _latency_tracer = LatencyTracer(enabled=enabled)
+    return _latency_tracer
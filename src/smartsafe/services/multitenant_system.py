@@ -19,6 +19,10 @@ from flask_cors import CORS
 import bcrypt
 from dotenv import load_dotenv
 from src.smartsafe.database.database_adapter import get_db_adapter
+from src.smartsafe.database.partitions import add_column, update_rows
+from src.smartsafe.database.query_profiler import profile_connection
+from src.smartsafe.services.session_cache import get_session_cache
+from src.smartsafe.services.tenant_cache import KIND_COMPANY_INFO, KIND_SUBSCRIPTION, get_tenant_config_cache
 
 # Load environment variables
 load_dotenv()
@@ -84,7 +88,11 @@ class MultiTenantDatabase:
     
     def get_connection(self, timeout: int = 30):
         """Database connection with timeout"""
-        return self.db_adapter.get_connection(timeout)
+        return profile_connection(self.db_adapter.get_connection(timeout), self.db_adapter.db_type)
+    
+    def get_read_connection(self, timeout: int = 30):
+        """Salt okuma bağlantısı (read-replica varsa oradan, yoksa primary)"""
+        return profile_connection(self.db_adapter.get_read_connection(timeout), self.db_adapter.db_type)
     
     def get_placeholder(self):
         """Get appropriate placeholder for database type"""
@@ -603,32 +611,32 @@ class MultiTenantDatabase:
             
             # Database migration - Yeni kolonları ekle (varsa hata vermesin)
             try:
-                cursor.execute('ALTER TABLE detections ADD COLUMN detection_type TEXT DEFAULT "PPE"')
+                add_column(conn, 'sqlite', 'detections', 'detection_type', "TEXT DEFAULT 'PPE'")
             except sqlite3.OperationalError:
                 pass  # Kolon zaten var
             
             try:
-                cursor.execute('ALTER TABLE detections ADD COLUMN track_id TEXT')
+                add_column(conn, 'sqlite', 'detections', 'track_id', 'TEXT')
             except sqlite3.OperationalError:
                 pass  # Kolon zaten var
             
             try:
-                cursor.execute('ALTER TABLE detections ADD COLUMN confidence REAL DEFAULT 0')
+                add_column(conn, 'sqlite', 'detections', 'confidence', 'REAL DEFAULT 0')
             except sqlite3.OperationalError:
                 pass  # Kolon zaten var
                 
             try:
-                cursor.execute('ALTER TABLE detections ADD COLUMN people_detected INTEGER DEFAULT 0')
+                add_column(conn, 'sqlite', 'detections', 'people_detected', 'INTEGER DEFAULT 0')
             except sqlite3.OperationalError:
                 pass  # Kolon zaten var
                 
             try:
-                cursor.execute('ALTER TABLE detections ADD COLUMN ppe_compliant INTEGER DEFAULT 0')
+                add_column(conn, 'sqlite', 'detections', 'ppe_compliant', 'INTEGER DEFAULT 0')
             except sqlite3.OperationalError:
                 pass  # Kolon zaten var
                 
             try:
-                cursor.execute('ALTER TABLE detections ADD COLUMN violations_count INTEGER DEFAULT 0')
+                add_column(conn, 'sqlite', 'detections', 'violations_count', 'INTEGER DEFAULT 0')
             except sqlite3.OperationalError:
                 pass  # Kolon zaten var
             
@@ -648,52 +656,42 @@ class MultiTenantDatabase:
                 pass  # Kolon zaten var
                 
             try:
-                cursor.execute('ALTER TABLE detections ADD COLUMN compliant_people INTEGER DEFAULT 0')
+                add_column(conn, 'sqlite', 'detections', 'compliant_people', 'INTEGER DEFAULT 0')
             except sqlite3.OperationalError:
                 pass  # Kolon zaten var
             
             try:
-                cursor.execute('ALTER TABLE detections ADD COLUMN violation_people INTEGER DEFAULT 0')
+                add_column(conn, 'sqlite', 'detections', 'violation_people', 'INTEGER DEFAULT 0')
             except sqlite3.OperationalError:
                 pass  # Kolon zaten var
             
             try:
-                cursor.execute('ALTER TABLE detections ADD COLUMN compliance_rate REAL')
+                add_column(conn, 'sqlite', 'detections', 'compliance_rate', 'REAL')
             except sqlite3.OperationalError:
                 pass  # Kolon zaten var
             
             # Mevcut veriler için compliance_rate hesapla (eğer NULL ise)
             try:
-                cursor.execute('''
-                    UPDATE detections 
-                    SET compliance_rate = CASE 
-                        WHEN people_detected > 0 THEN (ppe_compliant * 100.0 / people_detected)
-                        ELSE 0 
-                    END
-                    WHERE compliance_rate IS NULL AND people_detected > 0
-                ''')
+                update_rows(conn, 'sqlite', 'detections',
+                            'compliance_rate = CASE WHEN people_detected > 0 '
+                            'THEN (ppe_compliant * 100.0 / people_detected) ELSE 0 END',
+                            'compliance_rate IS NULL AND people_detected > 0')
                 conn.commit()
             except Exception as e:
                 logger.info(f"Migration info (compliance_rate calculation): {e}")
             
             # Mevcut veriler için compliant_people hesapla (eğer NULL ise)
             try:
-                cursor.execute('''
-                    UPDATE detections 
-                    SET compliant_people = ppe_compliant
-                    WHERE compliant_people IS NULL AND ppe_compliant IS NOT NULL
-                ''')
+                update_rows(conn, 'sqlite', 'detections', 'compliant_people = ppe_compliant',
+                            'compliant_people IS NULL AND ppe_compliant IS NOT NULL')
                 conn.commit()
             except Exception as e:
                 logger.info(f"Migration info (compliant_people calculation): {e}")
             
             # Mevcut veriler için violation_people hesapla (eğer NULL ise)
             try:
-                cursor.execute('''
-                    UPDATE detections 
-                    SET violation_people = violations_count
-                    WHERE violation_people IS NULL AND violations_count IS NOT NULL
-                ''')
+                update_rows(conn, 'sqlite', 'detections', 'violation_people = violations_count',
+                            'violation_people IS NULL AND violations_count IS NOT NULL')
                 conn.commit()
             except Exception as e:
                 logger.info(f"Migration info (violation_people calculation): {e}")
@@ -824,7 +822,7 @@ class MultiTenantDatabase:
                 
                 if 'status' not in columns:
                     logger.info("🔧 Adding status column to detections table...")
-                    cursor.execute('ALTER TABLE detections ADD COLUMN status TEXT DEFAULT "active"')
+                    add_column(conn, 'sqlite', 'detections', 'status', "TEXT DEFAULT 'active'")
                     conn.commit()
                     logger.info("✅ Migration: detections status column added successfully")
                     
@@ -1167,7 +1165,19 @@ class MultiTenantDatabase:
             return None
     
     def validate_session(self, session_id: str) -> Optional[Dict]:
-        """Oturum doğrulama"""
+        """Oturum doğrulama - tekrar eden istekler session cache'ten döner"""
+        cache = get_session_cache()
+        cached = cache.get(session_id)
+        if cached is not None:
+            return cached
+        generation = cache.generation
+        result = self._load_session(session_id)
+        if result:
+            cache.put(session_id, result, generation=generation)
+        return result
+    
+    def _load_session(self, session_id: str) -> Optional[Dict]:
+        """Oturumu sessions/users/companies JOIN'i ile doğrular"""
         try:
             conn = self.get_connection()
             cursor = conn.cursor()
@@ -1387,6 +1397,7 @@ class MultiTenantDatabase:
                     
                     conn.commit()
                     conn.close()
+                    get_tenant_config_cache().invalidate(company_id, KIND_SUBSCRIPTION)  # used_cameras
                     logger.info(f"✅ Successfully reactivated deleted camera: {existing_camera_id}")
                     return True, existing_camera_id
             
@@ -1500,6 +1511,7 @@ class MultiTenantDatabase:
             
             # Başarılı sonuç
             conn.close()
+            get_tenant_config_cache().invalidate(company_id, KIND_SUBSCRIPTION)  # used_cameras
             logger.info(f"✅ Camera added successfully: {camera_id}")
             return True, camera_id
             
@@ -1780,6 +1792,7 @@ class MultiTenantDatabase:
             
             conn.commit()
             conn.close()
+            get_tenant_config_cache().invalidate(company_id, KIND_SUBSCRIPTION)  # used_cameras
             return True
             
         except Exception as e:
@@ -1972,10 +1985,7 @@ class MultiTenantDatabase:
                 # Eksik kolonları ekle
                 if 'compliance_rate' not in columns:
                     try:
-                        if self.db_adapter.db_type == 'postgresql':
-                            cursor.execute('ALTER TABLE detections ADD COLUMN compliance_rate REAL')
-                        else:
-                            cursor.execute('ALTER TABLE detections ADD COLUMN compliance_rate REAL')
+                        add_column(conn, self.db_adapter.db_type, 'detections', 'compliance_rate', 'REAL')
                         conn.commit()
                         logger.info("✅ compliance_rate kolonu eklendi (runtime migration)")
                         columns.append('compliance_rate')
@@ -1984,10 +1994,7 @@ class MultiTenantDatabase:
                 
                 if 'compliant_people' not in columns:
                     try:
-                        if self.db_adapter.db_type == 'postgresql':
-                            cursor.execute('ALTER TABLE detections ADD COLUMN compliant_people INTEGER DEFAULT 0')
-                        else:
-                            cursor.execute('ALTER TABLE detections ADD COLUMN compliant_people INTEGER DEFAULT 0')
+                        add_column(conn, self.db_adapter.db_type, 'detections', 'compliant_people', 'INTEGER DEFAULT 0')
                         conn.commit()
                         logger.info("✅ compliant_people kolonu eklendi (runtime migration)")
                         columns.append('compliant_people')
@@ -1996,10 +2003,7 @@ class MultiTenantDatabase:
                 
                 if 'violation_people' not in columns:
                     try:
-                        if self.db_adapter.db_type == 'postgresql':
-                            cursor.execute('ALTER TABLE detections ADD COLUMN violation_people INTEGER DEFAULT 0')
-                        else:
-                            cursor.execute('ALTER TABLE detections ADD COLUMN violation_people INTEGER DEFAULT 0')
+                        add_column(conn, self.db_adapter.db_type, 'detections', 'violation_people', 'INTEGER DEFAULT 0')
                         conn.commit()
                         logger.info("✅ violation_people kolonu eklendi (runtime migration)")
                         columns.append('violation_people')
@@ -2009,10 +2013,7 @@ class MultiTenantDatabase:
                 # track_id kolonunu kontrol et ve ekle
                 if 'track_id' not in columns:
                     try:
-                        if self.db_adapter.db_type == 'postgresql':
-                            cursor.execute('ALTER TABLE detections ADD COLUMN track_id TEXT')
-                        else:
-                            cursor.execute('ALTER TABLE detections ADD COLUMN track_id TEXT')
+                        add_column(conn, self.db_adapter.db_type, 'detections', 'track_id', 'TEXT')
                         conn.commit()
                         logger.info("✅ track_id kolonu eklendi (runtime migration)")
                         columns.append('track_id')
@@ -2433,7 +2434,8 @@ class MultiTenantDatabase:
                 'cameras_trend': 0,
                 'compliance_trend': 0,
                 'violations_trend': 0,
-                'workers_trend': 0
+                'workers_trend': 0,
+                'degraded': True  # Hata yedeği: çağıran cache'lememeli
             }
     
     def get_company_ppe_requirements(self, company_id: str) -> List[str]:
@@ -2652,22 +2654,12 @@ class MultiTenantDatabase:
             return False
 
     def get_company_info(self, company_id: str) -> Optional[Dict[str, Any]]:
-        """Şirket bilgilerini getir (cache'lenmiş)"""
-        # Cache kontrolü - her frame'de DB sorgusu yapmamak için
-        if not hasattr(self, '_company_info_cache'):
-            self._company_info_cache = {}
-            self._company_info_cache_time = {}
-        
-        cache_key = company_id
-        cache_ttl = 60  # 60 saniye cache
-        
-        # Cache'den kontrol et
-        if cache_key in self._company_info_cache:
-            cache_time = self._company_info_cache_time.get(cache_key, 0)
-            if (datetime.now().timestamp() - cache_time) < cache_ttl:
-                logger.debug(f"🔍 Company info cache hit: {company_id}")
-                return self._company_info_cache[cache_key]
-        
+        """Şirket bilgilerini getir (tenant cache'lenmiş - her frame'de DB sorgusu yapmamak için)"""
+        return get_tenant_config_cache().get_or_load(
+            company_id, KIND_COMPANY_INFO, lambda: self._load_company_info(company_id))
+    
+    def _load_company_info(self, company_id: str) -> Optional[Dict[str, Any]]:
+        """Şirket bilgilerini veritabanından oku"""
         try:
             logger.debug(f"🔍 MultiTenantDatabase - get_company_info çağrıldı: {company_id}")
             
@@ -2738,11 +2730,6 @@ class MultiTenantDatabase:
                         'logo_url': result[10] if len(result) > 10 else None
                     }
                 
-                # Cache'e kaydet
-                self._company_info_cache[cache_key] = company_info
-                self._company_info_cache_time[cache_key] = datetime.now().timestamp()
-                
-                logger.debug(f"🔍 MultiTenantDatabase - Company info cached: {company_id}")
                 return company_info
             else:
                 logger.debug(f"🔍 MultiTenantDatabase - Query sonucu bulunamadı")
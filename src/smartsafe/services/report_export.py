@@ -0,0 +1,415 @@
+#!/usr/bin/env python3
+"""
+SmartSafe AI - Streaming Report Export
+Ham detection / ihlal satırlarını belleğe toplamadan CSV / NDJSON / Parquet'e aktarır
+
+- iter_row_batches(): PostgreSQL'de server-side (named) cursor + fetchmany,
+  SQLite'ta cursor iterasyonu; satırlar chunk_size'lık parçalar halinde gelir
+- stream_export(): parçaları doğrudan chunked HTTP yanıtına yazılacak byte
+  parçalarına çevirir - bellek kullanımı export boyutundan bağımsız, O(chunk)
+- ExportJobManager: çok büyük aralıklar için arka planda dosyaya yazan işler
+  (.part dosyası + atomik rename), satır sayacı ile ilerleme durumu
+- Parquet opsiyonel (pyarrow); her parça ayrı row group olarak yazılır
+"""
+
+import csv
+import io
+import json
+import os
+import threading
+import time
+import uuid
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from src.smartsafe.database.transactions import is_autocommit
+
+# pyarrow opsiyonel - yoksa Parquet formatı kullanılamaz
+try:
+    import pyarrow
+    import pyarrow.parquet
+    PYARROW_AVAILABLE = True
+except ImportError:
+    pyarrow = None
+    PYARROW_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+FORMAT_CSV = 'csv'
+FORMAT_NDJSON = 'ndjson'
+FORMAT_PARQUET = 'parquet'
+
+STREAM_FORMATS = (FORMAT_CSV, FORMAT_NDJSON)
+FILE_FORMATS = (FORMAT_CSV, FORMAT_NDJSON, FORMAT_PARQUET)
+
+CONTENT_TYPES = {
+    FORMAT_CSV: 'text/csv; charset=utf-8',
+    FORMAT_NDJSON: 'application/x-ndjson',
+    FORMAT_PARQUET: 'application/vnd.apache.parquet',
+}
+
+DEFAULT_CHUNK_ROWS = 1000
+
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_COMPLETED = 'completed'
+JOB_FAILED = 'failed'
+
+
+@dataclass(frozen=True)
+class ExportDataset:
+    """Dışa aktarılabilir ham tablo"""
+    table: str
+    time_column: str
+    columns: Tuple[str, ...]
+
+
+DATASETS: Dict[str, ExportDataset] = {
+    'violations': ExportDataset('violations', 'timestamp', (
+        'violation_id', 'camera_id', 'worker_id', 'missing_ppe', 'violation_type', 'confidence', 'timestamp')),
+    'detections': ExportDataset('detections', 'timestamp', (
+        'detection_id', 'camera_id', 'detection_type', 'confidence', 'people_detected', 'ppe_compliant',
+        'violations_count', 'timestamp')),
+    'dvr_detections': ExportDataset('dvr_detection_results', 'created_at', (
+        'id', 'stream_id', 'total_people', 'compliant_people', 'violations_count', 'missing_ppe',
+        'detection_confidence', 'created_at')),
+}
+
+# Eski export rapor türleri -> ham veri seti
+REPORT_TYPE_DATASETS = {
+    'violations': 'violations',
+    'compliance': 'detections',
+    'camera': 'detections',
+}
+
+
+def resolve_dataset(name: Optional[str]) -> ExportDataset:
+    dataset = DATASETS.get(REPORT_TYPE_DATASETS.get(name, name) if name else 'violations')
+    if dataset is None:
+        raise ValueError(f"Unknown export dataset: {name}")
+    return dataset
+
+
+def _query(dataset: ExportDataset, db_type: str, since: Optional[datetime],
+           until: Optional[datetime], select: Optional[str] = None) -> Tuple[str, Tuple]:
+    p = '%s' if db_type == 'postgresql' else '?'
+    where, params = [f'company_id = {p}'], []
+    # Zaman filtresi index (company_id, zaman) ve bölüm budaması için
+    if since is not None:
+        where.append(f'{dataset.time_column} >= {p}')
+        params.append(since.strftime('%Y-%m-%d %H:%M:%S'))
+    if until is not None:
+        where.append(f'{dataset.time_column} < {p}')
+        params.append(until.strftime('%Y-%m-%d %H:%M:%S'))
+    if select is not None:
+        return f"SELECT {select} FROM {dataset.table} WHERE {' AND '.join(where)}", tuple(params)
+    return (f"SELECT {', '.join(dataset.columns)} FROM {dataset.table} WHERE {' AND '.join(where)} "
+            f"ORDER BY {dataset.time_column}", tuple(params))
+
+
+def count_rows(conn, db_type: str, dataset: ExportDataset, company_id: str,
+               since: Optional[datetime] = None, until: Optional[datetime] = None) -> int:
+    """İlerleme yüzdesi için toplam satır sayısı (index üzerinden COUNT)"""
+    sql, params = _query(dataset, db_type, since, until, select='COUNT(*) AS total')
+    cursor = conn.cursor()
+    cursor.execute(sql, (company_id,) + params)
+    row = cursor.fetchone()
+    return int((row['total'] if hasattr(row, 'keys') else row[0]) or 0) if row else 0
+
+
+def iter_row_batches(conn, db_type: str, dataset: ExportDataset, company_id: str,
+                     since: Optional[datetime] = None, until: Optional[datetime] = None,
+                     chunk_size: int = DEFAULT_CHUNK_ROWS) -> Iterator[List[Tuple]]:
+    """chunk_size'lık satır listeleri (kolon sırası dataset.columns)"""
+    sql, params = _query(dataset, db_type, since, until)
+    if db_type == 'postgresql':
+        # Named cursor: satırlar sunucuda kalır, itersize kadar çekilir. Autocommit
+        # bağlantıda named cursor transaction dışında yaşayabilmek için WITH HOLD ister
+        cursor = conn.cursor(name=f'export_{uuid.uuid4().hex[:12]}',
+                             withhold=is_autocommit(conn))
+        cursor.itersize = chunk_size
+    else:
+        cursor = conn.cursor()
+    try:
+        cursor.execute(sql, (company_id,) + params)
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield [tuple(row[name] for name in dataset.columns) if hasattr(row, 'keys') else tuple(row)
+                   for row in rows]
+    finally:
+        try:
+            cursor.close()
+        except Exception:
+            pass
+
+
+def _plain(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat(sep=' ')
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (bytes, memoryview)):
+        return bytes(value).hex()
+    return value
+
+
+def encode_batches(batches: Iterator[List[Tuple]], columns: Sequence[str], fmt: str,
+                   on_batch: Optional[Callable[[int], None]] = None) -> Iterator[bytes]:
+    """Satır parçalarını CSV / NDJSON byte parçalarına çevirir (parça başına bir yield)"""
+    if fmt not in STREAM_FORMATS:
+        raise ValueError(f"Unsupported stream format: {fmt}")
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n') if fmt == FORMAT_CSV else None
+    if writer is not None:
+        writer.writerow(columns)
+    for rows in batches:
+        for row in rows:
+            values = [_plain(value) for value in row]
+            if writer is not None:
+                writer.writerow(values)
+            else:
+                buffer.write(json.dumps(dict(zip(columns, values)), ensure_ascii=False, default=str))
+                buffer.write('\n')
+        chunk = buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+        if on_batch is not None:
+            on_batch(len(rows))
+        yield chunk
+    tail = buffer.getvalue()
+    if tail:
+        yield tail.encode('utf-8')
+
+
+def stream_export(conn, db_type: str, dataset: ExportDataset, company_id: str, fmt: str,
+                  since: Optional[datetime] = None, until: Optional[datetime] = None,
+                  chunk_size: int = DEFAULT_CHUNK_ROWS,
+                  on_batch: Optional[Callable[[int], None]] = None) -> Iterator[bytes]:
+    """Chunked HTTP yanıtı için byte parçaları"""
+    batches = iter_row_batches(conn, db_type, dataset, company_id, since, until, chunk_size)
+    return encode_batches(batches, dataset.columns, fmt, on_batch=on_batch)
+
+
+def _write_parquet(path: str, batches: Iterator[List[Tuple]], columns: Sequence[str],
+                   on_batch: Callable[[int], None]):
+    writer, schema = None, None
+    try:
+        for rows in batches:
+            data = {name: [_plain(row[i]) if not isinstance(row[i], datetime) else row[i] for row in rows]
+                    for i, name in enumerate(columns)}
+            if schema is None:
+                inferred = pyarrow.Table.from_pydict(data).schema
+                # İlk parçada tamamen NULL olan kolonlar string kabul edilir
+                schema = pyarrow.schema([pyarrow.field(f.name, pyarrow.string()) if pyarrow.types.is_null(f.type)
+                                         else f for f in inferred])
+                writer = pyarrow.parquet.ParquetWriter(path, schema)
+            writer.write_table(pyarrow.Table.from_pydict(data, schema=schema))
+            on_batch(len(rows))
+        if writer is None:
+            pyarrow.parquet.write_table(pyarrow.table({name: pyarrow.array([], pyarrow.string())
+                                                       for name in columns}), path)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+@dataclass
+class ExportJob:
+    """Arka plan export işi"""
+    job_id: str
+    company_id: str
+    dataset: str
+    format: str
+    since: Optional[datetime] = None
+    until: Optional[datetime] = None
+    status: str = JOB_QUEUED
+    rows_total: Optional[int] = None
+    rows_written: int = 0
+    bytes_written: int = 0
+    path: Optional[str] = None
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+    @property
+    def filename(self) -> str:
+        return f"{self.company_id}_{self.dataset}_{self.job_id}.{self.format}"
+
+    def progress(self) -> Dict[str, Any]:
+        total = self.rows_total
+        if self.status == JOB_COMPLETED:
+            percent = 100.0
+        elif total:
+            percent = round(min(self.rows_written / total, 0.99) * 100, 1)
+        else:
+            percent = 0.0
+        return {
+            'job_id': self.job_id,
+            'dataset': self.dataset,
+            'format': self.format,
+            'status': self.status,
+            'rows_total': total,
+            'rows_written': self.rows_written,
+            'bytes_written': self.bytes_written,
+            'percent': percent,
+            'error': self.error,
+            'created_at': datetime.fromtimestamp(self.created_at).isoformat(),
+            'finished_at': datetime.fromtimestamp(self.finished_at).isoformat() if self.finished_at else None,
+        }
+
+
+def _default_connection_provider():
+    """Global database adapter'dan (bağlantı al, bağlantı bırak, db_type)"""
+    from src.smartsafe.database.database_adapter import get_db_adapter
+    adapter = get_db_adapter()
+    return adapter.get_connection, adapter.close_connection, adapter.db_type
+
+
+class ExportQueueFull(RuntimeError):
+    """Bekleyen export işi sınırı dolu - iş kabul edilmedi"""
+
+
+class ExportJobManager:
+    """Büyük aralıklar için dosyaya yazan arka plan export işleri
+
+    İşler sabit sayıda worker thread'li bir havuzda çalışır; sırada bekleyen iş
+    sayısı max_pending'e ulaşınca yeni iş ExportQueueFull ile reddedilir.
+    """
+
+    def __init__(self, export_dir: str = 'exports', max_workers: int = 2, max_jobs: int = 200,
+                 chunk_size: int = DEFAULT_CHUNK_ROWS, max_pending: int = 20,
+                 connection_provider: Optional[Callable[[], Tuple[Callable, Callable, str]]] = None):
+        self.export_dir = export_dir
+        self.max_jobs = max_jobs
+        self.max_pending = max_pending
+        self.chunk_size = chunk_size
+        self.connection_provider = connection_provider or _default_connection_provider
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix='export')
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, ExportJob] = {}
+
+        # İstatistikler
+        self.jobs_completed = 0
+        self.jobs_failed = 0
+        self.jobs_rejected = 0
+        self.rows_exported = 0
+
+    def submit(self, company_id: str, dataset: str, fmt: str, since: Optional[datetime] = None,
+               until: Optional[datetime] = None, wait: bool = False) -> ExportJob:
+        """İşi havuza ekler; sıra doluysa ExportQueueFull (wait=True ise bitene kadar bekler)"""
+        if fmt not in FILE_FORMATS:
+            raise ValueError(f"Unsupported export format: {fmt}")
+        if fmt == FORMAT_PARQUET and not PYARROW_AVAILABLE:
+            raise ValueError("Parquet export requires pyarrow")
+        resolve_dataset(dataset)
+        job = ExportJob(uuid.uuid4().hex, company_id, dataset, fmt, since=since, until=until)
+        with self._lock:
+            queued = sum(1 for queued_job in self._jobs.values() if queued_job.status == JOB_QUEUED)
+            if queued >= self.max_pending:
+                self.jobs_rejected += 1
+                raise ExportQueueFull(f"Too many pending export jobs ({queued})")
+            self._jobs[job.job_id] = job
+            self._prune()
+        future = self._executor.submit(self._run, job)
+        if wait:
+            future.result()
+        return job
+
+    def get(self, company_id: str, job_id: str) -> Optional[ExportJob]:
+        """Sadece işi başlatan şirkete döner"""
+        job = self._jobs.get(job_id)
+        return job if job is not None and job.company_id == company_id else None
+
+    def _prune(self):
+        # En eski bitmiş işler (ve dosyaları) unutulur
+        finished = sorted((job for job in self._jobs.values() if job.status in (JOB_COMPLETED, JOB_FAILED)),
+                          key=lambda job: job.created_at)
+        while len(self._jobs) > self.max_jobs and finished:
+            job = finished.pop(0)
+            del self._jobs[job.job_id]
+            if job.path and os.path.exists(job.path):
+                try:
+                    os.remove(job.path)
+                except OSError:
+                    pass
+
+    def _count(self, job: ExportJob, rows: int):
+        job.rows_written += rows
+        self.rows_exported += rows
+
+    def _run(self, job: ExportJob):
+        job.status, job.started_at = JOB_RUNNING, time.time()
+        dataset = resolve_dataset(job.dataset)
+        directory = os.path.join(self.export_dir, job.company_id)
+        path = os.path.join(directory, job.filename)
+        partial = path + '.part'
+        try:
+            os.makedirs(directory, exist_ok=True)
+            get_connection, release, db_type = self.connection_provider()
+            conn = get_connection()
+            if conn is None:
+                raise RuntimeError("database connection unavailable")
+            try:
+                job.rows_total = count_rows(conn, db_type, dataset, job.company_id, job.since, job.until)
+                batches = iter_row_batches(conn, db_type, dataset, job.company_id, job.since, job.until,
+                                           self.chunk_size)
+                on_batch = lambda rows: self._count(job, rows)
+                if job.format == FORMAT_PARQUET:
+                    _write_parquet(partial, batches, dataset.columns, on_batch)
+                else:
+                    with open(partial, 'wb') as handle:
+                        for chunk in encode_batches(batches, dataset.columns, job.format, on_batch=on_batch):
+                            handle.write(chunk)
+                            job.bytes_written += len(chunk)
+            finally:
+                release(conn)
+            os.replace(partial, path)
+            job.bytes_written = os.path.getsize(path)
+            job.path, job.status = path, JOB_COMPLETED
+            self.jobs_completed += 1
+            logger.info(f"✅ Export job {job.job_id} completed: {job.rows_written} rows -> {path}")
+        except Exception as e:
+            job.status, job.error = JOB_FAILED, str(e)
+            self.jobs_failed += 1
+            logger.error(f"❌ Export job {job.job_id} failed: {e}")
+            if os.path.exists(partial):
+                os.remove(partial)
+        finally:
+            job.finished_at = time.time()
+
+    def stats(self) -> Dict[str, Any]:
+        jobs = list(self._jobs.values())
+        return {
+            'jobs_running': sum(1 for job in jobs if job.status == JOB_RUNNING),
+            'jobs_queued': sum(1 for job in jobs if job.status == JOB_QUEUED),
+            'jobs_completed': self.jobs_completed,
+            'jobs_failed': self.jobs_failed,
+            'jobs_rejected': self.jobs_rejected,
+            'rows_exported': self.rows_exported,
+        }
+
+
+# Global job manager
+_export_job_manager = None
+
+
+def get_export_job_manager() -> ExportJobManager:
+    """Global export job manager instance'ını döndürür"""
+    global _export_job_manager
+    if _export_job_manager is None:
+        _export_job_manager = ExportJobManager(
+            export_dir=os.getenv('SMARTSAFE_EXPORT_DIR', 'exports'),
+            max_workers=int(os.getenv('SMARTSAFE_EXPORT_WORKERS', '2')),
+            max_pending=int(os.getenv('SMARTSAFE_EXPORT_MAX_PENDING', '20')),
+            chunk_size=int(os.getenv('SMARTSAFE_EXPORT_CHUNK_ROWS', str(DEFAULT_CHUNK_ROWS))),
+        )
+    return _export_job_manager
@@ -0,0 +1,697 @@
+#!/usr/bin/env python3
+"""
+SmartSafe AI - Report Rollups
+detections / violations / violation_events için saatlik ve günlük özet tabloları
+
+- Periyodik compaction: watermark'tan kapanmış son saate kadar ham satırlar
+  detection_rollup_hourly'ye toplanır (upsert), etkilenen günler
+  detection_rollup_daily'de saatliklerden yeniden hesaplanır; watermark aynı
+  transaction'da compare-and-set ile ilerletilir - her ham satır tam bir kez sayılır
+- Saat kapandıktan grace saniye sonra compaction (write-behind gecikmesi)
+- Geç satırlar: write-behind yazdığı satırların zamanlarını note_late_rows() ile
+  bildirir; compaction'ı geçmiş (kapanmış) bir saate düşenler kaydedilir ve bir
+  sonraki turda sadece o saatler ham tablolardan yeniden hesaplanır (silinip tekrar
+  toplanır). Güvenlik ağı olarak watermark'tan önceki son restate_hours saat
+  sweep_interval_seconds'ta bir (ve açılışta) toptan yeniden hesaplanır; pencere,
+  retention'ın ham veriyi sildiği süreden (en az 1 gün) kısa tutulmalıdır
+- Ham satırların zamanı yazan tarafta yerel saatle (datetime.now()) verilir;
+  SQLite'ın CURRENT_TIMESTAMP varsayılanı UTC'dir ve saat kovalarını kaydırır
+- summarize(): watermark'tan önceki tam günler daily, kenar saatler hourly,
+  watermark sonrası (açık saat) ham tablolardan okunur ve Python'da birleştirilir
+- ppe_type = '' satırları detections'tan; diğerleri missing_ppe (violations) ve
+  violation_type (violation_events - süre, ihlalin bittiği saate yazılır)
+"""
+
+import os
+import threading
+import time
+import logging
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from src.smartsafe.database.transactions import commit
+
+logger = logging.getLogger(__name__)
+
+HOURLY_TABLE = 'detection_rollup_hourly'
+DAILY_TABLE = 'detection_rollup_daily'
+WATERMARK_TABLE = 'rollup_watermarks'
+WATERMARK_NAME = 'hourly'
+
+SOURCE_DETECTIONS = 'detections'
+SOURCE_VIOLATIONS = 'violations'
+
+# 'timestamp' kolonuyla saatlik rollup'a giren ham tablolar (geç satır takibi)
+ROLLUP_SOURCE_TABLES = ('detections', 'violations')
+
+GROUP_DAY = 'day'
+GROUP_CAMERA = 'camera'
+GROUP_PPE_TYPE = 'ppe_type'
+
+METRICS = (
+    'detections', 'compliant_detections', 'people', 'compliant', 'violations',
+    'confidence_sum', 'violation_count', 'duration_seconds',
+)
+
+_TS_FORMAT = '%Y-%m-%d %H:%M:%S'
+_DAY_FORMAT = '%Y-%m-%d'
+
+# Segment türleri (plan_segments)
+SEGMENT_RAW = 'raw'
+SEGMENT_HOURLY = 'hourly'
+SEGMENT_DAILY = 'daily'
+
+_Segment = Tuple[str, Optional[datetime], Optional[datetime]]
+
+
+def _placeholder(db_type: str) -> str:
+    return '%s' if db_type == 'postgresql' else '?'
+
+
+def _col(row, index: int, name: str) -> Any:
+    return row[name] if hasattr(row, 'keys') else row[index]
+
+
+def _floor_hour(value: datetime) -> datetime:
+    return value.replace(minute=0, second=0, microsecond=0)
+
+
+def _ceil_hour(value: datetime) -> datetime:
+    floor = _floor_hour(value)
+    return floor if floor == value else floor + timedelta(hours=1)
+
+
+def _floor_day(value: datetime) -> datetime:
+    return value.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _ceil_day(value: datetime) -> datetime:
+    floor = _floor_day(value)
+    return floor if floor == value else floor + timedelta(days=1)
+
+
+def _parse_ts(value: Any) -> Optional[datetime]:
+    """DB'den gelen zaman damgası (SQLite metin / PostgreSQL datetime) -> naive datetime"""
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.astimezone().replace(tzinfo=None) if value.tzinfo else value
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day)
+    try:
+        return datetime.fromisoformat(str(value).strip().replace('T', ' '))
+    except ValueError:
+        return None
+
+
+def plan_segments(since: Optional[datetime], watermark: Optional[datetime]) -> List[_Segment]:
+    """[since, ∞) aralığını hangi kaynaktan okunacağına göre böler
+
+    Rollup'lar sadece watermark'tan önceki kapanmış saatleri içerir: tam günler daily,
+    günün kenarındaki saatler hourly, saat hizasında olmayan başlangıç ve watermark
+    sonrası ham tablolardan okunur.
+    """
+    if watermark is None or (since is not None and since >= watermark):
+        return [(SEGMENT_RAW, since, None)]
+
+    segments: List[_Segment] = []
+    hour_lo = _ceil_hour(since) if since is not None else None
+    if since is not None and hour_lo > since:
+        segments.append((SEGMENT_RAW, since, hour_lo))
+
+    day_lo = _ceil_day(hour_lo) if hour_lo is not None else None
+    day_hi = _floor_day(watermark)
+    if day_lo is None or day_lo < day_hi:
+        if hour_lo is not None and hour_lo < day_lo:
+            segments.append((SEGMENT_HOURLY, hour_lo, day_lo))
+        segments.append((SEGMENT_DAILY, day_lo, day_hi))
+        if day_hi < watermark:
+            segments.append((SEGMENT_HOURLY, day_hi, watermark))
+    elif hour_lo < watermark:
+        segments.append((SEGMENT_HOURLY, hour_lo, watermark))
+
+    segments.append((SEGMENT_RAW, watermark, None))
+    return segments
+
+
+# =============================================================================
+# COMPACTION
+# =============================================================================
+
+def _hour_expr(db_type: str, column: str) -> str:
+    if db_type == 'postgresql':
+        return f"date_trunc('hour', {column})"
+    return f"strftime('%Y-%m-%d %H:00:00', {column})"
+
+
+def _event_hour_expr(db_type: str) -> str:
+    if db_type == 'postgresql':
+        return "date_trunc('hour', to_timestamp(end_time)::timestamp)"
+    return "strftime('%Y-%m-%d %H:00:00', end_time, 'unixepoch', 'localtime')"
+
+
+def _bucket_day_expr(db_type: str) -> str:
+    return 'CAST(bucket AS DATE)' if db_type == 'postgresql' else 'substr(bucket, 1, 10)'
+
+
+def _rollup_columns() -> str:
+    return ', '.join(('company_id', 'camera_id', 'ppe_type', 'bucket') + METRICS + ('last_at',))
+
+
+def _upsert_clause(db_type: str, table: str) -> str:
+    updates = [f"{metric} = {table}.{metric} + excluded.{metric}" for metric in METRICS]
+    if db_type == 'postgresql':
+        updates.append(f"last_at = GREATEST({table}.last_at, excluded.last_at)")
+    else:
+        # SQLite skaler MAX() NULL görünce NULL döner
+        updates.append(f"last_at = COALESCE(MAX({table}.last_at, excluded.last_at), "
+                       f"{table}.last_at, excluded.last_at)")
+    return f"ON CONFLICT (company_id, camera_id, ppe_type, bucket) DO UPDATE SET {', '.join(updates)}"
+
+
+def _compaction_statements(db_type: str) -> List[Tuple[str, str]]:
+    """(SQL, parametre türü) - 'ts' => (start, end) metin, 'epoch' => (start, end) unix zamanı"""
+    p = _placeholder(db_type)
+    hour = _hour_expr(db_type, 'timestamp')
+    event_hour = _event_hour_expr(db_type)
+    null_ts = 'CAST(NULL AS TIMESTAMP)' if db_type == 'postgresql' else 'NULL'
+    insert = f"INSERT INTO {HOURLY_TABLE} ({_rollup_columns()})"
+    upsert = _upsert_clause(db_type, HOURLY_TABLE)
+    return [
+        (f'''{insert}
+            SELECT company_id, camera_id, '', {hour},
+                   COUNT(*),
+                   SUM(CASE WHEN COALESCE(violations_count, 0) = 0 THEN 1 ELSE 0 END),
+                   SUM(COALESCE(people_detected, 0)), SUM(COALESCE(ppe_compliant, 0)),
+                   SUM(COALESCE(violations_count, 0)), SUM(COALESCE(confidence, 0)),
+                   0, 0, MAX(timestamp)
+            FROM detections
+            WHERE timestamp >= {p} AND timestamp < {p}
+            GROUP BY company_id, camera_id, {hour}
+            {upsert}''', 'ts'),
+        (f'''{insert}
+            SELECT company_id, camera_id, missing_ppe, {hour},
+                   0, 0, 0, 0, 0, 0, COUNT(*), 0, MAX(timestamp)
+            FROM violations
+            WHERE timestamp >= {p} AND timestamp < {p}
+            GROUP BY company_id, camera_id, missing_ppe, {hour}
+            {upsert}''', 'ts'),
+        (f'''{insert}
+            SELECT company_id, COALESCE(camera_id, ''), violation_type, {event_hour},
+                   0, 0, 0, 0, 0, 0, 0, SUM(COALESCE(duration_seconds, 0)), {null_ts}
+            FROM violation_events
+            WHERE end_time IS NOT NULL AND company_id IS NOT NULL
+            AND end_time >= {p} AND end_time < {p}
+            GROUP BY company_id, COALESCE(camera_id, ''), violation_type, {event_hour}
+            {upsert}''', 'epoch'),
+    ]
+
+
+def read_watermark(conn, db_type: str) -> Optional[datetime]:
+    """Compaction'ın ulaştığı saat (bu andan önceki ham satırlar rollup'larda)"""
+    cursor = conn.cursor()
+    cursor.execute(f"SELECT watermark FROM {WATERMARK_TABLE} WHERE name = {_placeholder(db_type)}",
+                   (WATERMARK_NAME,))
+    row = cursor.fetchone()
+    return _parse_ts(_col(row, 0, 'watermark')) if row else None
+
+
+def _first_raw_timestamp(conn) -> Optional[datetime]:
+    """Henüz hiç compaction yapılmadıysa geçmişin başlangıcı"""
+    cursor = conn.cursor()
+    candidates = []
+    for query in ('SELECT MIN(timestamp) AS first FROM detections',
+                  'SELECT MIN(timestamp) AS first FROM violations',
+                  'SELECT MIN(end_time) AS first FROM violation_events'):
+        cursor.execute(query)
+        row = cursor.fetchone()
+        value = _col(row, 0, 'first') if row else None
+        if isinstance(value, (int, float)):
+            value = datetime.fromtimestamp(value)
+        value = _parse_ts(value)
+        if value is not None:
+            candidates.append(value)
+    return min(candidates) if candidates else None
+
+
+def _claim_window(cursor, db_type: str, previous: Optional[datetime], end: datetime) -> bool:
+    """Watermark'ı compare-and-set ile ilerletir; başka bir worker ilerlettiyse False"""
+    p = _placeholder(db_type)
+    if previous is None:
+        cursor.execute(f'''INSERT INTO {WATERMARK_TABLE} (name, watermark) VALUES ({p}, {p})
+                           ON CONFLICT (name) DO NOTHING''', (WATERMARK_NAME, end.strftime(_TS_FORMAT)))
+    else:
+        cursor.execute(f'''UPDATE {WATERMARK_TABLE} SET watermark = {p}, updated_at = CURRENT_TIMESTAMP
+                           WHERE name = {p} AND watermark = {p}''',
+                       (end.strftime(_TS_FORMAT), WATERMARK_NAME, previous.strftime(_TS_FORMAT)))
+    return cursor.rowcount == 1
+
+
+def _rebuild_daily(cursor, db_type: str, start: datetime, end: datetime):
+    """start..end aralığının dokunduğu günleri saatlik rollup'lardan yeniden hesaplar"""
+    p = _placeholder(db_type)
+    first_day, last_day = _floor_day(start), _floor_day(end - timedelta(seconds=1))
+    cursor.execute(f"DELETE FROM {DAILY_TABLE} WHERE bucket >= {p} AND bucket <= {p}",
+                   (first_day.strftime(_DAY_FORMAT), last_day.strftime(_DAY_FORMAT)))
+    day = _bucket_day_expr(db_type)
+    sums = ', '.join(f'SUM({metric})' for metric in METRICS)
+    cursor.execute(f'''
+        INSERT INTO {DAILY_TABLE} ({_rollup_columns()})
+        SELECT company_id, camera_id, ppe_type, {day}, {sums}, MAX(last_at)
+        FROM {HOURLY_TABLE}
+        WHERE bucket >= {p} AND bucket < {p}
+        GROUP BY company_id, camera_id, ppe_type, {day}
+    ''', (first_day.strftime(_TS_FORMAT), (last_day + timedelta(days=1)).strftime(_TS_FORMAT)))
+
+
+def compact(conn, db_type: str, now: Optional[datetime] = None, grace_seconds: float = 300,
+            chunk_hours: int = 24, max_chunks: Optional[int] = None) -> int:
+    """Kapanmış saatleri rollup'lara taşır; compaction yapılan saat sayısını döndürür
+
+    Her parça (en fazla chunk_hours saat) kendi transaction'ında yazılır.
+    """
+    cutoff = _floor_hour((now or datetime.now()) - timedelta(seconds=grace_seconds))
+    statements = _compaction_statements(db_type)
+    hours = 0
+    chunks = 0
+    while max_chunks is None or chunks < max_chunks:
+        previous = read_watermark(conn, db_type)
+        start = previous
+        if start is None:
+            first = _first_raw_timestamp(conn)
+            start = _floor_hour(first) if first is not None else cutoff
+        if start > cutoff or (previous is not None and start == cutoff):
+            break
+        end = min(start + timedelta(hours=chunk_hours), cutoff)
+
+        cursor = conn.cursor()
+        try:
+            if not _claim_window(cursor, db_type, previous, end):
+                conn.rollback()
+                logger.info("ℹ️ Rollup window already compacted by another worker")
+                continue
+            if end > start:
+                for query, param_kind in statements:
+                    if param_kind == 'epoch':
+                        params = (start.timestamp(), end.timestamp())
+                    else:
+                        params = (start.strftime(_TS_FORMAT), end.strftime(_TS_FORMAT))
+                    cursor.execute(query, params)
+                _rebuild_daily(cursor, db_type, start, end)
+            commit(conn)
+        except Exception:
+            try:
+                conn.rollback()
+            except Exception:
+                pass
+            raise
+        hours += int((end - start).total_seconds() // 3600)
+        chunks += 1
+    return hours
+
+
+def _hour_ranges(hours: Iterable[datetime]) -> List[Tuple[datetime, datetime]]:
+    """Saat başlarını bitişik [start, end) aralıklarına birleştirir"""
+    ranges: List[Tuple[datetime, datetime]] = []
+    for hour in sorted(set(hours)):
+        if ranges and ranges[-1][1] == hour:
+            ranges[-1] = (ranges[-1][0], hour + timedelta(hours=1))
+        else:
+            ranges.append((hour, hour + timedelta(hours=1)))
+    return ranges
+
+
+def _restate_ranges(conn, db_type: str, watermark: datetime, ranges: List[Tuple[datetime, datetime]]) -> bool:
+    """Aralıkları tek transaction'da ham tablolardan yeniden hesaplar
+
+    Watermark satırı aynı transaction'da güncellenir: eşzamanlı compaction/restate
+    sıraya girer, watermark bu arada ilerlediyse False döner (hiçbir şey yazılmaz).
+    """
+    p = _placeholder(db_type)
+    statements = _compaction_statements(db_type)
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f'''UPDATE {WATERMARK_TABLE} SET updated_at = CURRENT_TIMESTAMP
+                           WHERE name = {p} AND watermark = {p}''',
+                       (WATERMARK_NAME, watermark.strftime(_TS_FORMAT)))
+        if cursor.rowcount != 1:
+            conn.rollback()
+            return False
+        for start, end in ranges:
+            cursor.execute(f"DELETE FROM {HOURLY_TABLE} WHERE bucket >= {p} AND bucket < {p}",
+                           (start.strftime(_TS_FORMAT), end.strftime(_TS_FORMAT)))
+            for query, param_kind in statements:
+                if param_kind == 'epoch':
+                    params = (start.timestamp(), end.timestamp())
+                else:
+                    params = (start.strftime(_TS_FORMAT), end.strftime(_TS_FORMAT))
+                cursor.execute(query, params)
+            _rebuild_daily(cursor, db_type, start, end)
+        commit(conn)
+    except Exception:
+        try:
+            conn.rollback()
+        except Exception:
+            pass
+        raise
+    return True
+
+
+def restate(conn, db_type: str, hours: int) -> int:
+    """Watermark'tan önceki son hours saati ham tablolardan yeniden hesaplar (güvenlik ağı)
+
+    Watermark bu arada ilerlediyse restate atlanır. Yeniden hesaplanan saat sayısını döndürür.
+    """
+    watermark = read_watermark(conn, db_type)
+    if watermark is None or hours <= 0:
+        return 0
+    if not _restate_ranges(conn, db_type, watermark, [(watermark - timedelta(hours=hours), watermark)]):
+        return 0
+    return hours
+
+
+def restate_hours(conn, db_type: str, hours: Iterable[datetime]) -> int:
+    """Sadece verilen (geç satır alan) saatleri yeniden hesaplar
+
+    Watermark'tan sonraki saatler zaten compaction'a kalır ve atlanır. Yeniden
+    hesaplanan saat sayısını döndürür; watermark bu arada ilerlediyse 0.
+    """
+    watermark = read_watermark(conn, db_type)
+    if watermark is None:
+        return 0
+    closed = {_floor_hour(hour) for hour in hours if _floor_hour(hour) < watermark}
+    if not closed or not _restate_ranges(conn, db_type, watermark, _hour_ranges(closed)):
+        return 0
+    return len(closed)
+
+
+# =============================================================================
+# READ PATH
+# =============================================================================
+
+def _group_expr(db_type: str, segment: str, group: str) -> str:
+    if group == GROUP_CAMERA:
+        return "COALESCE(camera_id, '')" if segment == 'violation_events' else 'camera_id'
+    if group == GROUP_PPE_TYPE:
+        return {
+            SEGMENT_DAILY: 'ppe_type', SEGMENT_HOURLY: 'ppe_type', 'detections': "''",
+            'violations': 'missing_ppe', 'violation_events': 'violation_type',
+        }[segment]
+    if group == GROUP_DAY:
+        if segment == SEGMENT_DAILY:
+            return 'bucket'
+        if segment == SEGMENT_HOURLY:
+            return _bucket_day_expr(db_type)
+        if segment == 'violation_events':
+            if db_type == 'postgresql':
+                return 'CAST(to_timestamp(end_time) AS DATE)'
+            return "date(end_time, 'unixepoch', 'localtime')"
+        return 'DATE(timestamp)'
+    raise ValueError(f"Unknown rollup group: {group}")
+
+
+_RAW_METRICS = {
+    'detections': (
+        'COUNT(*) AS detections, '
+        'SUM(CASE WHEN COALESCE(violations_count, 0) = 0 THEN 1 ELSE 0 END) AS compliant_detections, '
+        'SUM(people_detected) AS people, SUM(ppe_compliant) AS compliant, '
+        'SUM(violations_count) AS violations, SUM(confidence) AS confidence_sum, '
+        'MAX(timestamp) AS last_at'
+    ),
+    'violations': 'COUNT(*) AS violation_count, MAX(timestamp) AS last_at',
+    'violation_events': 'SUM(duration_seconds) AS duration_seconds',
+}
+
+
+def _segment_queries(db_type: str, source: str, kind: str, start: Optional[datetime],
+                     end: Optional[datetime]) -> List[Tuple[str, str, List[str], list]]:
+    """(segment, tablo, WHERE koşulları, parametreler) listesi"""
+    p = _placeholder(db_type)
+    queries = []
+    if kind in (SEGMENT_HOURLY, SEGMENT_DAILY):
+        table = HOURLY_TABLE if kind == SEGMENT_HOURLY else DAILY_TABLE
+        fmt = _TS_FORMAT if kind == SEGMENT_HOURLY else _DAY_FORMAT
+        where, params = ["ppe_type = ''" if source == SOURCE_DETECTIONS else "ppe_type <> ''"], []
+        if start is not None:
+            where.append(f'bucket >= {p}')
+            params.append(start.strftime(fmt))
+        if end is not None:
+            where.append(f'bucket < {p}')
+            params.append(end.strftime(fmt))
+        queries.append((kind, table, where, params))
+        return queries
+
+    raw_tables = ('detections',) if source == SOURCE_DETECTIONS else ('violations', 'violation_events')
+    for table in raw_tables:
+        if table == 'violation_events':
+            where, params = ['end_time IS NOT NULL'], []
+            if start is not None:
+                where.append(f'end_time >= {p}')
+                params.append(start.timestamp())
+            if end is not None:
+                where.append(f'end_time < {p}')
+                params.append(end.timestamp())
+        else:
+            where, params = [], []
+            if start is not None:
+                where.append(f'timestamp >= {p}')
+                params.append(start.strftime(_TS_FORMAT))
+            if end is not None:
+                where.append(f'timestamp < {p}')
+                params.append(end.strftime(_TS_FORMAT))
+        queries.append((table, table, where, params))
+    return queries
+
+
+def _empty_entry() -> Dict[str, Any]:
+    entry: Dict[str, Any] = {metric: 0 for metric in METRICS}
+    entry['confidence_sum'] = 0.0
+    entry['last_at'] = None
+    return entry
+
+
+def summarize(conn, db_type: str, company_id: str, source: str = SOURCE_DETECTIONS,
+              group_by: Sequence[str] = (), since: Optional[datetime] = None) -> Dict[Tuple, Dict[str, Any]]:
+    """company_id için since'ten bu yana metrikler, group_by anahtarlarına göre
+
+    Dönüş: {(grup değerleri...): {detections, compliant_detections, people, compliant,
+    violations, confidence_sum, violation_count, duration_seconds, last_at}}
+    Rollup tabloları yoksa (migration uygulanmamış) tamamen ham tablolardan okunur.
+    """
+    group_by = tuple(group_by)
+    try:
+        watermark = read_watermark(conn, db_type)
+    except Exception as e:
+        logger.debug(f"Rollup watermark unavailable, reading raw tables: {e}")
+        try:
+            conn.rollback()
+        except Exception:
+            pass
+        watermark = None
+
+    p = _placeholder(db_type)
+    results: Dict[Tuple, Dict[str, Any]] = {}
+    cursor = conn.cursor()
+    for kind, start, end in plan_segments(since, watermark):
+        for segment, table, where, params in _segment_queries(db_type, source, kind, start, end):
+            groups = [_group_expr(db_type, segment, group) for group in group_by]
+            if segment in (SEGMENT_HOURLY, SEGMENT_DAILY):
+                metrics = ', '.join([f'SUM({metric}) AS {metric}' for metric in METRICS] + ['MAX(last_at) AS last_at'])
+            else:
+                metrics = _RAW_METRICS[segment]
+            select = ', '.join([f'{expr} AS g{i}' for i, expr in enumerate(groups)] + [metrics])
+            query = f"SELECT {select} FROM {table} WHERE {' AND '.join([f'company_id = {p}'] + where)}"
+            if groups:
+                query += f" GROUP BY {', '.join(groups)}"
+            cursor.execute(query, [company_id] + params)
+            names = [f'g{i}' for i in range(len(groups))] + [d[0] for d in cursor.description[len(groups):]]
+            for row in cursor.fetchall():
+                values = {name: _col(row, i, name) for i, name in enumerate(names)}
+                key = tuple(
+                    str(values[f'g{i}'])[:10] if group == GROUP_DAY and values[f'g{i}'] is not None
+                    else values[f'g{i}']
+                    for i, group in enumerate(group_by)
+                )
+                entry = results.setdefault(key, _empty_entry())
+                for metric in METRICS:
+                    value = values.get(metric)
+                    if value:
+                        entry[metric] += float(value) if metric == 'confidence_sum' else int(value)
+                last_at = values.get('last_at')
+                if last_at is not None and (entry['last_at'] is None or str(last_at) > str(entry['last_at'])):
+                    entry['last_at'] = last_at
+    return results
+
+
+# =============================================================================
+# BACKGROUND COMPACTOR
+# =============================================================================
+
+def _default_connection_provider():
+    """Global database adapter'dan (bağlantı al, bağlantı bırak, db_type) - SQLite'ta tek yazıcı bağlantısı"""
+    from src.smartsafe.database.database_adapter import get_db_adapter
+    adapter = get_db_adapter()
+    return adapter.get_write_connection, adapter.release_write_connection, adapter.db_type
+
+
+class RollupCompactor:
+    """Kapanmış saatleri periyodik olarak rollup tablolarına taşıyan arka plan thread'i"""
+
+    def __init__(self, interval_seconds: float = 300, grace_seconds: float = 300, chunk_hours: int = 24,
+                 restate_hours: int = 6, sweep_interval_seconds: float = 3600,
+                 connection_provider: Optional[Callable[[], Tuple[Callable, Callable, str]]] = None,
+                 clock: Callable[[], datetime] = datetime.now):
+        self.interval_seconds = interval_seconds
+        self.grace_seconds = grace_seconds
+        self.chunk_hours = chunk_hours
+        self.restate_hours = restate_hours
+        self.sweep_interval_seconds = sweep_interval_seconds
+        self.connection_provider = connection_provider or _default_connection_provider
+        self.clock = clock
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._run_lock = threading.Lock()
+        self._late_lock = threading.Lock()
+        self._late_hours: Set[datetime] = set()  # Compaction'dan sonra satır alan saatler
+        self._last_sweep: Optional[float] = None
+
+        # İstatistikler
+        self.runs = 0
+        self.errors = 0
+        self.hours_compacted = 0
+        self.hours_restated = 0
+        self.sweeps = 0
+        self.last_run_ms = 0.0
+        self.watermark: Optional[datetime] = None
+
+    def note_rows(self, timestamps: Iterable[Any]):
+        """Yazılan ham satır zamanları; compaction için kapanmış saate düşenler restate edilecek"""
+        cutoff = _floor_hour(self.clock() - timedelta(seconds=self.grace_seconds))
+        hours = set()
+        for value in timestamps:
+            ts = _parse_ts(value)
+            if ts is not None and ts < cutoff:
+                hours.add(_floor_hour(ts))
+        if hours:
+            with self._late_lock:
+                self._late_hours.update(hours)
+
+    def _take_late_hours(self) -> Set[datetime]:
+        with self._late_lock:
+            hours, self._late_hours = self._late_hours, set()
+        return hours
+
+    def _restate(self, conn, db_type: str):
+        """Geç satır alan saatler; sweep zamanı geldiyse son restate_hours saatin tamamı"""
+        late_hours = self._take_late_hours()
+        try:
+            now = time.monotonic()
+            if self._last_sweep is None or now - self._last_sweep >= self.sweep_interval_seconds:
+                self.hours_restated += restate(conn, db_type, self.restate_hours)
+                self._last_sweep = now
+                self.sweeps += 1
+                if self.watermark is not None:
+                    swept_from = self.watermark - timedelta(hours=self.restate_hours)
+                    late_hours = {hour for hour in late_hours if hour < swept_from}
+            if late_hours:
+                restated = restate_hours(conn, db_type, late_hours)
+                if not restated and self.watermark is not None and min(late_hours) < self.watermark:
+                    raise RuntimeError("rollup watermark moved during restate")
+                self.hours_restated += restated
+        except Exception:
+            with self._late_lock:
+                self._late_hours.update(late_hours)
+            raise
+
+    def run_once(self) -> int:
+        """Yakalanana kadar parça parça compaction, ardından geç satır alan saatler için restate;
+        her parça arasında yazıcı bağlantısı bırakılır"""
+        with self._run_lock:
+            started = time.perf_counter()
+            total = 0
+            try:
+                get_connection, release, db_type = self.connection_provider()
+                while True:
+                    conn = get_connection()
+                    if conn is None:
+                        raise RuntimeError("database connection unavailable")
+                    try:
+                        hours = compact(conn, db_type, now=self.clock(), grace_seconds=self.grace_seconds,
+                                        chunk_hours=self.chunk_hours, max_chunks=1)
+                        self.watermark = read_watermark(conn, db_type)
+                    finally:
+                        release(conn)
+                    if not hours:
+                        break
+                    total += hours
+                conn = get_connection()
+                if conn is None:
+                    raise RuntimeError("database connection unavailable")
+                try:
+                    self._restate(conn, db_type)
+                finally:
+                    release(conn)
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"❌ Rollup compaction failed: {e}")
+            self.runs += 1
+            self.hours_compacted += total
+            self.last_run_ms = round((time.perf_counter() - started) * 1000, 2)
+            if total:
+                logger.info(f"📊 Rollup compaction: {total} hours in {self.last_run_ms}ms (watermark {self.watermark})")
+            return total
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.run_once()
+            self._stop.wait(self.interval_seconds)
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='rollup-compactor', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        if self._thread is not None and self._thread.is_alive():
+            self._thread.join(timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        lag = (self.clock() - self.watermark).total_seconds() if self.watermark else None
+        return {
+            'runs': self.runs,
+            'errors': self.errors,
+            'hours_compacted': self.hours_compacted,
+            'hours_restated': self.hours_restated,
+            'sweeps': self.sweeps,
+            'late_hours_pending': len(self._late_hours),
+            'last_run_ms': self.last_run_ms,
+            'watermark': self.watermark.strftime(_TS_FORMAT) if self.watermark else None,
+            'lag_seconds': round(lag, 1) if lag is not None else None,
+        }
+
+
+# Global compactor
+_rollup_compactor = None
+
+
+def get_rollup_compactor() -> RollupCompactor:
+    """Global rollup compactor instance'ını döndürür"""
+    global _rollup_compactor
+    if _rollup_compactor is None:
+        _rollup_compactor = RollupCompactor(
+            interval_seconds=float(os.getenv('SMARTSAFE_ROLLUP_INTERVAL', '300')),
+            grace_seconds=float(os.getenv('SMARTSAFE_ROLLUP_GRACE', '300')),
+            chunk_hours=int(os.getenv('SMARTSAFE_ROLLUP_CHUNK_HOURS', '24')),
+            restate_hours=int(os.getenv('SMARTSAFE_ROLLUP_RESTATE_HOURS', '6')),
+            sweep_interval_seconds=float(os.getenv('SMARTSAFE_ROLLUP_SWEEP_INTERVAL', '3600')),
+        )
+    return _rollup_compactor
+
+
+def note_late_rows(timestamps: Iterable[Any]):
+    """Write-behind'ın yazdığı ham satır zamanlarını global compactor'a bildirir (compactor yoksa no-op)"""
+    if _rollup_compactor is not None:
+        _rollup_compactor.note_rows(timestamps)
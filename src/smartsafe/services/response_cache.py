@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+SmartSafe AI - Response Cache
+Dashboard API yanıtları (stats, chart-data, sektörler, abonelik) için süreç içi,
+sınırlı LRU/TTL cache
+
+- Kayıt sayısı ve yaklaşık bellek (JSON boyutu) sınırı; aşılınca en az
+  kullanılan kayıt düşer. Süresi dolan kayıt erişimde düşer, ayrı temizlik
+  thread'i yok
+- Kayıt başına TTL (endpoint kendi tazelik ihtiyacını verir)
+- Şirket (namespace) başına kayıtlar: invalidate(company_id) sadece o şirketi
+  düşürür; nesil sayacı sayesinde hesaplama sürerken gelen invalidation'dan
+  sonra eski sonuç cache'e yazılmaz
+- Single-flight: aynı anahtar için eşzamanlı miss'lerde sadece bir istek
+  hesaplar, diğerleri onun sonucunu (veya hatasını) bekler
+"""
+
+import json
+import os
+import threading
+import time
+import logging
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from src.smartsafe.services.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+GLOBAL_NAMESPACE = '_global'
+
+KEY_STATS = 'stats'
+KEY_CHART_DATA = 'chart_data'
+KEY_SECTORS = 'sectors'
+KEY_SUBSCRIPTION = 'subscription'
+
+# Anahtar başına varsayılan TTL (saniye); listede olmayanlar default_ttl kullanır
+DEFAULT_TTLS = {
+    KEY_STATS: 15.0,
+    KEY_CHART_DATA: 60.0,
+    KEY_SECTORS: 3600.0,
+    KEY_SUBSCRIPTION: 30.0,
+}
+
+
+class _Flight:
+    """Sürmekte olan tek hesaplama; bekleyenler event ile uyanır"""
+    __slots__ = ('event', 'value', 'error')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error: Optional[BaseException] = None
+
+
+def _size_of(value: Any) -> int:
+    try:
+        return len(json.dumps(value, default=str))
+    except (TypeError, ValueError):
+        return 1024
+
+
+class ResponseCache:
+    """(namespace, anahtar) -> yanıt; TTLCache üzerinde anahtar başına TTL ve single-flight"""
+
+    def __init__(self, max_entries: int = 10000, max_bytes: int = 64 * 1024 * 1024, default_ttl: float = 300.0,
+                 ttls: Optional[Dict[str, float]] = None, wait_timeout: float = 30.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self.ttls = dict(DEFAULT_TTLS, **(ttls or {}))
+        self.wait_timeout = wait_timeout
+        self._store = TTLCache(max_entries=max_entries, max_bytes=max_bytes, sizer=_size_of, clock=clock)
+        self._flights: Dict[Tuple[str, str], _Flight] = {}
+        self._lock = threading.Lock()
+
+        # İstatistikler
+        self.coalesced = 0
+
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        """Taze kayıt varsa değeri, yoksa None"""
+        return self._store.get(namespace, key)
+
+    def put(self, namespace: str, key: str, value: Any, ttl: Optional[float] = None,
+            generation: Optional[int] = None) -> bool:
+        """Hesaplama sürerken invalidate edildiyse veya yanıt çok büyükse yazılmaz (False)"""
+        if ttl is None:
+            ttl = self.ttls.get(key, self.default_ttl)
+        return self._store.put(namespace, key, value, ttl, generation=generation)
+
+    def get_or_compute(self, namespace: str, key: str, compute: Callable[[], Any], ttl: Optional[float] = None,
+                       cache_if: Callable[[Any], bool] = lambda value: value is not None) -> Any:
+        """Cache'ten döner; miss'te anahtar başına tek compute() çalışır, eşzamanlı istekler sonucu bekler"""
+        value = self.get(namespace, key)
+        if value is not None:
+            return value
+
+        cache_key = (namespace, key)
+        with self._lock:
+            flight = self._flights.get(cache_key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[cache_key] = _Flight()
+                generation = self._store.generation(namespace)
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            if flight.event.wait(self.wait_timeout):
+                if flight.error is not None:
+                    raise flight.error
+                return flight.value
+            logger.warning(f"⚠️ Response cache wait timed out, computing {namespace}/{key} directly")
+            return compute()
+
+        try:
+            flight.value = compute()
+            if cache_if(flight.value):
+                self.put(namespace, key, flight.value, ttl=ttl, generation=generation)
+            return flight.value
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(cache_key, None)
+            flight.event.set()
+
+    def invalidate(self, namespace: str, key: Optional[str] = None):
+        """Namespace'in (şirketin) kayıtlarını düşürür; key verilirse sadece o kayıt"""
+        self._store.invalidate(namespace, (lambda cached_key, _: cached_key == key) if key is not None else None)
+        logger.debug(f"🔄 Response cache invalidated: {namespace} {key or 'all'}")
+
+    def clear(self):
+        self._store.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        stats = self._store.stats()
+        return dict(stats, **{
+            'namespaces': self._store.namespaces(),
+            'bytes': self._store.bytes,
+            'max_entries': self.max_entries,
+            'max_bytes': self.max_bytes,
+            'coalesced': self.coalesced,
+            'oversized': self._store.oversized,
+            'in_flight': len(self._flights),
+        })
+
+
+# Global cache
+_response_cache = None
+
+
+def get_response_cache() -> ResponseCache:
+    """Global response cache instance'ını döndürür"""
+    global _response_cache
+    if _response_cache is None:
+        _response_cache = ResponseCache(
+            max_entries=int(os.getenv('SMARTSAFE_RESPONSE_CACHE_MAX_ENTRIES', '10000')),
+            max_bytes=int(float(os.getenv('SMARTSAFE_RESPONSE_CACHE_MAX_MB', '64')) * 1024 * 1024),
+            default_ttl=float(os.getenv('SMARTSAFE_RESPONSE_CACHE_TTL', '300')),
+        )
+    return _response_cache
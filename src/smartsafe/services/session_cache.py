@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+SmartSafe AI - Session Validation Cache
+Doğrulanmış oturum -> kullanıcı bağlamı için süreç içi, sınırlı TTL/LRU cache
+
+- validate_session neredeyse her route'un (MJPEG başlangıcı, polling) başında
+  çağrılır; tekrar eden istekler sessions/users/companies JOIN'i yerine
+  cache'ten mikrosaniyede döner
+- Sadece başarılı doğrulamalar cache'lenir; kayıt en fazla ttl saniye yaşar
+  (oturum süresinin dolması en fazla ttl kadar gecikmeli fark edilir)
+- Çıkış, kullanıcı silme/devre dışı bırakma, şifre değişikliği ve şirket
+  silme/güncellemede açıkça invalidate edilir
+- Nesil sayacı: DB sorgusu sürerken gelen invalidation'dan sonra eski sonuç
+  cache'e yazılmaz
+"""
+
+import os
+import time
+import logging
+from typing import Any, Callable, Dict, Optional
+
+from src.smartsafe.services.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+_NAMESPACE = 'sessions'
+
+
+class SessionCache:
+    """session_id -> kullanıcı bağlamı; TTLCache üzerinde tek namespace"""
+
+    def __init__(self, ttl_seconds: float = 45.0, max_entries: int = 10000,
+                 clock: Callable[[], float] = time.monotonic):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._store = TTLCache(max_entries=max_entries, clock=clock)
+
+    @property
+    def generation(self) -> int:
+        """DB sorgusundan önce okunur, put(..., generation=) ile geri verilir"""
+        return self._store.generation(_NAMESPACE)
+
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        context = self._store.get(_NAMESPACE, session_id)
+        # Çağıran sonucu değiştirirse cache bozulmasın
+        return dict(context) if context is not None else None
+
+    def put(self, session_id: str, context: Dict[str, Any], generation: Optional[int] = None):
+        self._store.put(_NAMESPACE, session_id, dict(context), self.ttl_seconds, generation=generation)
+
+    def _invalidate(self, match: Callable[[str, Dict[str, Any]], bool]) -> int:
+        return self._store.invalidate(_NAMESPACE, match)
+
+    def invalidate_session(self, session_id: str) -> int:
+        """Çıkış"""
+        return self._invalidate(lambda key, _: key == session_id)
+
+    def invalidate_user(self, user_id: str) -> int:
+        """Kullanıcı silme / devre dışı bırakma"""
+        return self._invalidate(lambda _, context: context.get('user_id') == user_id)
+
+    def invalidate_company(self, company_id: str) -> int:
+        """Şirket silme, şirket geneli şifre değişikliği, profil güncellemesi"""
+        return self._invalidate(lambda _, context: context.get('company_id') == company_id)
+
+    def clear(self):
+        self._store.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        stats = self._store.stats()
+        return {
+            'size': stats['entries'],
+            'max_entries': self.max_entries,
+            'ttl_seconds': self.ttl_seconds,
+            'hits': stats['hits'],
+            'misses': stats['misses'],
+            'hit_ratio': stats['hit_ratio'],
+            'evictions': stats['evictions'],
+            'invalidations': stats['invalidations'],
+        }
+
+
+# Global cache
+_session_cache = None
+
+
+def get_session_cache() -> SessionCache:
+    """Global session cache instance'ını döndürür"""
+    global _session_cache
+    if _session_cache is None:
+        _session_cache = SessionCache(
+            ttl_seconds=float(os.getenv('SMARTSAFE_SESSION_CACHE_TTL', '45')),
+            max_entries=int(os.getenv('SMARTSAFE_SESSION_CACHE_SIZE', '10000')),
+        )
+    return _session_cache
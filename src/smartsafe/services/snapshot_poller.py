@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+"""
+SmartSafe AI - Async Snapshot Poller
+IP-webcam tarzı (/shot.jpg) kameralar için tek event-loop thread'inde çalışan poller
+
+- Host başına keep-alive bağlantı havuzu (her frame'de yeni TCP bağlantısı yok)
+- Fallback URL'ler paralel denenir, çalışan URL hatırlanır
+- Kamera başına hız kontrolü, timeout ve hata durumunda backoff
+- JPEG decode küçük bir thread pool'da yapılır, frame'ler kameranın frame ring'ine yazılır
+"""
+
+import asyncio
+import threading
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Any, Callable, Tuple
+from urllib.parse import urlsplit
+
+# aiohttp opsiyonel - yoksa çağıran taraf thread tabanlı polling'e düşer
+try:
+    import aiohttp
+    AIOHTTP_AVAILABLE = True
+except ImportError:
+    aiohttp = None
+    AIOHTTP_AVAILABLE = False
+
+from src.smartsafe.services.frame_ring import get_frame_ring_registry
+
+logger = logging.getLogger(__name__)
+
+MAX_SNAPSHOT_BYTES = 8 * 1024 * 1024  # 8 MB üstü snapshot kabul edilmez
+MIN_SNAPSHOT_BYTES = 100
+
+
+def _decode_jpeg(body: bytes):
+    """JPEG/PNG byte'larını BGR frame'e çevirir (decode thread pool'unda çalışır)"""
+    import cv2
+    import numpy as np
+    arr = np.frombuffer(body, np.uint8)
+    return cv2.imdecode(arr, cv2.IMREAD_COLOR)
+
+
+class _CameraState:
+    """Poll edilen bir kameranın durumu"""
+
+    def __init__(self, camera_key: str, urls: List[str], auth: Optional[Tuple[str, str]],
+                 interval: float, timeout: float, is_active: Optional[Callable[[], bool]]):
+        self.camera_key = camera_key
+        self.urls = list(urls)
+        self.auth = auth
+        self.interval = interval
+        self.timeout = timeout
+        self.is_active = is_active
+        self.subscribers = 1
+        self.future = None
+        self.working_url: Optional[str] = None
+        self.frames = 0
+        self.errors = 0
+        self.consecutive_failures = 0
+        self.last_frame_time = 0.0
+        self.started_at = time.time()
+
+
+class SnapshotPoller:
+    """Yüzlerce snapshot kamerasını tek asyncio event loop thread'inde poll eder"""
+
+    def __init__(self, decode_workers: int = 4, connections_per_host: int = 4,
+                 reprobe_after_failures: int = 10, max_backoff: float = 5.0,
+                 decoder: Callable = _decode_jpeg):
+        self.connections_per_host = connections_per_host
+        self.reprobe_after_failures = reprobe_after_failures
+        self.max_backoff = max_backoff
+        self._decoder = decoder
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._decode_pool = ThreadPoolExecutor(max_workers=decode_workers, thread_name_prefix='snapshot-decode')
+        self._sessions: Dict[str, Any] = {}  # host -> aiohttp.ClientSession (sadece loop thread'inden erişilir)
+        self._cameras: Dict[str, _CameraState] = {}
+        self._working_urls: Dict[Tuple[str, ...], str] = {}  # URL listesi -> çalışan URL
+
+    @property
+    def available(self) -> bool:
+        return AIOHTTP_AVAILABLE
+
+    # --- Event loop yönetimi ---
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None or not self._thread or not self._thread.is_alive():
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._run_loop, args=(self._loop,),
+                                                name='snapshot-poller', daemon=True)
+                self._thread.start()
+                logger.info("🚀 Snapshot poller event loop başlatıldı")
+            return self._loop
+
+    @staticmethod
+    def _run_loop(loop: asyncio.AbstractEventLoop):
+        asyncio.set_event_loop(loop)
+        loop.run_forever()
+
+    def shutdown(self, timeout: float = 5.0):
+        """Tüm kameraları durdurur, HTTP oturumlarını kapatır"""
+        with self._lock:
+            loop = self._loop
+            states = list(self._cameras.values())
+            self._cameras.clear()
+        for state in states:
+            if state.future:
+                state.future.cancel()
+        if loop is not None and loop.is_running():
+            try:
+                asyncio.run_coroutine_threadsafe(self._close_sessions(), loop).result(timeout)
+            except Exception as e:
+                logger.debug(f"Snapshot poller session close error: {e}")
+            loop.call_soon_threadsafe(loop.stop)
+        self._decode_pool.shutdown(wait=False)
+
+    async def _close_sessions(self):
+        sessions = list(self._sessions.values())
+        self._sessions.clear()
+        for session in sessions:
+            await session.close()
+
+    # --- Public API ---
+    def subscribe(self, camera_key: str, urls: List[str], auth: Optional[Tuple[str, str]] = None,
+                  interval: float = 0.25, timeout: float = 3.0,
+                  is_active: Optional[Callable[[], bool]] = None) -> bool:
+        """Kamerayı polling'e ekler; aynı kamera zaten poll ediliyorsa abone sayısını artırır.
+
+        Frame'ler get_frame_ring_registry().get(camera_key) üzerinden okunur.
+        aiohttp yüklü değilse False döner.
+        """
+        if not AIOHTTP_AVAILABLE:
+            return False
+        if not urls:
+            return False
+
+        loop = self._ensure_loop()
+        with self._lock:
+            state = self._cameras.get(camera_key)
+            if state is not None:
+                state.subscribers += 1
+                return True
+            state = _CameraState(camera_key, urls, auth, interval, timeout, is_active)
+            self._cameras[camera_key] = state
+            state.future = asyncio.run_coroutine_threadsafe(self._poll_camera(state), loop)
+        logger.info(f"📸 Snapshot polling eklendi: {camera_key} ({len(urls)} URL adayı)")
+        return True
+
+    def unsubscribe(self, camera_key: str):
+        """Abone sayısını azaltır; son abone çıktığında kamera polling'i durur"""
+        with self._lock:
+            state = self._cameras.get(camera_key)
+            if state is None:
+                return
+            state.subscribers -= 1
+            if state.subscribers > 0:
+                return
+            del self._cameras[camera_key]
+        if state.future:
+            state.future.cancel()
+
+    def is_polling(self, camera_key: str) -> bool:
+        return camera_key in self._cameras
+
+    def get_working_url(self, camera_key: str) -> Optional[str]:
+        state = self._cameras.get(camera_key)
+        return state.working_url if state else None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            states = list(self._cameras.values())
+        now = time.time()
+        cameras = {}
+        for state in states:
+            elapsed = max(now - state.started_at, 1e-6)
+            cameras[state.camera_key] = {
+                'working_url': state.working_url.split('@')[-1] if state.working_url else None,
+                'subscribers': state.subscribers,
+                'frames': state.frames,
+                'errors': state.errors,
+                'fps': round(state.frames / elapsed, 2),
+                'last_frame_age': round(now - state.last_frame_time, 2) if state.last_frame_time else None,
+            }
+        return {
+            'available': AIOHTTP_AVAILABLE,
+            'cameras': cameras,
+            'hosts': len(self._sessions),
+        }
+
+    # --- HTTP ---
+    def _session_for(self, url: str):
+        """Host başına keep-alive bağlantı havuzu"""
+        parts = urlsplit(url)
+        host_key = f"{parts.scheme}://{parts.hostname}:{parts.port or ''}"
+        session = self._sessions.get(host_key)
+        if session is None or session.closed:
+            connector = aiohttp.TCPConnector(limit_per_host=self.connections_per_host,
+                                             keepalive_timeout=60, ttl_dns_cache=300)
+            session = aiohttp.ClientSession(connector=connector)
+            self._sessions[host_key] = session
+        return session
+
+    async def _fetch(self, url: str, auth: Optional[Tuple[str, str]], timeout: float) -> Optional[bytes]:
+        """Tek snapshot indirir; MJPEG stream veya hatalı yanıtlar için None döner"""
+        session = self._session_for(url)
+        # URL'de kimlik varsa (user:pass@host) ayrıca auth gönderme
+        basic_auth = aiohttp.BasicAuth(*auth) if (auth and '@' not in url) else None
+        async with session.get(url, auth=basic_auth, timeout=aiohttp.ClientTimeout(total=timeout)) as resp:
+            if resp.status != 200:
+                return None
+            content_type = resp.headers.get('Content-Type', '')
+            if content_type.startswith('multipart/'):
+                return None  # /video gibi sürekli MJPEG stream - snapshot değil
+            if resp.content_length and resp.content_length > MAX_SNAPSHOT_BYTES:
+                return None
+            body = await resp.content.read(MAX_SNAPSHOT_BYTES + 1)
+            if len(body) < MIN_SNAPSHOT_BYTES or len(body) > MAX_SNAPSHOT_BYTES:
+                return None
+            return body
+
+    async def _try_fetch(self, url: str, state: _CameraState) -> Optional[bytes]:
+        try:
+            return await self._fetch(url, state.auth, state.timeout)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.debug(f"Snapshot fetch hatası {url.split('@')[-1]}: {e}")
+            return None
+
+    async def _probe(self, state: _CameraState) -> Tuple[Optional[str], Optional[bytes]]:
+        """Önce hatırlanan URL'yi, sonra tüm adayları paralel dener; ilk geçerli yanıt kazanır"""
+        url_key = tuple(state.urls)
+        remembered = self._working_urls.get(url_key)
+        if remembered:
+            body = await self._try_fetch(remembered, state)
+            if body:
+                return remembered, body
+
+        tasks = {asyncio.ensure_future(self._try_fetch(url, state)): url for url in state.urls}
+        pending = set(tasks)
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    body = task.result()
+                    if body:
+                        url = tasks[task]
+                        self._working_urls[url_key] = url
+                        return url, body
+            return None, None
+        finally:
+            for task in pending:
+                task.cancel()
+
+    # --- Polling ---
+    async def _poll_camera(self, state: _CameraState):
+        loop = asyncio.get_running_loop()
+        registry = get_frame_ring_registry()
+        ring = registry.get_or_create(state.camera_key)
+        try:
+            while state.is_active is None or state.is_active():
+                started = time.monotonic()
+                body = None
+
+                if state.working_url is None:
+                    state.working_url, body = await self._probe(state)
+                    if state.working_url:
+                        logger.info(f"✅ Snapshot URL kullanılıyor: {state.camera_key} -> {state.working_url.split('@')[-1]}")
+                else:
+                    body = await self._try_fetch(state.working_url, state)
+
+                frame = None
+                if body:
+                    try:
+                        frame = await loop.run_in_executor(self._decode_pool, self._decoder, body)
+                    except Exception as e:
+                        logger.debug(f"Snapshot decode hatası {state.camera_key}: {e}")
+
+                if frame is not None:
+                    # Decode çıktısı yeni bir array - kopyalamadan ring'e ver
+                    ring.publish(frame)
+                    state.frames += 1
+                    state.last_frame_time = time.time()
+                    state.consecutive_failures = 0
+                    delay = state.interval - (time.monotonic() - started)
+                else:
+                    state.errors += 1
+                    state.consecutive_failures += 1
+                    if state.consecutive_failures >= self.reprobe_after_failures and state.working_url:
+                        logger.warning(f"⚠️ Snapshot URL yanıt vermiyor, yeniden keşif: {state.camera_key}")
+                        self._working_urls.pop(tuple(state.urls), None)
+                        state.working_url = None
+                        state.consecutive_failures = 0
+                    # Hata durumunda üstel backoff
+                    delay = min(self.max_backoff, state.interval * (2 ** min(state.consecutive_failures, 6)))
+
+                if delay > 0:
+                    await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.error(f"❌ Snapshot polling hatası {state.camera_key}: {e}")
+        finally:
+            with self._lock:
+                if self._cameras.get(state.camera_key) is state:
+                    del self._cameras[state.camera_key]
+            registry.remove(state.camera_key, ring)
+            logger.info(f"🛑 Snapshot polling durduruldu: {state.camera_key}")
+
+
+# Global poller instance
+_snapshot_poller = None
+
+
+def get_snapshot_poller() -> SnapshotPoller:
+    """Global snapshot poller instance'ını döndürür"""
+    global _snapshot_poller
+    if _snapshot_poller is None:
+        _snapshot_poller = SnapshotPoller()
+    return _snapshot_poller
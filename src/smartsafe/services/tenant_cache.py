@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+SmartSafe AI - Tenant Config Cache
+Şirket bilgisi, abonelik, demo durumu ve PPE konfigürasyonu için süreç içi cache
+
+- (company_id, tür) başına kayıt; her türün kendi TTL'i vardır
+- Şirket başına sürüm damgası (version): settings / ppe-config / profil / abonelik
+  yazmaları invalidate() ile sürümü artırır, eski sürümle yüklenen değer cache'e
+  yazılmaz ve detection tarafı snapshot değişimini ucuzca fark eder
+- Detection yolları TenantSnapshot alır: sektör + zorunlu/opsiyonel PPE +
+  compliance ayarları; değişmez (frozen) nesne, frame başına sadece dict
+  araması - konfigürasyon için frame başına DB sorgusu yok
+- Snapshot yüklemesi hata verirse son başarılı snapshot kullanılmaya devam eder;
+  varsayılan (boş) snapshot'a sadece hiç yüklenememiş şirkette düşülür ve o
+  varsayılan cache'e yazılmaz (DB düzelince ilk çağrıda gerçek konfig gelir)
+"""
+
+import json
+import os
+import time
+import logging
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from src.smartsafe.services.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+KIND_COMPANY_INFO = 'company_info'
+KIND_SUBSCRIPTION = 'subscription'
+KIND_DEMO_STATUS = 'demo_status'
+KIND_SNAPSHOT = 'snapshot'
+
+DEFAULT_TTLS = {
+    KIND_COMPANY_INFO: 60.0,
+    KIND_SUBSCRIPTION: 30.0,
+    KIND_DEMO_STATUS: 30.0,
+    KIND_SNAPSHOT: 30.0,
+}
+
+
+@dataclass(frozen=True)
+class TenantSnapshot:
+    """Detection yolunun ihtiyaç duyduğu şirket konfigürasyonu"""
+    company_id: str
+    version: int
+    found: bool = False
+    sector: Optional[str] = None
+    # None => konfig yok (eski varsayılan davranış), () => hiçbir PPE zorunlu değil
+    required_ppe: Optional[Tuple[str, ...]] = None
+    optional_ppe: Tuple[str, ...] = ()
+    confidence_threshold: Optional[float] = None
+    detection_interval: Optional[int] = None
+
+
+def _json_value(value: Any) -> Any:
+    if isinstance(value, str):
+        try:
+            return json.loads(value)
+        except ValueError:
+            return None
+    return value
+
+
+def _ppe_names(items: Any) -> Tuple[str, ...]:
+    if not isinstance(items, list):
+        return ()
+    return tuple(str(item).strip().lower() for item in items if item is not None)
+
+
+def build_snapshot(company_id: str, version: int, row: Optional[Dict[str, Any]]) -> TenantSnapshot:
+    """companies satırından (sector, required_ppe, ppe_requirements, compliance_settings) snapshot"""
+    if not row:
+        return TenantSnapshot(company_id, version)
+
+    required, optional = None, ()
+    for column in ('required_ppe', 'ppe_requirements'):
+        config = _json_value(row.get(column))
+        if isinstance(config, dict) and 'required' in config:
+            required, optional = _ppe_names(config.get('required')), _ppe_names(config.get('optional'))
+            break
+        if isinstance(config, list):
+            required = _ppe_names(config)
+            break
+
+    settings = _json_value(row.get('compliance_settings'))
+    settings = settings if isinstance(settings, dict) else {}
+    try:
+        confidence = float(settings['confidence_threshold']) if 'confidence_threshold' in settings else None
+        interval = int(settings['detection_interval']) if 'detection_interval' in settings else None
+    except (TypeError, ValueError):
+        confidence, interval = None, None
+
+    return TenantSnapshot(company_id, version, found=True, sector=row.get('sector') or None,
+                          required_ppe=required, optional_ppe=optional,
+                          confidence_threshold=confidence, detection_interval=interval)
+
+
+def _load_snapshot_row(company_id: str) -> Optional[Dict[str, Any]]:
+    """Global database adapter'dan snapshot kolonları"""
+    from src.smartsafe.database.database_adapter import get_db_adapter
+    adapter = get_db_adapter()
+    placeholder = '%s' if adapter.db_type == 'postgresql' else '?'
+    return adapter.execute_query(
+        f'''SELECT sector, required_ppe, ppe_requirements, compliance_settings
+            FROM companies WHERE company_id = {placeholder}''',
+        (company_id,), fetch_all=False)
+
+
+class TenantConfigCache:
+    """(company_id, tür) -> değer; tür başına TTL, şirket başına sürüm (TTLCache nesli)"""
+
+    def __init__(self, ttls: Optional[Dict[str, float]] = None,
+                 snapshot_loader: Callable[[str], Optional[Dict[str, Any]]] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.ttls = dict(DEFAULT_TTLS, **(ttls or {}))
+        self.snapshot_loader = snapshot_loader or _load_snapshot_row
+        self._store = TTLCache(clock=clock)
+        self._last_snapshots: Dict[str, TenantSnapshot] = {}  # Son başarılı yükleme (TTL/sürümden bağımsız)
+
+        # İstatistikler
+        self.load_failures = 0
+
+    def version(self, company_id: str) -> int:
+        return self._store.generation(company_id)
+
+    def get(self, company_id: str, kind: str) -> Optional[Any]:
+        """Taze kayıt varsa değeri (dict ise kopyası), yoksa None"""
+        value = self._store.get(company_id, kind)
+        return dict(value) if isinstance(value, dict) else value
+
+    def put(self, company_id: str, kind: str, value: Any, version: Optional[int] = None):
+        # Yükleme sürerken invalidate edildiyse yazılmaz
+        self._store.put(company_id, kind, value, self.ttls.get(kind, 60.0), generation=version)
+
+    def get_or_load(self, company_id: str, kind: str, loader: Callable[[], Any],
+                    cache_if: Callable[[Any], bool] = lambda value: value is not None) -> Any:
+        """Cache'ten döner; yoksa loader() çağrılır ve cache_if(value) ise saklanır"""
+        value = self.get(company_id, kind)
+        if value is not None:
+            return value
+        version = self.version(company_id)
+        value = loader()
+        if cache_if(value):
+            self.put(company_id, kind, value, version=version)
+        return value
+
+    def snapshot(self, company_id: str) -> TenantSnapshot:
+        """Detection yolu için değişmez şirket konfigürasyonu.
+
+        DB hatasında son başarılı snapshot döner (tekrar TTL boyunca cache'lenir);
+        hiç yüklenememişse cache'lenmeyen varsayılan snapshot döner.
+        """
+        cached = self._store.get(company_id, KIND_SNAPSHOT)
+        if cached is not None:
+            return cached
+        version = self.version(company_id)
+        try:
+            row = self.snapshot_loader(company_id)
+        except Exception as e:
+            self.load_failures += 1
+            previous = self._last_snapshots.get(company_id)
+            if previous is None:
+                logger.warning(f"⚠️ Tenant snapshot load failed for {company_id}, using defaults: {e}")
+                return TenantSnapshot(company_id, version)
+            logger.warning(f"⚠️ Tenant snapshot load failed for {company_id}, keeping previous snapshot: {e}")
+            self.put(company_id, KIND_SNAPSHOT, previous, version=version)
+            return previous
+        snapshot = build_snapshot(company_id, version, dict(row) if row else None)
+        self._last_snapshots[company_id] = snapshot
+        self.put(company_id, KIND_SNAPSHOT, snapshot, version=version)
+        return snapshot
+
+    def invalidate(self, company_id: str, *kinds: str):
+        """Şirketin kayıtlarını düşürür (tür verilmezse hepsi) ve sürümü artırır"""
+        self._store.invalidate(company_id, (lambda kind, _: kind in kinds) if kinds else None)
+        logger.debug(f"🔄 Tenant cache invalidated: {company_id} {kinds or 'all'}")
+
+    def stats(self) -> Dict[str, Any]:
+        stats = self._store.stats()
+        return {
+            'entries': stats['entries'],
+            'companies': self._store.namespaces(),
+            'hits': stats['hits'],
+            'misses': stats['misses'],
+            'hit_ratio': stats['hit_ratio'],
+            'invalidations': stats['invalidations'],
+            'load_failures': self.load_failures,
+        }
+
+
+# Global cache
+_tenant_config_cache = None
+
+
+def get_tenant_config_cache() -> TenantConfigCache:
+    """Global tenant config cache instance'ını döndürür"""
+    global _tenant_config_cache
+    if _tenant_config_cache is None:
+        ttl = os.getenv('SMARTSAFE_TENANT_CACHE_TTL')
+        _tenant_config_cache = TenantConfigCache(
+            ttls={kind: float(ttl) for kind in DEFAULT_TTLS} if ttl else None)
+    return _tenant_config_cache
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+SmartSafe AI - TTL / Generation Cache
+Oturum, tenant konfigürasyonu ve API yanıt cache'lerinin ortak deposu
+
+- (namespace, anahtar) -> değer; kayıt başına TTL, süresi dolan kayıt erişimde
+  düşer (ayrı temizlik thread'i yok)
+- LRU sınırı: kayıt sayısı ve isteğe bağlı yaklaşık bellek (sizer) sınırı
+- Namespace (şirket) başına nesil sayacı: DB / hesaplama öncesi generation()
+  okunur ve put(..., generation=) ile geri verilir; arada invalidate() veya
+  clear() geldiyse eski sonuç cache'e yazılmaz
+- invalidate_company(): bir şirketin oturum, tenant ve yanıt cache'lerini
+  birlikte düşürür (şirket yazmalarından sonra tek çağrı)
+"""
+
+import threading
+import time
+import logging
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class TTLCache:
+    """(namespace, anahtar) -> (son geçerlilik zamanı, boyut, değer) LRU cache"""
+
+    def __init__(self, max_entries: Optional[int] = None, max_bytes: Optional[int] = None,
+                 sizer: Optional[Callable[[Any], int]] = None, clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sizer = sizer
+        self.clock = clock
+        self._entries: 'OrderedDict[Tuple[str, str], Tuple[float, int, Any]]' = OrderedDict()
+        self._generations: Dict[str, int] = {}
+        self._epoch = 0  # clear() tüm namespace'lerin neslini birlikte ilerletir
+        self._lock = threading.Lock()
+        self.bytes = 0
+
+        # İstatistikler
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.oversized = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def namespaces(self) -> int:
+        return len({key[0] for key in list(self._entries)})
+
+    def generation(self, namespace: str) -> int:
+        """Yüklemeden önce okunur; her invalidate / clear sonrası büyür"""
+        return self._epoch + self._generations.get(namespace, 0)
+
+    def _drop(self, key: Tuple[str, str]):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.bytes -= entry[1]
+
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        """Taze kayıt varsa değeri, yoksa None"""
+        cache_key = (namespace, key)
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            if entry is not None and self.clock() >= entry[0]:
+                self._drop(cache_key)
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(cache_key)
+            self.hits += 1
+            return entry[2]
+
+    def put(self, namespace: str, key: str, value: Any, ttl: float, generation: Optional[int] = None) -> bool:
+        """Kaydı yazar; yükleme sürerken invalidate edildiyse veya kayıt çok büyükse False"""
+        size = self.sizer(value) if self.sizer else 0
+        cache_key = (namespace, key)
+        with self._lock:
+            if generation is not None and generation != self.generation(namespace):
+                return False
+            if self.max_bytes is not None and size > self.max_bytes // 4:
+                self.oversized += 1
+                return False
+            self._drop(cache_key)
+            self._entries[cache_key] = (self.clock() + ttl, size, value)
+            self.bytes += size
+            while self._entries and ((self.max_entries is not None and len(self._entries) > self.max_entries)
+                                     or (self.max_bytes is not None and self.bytes > self.max_bytes)):
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+            return True
+
+    def invalidate(self, namespace: str, match: Optional[Callable[[str, Any], bool]] = None) -> int:
+        """Namespace'in kayıtlarını (match verilirse eşleşenleri) düşürür ve neslini artırır;
+        düşen kayıt sayısını döndürür"""
+        with self._lock:
+            self._generations[namespace] = self._generations.get(namespace, 0) + 1
+            keys = [k for k, entry in self._entries.items()
+                    if k[0] == namespace and (match is None or match(k[1], entry[2]))]
+            for key in keys:
+                self._drop(key)
+            self.invalidations += 1
+        return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._epoch += 1
+            self._entries.clear()
+            self.bytes = 0
+            self.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hits / total, 4) if total else 0.0,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'invalidations': self.invalidations,
+        }
+
+
+def invalidate_company(company_id: str):
+    """Şirketin oturum bağlamı, tenant konfigürasyonu ve API yanıtlarını düşürür"""
+    from src.smartsafe.services.response_cache import get_response_cache
+    from src.smartsafe.services.session_cache import get_session_cache
+    from src.smartsafe.services.tenant_cache import get_tenant_config_cache
+
+    get_session_cache().invalidate_company(company_id)
+    get_tenant_config_cache().invalidate(company_id)
+    get_response_cache().invalidate(company_id)
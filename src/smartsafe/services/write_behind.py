@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+"""
+SmartSafe AI - Write-Behind Insert Queue
+Detection / ihlal / uyarı INSERT'lerini inference thread'lerinden ayırır
+
+- enqueue() hiçbir zaman DB'yi beklemez: satır sınırlı bir bellek kuyruğuna
+  eklenir, arka plan thread'i N satırda veya T ms'de bir toplu yazar
+- Aynı tablo + kolon setindeki satırlar tek bağlantı ve tek transaction'da
+  bulk_insert ile yazılır (SQLite'ta executemany, PostgreSQL'de büyük batch'ler
+  COPY + staging, küçükler execute_values)
+- Kuyruk doluysa drop politikası uygulanır (varsayılan: en eski satır düşer),
+  düşen satırlar metriklerde sayılır
+- Yazma hatasında batch önce grup (tablo) başına, sonra satır başına ayrı
+  transaction'larla yeniden denenir: hatalı satır geçerli satırları batırmaz.
+  Bağlantı sağlamken tek başına da yazılamayan satır dead-letter listesine
+  alınır; bağlantı koptuysa sadece commit edilmemiş satırlar kapasite
+  elverdiğince kuyruğun başına geri konur
+- Kapanışta (atexit) bekleyen satırlar flush edilir
+- Yazılan detections / violations satırlarının zamanları rollup compactor'a
+  bildirilir: yeniden denemeyle geç yazılan satırların saatleri restate edilir
+"""
+
+import atexit
+import os
+import threading
+import time
+import logging
+from collections import deque
+from datetime import datetime
+from typing import Any, Callable, Deque, Dict, List, Optional, Sequence, Tuple
+
+from src.smartsafe.database.bulk_ingest import DEFAULT_COPY_MIN_ROWS, bulk_insert
+from src.smartsafe.database.transactions import transaction
+from src.smartsafe.services.report_rollups import ROLLUP_SOURCE_TABLES, note_late_rows
+
+logger = logging.getLogger(__name__)
+
+DROP_OLDEST = 'drop_oldest'
+DROP_NEWEST = 'drop_newest'
+
+_Row = Tuple[str, Tuple[str, ...], Tuple[Any, ...]]
+
+
+def _default_connection_provider():
+    """Global database adapter'dan (bağlantı al, bağlantı bırak, db_type) - SQLite'ta tek yazıcı bağlantısı"""
+    from src.smartsafe.database.database_adapter import get_db_adapter
+    adapter = get_db_adapter()
+    return adapter.get_write_connection, adapter.release_write_connection, adapter.db_type
+
+
+def _insert_rows(conn, db_type: str, table: str, columns: Tuple[str, ...], rows: List[Tuple[Any, ...]]):
+    """Tek tablo için toplu INSERT (commit çağırana ait) - büyük PostgreSQL batch'leri COPY ile"""
+    bulk_insert(conn, db_type, table, columns, rows,
+                copy_min_rows=int(os.getenv('SMARTSAFE_COPY_MIN_ROWS', str(DEFAULT_COPY_MIN_ROWS))))
+
+
+def _connection_alive(conn) -> bool:
+    try:
+        cursor = conn.cursor()
+        cursor.execute('SELECT 1')
+        cursor.fetchone()
+        return True
+    except Exception:
+        return False
+
+
+class WriteBehindQueue:
+    """Sınırlı, toplu yazan arka plan INSERT kuyruğu"""
+
+    def __init__(self, flush_rows: int = 200, flush_interval_ms: int = 500, max_pending: int = 10000,
+                 drop_policy: str = DROP_OLDEST, max_dead_letters: int = 1000,
+                 connection_provider: Optional[Callable[[], Tuple[Callable, Callable, str]]] = None):
+        if drop_policy not in (DROP_OLDEST, DROP_NEWEST):
+            raise ValueError(f"Unknown drop policy: {drop_policy}")
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval_ms / 1000.0
+        self.max_pending = max_pending
+        self.drop_policy = drop_policy
+        self.connection_provider = connection_provider or _default_connection_provider
+        self._pending: Deque[_Row] = deque()
+        self.dead_letters: Deque[Dict[str, Any]] = deque(maxlen=max_dead_letters)
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()  # Arka plan ve manuel flush aynı anda yazmasın
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+
+        # İstatistikler
+        self.rows_enqueued = 0
+        self.rows_written = 0
+        self.rows_dropped = 0
+        self.rows_dead_lettered = 0
+        self.flushes = 0
+        self.flush_errors = 0
+        self.high_watermark = 0
+        self.last_flush_ms = 0.0
+        self.last_batch_rows = 0
+
+    def enqueue(self, table: str, columns: Sequence[str], row: Sequence[Any]) -> bool:
+        """Satırı kuyruğa ekler (bloklamaz); yeni satır düşürüldüyse False"""
+        item = (table, tuple(columns), tuple(row))
+        with self._cond:
+            if self._stopping:
+                self.rows_dropped += 1
+                return False
+            if len(self._pending) >= self.max_pending:
+                self.rows_dropped += 1
+                if self.drop_policy == DROP_NEWEST:
+                    return False
+                self._pending.popleft()
+            self._pending.append(item)
+            self.rows_enqueued += 1
+            if len(self._pending) > self.high_watermark:
+                self.high_watermark = len(self._pending)
+            if len(self._pending) >= self.flush_rows:
+                self._cond.notify()
+        self._ensure_thread()
+        return True
+
+    def _ensure_thread(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._cond:
+            if self._stopping or (self._thread is not None and self._thread.is_alive()):
+                return
+            self._thread = threading.Thread(target=self._run, name='write-behind-flush', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if len(self._pending) < self.flush_rows and not self._stopping:
+                    # Batch dolmadıysa en fazla flush_interval kadar biriktir
+                    self._cond.wait(self.flush_interval)
+                stopping = self._stopping
+            failed = not self.flush()
+            if stopping and (failed or not self._pending):
+                return
+            if failed:
+                # DB erişilemiyor - thread'i meşgul döngüye sokma
+                time.sleep(self.flush_interval)
+
+    def _take_batch(self) -> List[_Row]:
+        with self._cond:
+            batch = list(self._pending)
+            self._pending.clear()
+        return batch
+
+    def flush(self) -> bool:
+        """Bekleyen tüm satırları yazar; bağlantı hatasında False (commit edilmemiş satırlar geri konur)"""
+        with self._flush_lock:
+            batch = self._take_batch()
+            if not batch:
+                return True
+
+            groups: Dict[Tuple[str, Tuple[str, ...]], List[Tuple[Any, ...]]] = {}
+            for table, columns, row in batch:
+                groups.setdefault((table, columns), []).append(row)
+
+            started = time.perf_counter()
+            try:
+                get_connection, release, db_type = self.connection_provider()
+                conn = get_connection()
+                if conn is None:
+                    raise RuntimeError("database connection unavailable")
+            except Exception as e:
+                self.flush_errors += 1
+                logger.error(f"❌ Write-behind flush failed ({len(batch)} rows): {e}")
+                self._requeue(batch)
+                return False
+
+            try:
+                written, unwritten = self._write_groups(conn, db_type, groups)
+            finally:
+                release(conn)
+            self._note_rollup_rows(batch)
+
+            self.rows_written += written
+            if unwritten:
+                self.flush_errors += 1
+                logger.error(f"❌ Write-behind flush interrupted: {written} rows written, "
+                             f"{len(unwritten)} rows requeued")
+                self._requeue(unwritten)
+                return False
+
+            self.flushes += 1
+            self.last_batch_rows = len(batch)
+            self.last_flush_ms = round((time.perf_counter() - started) * 1000, 2)
+            logger.debug(f"💾 Write-behind flush: {written} rows in {self.last_flush_ms}ms")
+            return True
+
+    def _write_groups(self, conn, db_type: str, groups: Dict[Tuple[str, Tuple[str, ...]], List[Tuple[Any, ...]]]):
+        """(yazılan satır sayısı, commit edilemeyen satırlar) - bağlantı koparsa kalanlar geri konur"""
+        try:
+            # Hızlı yol: tüm gruplar tek transaction
+            with transaction(conn):
+                for (table, columns), rows in groups.items():
+                    _insert_rows(conn, db_type, table, columns, rows)
+            return sum(len(rows) for rows in groups.values()), []
+        except Exception as e:
+            logger.warning(f"⚠️ Write-behind batch failed, retrying per table: {e}")
+
+        written = 0
+        unwritten: List[_Row] = []
+        for (table, columns), rows in groups.items():
+            if unwritten:
+                unwritten.extend((table, columns, row) for row in rows)
+                continue
+            try:
+                with transaction(conn):
+                    _insert_rows(conn, db_type, table, columns, rows)
+                written += len(rows)
+                continue
+            except Exception as e:
+                logger.warning(f"⚠️ Write-behind {table} batch failed, retrying per row: {e}")
+            for index, row in enumerate(rows):
+                try:
+                    with transaction(conn):
+                        _insert_rows(conn, db_type, table, columns, [row])
+                    written += 1
+                except Exception as e:
+                    if not _connection_alive(conn):
+                        unwritten.extend((table, columns, rest) for rest in rows[index:])
+                        break
+                    self._dead_letter(table, columns, row, e)
+        return written, unwritten
+
+    def _note_rollup_rows(self, batch: List[_Row]):
+        """Rollup kaynak satırlarının zamanları (geç kalanların saati compactor'da restate edilir)"""
+        try:
+            timestamps = [row[columns.index('timestamp')] for table, columns, row in batch
+                          if table in ROLLUP_SOURCE_TABLES and 'timestamp' in columns]
+            if timestamps:
+                note_late_rows(timestamps)
+        except Exception as e:
+            logger.debug(f"Rollup late-row note failed: {e}")
+
+    def _dead_letter(self, table: str, columns: Tuple[str, ...], row: Tuple[Any, ...], error: Exception):
+        """Tek başına da yazılamayan satır - tekrar denenmez, incelemek için saklanır"""
+        self.rows_dead_lettered += 1
+        self.dead_letters.append({
+            'table': table,
+            'columns': list(columns),
+            'row': list(row),
+            'error': str(error),
+            'failed_at': datetime.now().isoformat(),
+        })
+        logger.error(f"❌ Write-behind row rejected by {table}: {error}")
+
+    def _requeue(self, batch: List[_Row]):
+        """Başarısız batch'i kapasite elverdiğince kuyruğun başına geri koyar (yeni satırlar öncelikli)"""
+        with self._cond:
+            room = max(self.max_pending - len(self._pending), 0)
+            keep = batch[-room:] if room else []
+            self.rows_dropped += len(batch) - len(keep)
+            self._pending.extendleft(reversed(keep))
+
+    def shutdown(self, timeout: float = 5.0):
+        """Yeni satır kabul etmeyi bırakır ve bekleyenleri yazar"""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+            thread = self._thread
+        if thread is not None and thread.is_alive():
+            thread.join(timeout)
+        if self._pending:
+            self.flush()
+        if self._pending:
+            logger.warning(f"⚠️ Write-behind shutdown: {len(self._pending)} rows could not be written")
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'pending': self.pending,
+            'max_pending': self.max_pending,
+            'high_watermark': self.high_watermark,
+            'drop_policy': self.drop_policy,
+            'rows_enqueued': self.rows_enqueued,
+            'rows_written': self.rows_written,
+            'rows_dropped': self.rows_dropped,
+            'rows_dead_lettered': self.rows_dead_lettered,
+            'flushes': self.flushes,
+            'flush_errors': self.flush_errors,
+            'last_flush_ms': self.last_flush_ms,
+            'last_batch_rows': self.last_batch_rows,
+        }
+
+
+# Global queue
+_write_behind_queue = None
+
+
+def get_write_behind_queue() -> WriteBehindQueue:
+    """Global write-behind queue instance'ını döndürür"""
+    global _write_behind_queue
+    if _write_behind_queue is None:
+        _write_behind_queue = WriteBehindQueue(
+            flush_rows=int(os.getenv('SMARTSAFE_WRITE_BEHIND_ROWS', '200')),
+            flush_interval_ms=int(os.getenv('SMARTSAFE_WRITE_BEHIND_INTERVAL_MS', '500')),
+            max_pending=int(os.getenv('SMARTSAFE_WRITE_BEHIND_MAX_PENDING', '10000')),
+            drop_policy=os.getenv('SMARTSAFE_WRITE_BEHIND_DROP_POLICY', DROP_OLDEST),
+        )
+        atexit.register(_write_behind_queue.shutdown)
+    return _write_behind_queue
@@ -0,0 +1,81 @@
+"""Tests for per-client adaptive MJPEG tiers (encoder and clock are stand-ins)."""
+from src.smartsafe.services.adaptive_mjpeg import (
+    TIER_BY_NAME, TIERS, TierController, TieredEncodeCache, adaptive_mjpeg_stream, resolve_tier
+)
+
+
+def _fake_encoder(frame, tier):
+    return f"{frame}@{tier.name}".encode()
+
+
+class _FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def test_controller_downgrades_on_slow_writes_and_recovers():
+    controller = TierController()
+    interval = controller.tier.frame_interval
+
+    for i in range(3):
+        changed = controller.record(interval * 2, 10000, now=i)
+    assert changed is TIER_BY_NAME['medium']
+
+    # Hızlı yazma upgrade_after_seconds boyunca sürerse bir üst tier'a dönülür
+    assert controller.record(0.001, 10000, now=10.0) is None
+    assert controller.record(0.001, 10000, now=16.0) is TIER_BY_NAME['high']
+
+
+def test_pinned_tier_never_changes_and_unknown_value_is_adaptive():
+    tier, adaptive = resolve_tier('LOW')
+    assert tier.name == 'low' and not adaptive
+    controller = TierController(tier, adaptive=False)
+    for i in range(10):
+        assert controller.record(5.0, 100, now=i) is None
+    assert controller.tier.name == 'low'
+    assert resolve_tier('bogus') == (TIERS[0], True)
+
+
+def test_clients_on_same_tier_share_one_encode():
+    cache = TieredEncodeCache(encoder=_fake_encoder)
+    renders = []
+
+    def render():
+        renders.append(1)
+        return 'frame7'
+
+    high, low = TIER_BY_NAME['high'], TIER_BY_NAME['low']
+    assert cache.get('cam', 7, high, render) == b'frame7@high'
+    assert cache.get('cam', 7, high, render) == b'frame7@high'
+    assert cache.get('cam', 7, low, render) == b'frame7@low'
+    assert len(renders) == 2
+    assert cache.stats()['encodes'] == 2 and cache.stats()['shared_hits'] == 1
+
+
+def test_stream_yields_parts_and_releases_views():
+    clock = _FakeClock()
+    cache = TieredEncodeCache(encoder=_fake_encoder)
+    released = []
+
+    def next_frame(min_seq):
+        seq = min_seq + 1
+        return seq, (lambda: f"f{seq}"), (lambda: released.append(seq)), None
+
+    stream = adaptive_mjpeg_stream('cam', next_frame, tier='medium', cache=cache,
+                                   clock=clock, sleep=clock.sleep)
+    parts = [next(stream) for _ in range(3)]
+    assert cache.stats()['clients_by_tier']['medium'] == 1
+    stream.close()
+
+    assert parts[0].startswith(b'--frame\r\nContent-Type: image/jpeg\r\n')
+    assert parts[2].endswith(b'f3@medium\r\n')
+    assert released == [1, 2, 3]
+    assert cache.stats()['clients_by_tier']['medium'] == 0
+    # Kaynağın son istemcisi ayrılınca frame'leri ve anahtar kilitleri bırakılır
+    assert not cache._entries and not cache._key_locks
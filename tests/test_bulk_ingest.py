@@ -0,0 +1,79 @@
+"""Tests for bulk detection ingestion (SQLite executemany, PostgreSQL COPY path with a fake cursor)."""
+import sqlite3
+from datetime import datetime
+
+from src.smartsafe.database.bulk_ingest import (
+    RECORD_SPECS, build_rows, bulk_insert, encode_copy_rows, insert_records
+)
+
+
+def test_build_rows_applies_defaults_and_optional_columns():
+    spec = RECORD_SPECS['camera_detection']
+    columns, rows = build_rows(spec, [{'company_id': 'C1', 'camera_id': 'CAM1', 'confidence': None}])
+    assert 'timestamp' not in columns
+    assert rows[0][columns.index('detection_type')] == 'ppe'
+    assert rows[0][columns.index('confidence')] == 0.0
+
+    ts = datetime(2024, 1, 2, 3, 4, 5)
+    columns, rows = build_rows(spec, [{'company_id': 'C1', 'camera_id': 'CAM1', 'timestamp': ts}])
+    assert columns[-1] == 'timestamp' and rows[0][-1] == ts
+
+
+def test_copy_text_encoding_escapes_specials():
+    buffer = encode_copy_rows([('a\tb', None, 'line\nbreak', 'back\\slash', True, datetime(2024, 1, 2, 3, 4))])
+    assert buffer.read() == 'a\\tb\t\\N\tline\\nbreak\tback\\\\slash\tt\t2024-01-02 03:04:00\n'
+
+
+def test_sqlite_bulk_insert_is_one_batch_and_ignores_duplicate_events():
+    conn = sqlite3.connect(':memory:')
+    conn.execute('''CREATE TABLE violation_events (event_id TEXT PRIMARY KEY, company_id TEXT, camera_id TEXT,
+                    person_id TEXT, violation_type TEXT, start_time REAL, end_time REAL, duration_seconds INTEGER,
+                    snapshot_path TEXT, severity TEXT, status TEXT)''')
+    events = [{'event_id': f'E{i}', 'company_id': 'C1', 'camera_id': 'CAM1', 'person_id': 'P1',
+               'violation_type': 'no_helmet', 'start_time': 1.0 + i} for i in range(5)]
+    assert insert_records(conn, 'sqlite', 'violation_event', events) == 5
+    assert insert_records(conn, 'sqlite', 'violation_event', events[3:] + [dict(events[0], event_id='E9')]) == 1
+    conn.commit()
+    assert conn.execute("SELECT COUNT(*), MIN(severity), MIN(status) FROM violation_events").fetchone() == (
+        6, 'warning', 'active')
+
+
+class _PgCursor:
+    def __init__(self, log):
+        self.log = log
+        self.rowcount = -1
+
+    def execute(self, sql, params=None):
+        self.log.append(' '.join(sql.split()))
+        if sql.startswith('INSERT'):
+            self.rowcount = 2
+
+    def copy_expert(self, sql, stream):
+        self.log.append(sql)
+        self.log.append(stream.read())
+
+
+class _PgConn:
+    autocommit = True
+
+    def __init__(self):
+        self.log = []
+
+    def cursor(self):
+        return _PgCursor(self.log)
+
+
+def test_postgres_large_batch_is_copied_through_staging_table():
+    conn = _PgConn()
+    inserted = bulk_insert(conn, 'postgresql', 'violation_events', ('event_id', 'company_id'),
+                           [('E1', 'C1'), ('E2', None)], conflict_columns=('event_id',), copy_min_rows=2)
+    assert inserted == 2
+    log = conn.log
+    stage = log[1].split()[3]
+    assert log[0] == 'BEGIN' and log[-1] == 'COMMIT'
+    assert log[1] == (f'CREATE TEMP TABLE {stage} ON COMMIT DROP AS '
+                      f'SELECT event_id, company_id FROM violation_events WITH NO DATA')
+    assert log[2] == f'COPY {stage} (event_id, company_id) FROM STDIN'
+    assert log[3] == 'E1\tC1\nE2\t\\N\n'
+    assert log[4] == (f'INSERT INTO violation_events (event_id, company_id) SELECT event_id, company_id '
+                      f'FROM {stage} ON CONFLICT (event_id) DO NOTHING')
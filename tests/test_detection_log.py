@@ -0,0 +1,92 @@
+"""Tests for the binary per-camera detection log (encoding, time-range reads, size and recovery)."""
+import json
+import os
+from datetime import datetime
+
+from src.smartsafe.services.detection_log import BOX, FRAME, HEADER, DetectionLog
+
+
+def _detections(n):
+    return [{'bbox': [10 + i, 20, 110 + i, 220], 'class_name': 'helmet' if i % 2 else 'person',
+             'confidence': 0.87, 'track_id': i, 'class_id': i % 2} for i in range(n)]
+
+
+def test_round_trip_preserves_frame_and_boxes(tmp_path):
+    log = DetectionLog(root=str(tmp_path), retention_days=0)
+    ts = datetime(2024, 3, 5, 12, 0, 0).timestamp() + 0.25
+    detections = _detections(3) + [{'bbox': [0, 0, 99999, -99999], 'class_name': 'vest', 'confidence': 0.5,
+                                    'track_id': None}]
+    assert log.append('C1', 'CAM1', ts, detections, people=2, compliant=1, violations=1,
+                      frame_size=(1920, 1080), seq=7, inference_ms=12.5)
+    frames = list(log.read_range('C1', 'CAM1', ts - 1, ts + 1))
+    log.close()
+
+    assert len(frames) == 1
+    frame = frames[0]
+    assert abs(frame.timestamp - ts) < 0.001
+    assert (frame.seq, frame.people, frame.compliant, frame.violations) == (7, 2, 1, 1)
+    assert (frame.width, frame.height, frame.inference_ms) == (1920, 1080, 12.5)
+    assert [box.class_name for box in frame.boxes] == ['person', 'helmet', 'person', 'vest']
+    assert frame.boxes[1].bbox == (11, 20, 111, 220) and frame.boxes[1].track_id == 1
+    assert abs(frame.boxes[0].confidence - 0.87) < 0.001
+    assert frame.boxes[3].bbox == (0, 0, 32767, -32768) and frame.boxes[3].track_id is None
+
+
+def test_out_of_range_track_ids_do_not_fail_the_write(tmp_path):
+    log = DetectionLog(root=str(tmp_path), retention_days=0)
+    ts = datetime(2024, 3, 5, 12, 0, 0).timestamp()
+    detections = [{'bbox': [0, 0, 10, 10], 'class_name': 'person', 'confidence': 0.9, 'track_id': track_id}
+                  for track_id in (2 ** 40 + 5, float('inf'), -3, 'trk-2147483648')]
+    assert log.append('C1', 'CAM1', ts, detections)
+    frame = next(log.read_range('C1', 'CAM1', ts - 1, ts + 1))
+    log.close()
+    assert [box.track_id for box in frame.boxes] == [5, None, None, 147483648]
+
+
+def test_time_range_reads_span_days_and_respect_bounds(tmp_path):
+    log = DetectionLog(root=str(tmp_path), retention_days=0)
+    start = datetime(2024, 3, 5, 23, 59, 50).timestamp()
+    for i in range(40):
+        log.append('C1', 'CAM1', start + i * 0.5, _detections(i % 3), seq=i)
+
+    frames = list(log.read_range('C1', 'CAM1', start + 5, start + 15))
+    assert [frame.seq for frame in frames] == list(range(10, 30))
+    assert sorted(log.days('C1', 'CAM1')) == [datetime(2024, 3, 5).date(), datetime(2024, 3, 6).date()]
+
+    reader = log.reader('C1', 'CAM1', datetime(2024, 3, 6).date())
+    with reader:
+        assert reader.frame_count == 20
+        assert reader.index_at(start + 12) == 4
+    assert list(log.read_range('C1', 'CAM2', start, start + 60)) == []
+    log.close()
+
+
+def test_log_is_compact_and_recovers_from_partial_records(tmp_path):
+    log = DetectionLog(root=str(tmp_path), retention_days=0)
+    ts = datetime(2024, 3, 5, 8, 0, 0).timestamp()
+    json_bytes = 0
+    for i in range(100):
+        detections = [dict(d, bbox=[c + 0.4321 for c in d['bbox']], missing=False, pose_based=True)
+                      for d in _detections(5)]
+        log.append('C1', 'CAM1', ts + i, detections, people=3, compliant=2, violations=1, seq=i)
+        # Canlı döngüdeki detection_data'nın JSON karşılığı (overlay dahil)
+        json_bytes += len(json.dumps({
+            'camera_id': 'CAM1', 'company_id': 'C1', 'timestamp': datetime.fromtimestamp(ts + i).isoformat(),
+            'frame_count': i, 'people_detected': 3, 'ppe_compliant': 2, 'violations': ['Baret eksik'],
+            'compliance_rate': 66.7, 'processing_time_ms': 41.27, 'detections': detections,
+            'overlay': {'camera_id': 'CAM1', 'frame_ts': ts + i, 'boxes': detections}}))
+    log.close()
+    assert log.stats()['bytes_written'] == 100 * (FRAME.size + 5 * BOX.size)
+    assert log.stats()['bytes_written'] * 15 < json_bytes
+
+    # Yarım yazılmış kuyruk kaydı açılışta kırpılır
+    frames_path = os.path.join(str(tmp_path), 'C1', 'CAM1', '20240305.frames')
+    with open(frames_path, 'ab') as handle:
+        handle.write(b'\x01\x02\x03')
+    log = DetectionLog(root=str(tmp_path), retention_days=0)
+    log.append('C1', 'CAM1', ts + 200, [], seq=200)
+    frames = list(log.read_range('C1', 'CAM1', ts, ts + 300))
+    log.close()
+    assert os.path.getsize(frames_path) == HEADER.size + 101 * FRAME.size
+    assert [frame.seq for frame in frames][-2:] == [99, 200]
+    assert frames[-1].boxes == []
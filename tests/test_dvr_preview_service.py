@@ -0,0 +1,116 @@
+"""Tests for the DVR grid preview service (cache, in-flight sharing, live frames, timeouts)."""
+import threading
+import time
+
+import pytest
+
+pytest.importorskip('cv2')
+
+from src.smartsafe.integrations.dvr import dvr_preview_service
+from src.smartsafe.integrations.dvr.dvr_preview_service import DVRPreviewService
+
+DVR_SYSTEM = {'ip_address': '10.0.0.5', 'username': 'admin', 'password': 'pw', 'rtsp_port': 554}
+
+
+class _FakeStreamHandler:
+    """grab_frame release edilene kadar bekler; aktif stream'ler active_frames'ten okunur"""
+
+    def __init__(self, block=False):
+        self.grabs = 0
+        self.active_frames = {}
+        self.release = threading.Event()
+        if not block:
+            self.release.set()
+
+    def get_stream_status(self, stream_id):
+        return {'status': 'active'} if stream_id in self.active_frames else None
+
+    def get_latest_frame(self, stream_id):
+        return self.active_frames.get(stream_id)
+
+    def get_dual_stream_urls(self, ip, username, password, port, channel, brand=None, company_id=None, dvr_id=None):
+        return {'main': [f'rtsp://{ip}:{port}/ch{channel}/main'], 'sub': [f'rtsp://{ip}:{port}/ch{channel}/sub']}
+
+    def grab_frame(self, candidates, timeout_ms=None):
+        self.grabs += 1
+        self.release.wait(5)
+        return f'frame-{self.grabs}'
+
+
+@pytest.fixture
+def service(monkeypatch):
+    def make(handler, **kwargs):
+        monkeypatch.setattr(dvr_preview_service, 'get_stream_handler', lambda: handler)
+        svc = DVRPreviewService(max_workers=4, **kwargs)
+        monkeypatch.setattr(svc, '_encode_thumbnail', lambda frame: f'thumb:{frame}')
+        monkeypatch.setattr(svc, '_thumbnail_from_jpeg_b64', lambda frame_b64: f'live:{frame_b64}')
+        return svc
+    return make
+
+
+def test_cached_thumbnail_is_served_within_ttl(service):
+    handler = _FakeStreamHandler()
+    svc = service(handler, cache_ttl=60)
+
+    first = svc.get_previews('COMP', 'DVR1', DVR_SYSTEM, [1])
+    second = svc.get_previews('COMP', 'DVR1', DVR_SYSTEM, [1])
+
+    assert first[0]['source'] == 'rtsp' and second[0]['source'] == 'cache'
+    assert second[0]['frame'] == first[0]['frame'] == 'thumb:frame-1'
+    assert handler.grabs == 1 and svc.get_stats()['cache_hits'] == 1
+
+    svc.cache_ttl = 0
+    assert svc.get_previews('COMP', 'DVR1', DVR_SYSTEM, [1])[0]['source'] == 'rtsp'
+    assert handler.grabs == 2
+
+
+def test_concurrent_callers_share_one_inflight_grab(service):
+    handler = _FakeStreamHandler(block=True)
+    svc = service(handler)
+    results = []
+
+    def call():
+        results.append(svc.get_previews('COMP', 'DVR1', DVR_SYSTEM, [3])[0])
+
+    threads = [threading.Thread(target=call) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    deadline = time.time() + 5
+    while handler.grabs == 0 and time.time() < deadline:
+        time.sleep(0.01)
+    time.sleep(0.05)
+    handler.release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert handler.grabs == 1
+    assert [r['frame'] for r in results] == ['thumb:frame-1'] * 4
+    assert svc.get_stats()['inflight_grabs'] == 0
+
+
+def test_active_stream_frame_is_reused_without_rtsp_grab(service):
+    handler = _FakeStreamHandler()
+    handler.active_frames['DVR1_ch02'] = 'b64jpeg'
+    svc = service(handler)
+
+    previews = svc.get_previews('COMP', 'DVR1', DVR_SYSTEM, [2, 4])
+
+    assert previews[0] == {'channel_number': 2, 'frame': 'live:b64jpeg', 'source': 'live'}
+    assert previews[1]['source'] == 'rtsp' and handler.grabs == 1
+    assert svc.get_stats()['live_hits'] == 1
+
+
+def test_grab_past_timeout_returns_none_and_fills_cache_later(service):
+    handler = _FakeStreamHandler(block=True)
+    svc = service(handler)
+
+    started = time.perf_counter()
+    previews = svc.get_previews('COMP', 'DVR1', DVR_SYSTEM, [5], timeout=0.1)
+    assert time.perf_counter() - started < 1
+    assert previews == [{'channel_number': 5, 'frame': None, 'source': 'rtsp'}]
+
+    handler.release.set()
+    deadline = time.time() + 5
+    while svc.get_stats()['inflight_grabs'] and time.time() < deadline:
+        time.sleep(0.01)
+    assert svc.get_previews('COMP', 'DVR1', DVR_SYSTEM, [5])[0]['source'] == 'cache'
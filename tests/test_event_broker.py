@@ -0,0 +1,86 @@
+"""Tests for the live detection event broker (SSE push)."""
+import json
+import threading
+import time
+
+from src.smartsafe.services.event_broker import (
+    EventBroker, detection_summary, format_sse, stream_events
+)
+
+
+def _parse(chunk):
+    fields = dict(line.split(': ', 1) for line in chunk.strip().split('\n'))
+    return fields['event'], json.loads(fields['data'])
+
+
+def test_events_are_filtered_by_company_and_camera():
+    broker = EventBroker()
+    all_cameras = broker.subscribe('COMP_A')
+    cam1_only = broker.subscribe('COMP_A', ['CAM1'])
+    other_company = broker.subscribe('COMP_B')
+
+    broker.publish('COMP_A', 'detection', {'camera_id': 'CAM1'}, camera_id='CAM1')
+    broker.publish('COMP_A', 'detection', {'camera_id': 'CAM2'}, camera_id='CAM2')
+
+    assert all_cameras.pending == 2
+    assert cam1_only.pending == 1 and cam1_only.get(0)['data']['camera_id'] == 'CAM1'
+    assert other_company.pending == 0
+
+
+def test_slow_client_is_dropped_without_blocking_producer():
+    broker = EventBroker(max_buffer=3)
+    slow = broker.subscribe('COMP_A')
+    fast = broker.subscribe('COMP_A')
+
+    for i in range(5):
+        broker.publish('COMP_A', 'detection', {'n': i}, camera_id='CAM1')
+        fast.get(0)
+
+    assert slow.dropped and slow.closed
+    assert broker.subscriber_count('COMP_A') == 1
+    assert broker.stats()['clients_dropped'] == 1
+
+    # Generator düşürülen istemciye 'dropped' olayı gönderip kapanır
+    chunks = list(stream_events(slow, heartbeat=0.01))
+    assert _parse(chunks[-1])[0] == 'dropped'
+
+
+def test_stream_sends_initial_then_live_events():
+    broker = EventBroker()
+    broker.publish('COMP_A', 'detection', {'camera_id': 'CAM1', 'total_people': 2}, camera_id='CAM1', retain=True)
+    subscription = broker.subscribe('COMP_A', ['CAM1'])
+    stream = stream_events(subscription, broker.retained_events('COMP_A', ['CAM1']), heartbeat=0.01)
+
+    assert next(stream).startswith('retry:')
+    assert _parse(next(stream)) == ('detection', {'camera_id': 'CAM1', 'total_people': 2})
+    assert next(stream) == ': keepalive\n\n'
+
+    threading.Timer(0.05, broker.publish, args=('COMP_A', 'violation', {'camera_id': 'CAM1'}),
+                    kwargs={'camera_id': 'CAM1'}).start()
+    chunk = next(stream)
+    while chunk.startswith(':'):
+        chunk = next(stream)
+    assert _parse(chunk) == ('violation', {'camera_id': 'CAM1'})
+
+    stream.close()
+    assert broker.subscriber_count() == 0
+
+
+def test_total_subscribers_are_capped_and_streams_expire():
+    broker = EventBroker(max_subscribers=1)
+    first = broker.subscribe('COMP_A')
+    assert broker.subscribe('COMP_B') is None
+    assert broker.stats()['clients_rejected'] == 1
+
+    # Ömrü dolan akış kapanır ve thread'i (aboneliği) bırakır
+    started = time.monotonic()
+    chunks = list(stream_events(first, heartbeat=10, max_lifetime=0.05))
+    assert time.monotonic() - started < 1
+    assert chunks[0].startswith('retry:') and broker.subscriber_count() == 0
+    assert broker.subscribe('COMP_B') is not None
+
+
+def test_detection_summary_omits_heavy_fields():
+    summary = detection_summary({'camera_id': 'CAM1', 'total_people': 3, 'detections': [{'bbox': [0, 0, 1, 1]}]})
+    assert summary == {'camera_id': 'CAM1', 'total_people': 3}
+    assert format_sse({'id': 7, 'event': 'detection', 'data': summary}).startswith('id: 7\nevent: detection\n')
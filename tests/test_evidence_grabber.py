@@ -0,0 +1,50 @@
+"""Tests for the background main-stream evidence grabber (dual-stream snapshots)."""
+import time
+
+import pytest
+
+np = pytest.importorskip('numpy')
+pytest.importorskip('cv2')
+
+from src.smartsafe.integrations.dvr.evidence_grabber import MainStreamGrabber
+
+
+class _FakeCapture:
+    def __init__(self, opened=True):
+        self.opened = opened
+        self.value = 0
+        self.grabs = 0
+        self.released = False
+
+    def isOpened(self):
+        return self.opened
+
+    def read(self, image=None):
+        time.sleep(0.005)
+        self.value += 1
+        return True, np.full((4, 6, 3), self.value % 255, dtype=np.uint8)
+
+    def grab(self):
+        time.sleep(0.005)
+        self.grabs += 1
+        return True
+
+    def release(self):
+        self.released = True
+
+
+def test_frames_are_kept_in_background_and_matched_by_time():
+    captures = {'rtsp://bad': _FakeCapture(opened=False), 'rtsp://main': _FakeCapture()}
+    grabber = MainStreamGrabber('dvr_1_ch01', ['rtsp://bad', 'rtsp://main'], fps=20, num_slots=4,
+                                capture_factory=lambda url, timeout_ms: captures[url]).start()
+    deadline = time.time() + 5
+    while grabber.frames_kept < 3 and time.time() < deadline:
+        time.sleep(0.01)
+
+    frame = grabber.frame_near(time.time())
+    assert frame is not None and frame.flags.writeable
+    assert grabber.url == 'rtsp://main' and captures['rtsp://main'].grabs > 0
+    assert grabber.frame_near(time.time() + 60, max_skew=1.0) is None
+
+    grabber.stop()
+    assert captures['rtsp://main'].released and grabber.stats()['misses'] == 1
@@ -0,0 +1,99 @@
+"""Tests for versioned schema migrations (SQLite)."""
+import sqlite3
+
+from src.smartsafe.database.migrations import MIGRATIONS, applied_versions, apply_migrations, rollback_to
+
+
+def _conn():
+    conn = sqlite3.connect(':memory:')
+    conn.executescript('''
+        CREATE TABLE detections (detection_id INTEGER PRIMARY KEY, company_id TEXT, camera_id TEXT, timestamp DATETIME);
+        CREATE TABLE violations (violation_id INTEGER PRIMARY KEY, company_id TEXT, camera_id TEXT, timestamp DATETIME);
+        CREATE TABLE violation_events (event_id TEXT PRIMARY KEY, company_id TEXT, camera_id TEXT,
+                                       start_time REAL, status TEXT);
+        CREATE TABLE sessions (session_id TEXT PRIMARY KEY, expires_at TIMESTAMP);
+    ''')
+    return conn
+
+
+def _plan(conn, sql):
+    return ' '.join(row[-1] for row in conn.execute('EXPLAIN QUERY PLAN ' + sql))
+
+
+def test_migrations_apply_once_in_order():
+    conn = _conn()
+    latest = max(m.version for m in MIGRATIONS)
+
+    assert apply_migrations(conn, 'sqlite') == sorted(m.version for m in MIGRATIONS)
+    assert apply_migrations(conn, 'sqlite') == []
+    assert applied_versions(conn, 'sqlite')[-1] == latest
+
+
+def test_hot_queries_use_composite_indexes():
+    conn = _conn()
+    apply_migrations(conn, 'sqlite')
+
+    assert 'idx_detections_company_ts' in _plan(
+        conn, "SELECT COUNT(*) FROM detections WHERE company_id = 'C' AND timestamp >= '2024-01-01'")
+    assert 'idx_violation_events_camera_start' in _plan(
+        conn, "SELECT * FROM violation_events WHERE camera_id = 'CAM' AND start_time >= 0 ORDER BY start_time DESC")
+
+
+def test_rollback_drops_indexes_and_allows_reapply():
+    conn = _conn()
+    apply_migrations(conn, 'sqlite')
+
+    assert rollback_to(conn, 'sqlite', 0) == sorted((m.version for m in MIGRATIONS), reverse=True)
+    indexes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert 'idx_detections_company_ts' not in indexes
+    assert apply_migrations(conn, 'sqlite') == sorted(m.version for m in MIGRATIONS)
+
+
+class _FakePgCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def execute(self, sql, params=None):
+        sql = ' '.join(sql.split())
+        if self.conn.fail_on and self.conn.fail_on in sql:
+            raise RuntimeError('canceling statement due to lock timeout')
+        self.conn.log.append((sql, self.conn.autocommit))
+
+    def fetchone(self):
+        return None
+
+    def fetchall(self):
+        return []
+
+
+class _FakePgConnection:
+    def __init__(self, fail_on=None):
+        self.autocommit = False
+        self.fail_on = fail_on
+        self.log = []
+
+    def cursor(self):
+        return _FakePgCursor(self)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+
+def test_postgresql_indexes_are_built_concurrently_outside_the_transaction():
+    conn = _FakePgConnection()
+    assert apply_migrations(conn, 'postgresql', MIGRATIONS[:1]) == [1]
+
+    concurrent = [(sql, auto) for sql, auto in conn.log if 'CONCURRENTLY' in sql]
+    assert len(concurrent) == 7 and all(auto for _, auto in concurrent)
+    # Sürüm index'ler bittikten sonra, transaction içinde kaydedilir
+    assert conn.log[-1][0].startswith('INSERT INTO schema_migrations') and conn.log[-1][1] is False
+    assert conn.autocommit is False
+
+    # Yarıda kalan index düşürülür, sürüm kaydedilmez
+    conn = _FakePgConnection(fail_on='idx_violations_company_ts ON')
+    assert apply_migrations(conn, 'postgresql', MIGRATIONS[:1]) == []
+    assert conn.log[-1][0] == 'DROP INDEX CONCURRENTLY IF EXISTS idx_violations_company_ts'
+    assert not any(sql.startswith('INSERT INTO schema_migrations') for sql, _ in conn.log)
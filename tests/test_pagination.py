@@ -0,0 +1,82 @@
+"""Tests for keyset pagination (opaque cursors, page walking, partitioned history tables)."""
+import sqlite3
+from datetime import datetime
+
+import pytest
+
+from src.smartsafe.database.pagination import (
+    InvalidCursor, build_page, decode_cursor, encode_cursor, keyset_query
+)
+from src.smartsafe.database.partitions import PARTITIONED_TABLES, ensure_indexes, partition_table
+
+DETECTIONS = PARTITIONED_TABLES[0]
+
+
+def _detections(partitioned=False):
+    conn = sqlite3.connect(':memory:')
+    conn.row_factory = sqlite3.Row
+    conn.execute('''CREATE TABLE detections (detection_id INTEGER PRIMARY KEY AUTOINCREMENT, company_id TEXT NOT NULL,
+                    camera_id TEXT, timestamp DATETIME DEFAULT CURRENT_TIMESTAMP)''')
+    # Aynı saniyede birden çok satır - sıralama id ile kesinleşir
+    for i in range(45):
+        conn.execute('INSERT INTO detections (company_id, camera_id, timestamp) VALUES (?, ?, ?)',
+                     ('C1', 'CAM1' if i % 3 else 'CAM2', f'2024-{1 + i % 5:02d}-10 08:00:{i // 10:02d}'))
+    conn.commit()
+    if partitioned:
+        partition_table(conn, 'sqlite', DETECTIONS, now=datetime(2024, 6, 1), months_ahead=1)
+    ensure_indexes(conn, 'sqlite', DETECTIONS)
+    return conn
+
+
+def _walk(conn, limit):
+    pages, token = [], None
+    while True:
+        key = decode_cursor('camera_detections', token) if token else None
+        sql, params = keyset_query('SELECT * FROM detections', ['camera_id = ?', 'company_id = ?'], ['CAM1', 'C1'],
+                                   'timestamp', 'detection_id', limit, key)
+        rows = [dict(row) for row in conn.execute(sql, params).fetchall()]
+        page = build_page('camera_detections', rows, limit, 'timestamp', 'detection_id')
+        pages.append([row['detection_id'] for row in page.items])
+        token = page.next_cursor
+        if not page.has_more:
+            return pages
+
+
+def test_cursor_is_opaque_and_scoped():
+    token = encode_cursor('violation_history', 1714550400.25, 'EVT-1')
+    assert '=' not in token and 'EVT' not in token
+    assert decode_cursor('violation_history', token) == (1714550400.25, 'EVT-1')
+    assert decode_cursor('camera_detections', encode_cursor('camera_detections', datetime(2024, 5, 1, 8), 7)) == \
+        ('2024-05-01 08:00:00', 7)
+    with pytest.raises(InvalidCursor):
+        decode_cursor('camera_detections', token)
+    with pytest.raises(InvalidCursor):
+        decode_cursor('violation_history', 'not-a-cursor')
+
+
+@pytest.mark.parametrize('partitioned', [False, True])
+def test_walking_pages_visits_every_row_once_in_order_using_the_index(partitioned):
+    conn = _detections(partitioned)
+    expected = [row[0] for row in conn.execute(
+        "SELECT detection_id FROM detections WHERE camera_id = 'CAM1' AND company_id = 'C1' "
+        "ORDER BY timestamp DESC, detection_id DESC")]
+    pages = _walk(conn, 7)
+    assert [len(page) for page in pages] == [7, 7, 7, 7, 2]
+    assert [detection_id for page in pages for detection_id in page] == expected
+
+    sql, params = keyset_query('SELECT * FROM detections', ['camera_id = ?', 'company_id = ?'], ['CAM1', 'C1'],
+                               'timestamp', 'detection_id', 7, ('2024-03-10 08:00:02', 30))
+    plan = ' | '.join(row[3] for row in conn.execute('EXPLAIN QUERY PLAN ' + sql, params))
+    assert 'camera_company_ts_id' in plan and 'TEMP B-TREE' not in plan
+
+
+def test_rows_with_null_sort_keys_never_reach_a_cursor():
+    conn = _detections()
+    conn.execute("INSERT INTO detections (company_id, camera_id, timestamp) VALUES ('C1', 'CAM1', NULL)")
+    pages = _walk(conn, 7)
+    ids = [i for page in pages for i in page]
+    assert len(ids) == len(set(ids)) == 30
+
+    page = build_page('camera_detections', [{'timestamp': '2024-01-01', 'detection_id': 2},
+                                            {'timestamp': None, 'detection_id': 1}], 1, 'timestamp', 'detection_id')
+    assert page.items == [{'timestamp': '2024-01-01', 'detection_id': 2}] and not page.has_more
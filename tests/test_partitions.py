@@ -0,0 +1,130 @@
+"""Tests for monthly detection partitions and retention (SQLite shards)."""
+import sqlite3
+from datetime import datetime
+
+from src.smartsafe.database.partitions import (
+    PARTITIONED_TABLES, PartitionMaintainer, add_column, apply_retention, ensure_partitions, is_partitioned,
+    list_partitions, load_company_retention, partition_table, update_rows
+)
+
+DETECTIONS = PARTITIONED_TABLES[0]
+NOW = datetime(2024, 6, 15, 12)
+
+
+def _conn():
+    conn = sqlite3.connect(':memory:')
+    conn.row_factory = sqlite3.Row
+    conn.executescript('''
+        CREATE TABLE companies (company_id TEXT PRIMARY KEY, subscription_type TEXT, compliance_settings TEXT);
+        CREATE TABLE detections (detection_id INTEGER PRIMARY KEY AUTOINCREMENT, company_id TEXT NOT NULL,
+                                 camera_id TEXT, people_detected INTEGER DEFAULT 0,
+                                 timestamp DATETIME DEFAULT CURRENT_TIMESTAMP);
+        CREATE INDEX idx_detections_company_ts ON detections(company_id, timestamp);
+    ''')
+    for month in (1, 3, 4, 5, 6):
+        for company in ('C1', 'C2'):
+            conn.execute('INSERT INTO detections (company_id, camera_id, people_detected, timestamp) '
+                         'VALUES (?, ?, ?, ?)', (company, 'CAM1', month, f'2024-{month:02d}-10 08:00:00'))
+    conn.execute("INSERT INTO detections (company_id, camera_id, timestamp) VALUES ('C1', 'CAM1', NULL)")
+    conn.commit()
+    return conn
+
+
+def _names(conn):
+    return [name for name, _ in list_partitions(conn, 'sqlite', DETECTIONS)]
+
+
+def test_conversion_keeps_rows_and_routes_writes_through_view():
+    conn = _conn()
+    before = [tuple(row) for row in conn.execute('SELECT * FROM detections ORDER BY detection_id')]
+
+    assert partition_table(conn, 'sqlite', DETECTIONS, now=NOW, months_ahead=1) == 7
+    assert is_partitioned(conn, 'sqlite', 'detections') is True
+    assert _names(conn)[:2] == ['detections_pdefault', 'detections_p202401']
+    assert _names(conn)[-1] == 'detections_p202407'
+    assert [tuple(row) for row in conn.execute('SELECT * FROM detections ORDER BY detection_id')] == before
+    assert conn.execute('SELECT COUNT(*) FROM detections_pdefault').fetchone()[0] == 1
+
+    # Varsayılanlar uygulanır, id'ler shard'lar arasında tekil kalır
+    conn.execute("INSERT INTO detections (company_id, timestamp) VALUES ('C1', '2024-06-20 10:00:00')")
+    conn.execute("INSERT INTO detections (company_id, timestamp) VALUES ('C2', '2023-01-01 10:00:00')")
+    row = conn.execute("SELECT * FROM detections_p202406 WHERE timestamp = '2024-06-20 10:00:00'").fetchone()
+    assert row['people_detected'] == 0 and row['detection_id'] == len(before) + 1
+    assert conn.execute("SELECT detection_id FROM detections_pdefault WHERE company_id = 'C2'").fetchone()[0] \
+        == len(before) + 2
+
+    conn.execute("UPDATE detections SET people_detected = 9 WHERE detection_id = 1")
+    conn.execute("DELETE FROM detections WHERE detection_id = 2")
+    assert conn.execute('SELECT people_detected FROM detections_p202401 WHERE detection_id = 1').fetchone()[0] == 9
+    assert conn.execute('SELECT COUNT(*) FROM detections WHERE detection_id = 2').fetchone()[0] == 0
+
+
+def test_future_partition_moves_rows_out_of_default():
+    conn = _conn()
+    partition_table(conn, 'sqlite', DETECTIONS, now=NOW, months_ahead=0)
+    conn.execute("INSERT INTO detections (company_id, timestamp) VALUES ('C1', '2024-07-02 09:00:00')")
+    assert conn.execute('SELECT COUNT(*) FROM detections_pdefault').fetchone()[0] == 2
+
+    assert ensure_partitions(conn, 'sqlite', DETECTIONS, now=datetime(2024, 7, 1), months_ahead=1) == [
+        'detections_p202407', 'detections_p202408']
+    assert conn.execute('SELECT COUNT(*) FROM detections_p202407').fetchone()[0] == 1
+    assert conn.execute('SELECT COUNT(*) FROM detections_pdefault').fetchone()[0] == 1
+    conn.execute("INSERT INTO detections (company_id, timestamp) VALUES ('C1', '2024-08-02 09:00:00')")
+    assert conn.execute('SELECT COUNT(*) FROM detections_p202408').fetchone()[0] == 1
+    assert ensure_partitions(conn, 'sqlite', DETECTIONS, now=datetime(2024, 7, 1), months_ahead=1) == []
+
+
+def test_retention_drops_whole_months_and_purges_expired_companies():
+    conn = _conn()
+    conn.execute("INSERT INTO companies VALUES ('C1', 'enterprise', NULL)")
+    conn.execute("INSERT INTO companies VALUES ('C2', 'starter', '{\"retention_days\": 60}')")
+    conn.commit()
+    partition_table(conn, 'sqlite', DETECTIONS, now=NOW, months_ahead=0)
+    company_days = load_company_retention(conn, 'sqlite')
+    assert company_days == {'C1': 730, 'C2': 60}
+
+    # Watermark yoksa rollup'a girmemiş ham veri silinmez
+    assert apply_retention(conn, 'sqlite', DETECTIONS, company_days, now=NOW) == {'dropped': [], 'purged': {}}
+
+    result = apply_retention(conn, 'sqlite', DETECTIONS, {'C1': 100, 'C2': 60}, default_days=100,
+                             now=NOW, watermark=datetime(2024, 5, 1))
+    assert result['dropped'] == ['detections_p202401', 'detections_p202402']
+    assert result['purged'] == {'detections_p202403': 1}
+    assert 'detections_p202401' not in _names(conn)
+    counts = dict(conn.execute('SELECT company_id, COUNT(*) FROM detections GROUP BY company_id').fetchall())
+    # C1: Mart-Haziran + NULL zamanlı satır; C2: Mart satırı 60 günü doldurdu
+    assert counts == {'C1': 5, 'C2': 3}
+    conn.execute("INSERT INTO detections (company_id, timestamp) VALUES ('C1', '2024-06-21 10:00:00')")
+    assert conn.execute('SELECT COUNT(*) FROM detections_p202406').fetchone()[0] == 3
+
+
+def test_schema_evolution_alters_every_shard_and_backfills_directly():
+    conn = _conn()
+    partition_table(conn, 'sqlite', DETECTIONS, now=NOW, months_ahead=0)
+
+    assert add_column(conn, 'sqlite', 'detections', 'total_people', 'INTEGER DEFAULT 0')
+    assert not add_column(conn, 'sqlite', 'detections', 'total_people', 'INTEGER DEFAULT 0')
+    for name in _names(conn):
+        assert 'total_people' in [row[1] for row in conn.execute(f'PRAGMA table_info({name})')]
+    conn.execute("INSERT INTO detections (company_id, timestamp) VALUES ('C1', '2024-06-20 10:00:00')")
+    assert conn.execute("SELECT total_people FROM detections_p202406 "
+                        "WHERE timestamp = '2024-06-20 10:00:00'").fetchone()[0] == 0
+
+    assert update_rows(conn, 'sqlite', 'detections', 'total_people = people_detected',
+                       'people_detected > ?', (3,)) == 6
+    assert conn.execute('SELECT SUM(total_people) FROM detections').fetchone()[0] == 2 * (4 + 5 + 6)
+    ensure_partitions(conn, 'sqlite', DETECTIONS, now=datetime(2024, 7, 1), months_ahead=0)
+    assert 'total_people' in [row[1] for row in conn.execute('PRAGMA table_info(detections_p202407)')]
+
+
+def test_maintainer_keeps_data_unless_retention_is_enabled():
+    conn = _conn()
+    conn.execute("INSERT INTO companies VALUES ('C1', 'trial', NULL)")
+    conn.commit()
+    provider = lambda: (lambda: conn, lambda c: None, 'sqlite')
+    maintainer = PartitionMaintainer(tables=(DETECTIONS,), months_ahead=0,
+                                     connection_provider=provider, clock=lambda: NOW, retention=False)
+    maintainer.run_once()
+    assert is_partitioned(conn, 'sqlite', 'detections') is True
+    assert maintainer.stats()['errors'] == 0 and maintainer.stats()['partitions_dropped'] == 0
+    assert conn.execute('SELECT COUNT(*) FROM detections').fetchone()[0] == 11
@@ -0,0 +1,109 @@
+"""Tests for the thread-safe PostgreSQL connection pool (fake connections)."""
+import threading
+import time
+
+import pytest
+
+from src.smartsafe.database.pg_pool import PoolTimeout, PostgresConnectionPool
+
+
+class _Cursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def execute(self, sql, params=None):
+        if self.conn.broken:
+            raise RuntimeError('server closed the connection unexpectedly')
+
+    def fetchone(self):
+        return (1,)
+
+    def close(self):
+        pass
+
+
+class _Conn:
+    def __init__(self):
+        self.closed = 0
+        self.broken = False
+        self.autocommit = False
+        self.rollbacks = 0
+
+    def cursor(self):
+        return _Cursor(self)
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def close(self):
+        self.closed = 1
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _pool(**kwargs):
+    opened = []
+
+    def connect():
+        conn = _Conn()
+        opened.append(conn)
+        return conn
+
+    return PostgresConnectionPool(connect, **kwargs), opened
+
+
+def test_close_returns_connection_and_context_manager_always_releases():
+    pool, opened = _pool(min_size=1, max_size=2)
+    assert len(opened) == 1
+
+    conn = pool.acquire()
+    conn.close()
+    with pytest.raises(ValueError):
+        with pool.connection() as conn:
+            assert pool.stats()['in_use'] == 1
+            raise ValueError('boom')
+    stats = pool.stats()
+    assert (stats['in_use'], stats['idle'], stats['connections_created']) == (0, 1, 1)
+    assert opened[0].rollbacks >= 2
+
+
+def test_exhausted_pool_blocks_then_times_out():
+    pool, opened = _pool(min_size=0, max_size=1, acquire_timeout=0.05)
+    held = pool.acquire()
+    with pytest.raises(PoolTimeout):
+        pool.acquire()
+    assert pool.stats()['timeouts'] == 1
+
+    got = []
+    waiter = threading.Thread(target=lambda: got.append(pool.acquire(timeout=2)))
+    waiter.start()
+    time.sleep(0.05)
+    assert pool.stats()['waiters'] == 1
+    held.close()
+    waiter.join(2)
+    assert got and got[0].raw_connection is opened[0]
+    assert len(opened) == 1 and pool.stats()['acquires'] == 2
+
+
+def test_unhealthy_and_expired_connections_are_replaced():
+    clock = _Clock()
+    pool, opened = _pool(min_size=1, max_size=2, max_lifetime=100, health_check_idle=5, clock=clock)
+
+    opened[0].broken = True
+    clock.now += 10
+    conn = pool.acquire()
+    assert conn.raw_connection is opened[1] and opened[0].closed
+    conn.close()
+
+    clock.now += 200
+    conn = pool.acquire()
+    assert conn.raw_connection is opened[2]
+    conn.close()
+    assert pool.stats()['connections_discarded'] == 2
+    assert sum(count for _, count in pool.stats()['wait_buckets']) == 2
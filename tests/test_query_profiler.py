@@ -0,0 +1,107 @@
+"""Tests for the SQL query profiler (fingerprints, wrapped cursors, slow log, N+1 detection)."""
+import sqlite3
+
+from src.smartsafe.database import query_profiler
+from src.smartsafe.database.query_profiler import (
+    ProfiledConnection, QueryProfiler, fingerprint, normalize_sql
+)
+
+
+def _db(profiler):
+    raw = sqlite3.connect(':memory:')
+    raw.execute('CREATE TABLE cameras (camera_id TEXT PRIMARY KEY, company_id TEXT, name TEXT)')
+    raw.executemany('INSERT INTO cameras VALUES (?, ?, ?)', [(f'CAM{i}', 'C1', f'Cam {i}') for i in range(20)])
+    return ProfiledConnection(raw, profiler, 'sqlite')
+
+
+def test_fingerprint_ignores_literals_placeholders_and_list_lengths():
+    assert normalize_sql("SELECT * FROM cameras  WHERE company_id = 'C1' AND id IN (1, 2, 3) -- note") == \
+        'SELECT * FROM cameras WHERE company_id = ? AND id IN (?)'
+    assert fingerprint('SELECT * FROM cameras WHERE company_id = %s AND id IN (%s, %s)') == \
+        fingerprint("SELECT * FROM cameras WHERE company_id = 'C2' AND id IN (7)")
+    assert fingerprint('INSERT INTO t (a, b) VALUES (?, ?), (?, ?), (?, ?)') == \
+        fingerprint('INSERT INTO t (a, b) VALUES (%s, %s)')
+    assert fingerprint('SELECT * FROM detections_p202403') != fingerprint('SELECT * FROM detections_p202404')
+
+
+def test_fingerprint_is_computed_once_per_raw_statement():
+    query_profiler._normalized_memo.cache_clear()
+    sql = 'SELECT name FROM cameras WHERE company_id = ?'
+    for _ in range(50):
+        fingerprint(sql)
+    info = query_profiler._normalized_memo.cache_info()
+    assert (info.misses, info.hits) == (1, 49)
+    # Çok uzun ifadeler LRU'ya girmez
+    fingerprint('SELECT 1 WHERE ' + ' OR '.join(['a = ?'] * 2000))
+    assert query_profiler._normalized_memo.cache_info().currsize == 1
+
+
+def test_wrapped_cursor_records_time_rows_and_slow_queries_with_plan():
+    profiler = QueryProfiler(slow_ms=0, explain_slow=True)
+    conn = _db(profiler)
+    cursor = conn.cursor()
+    cursor.execute('SELECT camera_id FROM cameras WHERE company_id = ?', ('C1',))
+    assert len(cursor.fetchall()) == 20
+    cursor.execute('SELECT name FROM cameras WHERE camera_id = ?', ('CAM3',))
+    assert cursor.fetchone() == ('Cam 3',)
+    cursor.close()
+    conn.execute("UPDATE cameras SET name = 'x' WHERE company_id = ?", ('C1',))
+
+    stats = profiler.stats(sort='rows')
+    assert stats['total_queries'] == 3
+    by_sql = {query['sql']: query for query in stats['queries']}
+    assert by_sql['SELECT camera_id FROM cameras WHERE company_id = ?']['rows'] == 20
+    assert by_sql['SELECT name FROM cameras WHERE camera_id = ?']['rows'] == 1
+    assert by_sql['UPDATE cameras SET name = ? WHERE company_id = ?']['rows'] == 20
+    assert stats['queries'][0]['rows'] == 20 and stats['queries'][0]['p95_ms'] >= 0
+
+    # Yavaş okumalarda plan otomatik eklenir, yazmalarda sadece istek üzerine
+    slow = {entry['sql']: entry for entry in stats['slow_log']}
+    assert any('camera_id' in line for line in slow['SELECT name FROM cameras WHERE camera_id = ?']['plan'])
+    assert slow['UPDATE cameras SET name = ? WHERE company_id = ?']['plan'] is None
+    fp = fingerprint('SELECT name FROM cameras WHERE camera_id = ?')
+    assert profiler.explain(fp, conn._conn)['plan']
+
+
+def test_repeated_statement_in_one_request_is_flagged_as_n_plus_one():
+    profiler = QueryProfiler(n_plus_one_threshold=10)
+    conn = _db(profiler)
+
+    token = profiler.begin_request('GET report.company_cameras')
+    cursor = conn.cursor()
+    cursor.execute('SELECT camera_id FROM cameras WHERE company_id = ?', ('C1',))
+    for row in cursor.fetchall():
+        conn.execute('SELECT name FROM cameras WHERE camera_id = ?', row).fetchone()
+    offenders = profiler.end_request(token)
+
+    assert [(entry['count'], entry['request']) for entry in offenders] == [(20, 'GET report.company_cameras')]
+    assert offenders[0]['sql'] == 'SELECT name FROM cameras WHERE camera_id = ?'
+    stats = profiler.stats()
+    assert stats['n_plus_one'][0]['fingerprint'] == offenders[0]['fingerprint']
+    assert {query['sql']: query['n_plus_one'] for query in stats['queries']} == {
+        'SELECT name FROM cameras WHERE camera_id = ?': 1,
+        'SELECT camera_id FROM cameras WHERE company_id = ?': 0,
+    }
+
+    # Kapsam dışı sorgular N+1 sayımına girmez
+    assert profiler.end_request(profiler.begin_request('GET other')) == []
+
+
+def test_fetchone_loops_count_every_row_and_gc_never_takes_the_lock():
+    profiler = QueryProfiler()
+    conn = _db(profiler)
+    cursor = conn.cursor()
+    cursor.execute('SELECT camera_id FROM cameras')
+    seen = 0
+    while cursor.fetchone() is not None:
+        seen += 1
+    assert seen == 20 and profiler.stats()['queries'][0]['rows'] == 20
+
+    # Kilit tutulurken çöp toplanan cursor beklemez; ölçüm sonraki raporda işlenir
+    conn.execute('SELECT name FROM cameras WHERE camera_id = ?', ('CAM1',)).fetchone()
+    profiler._lock.acquire()
+    try:
+        conn.cursor().execute('SELECT name FROM cameras WHERE company_id = ?', ('C1',))
+    finally:
+        profiler._lock.release()
+    assert profiler.stats()['total_queries'] == 3
@@ -0,0 +1,104 @@
+"""Tests for read-replica routing (two SQLite files standing in for primary and replica)."""
+import shutil
+import sqlite3
+from datetime import datetime, timedelta
+
+from src.smartsafe.database.read_routing import (
+    ReadRouter, Replica, begin_read_scope, end_read_scope, note_write
+)
+
+
+class _Clock:
+    def __init__(self):
+        self.now = datetime(2024, 5, 1, 12, 0, 0)
+
+    def __call__(self):
+        return self.now
+
+
+def _router(tmp_path, clock, names=('replica1',), **kwargs):
+    primary = str(tmp_path / 'primary.db')
+    replicas = []
+    for name in names:
+        path = str(tmp_path / f'{name}.db')
+        sqlite3.connect(path).close()
+        replicas.append(Replica(name, lambda path=path: sqlite3.connect(path)))
+    router = ReadRouter(replicas, 'sqlite', primary_write_connection=lambda: sqlite3.connect(primary),
+                        clock=clock, **kwargs)
+    return router, primary
+
+
+def _replicate(primary, tmp_path, names=('replica1',)):
+    for name in names:
+        shutil.copyfile(primary, str(tmp_path / f'{name}.db'))
+
+
+def test_lagging_or_unreplicated_replica_falls_back_to_primary(tmp_path):
+    clock = _Clock()
+    router, primary = _router(tmp_path, clock, max_lag_seconds=5)
+
+    router.check_replicas()  # heartbeat replica'ya henüz ulaşmadı
+    assert router.replicas[0].healthy is False
+    assert router.connection(lambda: 'primary') == 'primary'
+    assert router.stats()['fallbacks'] == 1
+
+    _replicate(primary, tmp_path)
+    router.check_replicas()
+    assert router.replicas[0].lag_seconds == 0.0
+    conn = router.connection(lambda: 'primary')
+    assert conn != 'primary'
+    conn.close()
+
+    clock.now += timedelta(seconds=30)  # primary ilerliyor, replica geride kalıyor
+    router.check_replicas()
+    assert router.replicas[0].lag_seconds >= 30
+    assert router.connection(lambda: 'primary') == 'primary'
+    assert router.stats()['replicas']['replica1']['reads'] == 1
+
+
+def test_eligible_replicas_are_used_round_robin(tmp_path):
+    clock = _Clock()
+    names = ('replica1', 'replica2')
+    router, primary = _router(tmp_path, clock, names=names)
+    router.check_replicas()
+    _replicate(primary, tmp_path, names)
+    router.check_replicas()
+
+    for _ in range(4):
+        router.connection(lambda: 'primary').close()
+    stats = router.stats()
+    assert [stats['replicas'][name]['reads'] for name in names] == [2, 2]
+    assert stats['replica_reads'] == 4 and stats['primary_reads'] == 0
+
+
+def test_reads_stick_to_primary_after_a_write(tmp_path):
+    clock = _Clock()
+    router, primary = _router(tmp_path, clock, sticky_seconds=60)
+    router.check_replicas()
+    _replicate(primary, tmp_path)
+    router.check_replicas()
+
+    token = begin_read_scope('session-a', write=True)
+    try:
+        assert router.connection(lambda: 'primary') == 'primary'
+    finally:
+        end_read_scope(token)
+
+    # Aynı oturumun sonraki GET isteği hâlâ sticky penceresinde
+    token = begin_read_scope('session-a')
+    try:
+        assert router.connection(lambda: 'primary') == 'primary'
+    finally:
+        end_read_scope(token)
+
+    # Başka oturum replica'dan okur; yazma yapınca kendi isteği içinde primary'ye geçer
+    token = begin_read_scope('session-b')
+    try:
+        conn = router.connection(lambda: 'primary')
+        assert conn != 'primary'
+        conn.close()
+        note_write()
+        assert router.connection(lambda: 'primary') == 'primary'
+    finally:
+        end_read_scope(token)
+    assert router.stats()['sticky_reads'] == 3
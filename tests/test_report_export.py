@@ -0,0 +1,101 @@
+"""Tests for streaming report exports and background export jobs (SQLite)."""
+import csv
+import io
+import json
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+import pytest
+
+from src.smartsafe.services.report_export import (
+    FORMAT_CSV, FORMAT_NDJSON, JOB_COMPLETED, JOB_FAILED, JOB_QUEUED, PYARROW_AVAILABLE, ExportJobManager,
+    ExportQueueFull, resolve_dataset, stream_export
+)
+
+
+def _conn(path=':memory:'):
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.executescript('''
+        CREATE TABLE IF NOT EXISTS violations (violation_id INTEGER PRIMARY KEY, company_id TEXT, camera_id TEXT,
+                                               worker_id TEXT, missing_ppe TEXT, violation_type TEXT,
+                                               confidence REAL, timestamp DATETIME);
+    ''')
+    for i in range(25):
+        conn.execute('INSERT INTO violations (company_id, camera_id, missing_ppe, violation_type, confidence, '
+                     'timestamp) VALUES (?, ?, ?, ?, ?, ?)',
+                     ('C1' if i % 5 else 'C2', f'CAM{i % 3}', 'helmet, "vest"', 'ppe', 0.5,
+                      f'2024-03-{1 + i:02d} 10:00:00'))
+    conn.commit()
+    return conn
+
+
+def test_csv_stream_is_chunked_and_filtered():
+    conn = _conn()
+    chunks = list(stream_export(conn, 'sqlite', resolve_dataset('violations'), 'C1', FORMAT_CSV,
+                                since=datetime(2024, 3, 5), until=datetime(2024, 3, 20), chunk_size=4))
+    rows = list(csv.reader(io.StringIO(b''.join(chunks).decode('utf-8'))))
+    assert rows[0][0] == 'violation_id' and rows[0][-1] == 'timestamp'
+    # 5..19 Mart arası, C2'nin satırları hariç (her 5. satır)
+    assert len(rows) - 1 == 12
+    assert len(chunks) == 3
+    assert rows[1][3] == 'helmet, "vest"'
+    assert [row[-1] for row in rows[1:]] == sorted(row[-1] for row in rows[1:])
+
+
+def test_ndjson_stream_and_empty_export():
+    conn = _conn()
+    lines = b''.join(stream_export(conn, 'sqlite', resolve_dataset('violations'), 'C2', FORMAT_NDJSON)).splitlines()
+    records = [json.loads(line) for line in lines]
+    assert len(records) == 5 and records[0]['camera_id'] == 'CAM0'
+    assert b''.join(stream_export(conn, 'sqlite', resolve_dataset('violations'), 'C9', FORMAT_NDJSON)) == b''
+    assert b''.join(stream_export(conn, 'sqlite', resolve_dataset('violations'), 'C9', FORMAT_CSV)).count(b'\n') == 1
+    with pytest.raises(ValueError):
+        resolve_dataset('users')
+
+
+def test_background_job_writes_file_and_reports_progress(tmp_path):
+    conn = _conn(str(tmp_path / 'db.sqlite'))
+    manager = ExportJobManager(export_dir=str(tmp_path / 'exports'), chunk_size=7,
+                               connection_provider=lambda: (lambda: conn, lambda c: None, 'sqlite'))
+    job = manager.submit('C1', 'violations', FORMAT_CSV, wait=True)
+    assert job.status == JOB_COMPLETED
+    progress = manager.get('C1', job.job_id).progress()
+    assert (progress['rows_total'], progress['rows_written'], progress['percent']) == (20, 20, 100.0)
+    with open(job.path, encoding='utf-8') as handle:
+        assert len(handle.read().splitlines()) == 21
+    assert manager.get('C2', job.job_id) is None
+
+    conn.execute('DROP TABLE violations')
+    failed = manager.submit('C1', 'violations', FORMAT_NDJSON, wait=True)
+    assert failed.status == JOB_FAILED and 'violations' in failed.error
+    assert manager.stats()['jobs_completed'] == 1 and manager.stats()['jobs_failed'] == 1
+    if not PYARROW_AVAILABLE:
+        with pytest.raises(ValueError):
+            manager.submit('C1', 'violations', 'parquet')
+
+
+def test_jobs_run_on_a_bounded_pool_and_excess_pending_jobs_are_rejected(tmp_path):
+    conn = _conn(str(tmp_path / 'db.sqlite'))
+    gate = threading.Event()
+
+    def get_connection():
+        gate.wait(5)
+        return conn
+
+    manager = ExportJobManager(export_dir=str(tmp_path / 'exports'), max_workers=1, max_pending=1,
+                               connection_provider=lambda: (get_connection, lambda c: None, 'sqlite'))
+    running = manager.submit('C1', 'violations', FORMAT_CSV)
+    deadline = time.time() + 5
+    while running.status == JOB_QUEUED and time.time() < deadline:
+        time.sleep(0.01)
+    queued = manager.submit('C1', 'violations', FORMAT_CSV)
+    with pytest.raises(ExportQueueFull):
+        manager.submit('C1', 'violations', FORMAT_CSV)
+    assert queued.status == JOB_QUEUED and manager.stats()['jobs_rejected'] == 1
+
+    gate.set()
+    while manager.stats()['jobs_completed'] < 2 and time.time() < deadline:
+        time.sleep(0.01)
+    assert running.status == queued.status == JOB_COMPLETED
@@ -0,0 +1,81 @@
+"""Tests for the bounded response cache (LRU/TTL bounds, tenant invalidation, single-flight)."""
+import threading
+import time
+
+import pytest
+
+from src.smartsafe.services.response_cache import ResponseCache
+
+
+def test_ttl_expiry_and_lru_bounds():
+    now = [0.0]
+    cache = ResponseCache(max_entries=2, default_ttl=10, clock=lambda: now[0])
+    cache.put('C1', 'stats', {'v': 1})
+    cache.put('C1', 'chart', {'v': 2}, ttl=1)
+    assert cache.get('C1', 'stats') == {'v': 1}  # stats en son kullanılan
+    cache.put('C2', 'stats', {'v': 3})
+    assert cache.get('C1', 'chart') is None and cache.stats()['evictions'] == 1
+    now[0] = 11
+    assert cache.get('C2', 'stats') == {'v': 3}  # stats anahtarının varsayılan TTL'i 15 sn
+    cache.put('C2', 'other', {'v': 4})
+    now[0] = 16
+    assert cache.get('C2', 'stats') is None and cache.stats()['expirations'] == 1
+
+    small = ResponseCache(max_bytes=500)
+    for key in 'abcde':
+        small.put('C1', key, key * 110)
+    assert small.get('C1', 'a') is None and small.get('C1', 'b') is not None
+    assert small.stats()['bytes'] == 4 * 112
+    assert not small.put('C1', 'big', 'z' * 200) and small.stats()['oversized'] == 1
+
+
+def test_invalidate_is_per_tenant_and_drops_inflight_results():
+    cache = ResponseCache()
+    cache.put('C1', 'stats', 1)
+    cache.put('C1', 'subscription', 2)
+    cache.put('C2', 'stats', 3)
+    cache.invalidate('C1', 'stats')
+    assert cache.get('C1', 'stats') is None and cache.get('C1', 'subscription') == 2
+    cache.invalidate('C1')
+    assert cache.get('C1', 'subscription') is None and cache.get('C2', 'stats') == 3
+
+    def compute():
+        cache.invalidate('C1')  # Hesaplama sürerken yazma oldu
+        return {'stale': True}
+    assert cache.get_or_compute('C1', 'stats', compute) == {'stale': True}
+    assert cache.get('C1', 'stats') is None
+
+    assert cache.get_or_compute('C1', 'sub', lambda: {'success': False},
+                                cache_if=lambda value: value['success']) == {'success': False}
+    assert cache.get('C1', 'sub') is None
+
+
+def test_single_flight_computes_once_for_concurrent_misses():
+    cache = ResponseCache()
+    calls = []
+    release = threading.Event()
+
+    def compute():
+        calls.append(1)
+        release.wait(2)
+        return {'rows': 42}
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_compute('C1', 'chart', compute)))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    deadline = time.monotonic() + 2
+    while cache.stats()['coalesced'] < 7 and time.monotonic() < deadline:
+        time.sleep(0.005)
+    release.set()
+    for thread in threads:
+        thread.join(2)
+    assert len(calls) == 1 and results == [{'rows': 42}] * 8
+    assert cache.stats()['coalesced'] == 7
+
+    def failing():
+        raise RuntimeError('db down')
+    with pytest.raises(RuntimeError):
+        cache.get_or_compute('C1', 'broken', failing)
+    assert cache.stats()['in_flight'] == 0
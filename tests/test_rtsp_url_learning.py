@@ -0,0 +1,74 @@
+"""Tests for per-DVR RTSP URL pattern learning."""
+import threading
+import time
+
+from src.smartsafe.integrations.dvr.rtsp_url_learning import (
+    RTSPPatternCache, brand_from_url, probe_in_priority, render_pattern, url_to_pattern
+)
+
+IP, USER, PASSWORD, PORT = '192.168.1.50', 'admin', 'p{a}ss', 554
+
+
+def test_learned_pattern_renders_other_channels():
+    cases = [
+        (f"rtsp://{IP}:{PORT}/user={USER}&password={PASSWORD}&channel=3&stream=0.sdp",
+         f"rtsp://{IP}:{PORT}/user={USER}&password={PASSWORD}&channel=12&stream=0.sdp", 'xm'),
+        (f"rtsp://{USER}:{PASSWORD}@{IP}:{PORT}/cam/realmonitor?channel=3&subtype=0",
+         f"rtsp://{USER}:{PASSWORD}@{IP}:{PORT}/cam/realmonitor?channel=12&subtype=0", 'dahua'),
+        (f"rtsp://{USER}:{PASSWORD}@{IP}:{PORT}/ISAPI/Streaming/channels/301",
+         f"rtsp://{USER}:{PASSWORD}@{IP}:{PORT}/ISAPI/Streaming/channels/1201", 'hikvision'),
+        (f"rtsp://{USER}:{PASSWORD}@{IP}:{PORT}/ch03/main",
+         f"rtsp://{USER}:{PASSWORD}@{IP}:{PORT}/ch12/main", 'generic'),
+    ]
+    for url, expected, brand in cases:
+        pattern = url_to_pattern(url, IP, USER, PASSWORD, PORT, 3)
+        assert pattern is not None
+        assert PASSWORD not in pattern  # Kimlik bilgisi kalıpta saklanmaz
+        assert render_pattern(pattern, IP, USER, PASSWORD, PORT, 12) == expected
+        assert brand_from_url(url) == brand
+
+
+def test_foreign_url_is_not_learned():
+    # Gateway gibi DVR dışı bir adres kanal kalıbı olarak öğrenilmez
+    assert url_to_pattern("rtsp://10.0.0.1:8554/dvr1/ch03", IP, USER, PASSWORD, PORT, 3) is None
+
+
+def test_probe_prefers_priority_over_speed():
+    delays = {'main': 0.2, 'sub': 0.01, 'broken': 0.01}
+    closed = []
+
+    def opener(url):
+        time.sleep(delays[url])
+        return None if url == 'broken' else url
+
+    started = time.time()
+    url, resource = probe_in_priority(['broken', 'main', 'sub'], opener, closed.append)
+    elapsed = time.time() - started
+
+    assert (url, resource) == ('main', 'main')
+    assert closed == ['sub']  # Kazanamayan açık bağlantı kapatılır
+    assert elapsed < 0.2 + 0.15  # Sıralı deneme değil (en yavaş öncelikli aday kadar)
+
+
+def test_probe_returns_none_when_nothing_opens():
+    calls = []
+    lock = threading.Lock()
+
+    def opener(url):
+        with lock:
+            calls.append(url)
+        return None
+
+    assert probe_in_priority(['a', 'b', 'c'], opener) == (None, None)
+    assert sorted(calls) == ['a', 'b', 'c']
+
+
+def test_pattern_cache_is_scoped_per_company_and_dvr():
+    cache = RTSPPatternCache()
+    cache.remember(IP, PORT, brand='dahua', pattern='p1', company_id='C1', dvr_id='D1')
+    cache.remember(IP, PORT, pattern='p2', company_id='C2', dvr_id='D9')
+    cache.remember(IP, PORT, brand='xm', company_id='C1', dvr_id='D1')
+
+    assert cache.get(IP, PORT, 'C1', 'D1') == {'brand': 'xm', 'pattern': 'p1'}
+    assert cache.get(IP, PORT, 'C2', 'D9') == {'pattern': 'p2'}
+    assert cache.get(IP, PORT) is None and cache.get(IP, PORT, 'C2', 'D1') is None
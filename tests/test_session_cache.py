@@ -0,0 +1,64 @@
+"""Tests for the in-process session validation cache."""
+from src.smartsafe.services.session_cache import SessionCache
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _context(user_id='U1', company_id='C1'):
+    return {'user_id': user_id, 'company_id': company_id, 'username': 'admin', 'permissions': []}
+
+
+def test_hit_miss_and_ttl_expiry():
+    clock = _Clock()
+    cache = SessionCache(ttl_seconds=30, clock=clock)
+
+    assert cache.get('S1') is None
+    cache.put('S1', _context())
+    assert cache.get('S1')['user_id'] == 'U1'
+
+    clock.now += 31
+    assert cache.get('S1') is None
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['size']) == (1, 2, 0)
+    assert stats['hit_ratio'] == round(1 / 3, 4)
+
+
+def test_lru_eviction_keeps_recently_used():
+    cache = SessionCache(max_entries=2)
+    cache.put('S1', _context('U1'))
+    cache.put('S2', _context('U2'))
+    cache.get('S1')
+    cache.put('S3', _context('U3'))
+
+    assert cache.get('S2') is None
+    assert cache.get('S1') is not None
+    assert cache.stats()['evictions'] == 1
+
+
+def test_invalidation_by_session_user_and_company():
+    cache = SessionCache()
+    cache.put('S1', _context('U1', 'C1'))
+    cache.put('S2', _context('U2', 'C1'))
+    cache.put('S3', _context('U3', 'C2'))
+    cache.put('S4', _context('U4', 'C2'))
+
+    assert cache.invalidate_session('S4') == 1
+    assert cache.invalidate_user('U3') == 1
+    assert cache.invalidate_company('C1') == 2
+    assert cache.stats()['size'] == 0
+
+
+def test_stale_result_is_not_cached_after_concurrent_invalidation():
+    cache = SessionCache()
+    generation = cache.generation
+    # DB sorgusu sürerken kullanıcı silindi
+    cache.invalidate_user('U1')
+    cache.put('S1', _context('U1'), generation=generation)
+
+    assert cache.get('S1') is None
@@ -0,0 +1,98 @@
+"""Tests for the async snapshot poller against a local HTTP server."""
+import asyncio
+import threading
+import time
+
+import pytest
+
+np = pytest.importorskip('numpy')
+web = pytest.importorskip('aiohttp.web')
+
+from src.smartsafe.services.frame_ring import get_frame_ring_registry
+from src.smartsafe.services.snapshot_poller import SnapshotPoller
+
+
+def _fake_decoder(body):
+    return np.frombuffer(body, np.uint8).reshape(1, -1, 1).copy()
+
+
+@pytest.fixture
+def snapshot_server():
+    """/shot.jpg 200 döner, diğer path'ler 404; istek sayıları tutulur"""
+    hits = {'shot': 0, 'missing': 0}
+    loop = asyncio.new_event_loop()
+    started = threading.Event()
+    state = {}
+
+    async def shot(request):
+        hits['shot'] += 1
+        return web.Response(body=bytes(range(200)), content_type='image/jpeg')
+
+    async def missing(request):
+        hits['missing'] += 1
+        return web.Response(status=404)
+
+    async def start():
+        app = web.Application()
+        app.router.add_get('/shot.jpg', shot)
+        app.router.add_get('/photo.jpg', missing)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, '127.0.0.1', 0)
+        await site.start()
+        state['runner'] = runner
+        state['port'] = runner.addresses[0][1]
+        started.set()
+
+    thread = threading.Thread(target=lambda: (loop.run_until_complete(start()), loop.run_forever()), daemon=True)
+    thread.start()
+    started.wait(5)
+    yield f"http://127.0.0.1:{state['port']}", hits
+    asyncio.run_coroutine_threadsafe(state['runner'].cleanup(), loop).result(5)
+    loop.call_soon_threadsafe(loop.stop)
+
+
+def _wait_for(predicate, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def test_poller_finds_working_url_and_feeds_ring(snapshot_server):
+    base, hits = snapshot_server
+    poller = SnapshotPoller(decoder=_fake_decoder)
+    try:
+        assert poller.subscribe('cam_poll', [f"{base}/photo.jpg", f"{base}/shot.jpg"], interval=0.02)
+        registry = get_frame_ring_registry()
+        assert _wait_for(lambda: registry.get('cam_poll') is not None and registry.get('cam_poll').latest_seq >= 3)
+
+        assert poller.get_working_url('cam_poll') == f"{base}/shot.jpg"
+        # Çalışan URL bulunduktan sonra 404 veren aday tekrar denenmez
+        assert hits['missing'] == 1
+
+        view = registry.get('cam_poll').acquire_latest()
+        assert view.frame.shape == (1, 200, 1)
+        view.release()
+    finally:
+        poller.unsubscribe('cam_poll')
+        assert _wait_for(lambda: not poller.is_polling('cam_poll') and get_frame_ring_registry().get('cam_poll') is None)
+        poller.shutdown()
+
+
+def test_subscribers_share_one_poll(snapshot_server):
+    base, _ = snapshot_server
+    poller = SnapshotPoller(decoder=_fake_decoder)
+    try:
+        assert poller.subscribe('cam_shared', [f"{base}/shot.jpg"], interval=0.02)
+        assert poller.subscribe('cam_shared', [f"{base}/shot.jpg"], interval=0.02)
+        assert poller.stats()['cameras']['cam_shared']['subscribers'] == 2
+
+        poller.unsubscribe('cam_shared')
+        assert poller.is_polling('cam_shared')
+        poller.unsubscribe('cam_shared')
+        assert not poller.is_polling('cam_shared')
+    finally:
+        poller.shutdown()
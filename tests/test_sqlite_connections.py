@@ -0,0 +1,129 @@
+"""Tests for persistent per-thread SQLite connections."""
+import sqlite3
+import threading
+
+from src.smartsafe.database.sqlite_connections import SQLiteConnectionManager
+
+
+def _manager(tmp_path):
+    manager = SQLiteConnectionManager(str(tmp_path / 'test.db'))
+    with manager.writer() as conn:
+        conn.execute('CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT)')
+    return manager
+
+
+def test_connection_is_reused_per_thread_with_wal(tmp_path):
+    manager = _manager(tmp_path)
+
+    first = manager.connection()
+    assert first.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+    assert first.execute('PRAGMA synchronous').fetchone()[0] == 1  # NORMAL
+    first.close()
+    second = manager.connection()
+    second.close()
+
+    other = []
+    thread = threading.Thread(target=lambda: other.append(manager.connection().execute('SELECT 1').fetchone()))
+    thread.start()
+    thread.join()
+
+    # writer + bu thread + diğer thread
+    assert manager.connects == 3
+    assert other[0][0] == 1
+
+
+def test_close_rolls_back_uncommitted_work_and_keeps_connection(tmp_path):
+    manager = _manager(tmp_path)
+
+    conn = manager.connection()
+    conn.execute("INSERT INTO items (name) VALUES ('lost')")
+    conn.close()
+
+    conn = manager.connection()
+    assert conn.execute('SELECT COUNT(*) FROM items').fetchone()[0] == 0
+    conn.close()
+    assert manager.connects == 2
+
+
+def test_nested_lease_does_not_roll_back_outer_transaction(tmp_path):
+    manager = _manager(tmp_path)
+
+    outer = manager.connection()
+    outer.execute("INSERT INTO items (name) VALUES ('kept')")
+    inner = manager.connection()
+    inner.execute('SELECT 1').fetchone()
+    inner.close()
+    outer.commit()
+    outer.close()
+
+    with manager.writer() as conn:
+        assert conn.execute('SELECT COUNT(*) FROM items').fetchone()[0] == 1
+
+
+def test_closed_connection_is_reopened_after_health_check(tmp_path):
+    manager = _manager(tmp_path)
+    conn = manager.connection()
+    conn.close()
+    manager.close_all()
+
+    conn = manager.connection()
+    assert conn.execute('SELECT COUNT(*) FROM items').fetchone()[0] == 0
+    conn.close()
+    assert manager.reconnects == 1
+
+
+def test_concurrent_writers_do_not_fail(tmp_path):
+    manager = _manager(tmp_path)
+    errors = []
+
+    def write(n):
+        try:
+            for i in range(50):
+                with manager.writer() as conn:
+                    conn.execute('INSERT INTO items (name) VALUES (?)', (f'{n}-{i}',))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=write, args=(n,)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    conn = manager.connection()
+    assert not errors
+    assert conn.execute('SELECT COUNT(*) FROM items').fetchone()[0] == 200
+    conn.close()
+
+
+def test_writer_lease_is_not_released_by_garbage_collection(tmp_path):
+    manager = SQLiteConnectionManager(str(tmp_path / 'leak.db'))
+    lease = manager.acquire_writer()
+    del lease
+    assert manager.stats()['writer_leaks'] == 1
+
+    # Kilit sahibi thread'de kalır; __del__ onu başka thread'den açmaya çalışmaz
+    acquired = []
+    worker = threading.Thread(target=lambda: acquired.append(manager._writer_lock.acquire(timeout=0.1)))
+    worker.start()
+    worker.join()
+    assert acquired == [False]
+
+    # Başka thread'in yazması sonsuza kadar beklemez, busy_timeout sonunda hata alır
+    manager.busy_timeout_ms = 50
+    errors = []
+
+    def write():
+        try:
+            manager.acquire_writer()
+        except sqlite3.OperationalError as e:
+            errors.append(str(e))
+
+    worker = threading.Thread(target=write)
+    worker.start()
+    worker.join(5)
+    assert errors and 'locked' in errors[0] and manager.stats()['write_timeouts'] == 1
+
+    with manager.writer() as conn:
+        conn.execute('CREATE TABLE t (x INTEGER)')
+    assert manager.stats()['writer_leaks'] == 1
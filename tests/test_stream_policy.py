@@ -0,0 +1,53 @@
+"""Tests for DVR dual-stream policy helpers."""
+from src.smartsafe.database.stream_policies import normalize_stream_policy
+from src.smartsafe.integrations.dvr.stream_policy import (
+    resolve_policy_urls, scale_bbox, split_stream_urls, stream_variant
+)
+
+AUTH = 'rtsp://admin:pw@10.0.0.5:554'
+
+
+def test_normalize_stream_policy():
+    assert normalize_stream_policy(None) == 'dual'
+    assert normalize_stream_policy('MAIN') == 'main'
+    assert normalize_stream_policy('bogus') == 'dual'
+
+
+def test_stream_variant_swaps_stream_suffix():
+    xm = 'rtsp://10.0.0.5:554/user=admin&password=pw&channel=3&stream=0.sdp'
+    assert stream_variant(xm, 'sub').endswith('&channel=3&stream=1.sdp')
+    assert stream_variant(f'{AUTH}/cam/realmonitor?channel=3&subtype=1&stream=1', 'main') == \
+        f'{AUTH}/cam/realmonitor?channel=3&subtype=0&stream=0'
+    assert stream_variant(f'{AUTH}/ISAPI/Streaming/channels/1201', 'sub') == f'{AUTH}/ISAPI/Streaming/channels/1202'
+    assert stream_variant(f'{AUTH}/ch03/sub', 'main') == f'{AUTH}/ch03/main'
+    # Tek stream'li kalıp
+    assert stream_variant(f'{AUTH}/live/ch03', 'sub') is None
+
+
+def test_split_stream_urls_keeps_candidate_order():
+    urls = split_stream_urls([
+        f'{AUTH}/ch01/sub',  # öğrenilmiş kalıp sub stream olabilir
+        f'{AUTH}/cam/realmonitor?channel=1&subtype=0',
+        f'{AUTH}/cam/realmonitor?channel=1&subtype=1',
+        f'{AUTH}/live/ch01',
+    ])
+    assert urls['main'] == [f'{AUTH}/ch01/main', f'{AUTH}/cam/realmonitor?channel=1&subtype=0', f'{AUTH}/live/ch01']
+    assert urls['sub'] == [f'{AUTH}/ch01/sub', f'{AUTH}/cam/realmonitor?channel=1&subtype=1']
+
+
+def test_resolve_policy_urls():
+    urls = split_stream_urls([f'{AUTH}/ISAPI/Streaming/channels/101'])
+    dual = resolve_policy_urls(urls, 'dual')
+    assert dual['detection'][0].endswith('/channels/102')
+    assert dual['snapshot'][0].endswith('/channels/101')
+
+    main = resolve_policy_urls(urls, 'main')
+    assert main['detection'] == urls['main']
+    assert main['snapshot'] == []
+
+
+def test_scale_bbox_sub_to_main():
+    # 640x360 substream -> 1920x1080 main stream
+    assert scale_bbox([10, 20, 100, 200], (360, 640, 3), (1080, 1920, 3)) == [30, 60, 300, 600]
+    # Frame dışına taşan koordinatlar kırpılır
+    assert scale_bbox([600, 300, 700, 400], (360, 640), (1080, 1920)) == [1800, 900, 1920, 1080]
@@ -0,0 +1,95 @@
+"""Tests for the tenant config cache and detection snapshots."""
+import json
+
+from src.smartsafe.services.tenant_cache import KIND_COMPANY_INFO, TenantConfigCache, build_snapshot
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_snapshot_is_loaded_once_until_invalidated():
+    calls = []
+
+    def loader(company_id):
+        calls.append(company_id)
+        return {'sector': 'construction',
+                'required_ppe': json.dumps({'required': ['Helmet ', 'safety_vest'], 'optional': ['gloves']}),
+                'compliance_settings': json.dumps({'confidence_threshold': 0.6, 'detection_interval': 3})}
+
+    cache = TenantConfigCache(snapshot_loader=loader)
+    first = cache.snapshot('C1')
+    for _ in range(100):
+        assert cache.snapshot('C1') is first
+    assert calls == ['C1']
+    assert first.required_ppe == ('helmet', 'safety_vest')
+    assert first.optional_ppe == ('gloves',)
+    assert (first.confidence_threshold, first.detection_interval) == (0.6, 3)
+
+    cache.invalidate('C1')
+    second = cache.snapshot('C1')
+    assert second is not first
+    assert second.version == first.version + 1
+    assert len(calls) == 2
+
+
+def test_per_kind_ttl_expiry():
+    clock = _Clock()
+    cache = TenantConfigCache(ttls={KIND_COMPANY_INFO: 10}, clock=clock)
+    loads = []
+
+    def load():
+        loads.append(1)
+        return {'company_name': 'ACME'}
+
+    assert cache.get_or_load('C1', KIND_COMPANY_INFO, load)['company_name'] == 'ACME'
+    cache.get_or_load('C1', KIND_COMPANY_INFO, load)
+    clock.now += 11
+    cache.get_or_load('C1', KIND_COMPANY_INFO, load)
+    assert len(loads) == 2
+
+
+def test_load_racing_invalidation_is_not_cached():
+    cache = TenantConfigCache()
+
+    def load():
+        # PUT isteği yükleme sırasında konfigürasyonu değiştirdi
+        cache.invalidate('C1')
+        return {'sector': 'old'}
+
+    cache.get_or_load('C1', KIND_COMPANY_INFO, load)
+    assert cache.get('C1', KIND_COMPANY_INFO) is None
+
+
+def test_snapshot_distinguishes_missing_and_empty_ppe_config():
+    assert build_snapshot('C1', 0, {'sector': 'food'}).required_ppe is None
+    assert build_snapshot('C1', 0, {'required_ppe': '[]'}).required_ppe == ()
+    assert build_snapshot('C1', 0, None).found is False
+
+
+def test_snapshot_load_failure_keeps_previous_snapshot():
+    clock = _Clock()
+    rows = [{'sector': 'construction', 'required_ppe': '["helmet"]'}]
+
+    def loader(company_id):
+        if not rows:
+            raise RuntimeError('db down')
+        return rows[0]
+
+    cache = TenantConfigCache(ttls={'snapshot': 10}, snapshot_loader=loader, clock=clock)
+    first = cache.snapshot('C1')
+
+    rows.clear()
+    clock.now += 11
+    cache.invalidate('C1')
+    assert cache.snapshot('C1') is first
+    assert cache.stats()['load_failures'] == 1
+
+    # Hiç yüklenmemiş şirket: varsayılan döner ama cache'lenmez
+    assert cache.snapshot('C2').found is False
+    rows.append({'sector': 'food'})
+    assert cache.snapshot('C2').sector == 'food'
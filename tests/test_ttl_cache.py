@@ -0,0 +1,41 @@
+"""Tests for the shared TTL/generation cache and company-wide invalidation."""
+from src.smartsafe.services import response_cache, session_cache, tenant_cache
+from src.smartsafe.services.ttl_cache import TTLCache, invalidate_company
+
+
+def test_generation_guards_put_after_invalidate_and_clear():
+    cache = TTLCache(max_entries=10)
+    generation = cache.generation('C1')
+    cache.invalidate('C2')
+    assert cache.put('C1', 'a', 1, ttl=10, generation=generation)  # Başka namespace etkilemez
+
+    cache.invalidate('C1', lambda key, _: key == 'a')
+    assert not cache.put('C1', 'a', 2, ttl=10, generation=generation)
+    assert cache.get('C1', 'a') is None
+
+    generation = cache.generation('C1')
+    cache.clear()
+    assert not cache.put('C1', 'a', 3, ttl=10, generation=generation)
+    assert cache.put('C1', 'a', 3, ttl=10, generation=cache.generation('C1'))
+
+
+def test_invalidate_company_clears_all_three_caches(monkeypatch):
+    sessions = session_cache.SessionCache()
+    tenants = tenant_cache.TenantConfigCache()
+    responses = response_cache.ResponseCache()
+    monkeypatch.setattr(session_cache, '_session_cache', sessions)
+    monkeypatch.setattr(tenant_cache, '_tenant_config_cache', tenants)
+    monkeypatch.setattr(response_cache, '_response_cache', responses)
+
+    sessions.put('S1', {'user_id': 'U1', 'company_id': 'C1'})
+    sessions.put('S2', {'user_id': 'U2', 'company_id': 'C2'})
+    tenants.put('C1', tenant_cache.KIND_COMPANY_INFO, {'name': 'Acme'})
+    responses.put('C1', response_cache.KEY_STATS, {'total_cameras': 3})
+    responses.put('C2', response_cache.KEY_STATS, {'total_cameras': 1})
+
+    invalidate_company('C1')
+
+    assert sessions.get('S1') is None and sessions.get('S2') is not None
+    assert tenants.get('C1', tenant_cache.KIND_COMPANY_INFO) is None
+    assert responses.get('C1', response_cache.KEY_STATS) is None
+    assert responses.get('C2', response_cache.KEY_STATS) == {'total_cameras': 1}
@@ -0,0 +1,114 @@
+"""Tests for the write-behind batched insert queue (SQLite file database)."""
+import sqlite3
+import time
+
+from src.smartsafe.services.write_behind import DROP_NEWEST, WriteBehindQueue
+
+COLUMNS = ('company_id', 'camera_id', 'people_detected')
+
+
+def _provider(path, delay=0.0, fail=None):
+    conn = sqlite3.connect(path)
+    conn.execute('CREATE TABLE IF NOT EXISTS detections (company_id TEXT, camera_id TEXT, people_detected INTEGER)')
+    conn.execute('CREATE TABLE IF NOT EXISTS violations (company_id TEXT, camera_id TEXT, missing_ppe TEXT)')
+    conn.commit()
+    conn.close()
+
+    def get_connection():
+        time.sleep(delay)
+        if fail and fail[0]:
+            raise sqlite3.OperationalError('database is locked')
+        return sqlite3.connect(path)
+
+    return lambda: (get_connection, lambda conn: conn.close(), 'sqlite')
+
+
+def _count(path, table):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_rows_are_written_in_one_batch_per_flush(tmp_path):
+    path = str(tmp_path / 'wb.db')
+    queue = WriteBehindQueue(flush_rows=1000, flush_interval_ms=60000, connection_provider=_provider(path))
+    for i in range(50):
+        queue.enqueue('detections', COLUMNS, ('COMP', f'CAM{i % 3}', i))
+    queue.enqueue('violations', ('company_id', 'camera_id', 'missing_ppe'), ('COMP', 'CAM1', 'helmet'))
+
+    assert queue.flush()
+    assert (_count(path, 'detections'), _count(path, 'violations')) == (50, 1)
+    stats = queue.stats()
+    assert stats['flushes'] == 1 and stats['rows_written'] == 51 and stats['pending'] == 0
+    queue.shutdown()
+
+
+def test_background_thread_flushes_when_batch_fills(tmp_path):
+    path = str(tmp_path / 'wb.db')
+    queue = WriteBehindQueue(flush_rows=10, flush_interval_ms=60000, connection_provider=_provider(path))
+    for i in range(10):
+        queue.enqueue('detections', COLUMNS, ('COMP', 'CAM1', i))
+
+    deadline = time.time() + 5
+    while _count(path, 'detections') < 10 and time.time() < deadline:
+        time.sleep(0.01)
+    assert _count(path, 'detections') == 10
+    queue.shutdown()
+
+
+def test_full_queue_applies_drop_policy(tmp_path):
+    path = str(tmp_path / 'wb.db')
+    oldest = WriteBehindQueue(flush_rows=100, flush_interval_ms=60000, max_pending=3,
+                              connection_provider=_provider(path))
+    newest = WriteBehindQueue(flush_rows=100, flush_interval_ms=60000, max_pending=3, drop_policy=DROP_NEWEST,
+                              connection_provider=_provider(path))
+    for i in range(5):
+        oldest.enqueue('detections', COLUMNS, ('OLD', 'CAM1', i))
+        newest.enqueue('detections', COLUMNS, ('NEW', 'CAM1', i))
+
+    assert oldest.stats()['rows_dropped'] == 2 and newest.stats()['rows_dropped'] == 2
+    oldest.shutdown()
+    newest.shutdown()
+    conn = sqlite3.connect(path)
+    kept = conn.execute('SELECT company_id, people_detected FROM detections ORDER BY company_id, people_detected').fetchall()
+    conn.close()
+    assert kept == [('NEW', 0), ('NEW', 1), ('NEW', 2), ('OLD', 2), ('OLD', 3), ('OLD', 4)]
+
+
+def test_enqueue_never_waits_for_db_and_failed_batches_are_retried(tmp_path):
+    path = str(tmp_path / 'wb.db')
+    fail = [True]
+    queue = WriteBehindQueue(flush_rows=5, flush_interval_ms=20, connection_provider=_provider(path, 0.2, fail))
+
+    started = time.perf_counter()
+    for i in range(20):
+        queue.enqueue('detections', COLUMNS, ('COMP', 'CAM1', i))
+    assert time.perf_counter() - started < 0.1
+
+    deadline = time.time() + 5
+    while queue.stats()['flush_errors'] == 0 and time.time() < deadline:
+        time.sleep(0.01)
+    fail[0] = False
+    queue.shutdown(timeout=5)
+
+    assert queue.stats()['flush_errors'] >= 1
+    assert _count(path, 'detections') == 20 and queue.pending == 0
+
+
+def test_bad_row_is_dead_lettered_without_sinking_the_batch(tmp_path):
+    path = str(tmp_path / 'wb.db')
+    queue = WriteBehindQueue(flush_rows=1000, flush_interval_ms=60000, connection_provider=_provider(path))
+    for i in range(5):
+        queue.enqueue('detections', COLUMNS, ('COMP', 'CAM1', i))
+    queue.enqueue('violations', ('company_id', 'camera_id', 'missing_ppe'), ('COMP', 'CAM1', 'helmet'))
+    queue.enqueue('violations', ('company_id', 'camera_id', 'no_such_column'), ('COMP', 'CAM1', 'x'))
+    queue.enqueue('violations', ('company_id', 'camera_id', 'missing_ppe'), ('COMP', 'CAM2', 'vest'))
+
+    assert queue.flush()
+    assert (_count(path, 'detections'), _count(path, 'violations')) == (5, 2)
+    stats = queue.stats()
+    assert stats['rows_written'] == 7 and stats['rows_dead_lettered'] == 1 and stats['pending'] == 0
+    assert queue.dead_letters[0]['table'] == 'violations' and 'no_such_column' in queue.dead_letters[0]['error']
+    queue.shutdown()